@@ -2,15 +2,26 @@
 RBAC Access Control Service
 Main application entry point
 """
+import atexit
 import os
 import logging
 from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 
+from src import metrics, request_timing
 from src.config import Config
+from src.database import replicas
 from src.database.connection import DatabaseConnection
 from src.routes import register_routes
+from src.services.audit_writer import AuditWriter
+from src.services.login_throttle import LoginThrottle, MemoryThrottleBackend, RedisThrottleBackend
+from src.services.password_hasher import PasswordHasher
+from src.services.permission_cache import PermissionCache
+from src.services.rbac_service import RBACService
+from src.services.shared_cache import SharedCache
+from src.services.token_verifier import TokenVerifier
 
 # Load environment variables
 load_dotenv()
@@ -28,8 +39,12 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     
+    # Behind reverse proxies, take the client address (login throttle, logs) from X-Forwarded-For
+    if Config.TRUSTED_PROXY_COUNT > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.TRUSTED_PROXY_COUNT)
+    
     # Enable CORS
-    CORS(app, origins=app.config['CORS_ORIGINS'])
+    CORS(app, origins=app.config['CORS_ORIGINS'], expose_headers=['X-Next-Cursor'])
     
     # Initialize database connection
     db_connection = DatabaseConnection()
@@ -38,6 +53,82 @@ def create_app():
     # Store database connection in app context
     app.db_connection = db_connection
     
+    # Clients that wrote keep reading from the primary until replicas catch up
+    if Config.DB_REPLICA_URLS:
+        replicas.init_app(app, sticky_seconds=Config.DB_REPLICA_STICKY_SECONDS)
+    
+    # Permission decision, role set and item cache (None when disabled)
+    app.permission_cache = None
+    if Config.PERMISSION_CACHE_ENABLED:
+        app.permission_cache = PermissionCache(
+            max_size=Config.PERMISSION_CACHE_MAX_SIZE,
+            ttl=Config.PERMISSION_CACHE_TTL
+        )
+    
+    # Redis-backed cache shared by all workers, fronted by the local cache
+    if Config.REDIS_ENABLED:
+        shared_cache = SharedCache(
+            Config.REDIS_URL,
+            ttl=Config.CACHE_TTL,
+            local=app.permission_cache
+        )
+        shared_cache.start_listener()
+        app.permission_cache = shared_cache
+    
+    # JWT verifier shared by all requests, caching verified tokens until exp;
+    # tokens issued before a role change, logout or deactivation are refused
+    app.token_verifier = TokenVerifier(
+        Config.JWT_SECRET_KEY,
+        algorithm=Config.JWT_ALGORITHM,
+        max_size=Config.TOKEN_CACHE_SIZE,
+        is_revoked=RBACService(db_connection, app.permission_cache).is_token_revoked
+    )
+    
+    # Failed-login limits, enforced before the user lookup and bcrypt (None when disabled)
+    app.login_throttle = None
+    if Config.LOGIN_THROTTLE_ENABLED:
+        if Config.LOGIN_THROTTLE_BACKEND == 'redis':
+            backend = RedisThrottleBackend(Config.REDIS_URL)
+        else:
+            backend = MemoryThrottleBackend()
+        app.login_throttle = LoginThrottle(
+            max_attempts=Config.MAX_LOGIN_ATTEMPTS,
+            max_attempts_per_ip=Config.LOGIN_THROTTLE_MAX_PER_IP,
+            window=Config.LOGIN_THROTTLE_WINDOW,
+            backend=backend
+        )
+    
+    # bcrypt runs on its own bounded pool so logins cannot starve other requests
+    app.password_hasher = PasswordHasher(
+        rounds=Config.BCRYPT_ROUNDS,
+        max_workers=Config.PASSWORD_HASH_WORKERS,
+        max_pending=Config.PASSWORD_HASH_MAX_PENDING
+    )
+    atexit.register(app.password_hasher.shutdown)
+    
+    # Background audit log writer (None writes access_logs synchronously)
+    app.audit_writer = None
+    if Config.AUDIT_ASYNC_ENABLED:
+        app.audit_writer = AuditWriter(
+            db_connection,
+            max_queue_size=Config.AUDIT_QUEUE_SIZE,
+            batch_size=Config.AUDIT_BATCH_SIZE,
+            flush_interval=Config.AUDIT_FLUSH_INTERVAL,
+            overflow_policy=Config.AUDIT_OVERFLOW_POLICY,
+            block_timeout=Config.AUDIT_BLOCK_TIMEOUT,
+            spill_path=Config.AUDIT_SPILL_PATH
+        )
+        app.audit_writer.start()
+        atexit.register(app.audit_writer.stop)
+    
+    # Server-Timing header and per-request timing log (nothing is hooked in when disabled)
+    if Config.REQUEST_TIMING_ENABLED:
+        request_timing.init_app(app, log_threshold_ms=Config.REQUEST_TIMING_LOG_THRESHOLD_MS)
+    
+    # Prometheus /metrics: query fingerprints, routes, pool and caches
+    if Config.METRICS_ENABLED:
+        metrics.init_app(app, refresh_interval=Config.METRICS_REFRESH_INTERVAL)
+    
     # Register all routes
     register_routes(app)
     
@@ -0,0 +1,73 @@
+"""
+RBAC Access Control Service
+ASGI entry point: permission checks, item, role, user and auth endpoints run
+as async handlers on a psycopg 3 pool; every other route is served by the
+Flask app from a thread pool
+
+Run with: uvicorn --factory asgi:create_async_app --workers 4
+"""
+import logging
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from psycopg_pool import PoolTimeout
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount
+
+from app import create_app
+from src.config import Config
+from src.database.async_connection import AsyncDatabaseConnection
+from src.routes import asgi as asgi_routes
+
+
+logger = logging.getLogger(__name__)
+
+
+async def pool_timeout(request, exc):
+    """Every async pool connection stayed checked out for DB_POOL_TIMEOUT seconds"""
+    return JSONResponse({'error': 'Service busy, please retry'}, 503, {'Retry-After': '1'})
+
+
+def create_async_app():
+    """ASGI application factory"""
+    # Caches, token verifier, password hasher and audit writer are shared with the Flask app
+    flask_app = create_app()
+    db = AsyncDatabaseConnection()
+    
+    @asynccontextmanager
+    async def lifespan(app):
+        await db.initialize()
+        yield
+        await db.close()
+    
+    # Async routes match first; anything else (bulk, export, sync, /metrics,
+    # unknown paths and methods) falls through to Flask
+    routes = asgi_routes.routes + [
+        Mount('/', app=WSGIMiddleware(flask_app, workers=Config.ASGI_WSGI_THREADS))
+    ]
+    
+    middleware = [
+        Middleware(
+            CORSMiddleware,
+            allow_origins=[origin.strip() for origin in Config.CORS_ORIGINS.split(',')],
+            allow_methods=['*'],
+            allow_headers=['*'],
+            expose_headers=['X-Next-Cursor']
+        )
+    ]
+    
+    app = Starlette(
+        routes=routes,
+        middleware=middleware,
+        exception_handlers={PoolTimeout: pool_timeout},
+        lifespan=lifespan
+    )
+    app.state.flask_app = flask_app
+    app.state.db = db
+    
+    logger.info("RBAC Service ASGI app initialized successfully")
+    
+    return app
@@ -0,0 +1,293 @@
+"""
+WSGI vs ASGI serving benchmark
+Starts the Flask app under gunicorn (gthread workers) and the ASGI app under
+uvicorn with the same number of worker processes, or uses instances that are
+already running, and drives both with the same permission-check requests at
+increasing concurrency, reporting throughput, latency percentiles and errors
+side by side
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import signal
+import subprocess
+import sys
+import os
+import time
+import urllib.request
+from collections import Counter
+from urllib.parse import urlsplit
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from bench_suite import Probes, environment
+from replay_access_logs import ENDPOINTS
+from src.database.connection import DatabaseConnection
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def server_commands(workers: int, threads: int, wsgi_port: int, asgi_port: int) -> dict:
+    """Command lines of the two serving modes, with the same number of worker processes"""
+    return {
+        'wsgi': [
+            sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--worker-class', 'gthread',
+            '--threads', str(threads), '--bind', f'127.0.0.1:{wsgi_port}', 'app:create_app()'
+        ],
+        'asgi': [
+            sys.executable, '-m', 'uvicorn', '--factory', 'asgi:create_async_app', '--workers', str(workers),
+            '--host', '127.0.0.1', '--port', str(asgi_port), '--no-access-log', '--log-level', 'warning'
+        ]
+    }
+
+
+def start_server(command, url: str, timeout: float = 30.0) -> subprocess.Popen:
+    """Start a server and wait until its /health endpoint answers"""
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{command[2]} exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    
+    stop_server(process)
+    raise SystemExit(f"{url} did not become healthy within {timeout:.0f}s")
+
+
+def stop_server(process: subprocess.Popen):
+    """Stop a server started by start_server"""
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+class Connection:
+    """
+    Minimal HTTP/1.1 keep-alive client connection
+    
+    A thread-per-connection client would saturate a small machine long before
+    the servers do at the higher concurrency levels, so the load comes from
+    one event loop.
+    """
+    
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+    
+    async def request(self, method: str, path: str, body=None) -> int:
+        """Send one request and read the whole response; returns the status code"""
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        
+        payload = json.dumps(body).encode() if body is not None else b''
+        self._writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+        )
+        
+        head = await self._reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split(' ', 2)[1])
+        headers = dict(line.lower().split(': ', 1) for line in lines[1:] if line)
+        
+        if 'content-length' not in headers:
+            raise ConnectionError("response without Content-Length")
+        await self._reader.readexactly(int(headers['content-length']))
+        
+        if headers.get('connection') == 'close':
+            self.close()
+        return status
+    
+    def close(self):
+        """Drop the connection; the next request reconnects"""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+async def run_level(url: str, requests, concurrency: int, duration: float, warmup: float, timeout: float) -> dict:
+    """
+    Keep concurrency requests in flight for warmup + duration seconds
+    
+    Only requests completed after the warmup are counted.
+    
+    Args:
+        url: Base URL of the server
+        requests: Endless iterator of (method, path, body)
+        concurrency: Connections, each with one request in flight
+        duration: Measured seconds
+        warmup: Seconds of load before measuring
+        timeout: Per-request timeout in seconds
+    """
+    parts = urlsplit(url)
+    prefix = parts.path.rstrip('/')
+    latencies_ms = []
+    statuses = Counter()
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + warmup
+    stop_at = measure_from + duration
+    
+    async def worker():
+        conn = Connection(parts.hostname, parts.port or 80)
+        while loop.time() < stop_at:
+            method, path, body = next(requests)
+            status = None
+            started = loop.time()
+            try:
+                status = await asyncio.wait_for(conn.request(method, prefix + path, body), timeout)
+            except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                conn.close()
+            finished = loop.time()
+            
+            if finished >= measure_from:
+                latencies_ms.append((finished - started) * 1000)
+                statuses[status or 'error'] += 1
+        conn.close()
+    
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    
+    latencies_ms.sort()
+    count = len(latencies_ms)
+    pick = lambda q: round(latencies_ms[min(count - 1, int(q * count))], 2) if count else 0.0
+    errors = sum(n for status, n in statuses.items() if status == 'error' or status >= 400)
+    
+    return {
+        'concurrency': concurrency,
+        'requests': count,
+        'requests_per_second': round(count / duration, 1),
+        'errors': errors,
+        'error_rate': round(errors / count, 4) if count else 0.0,
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+        'max_ms': round(latencies_ms[-1], 2) if count else 0.0,
+        'statuses': {str(status): n for status, n in statuses.items()}
+    }
+
+
+def build_requests(probes: Probes, names, rng: random.Random):
+    """Endless, shuffled cycle of the selected endpoints' requests for each sampled check"""
+    requests = [
+        ENDPOINTS[name]({'user_id': user_id, 'item_id': item_id, 'action': action})
+        for user_id, item_id, action in probes.checks
+        for name in names
+    ]
+    rng.shuffle(requests)
+    return itertools.cycle(requests)
+
+
+def report(results: dict):
+    """Print both modes side by side for every concurrency level"""
+    modes = list(results['modes'])
+    print(f"\n{'concurrency':>11}  " + "  ".join(
+        f"{mode + ' req/s':>12} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}" for mode in modes
+    ))
+    
+    for index, concurrency in enumerate(results['config']['concurrency']):
+        cells = []
+        for mode in modes:
+            level = results['modes'][mode][index]
+            cells.append(f"{level['requests_per_second']:>12.1f} {level['p50_ms']:>7.1f}ms "
+                         f"{level['p95_ms']:>6.1f}ms {level['p99_ms']:>6.1f}ms {level['errors']:>7}")
+        print(f"{concurrency:>11}  " + "  ".join(cells))
+    
+    if len(modes) == 2:
+        first, second = (results['modes'][mode] for mode in modes)
+        ratios = [
+            f"{b['requests_per_second'] / a['requests_per_second']:.2f}x" if a['requests_per_second'] else 'n/a'
+            for a, b in zip(first, second)
+        ]
+        print(f"\n{modes[1]} / {modes[0]} throughput: {', '.join(ratios)}")
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--wsgi-url', help="Use a running WSGI instance instead of starting gunicorn")
+    parser.add_argument('--asgi-url', help="Use a running ASGI instance instead of starting uvicorn")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for both servers (default: one per CPU)")
+    parser.add_argument('--threads', type=int, default=16, help="Threads per gunicorn gthread worker")
+    parser.add_argument('--wsgi-port', type=int, default=8001)
+    parser.add_argument('--asgi-port', type=int, default=8002)
+    parser.add_argument('--concurrency', type=lambda s: [int(n) for n in s.split(',')], default=[16, 64, 256],
+                        help="Comma-separated numbers of requests kept in flight")
+    parser.add_argument('--duration', type=float, default=15.0, help="Measured seconds per concurrency level")
+    parser.add_argument('--warmup', type=float, default=3.0, help="Unmeasured seconds before each level")
+    parser.add_argument('--endpoints', default='check',
+                        help=f"Comma-separated requests per sampled check, from: {', '.join(ENDPOINTS)}")
+    parser.add_argument('--probes', type=int, default=500, help="Users and items sampled from the database")
+    parser.add_argument('--timeout', type=float, default=10.0, help="Per-request timeout in seconds")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    
+    names = [name.strip() for name in args.endpoints.split(',')]
+    unknown = [name for name in names if name not in ENDPOINTS]
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(unknown)}")
+    
+    rng = random.Random(args.seed)
+    db = DatabaseConnection()
+    db.initialize()
+    try:
+        probes = Probes(db, rng, args.probes)
+    finally:
+        db.close()
+    
+    commands = server_commands(args.workers, args.threads, args.wsgi_port, args.asgi_port)
+    urls = {
+        'wsgi': args.wsgi_url or f'http://127.0.0.1:{args.wsgi_port}',
+        'asgi': args.asgi_url or f'http://127.0.0.1:{args.asgi_port}'
+    }
+    external = {'wsgi': args.wsgi_url, 'asgi': args.asgi_url}
+    results = {'environment': environment(), 'config': vars(args).copy(), 'modes': {}}
+    
+    # One server at a time, so each has the machine to itself
+    for mode, url in urls.items():
+        process = None if external[mode] else start_server(commands[mode], url)
+        print(f"Benchmarking {mode} at {url} (endpoints: {', '.join(names)})", file=sys.stderr)
+        try:
+            levels = []
+            for concurrency in args.concurrency:
+                requests = build_requests(probes, names, random.Random(args.seed))
+                level = asyncio.run(run_level(url, requests, concurrency, args.duration, args.warmup, args.timeout))
+                print(f"  {concurrency:>4} in flight: {level['requests_per_second']:.1f} req/s, "
+                      f"p99 {level['p99_ms']}ms, {level['errors']} errors", file=sys.stderr)
+                levels.append(level)
+            results['modes'][mode] = levels
+        finally:
+            if process is not None:
+                stop_server(process)
+    
+    report(results)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"✓ Results saved to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Auth middleware benchmark
+Measures per-request require_auth overhead with a cold and a warm token cache
+"""
+import argparse
+import statistics
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import jwt
+from flask import Flask
+
+from src.config import Config
+from src.middleware import require_auth
+from src.services.token_verifier import TokenVerifier
+
+
+def build_app(cache_size: int) -> Flask:
+    """Minimal app with a verifier; no database is needed for require_auth"""
+    app = Flask(__name__)
+    app.token_verifier = TokenVerifier(Config.JWT_SECRET_KEY, Config.JWT_ALGORITHM, max_size=cache_size)
+    return app
+
+
+def make_token() -> str:
+    """Token shaped like the ones issued at login"""
+    now = datetime.utcnow()
+    payload = {
+        'user_id': 1,
+        'username': 'bench',
+        'email': 'bench@example.com',
+        'iat': now,
+        'exp': now + timedelta(hours=1),
+        'authz_version': 0,
+        'roles': ['viewer'],
+        'roles_exp': None
+    }
+    return jwt.encode(payload, Config.JWT_SECRET_KEY, algorithm=Config.JWT_ALGORITHM)
+
+
+def run(app: Flask, token: str, iterations: int):
+    """Time a require_auth-protected no-op view in microseconds"""
+    view = require_auth(lambda: None)
+    headers = {'Authorization': f'Bearer {token}'}
+    timings = []
+    
+    for _ in range(iterations):
+        with app.test_request_context('/', headers=headers):
+            started = time.perf_counter()
+            view()
+            timings.append((time.perf_counter() - started) * 1e6)
+    
+    return timings
+
+
+def report(label: str, timings):
+    """Print latency percentiles"""
+    timings = sorted(timings)
+    pick = lambda q: timings[min(len(timings) - 1, int(q * len(timings)))]
+    print(f"{label:<6} mean={statistics.mean(timings):7.1f}us  p50={pick(0.50):7.1f}us  "
+          f"p95={pick(0.95):7.1f}us  p99={pick(0.99):7.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+    
+    token = make_token()
+    
+    # Cold: caching disabled, so every request decodes and verifies the JWT
+    cold = run(build_app(cache_size=0), token, args.iterations)
+    report('cold', cold)
+    
+    # Warm: the token is verified once and then served from the cache
+    warm = run(build_app(cache_size=Config.TOKEN_CACHE_SIZE), token, args.iterations)
+    report('warm', warm)
+    
+    print(f"median speedup: {statistics.median(cold) / statistics.median(warm):.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Prepared statement benchmark
+Compares permission check latency with plain-text SQL and with prepared statements
+"""
+import argparse
+import statistics
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from src.database.connection import DatabaseConnection
+from src.services.rbac_service import RBACService
+
+load_dotenv()
+
+
+class NullAuditWriter:
+    """Discards audit rows so only the check query is measured"""
+    
+    def submit(self, *row) -> bool:
+        return True
+
+
+def sample_check(db: DatabaseConnection):
+    """Pick an existing (user_id, item_id, action) so the probe finds a row"""
+    row = db.execute_query(
+        "SELECT user_id, item_id, action FROM effective_access WHERE user_id <> 0 LIMIT 1",
+        fetch_one=True
+    )
+    return (row['user_id'], row['item_id'], row['action']) if row else (1, 1, 'read')
+
+
+def run(service: RBACService, check, iterations: int):
+    """Time check_user_permission calls in microseconds"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        service.check_user_permission(*check)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings
+
+
+def report(label: str, timings):
+    """Print latency percentiles"""
+    timings = sorted(timings)
+    pick = lambda q: timings[min(len(timings) - 1, int(q * len(timings)))]
+    print(f"{label:<10} mean={statistics.mean(timings):8.1f}us  p50={pick(0.50):8.1f}us  "
+          f"p95={pick(0.95):8.1f}us  p99={pick(0.99):8.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--warmup', type=int, default=200)
+    args = parser.parse_args()
+    
+    db = DatabaseConnection()
+    db.initialize()
+    
+    # No decision cache, so every call reaches the database
+    service = RBACService(db, audit_writer=NullAuditWriter())
+    check = sample_check(db)
+    print(f"Checking {check} x {args.iterations}")
+    
+    results = {}
+    for label, prepared in (('text', False), ('prepared', True)):
+        db.use_prepared_statements = prepared
+        run(service, check, args.warmup)
+        results[label] = run(service, check, args.iterations)
+        report(label, results[label])
+    
+    speedup = statistics.median(results['text']) / statistics.median(results['prepared'])
+    print(f"median speedup: {speedup:.2f}x")
+    
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+"""
+Authorization hot-path benchmark suite
+Measures permission checks, accessible-item listing, login, token verification,
+require_role and the list endpoints against a real Postgres, at one or more
+dataset sizes, and compares the results with a saved baseline
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import os
+import time
+from datetime import datetime, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from flask import Flask
+
+load_dotenv()
+
+from app import create_app
+from src.config import Config
+from src.middleware import require_role
+from src.services.auth_service import AuthService
+from src.services.rbac_service import RBACService
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Metrics compared against the baseline; higher is worse for all of them
+COMPARED_METRICS = ('p50_us', 'p95_us')
+
+# Settings that change what the cases measure, recorded with every run
+RECORDED_SETTINGS = (
+    'PERMISSION_CACHE_ENABLED', 'REDIS_ENABLED', 'AUDIT_ASYNC_ENABLED', 'TOKEN_CACHE_SIZE',
+    'DB_PREPARED_STATEMENTS', 'DB_POOL_SIZE', 'BCRYPT_ROUNDS', 'DEFAULT_PAGE_SIZE'
+)
+
+
+class Probes:
+    """Deterministic sample of users, items and permission checks to cycle through"""
+    
+    def __init__(self, db, rng: random.Random, count: int):
+        bounds = db.execute_query(
+            "SELECT (SELECT MAX(id) FROM users) AS max_user, (SELECT MAX(id) FROM items) AS max_item",
+            fetch_one=True
+        )
+        if not bounds['max_user'] or not bounds['max_item']:
+            raise SystemExit("The database has no users or items; load a dataset first")
+        
+        user_ids = [rng.randint(1, bounds['max_user']) for _ in range(count)]
+        rows = db.execute_query(
+            "SELECT id, username FROM users WHERE id = ANY(%s) AND is_active ORDER BY id", (user_ids,)
+        )
+        self.users = [(row['id'], row['username']) for row in rows]
+        self.item_ids = [rng.randint(1, bounds['max_item']) for _ in range(count)]
+        
+        # Half the checks are grants that exist, half are random pairs (almost always denied)
+        granted = db.execute_query(
+            """
+            SELECT DISTINCT ON (user_id) user_id, item_id, action FROM effective_access
+            WHERE user_id = ANY(%s) ORDER BY user_id, item_id
+            """,
+            ([user_id for user_id, _ in self.users],)
+        )
+        self.checks = [(row['user_id'], row['item_id'], row['action']) for row in granted]
+        self.checks += [
+            (rng.choice(self.users)[0], item_id, rng.choice(('read', 'write', 'delete')))
+            for item_id in self.item_ids[:max(len(self.checks), 1)]
+        ]
+        rng.shuffle(self.checks)
+
+
+def measure(fn, probes, iterations: int, warmup: int):
+    """
+    Call fn once per probe, cycling through probes
+    
+    Returns:
+        Latency and throughput summary; latencies in microseconds
+    """
+    for i in range(warmup):
+        fn(probes[i % len(probes)])
+    
+    timings = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        fn(probes[i % len(probes)])
+        timings.append((time.perf_counter() - call_started) * 1e6)
+    elapsed = time.perf_counter() - started
+    
+    timings.sort()
+    pick = lambda q: timings[min(len(timings) - 1, int(q * len(timings)))]
+    return {
+        'iterations': iterations,
+        'mean_us': round(statistics.mean(timings), 1),
+        'p50_us': round(pick(0.50), 1),
+        'p95_us': round(pick(0.95), 1),
+        'p99_us': round(pick(0.99), 1),
+        'max_us': round(timings[-1], 1),
+        'ops_per_sec': round(iterations / elapsed, 1)
+    }
+
+
+def build_cases(app: Flask, probes: Probes, password: str):
+    """
+    Benchmark cases as (name, fn, probes, iteration scale)
+    
+    Services are built the way the routes build them, with the app's
+    cache, audit writer and token verifier as configured; the .uncached
+    variants drop the cache so the database (or the JWT decode) is hit
+    every time.
+    """
+    db = app.db_connection
+    rbac = RBACService(db, cache=app.permission_cache, audit_writer=app.audit_writer)
+    rbac_uncached = RBACService(db, audit_writer=app.audit_writer)
+    auth = AuthService(db, token_verifier=app.token_verifier, password_hasher=app.password_hasher)
+    auth_uncached = AuthService(db)
+    client = app.test_client()
+    
+    # A handful of real logins provide the tokens for the token and middleware cases
+    logins = [auth.authenticate_user(username, password) for _, username in probes.users[:5]]
+    logins = [login for login in logins if login]
+    if not logins:
+        raise SystemExit(f"No sampled user could log in with the password {password!r}")
+    tokens = [login['token'] for login in logins]
+    
+    def role_probe(token):
+        payload = auth.verify_token(token)
+        view = require_role(*(payload.get('roles') or ['viewer']))(lambda: None)
+        return view, {'Authorization': f'Bearer {token}'}
+    
+    def call_require_role(probe):
+        view, headers = probe
+        with app.test_request_context('/', headers=headers):
+            view()
+    
+    def get(path):
+        return lambda arg: client.get(path.format(arg)).close()
+    
+    user_ids = [user_id for user_id, _ in probes.users]
+    return [
+        ('rbac.check_user_permission', lambda check: rbac.check_user_permission(*check), probes.checks, 1),
+        ('rbac.check_user_permission.uncached',
+         lambda check: rbac_uncached.check_user_permission(*check), probes.checks, 1),
+        ('rbac.get_accessible_items',
+         lambda user_id: rbac.get_accessible_items(user_id, 'read', limit=Config.DEFAULT_PAGE_SIZE), user_ids, 0.2),
+        ('auth.authenticate_user',
+         lambda user: auth.authenticate_user(user[1], password), probes.users, 0.01),
+        ('auth.verify_token', auth.verify_token, tokens, 1),
+        ('auth.verify_token.uncached', auth_uncached.verify_token, tokens, 1),
+        ('middleware.require_role', call_require_role, [role_probe(token) for token in tokens], 1),
+        ('http.list_items', get('/api/items'), [None], 0.2),
+        ('http.list_users', get('/api/users'), [None], 0.2),
+        ('http.list_roles', get('/api/roles'), [None], 0.2),
+        ('http.accessible_items', get('/api/items/accessible?user_id={}'), user_ids, 0.2),
+        ('http.get_item', get('/api/items/{}'), probes.item_ids, 1)
+    ]
+
+
+def dataset_counts(db) -> dict:
+    """Row counts that describe the loaded dataset"""
+    return db.execute_query(
+        """
+        SELECT (SELECT COUNT(*) FROM users) AS users,
+               (SELECT COUNT(*) FROM items) AS items,
+               (SELECT COUNT(*) FROM roles) AS roles,
+               (SELECT COUNT(*) FROM item_access) AS item_access,
+               (SELECT COUNT(*) FROM effective_access) AS effective_access
+        """,
+        fetch_one=True
+    )
+
+
+def load_dataset(users: int, args):
+    """Replace the database contents with a generated dataset of the given size"""
+    command = [
+        sys.executable, os.path.join(ROOT, 'scripts', 'generate_dataset.py'), '--reset',
+        '--users', str(users), '--items', str(users * 5), '--grants', str(users * 5),
+        '--access-logs', str(users), '--password', args.password, '--seed', str(args.seed)
+    ]
+    print(f"Loading dataset: {users} users...", file=sys.stderr)
+    subprocess.run(command, check=True, stdout=sys.stderr)
+
+
+def run_size(args) -> dict:
+    """Run every selected case against the currently loaded dataset"""
+    app = create_app()
+    db = app.db_connection
+    try:
+        counts = dataset_counts(db)
+        probes = Probes(db, random.Random(args.seed), args.probes)
+        print("Dataset: " + ", ".join(f"{k}={v}" for k, v in counts.items()), file=sys.stderr)
+        
+        cases = {}
+        for name, fn, case_probes, scale in build_cases(app, probes, args.password):
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            iterations = max(5, int(args.iterations * scale))
+            cases[name] = measure(fn, case_probes, iterations, max(1, int(args.warmup * scale)))
+            report(name, cases[name])
+        
+        return {'dataset': counts, 'cases': cases}
+    finally:
+        if app.audit_writer is not None:
+            app.audit_writer.stop()
+        app.password_hasher.shutdown()
+        db.close()
+
+
+def report(name: str, result: dict):
+    """Print one case's latency percentiles and throughput"""
+    print(f"  {name:<38} p50={result['p50_us']:9.1f}us  p95={result['p95_us']:9.1f}us  "
+          f"p99={result['p99_us']:9.1f}us  {result['ops_per_sec']:9.1f} ops/s", file=sys.stderr)
+
+
+def compare(current: dict, baseline: dict, threshold: float):
+    """
+    Compare a run with a baseline
+    
+    A case regresses when any compared percentile grew by more than
+    threshold (a fraction) at the same dataset size. Cases or sizes
+    missing from either run are skipped.
+    
+    Returns:
+        List of (size, case, metric, baseline value, current value) regressions
+    """
+    regressions = []
+    for size, run in current['sizes'].items():
+        base_run = baseline['sizes'].get(size)
+        if base_run is None:
+            continue
+        for name, result in run['cases'].items():
+            base = base_run['cases'].get(name)
+            if base is None:
+                continue
+            for metric in COMPARED_METRICS:
+                if base[metric] > 0 and result[metric] > base[metric] * (1 + threshold):
+                    regressions.append((size, name, metric, base[metric], result[metric]))
+    return regressions
+
+
+def environment() -> dict:
+    """Where and how the run was made, so baselines are compared like for like"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'settings': {name: getattr(Config, name) for name in RECORDED_SETTINGS}
+    }
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=lambda s: [int(n) for n in s.split(',')],
+                        help="Comma-separated user counts to generate and load in turn, e.g. 1000,10000,100000 "
+                             "(REPLACES the database contents); default: benchmark the loaded data as is")
+    parser.add_argument('--iterations', type=int, default=2000, help="Calls per case (scaled down for slow cases)")
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--probes', type=int, default=500, help="Users and items sampled per dataset")
+    parser.add_argument('--only', nargs='+', help="Run only cases whose names start with these prefixes")
+    parser.add_argument('--password', default='password123', help="Password of the generated users")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Compare with the results in this JSON file")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="Allowed growth of p50/p95 over the baseline before flagging (0.15 = 15%%)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {'environment': environment(), 'config': vars(args).copy(), 'sizes': {}}
+    
+    if args.sizes:
+        for users in args.sizes:
+            load_dataset(users, args)
+            results['sizes'][f"{users}_users"] = run_size(args)
+    else:
+        run = run_size(args)
+        results['sizes'][f"{run['dataset']['users']}_users"] = run
+    
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"✓ Results saved to {args.save}", file=sys.stderr)
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        
+        if baseline['environment']['settings'] != results['environment']['settings']:
+            print("⚠ Baseline was recorded with different settings; the comparison may not be meaningful",
+                  file=sys.stderr)
+        
+        regressions = compare(results, baseline, args.threshold)
+        for size, name, metric, before, after in regressions:
+            print(f"✗ {size} {name} {metric}: {before:.1f}us -> {after:.1f}us "
+                  f"(+{(after / before - 1) * 100:.0f}%)", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"✓ No regressions beyond {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
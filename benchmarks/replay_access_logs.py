@@ -0,0 +1,314 @@
+"""
+Access-log replay load generator
+Replays a time window of access_logs against a running instance, at the
+recorded pace (optionally sped up) or at a fixed concurrency, and reports
+per-endpoint latency histograms and error rates
+"""
+import argparse
+import http.client
+import json
+import sys
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from src.database.connection import DatabaseConnection
+
+load_dotenv()
+
+WINDOW_QUERY = """
+SELECT user_id, item_id, action, created_at FROM access_logs
+WHERE created_at >= %s AND created_at < %s
+AND user_id IS NOT NULL AND item_id IS NOT NULL
+ORDER BY created_at, id
+"""
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf'))
+
+
+def check_access(row):
+    """The request that produced the log row"""
+    body = {'user_id': row['user_id'], 'action': row['action']}
+    return 'POST', f"/api/items/{row['item_id']}/check-access", body
+
+
+def get_item(row):
+    """Item detail fetch for the checked item"""
+    return 'GET', f"/api/items/{row['item_id']}", None
+
+
+def accessible_items(row):
+    """First page of the user's accessible items for the checked action"""
+    query = urlencode({'user_id': row['user_id'], 'action': row['action']})
+    return 'GET', f"/api/items/accessible?{query}", None
+
+
+# Requests sent for each replayed log row, selected with --endpoints
+ENDPOINTS = {
+    'check': check_access,
+    'item': get_item,
+    'accessible': accessible_items
+}
+
+
+class EndpointStats:
+    """Latencies, status codes and errors of one endpoint"""
+    
+    def __init__(self):
+        self.latencies_ms = []
+        self.statuses = Counter()
+        self.errors = 0
+    
+    def summary(self) -> dict:
+        """Counts, error rate, percentiles and histogram"""
+        latencies = sorted(self.latencies_ms)
+        count = len(latencies)
+        pick = lambda q: latencies[min(count - 1, int(q * count))] if count else 0.0
+        
+        histogram = Counter()
+        for latency in latencies:
+            histogram[next(bound for bound in BUCKETS_MS if latency <= bound)] += 1
+        
+        return {
+            'requests': count,
+            'errors': self.errors,
+            'error_rate': self.errors / count if count else 0.0,
+            'statuses': {str(status): n for status, n in sorted(self.statuses.items(), key=str)},
+            'p50_ms': round(pick(0.50), 2),
+            'p95_ms': round(pick(0.95), 2),
+            'p99_ms': round(pick(0.99), 2),
+            'max_ms': round(latencies[-1], 2) if count else 0.0,
+            'histogram_ms': [
+                {'le': 'inf' if bound == float('inf') else bound, 'count': histogram[bound]}
+                for bound in BUCKETS_MS
+            ]
+        }
+
+
+class Replayer:
+    """
+    Sends the requests for each log row from a thread pool
+    
+    Each worker keeps its own keep-alive connection. In-flight requests are
+    bounded by the pool size; when every worker is busy, dispatch waits and
+    the lag behind the recorded schedule is tracked instead of queueing
+    without limit.
+    """
+    
+    def __init__(self, base_url: str, endpoints, workers: int, token=None, timeout: float = 10.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'http'
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.endpoints = endpoints
+        self.timeout = timeout
+        self.headers = {'Content-Type': 'application/json'}
+        if token:
+            self.headers['Authorization'] = f'Bearer {token}'
+        
+        self.stats = {name: EndpointStats() for name in endpoints}
+        self.rows = 0
+        self.max_lag = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rbac-replay')
+    
+    def dispatch(self, row, due=None):
+        """
+        Queue a row's requests, waiting for a free worker
+        
+        Args:
+            row: Log row
+            due: perf_counter() time the row was scheduled for (optional)
+        """
+        self._slots.acquire()
+        with self._lock:
+            self.rows += 1
+            if due is not None:
+                self.max_lag = max(self.max_lag, time.perf_counter() - due)
+        self._executor.submit(self._replay, row)
+    
+    def close(self):
+        """Wait for the requests in flight"""
+        self._executor.shutdown(wait=True)
+    
+    def _replay(self, row):
+        """Send every selected endpoint's request for one row"""
+        try:
+            for name, build in self.endpoints.items():
+                method, path, body = build(row)
+                self._send(name, method, path, body)
+        finally:
+            self._slots.release()
+    
+    def _send(self, name: str, method: str, path: str, body):
+        """Send one request and record its latency and outcome"""
+        payload = json.dumps(body) if body is not None else None
+        status = None
+        started = time.perf_counter()
+        try:
+            conn = self._connection()
+            conn.request(method, self.prefix + path, body=payload, headers=self.headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            # Drop the connection; the next request on this worker reconnects
+            self._local.conn = None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        stats = self.stats[name]
+        with self._lock:
+            stats.latencies_ms.append(elapsed_ms)
+            stats.statuses[status or 'error'] += 1
+            if status is None or status >= 400:
+                stats.errors += 1
+    
+    def _connection(self) -> http.client.HTTPConnection:
+        """This worker's keep-alive connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            conn = cls(self.netloc, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+
+def replay(rows, replayer: Replayer, speed=None, progress_interval: float = 5.0):
+    """
+    Dispatch rows in order
+    
+    Args:
+        rows: Log rows ordered by created_at
+        replayer: Where to send them
+        speed: Replay the recorded inter-arrival gaps divided by this
+            factor, or None to send as fast as the workers allow
+        progress_interval: Seconds between progress lines
+    """
+    started = time.perf_counter()
+    first_at = None
+    next_progress = started + progress_interval
+    
+    for row in rows:
+        due = None
+        if speed is not None:
+            first_at = first_at or row['created_at']
+            due = started + (row['created_at'] - first_at).total_seconds() / speed
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        replayer.dispatch(row, due)
+        
+        if time.perf_counter() >= next_progress:
+            elapsed = time.perf_counter() - started
+            print(f"  {replayer.rows} rows in {elapsed:.0f}s ({replayer.rows / elapsed:.1f} rows/s, "
+                  f"max lag {replayer.max_lag:.2f}s)", file=sys.stderr)
+            next_progress += progress_interval
+    
+    replayer.close()
+    return time.perf_counter() - started
+
+
+def report(results: dict):
+    """Print per-endpoint percentiles, error rates and histograms"""
+    lag = f", max lag {results['max_lag_seconds']:.2f}s" if results['mode']['speed'] is not None else ""
+    print(f"\nReplayed {results['rows']} log rows in {results['elapsed_seconds']:.1f}s "
+          f"({results['rows_per_second']:.1f} rows/s{lag})")
+    
+    for name, summary in results['endpoints'].items():
+        print(f"\n{name}: {summary['requests']} requests, {summary['errors']} errors "
+              f"({summary['error_rate']:.2%})  p50={summary['p50_ms']}ms  p95={summary['p95_ms']}ms  "
+              f"p99={summary['p99_ms']}ms  max={summary['max_ms']}ms")
+        print(f"  statuses: {summary['statuses']}")
+        
+        peak = max((bucket['count'] for bucket in summary['histogram_ms']), default=0) or 1
+        for bucket in summary['histogram_ms']:
+            label = f"<= {bucket['le']}ms" if bucket['le'] != 'inf' else f"> {BUCKETS_MS[-2]}ms"
+            print(f"  {label:>10} {bucket['count']:>8} {'#' * round(40 * bucket['count'] / peak)}")
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default='http://localhost:5000', help="Base URL of the running instance")
+    parser.add_argument('--start', type=datetime.fromisoformat,
+                        help="Start of the window (default: --duration before --end)")
+    parser.add_argument('--end', type=datetime.fromisoformat, help="End of the window (default: now)")
+    parser.add_argument('--duration', type=float, default=3600, help="Window length in seconds")
+    parser.add_argument('--limit', type=int, help="Replay at most this many rows")
+    parser.add_argument('--endpoints', default='check',
+                        help=f"Comma-separated requests per row, from: {', '.join(ENDPOINTS)}")
+    
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--speed', type=float, default=1.0,
+                      help="Replay the recorded timing N times faster (default: real time)")
+    mode.add_argument('--concurrency', type=int,
+                      help="Ignore timing and keep this many rows in flight")
+    
+    parser.add_argument('--max-in-flight', type=int, default=64,
+                        help="Worker threads when replaying recorded timing")
+    parser.add_argument('--token', help="Bearer token sent with every request")
+    parser.add_argument('--timeout', type=float, default=10.0, help="Per-request timeout in seconds")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    
+    names = [name.strip() for name in args.endpoints.split(',')]
+    unknown = [name for name in names if name not in ENDPOINTS]
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(unknown)}")
+    
+    end = args.end or datetime.utcnow()
+    start = args.start or end - timedelta(seconds=args.duration)
+    speed = None if args.concurrency else args.speed
+    workers = args.concurrency or args.max_in_flight
+    
+    db = DatabaseConnection()
+    db.initialize()
+    
+    replayer = Replayer(args.url, {name: ENDPOINTS[name] for name in names}, workers,
+                        token=args.token, timeout=args.timeout)
+    
+    mode = f"{args.concurrency} concurrent" if speed is None else f"{speed:g}x recorded speed"
+    print(f"Replaying access_logs from {start} to {end} against {args.url} ({mode}, endpoints: {', '.join(names)})",
+          file=sys.stderr)
+    
+    query = WINDOW_QUERY + (f" LIMIT {int(args.limit)}" if args.limit else "")
+    try:
+        elapsed = replay(db.iter_query(query, (start, end)), replayer, speed=speed)
+    finally:
+        db.close()
+    
+    results = {
+        'url': args.url,
+        'window': {'start': start.isoformat(), 'end': end.isoformat()},
+        'mode': {'speed': speed, 'concurrency': args.concurrency},
+        'rows': replayer.rows,
+        'elapsed_seconds': elapsed,
+        'rows_per_second': replayer.rows / elapsed if elapsed else 0.0,
+        'max_lag_seconds': replayer.max_lag,
+        'endpoints': {name: stats.summary() for name, stats in replayer.stats.items()}
+    }
+    report(results)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Results saved to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+"""
+Gunicorn configuration
+Gives the workers a shared Prometheus multiprocess directory when metrics are enabled
+"""
+import os
+import shutil
+
+
+if os.getenv('METRICS_ENABLED', 'false').lower() == 'true':
+    # Must be set before any worker imports prometheus_client
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/rbac-metrics')
+
+
+def on_starting(server):
+    """Start from an empty metrics directory so samples from a previous run are not served"""
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
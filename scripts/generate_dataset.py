@@ -0,0 +1,401 @@
+"""
+Synthetic dataset generator
+Builds a production-sized RBAC dataset with power-law access patterns and
+bulk-loads it with parallel COPY
+
+Every row is derived from --seed, the table and the chunk it belongs to, so
+the same arguments (including --epoch, which defaults to today) always produce
+the same dataset regardless of --workers.
+Hot items, heavy users and popular roles follow bounded power laws whose
+exponents are configurable (0 = uniform, larger = more skewed).
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import accumulate
+from random import Random
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bcrypt
+from dotenv import load_dotenv
+from src.config import Config
+from src.database.connection import DatabaseConnection
+
+load_dotenv()
+
+# Tables whose triggers maintain role_closure, effective_access and
+# authz_version row by row; they are disabled during the load and the derived
+# tables rebuilt once at the end
+TRIGGER_TABLES = ('roles', 'user_roles', 'items', 'item_access')
+
+RESET_SQL = """
+TRUNCATE access_logs, item_access, user_roles, role_permissions, refresh_tokens,
+         effective_access, role_closure, items, roles, users
+RESTART IDENTITY CASCADE
+"""
+
+COLUMNS = {
+    'roles': ('id', 'name', 'description', 'parent_role_id'),
+    'role_permissions': ('role_id', 'permission_id'),
+    'users': ('id', 'username', 'email', 'password_hash', 'first_name', 'last_name', 'created_at'),
+    'user_roles': ('user_id', 'role_id', 'granted_by', 'granted_at', 'expires_at'),
+    'items': ('id', 'name', 'item_type', 'owner_id', 'metadata', 'is_public', 'created_at'),
+    'item_access': ('id', 'item_id', 'user_id', 'role_id', 'permission_id', 'granted_by', 'granted_at', 'expires_at'),
+    'access_logs': ('id', 'user_id', 'item_id', 'action', 'granted', 'ip_address', 'user_agent', 'created_at')
+}
+
+DEFAULT_ROLE_NAMES = ('admin', 'editor', 'viewer', 'contributor')
+ITEM_TYPES = (('document', 40), ('file', 25), ('report', 15), ('dataset', 10), ('resource', 10))
+ACTIONS = (('read', 80), ('write', 15), ('delete', 3), ('create', 2))
+FIRST_NAMES = ('Ada', 'Alan', 'Grace', 'Linus', 'Margaret', 'Ken', 'Barbara', 'Dennis', 'Frances', 'Edsger')
+LAST_NAMES = ('Lovelace', 'Turing', 'Hopper', 'Torvalds', 'Hamilton', 'Thompson', 'Liskov', 'Ritchie', 'Allen')
+USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 13_4)',
+    'Mozilla/5.0 (X11; Linux x86_64)',
+    'python-requests/2.31.0',
+    'rbac-sync/1.0'
+)
+
+# Multiplier used to spread power-law ranks over the ID space, so the hottest
+# rows are not simply the oldest ones; prime and larger than any table
+_SCATTER = 2654435761
+
+
+class PowerLaw:
+    """Draws 1-based ranks from a bounded power law; rank 1 is the most frequent"""
+    
+    def __init__(self, n: int, exponent: float):
+        self.n = n
+        self.exponent = exponent
+        self._span = (n + 1) ** (1 - exponent) - 1 if exponent != 1 else None
+    
+    def rank(self, rng: Random) -> int:
+        """Draw a rank by inverting the continuous power-law CDF on [1, n + 1)"""
+        u = rng.random()
+        if self.exponent == 0:
+            x = 1 + u * self.n
+        elif self._span is None:
+            x = (self.n + 1) ** u
+        else:
+            x = (1 + u * self._span) ** (1 / (1 - self.exponent))
+        return min(int(x), self.n)
+    
+    def id(self, rng: Random) -> int:
+        """Draw a row ID (1..n), scattering ranks over the ID space"""
+        return (self.rank(rng) - 1) * _SCATTER % self.n + 1
+
+
+class Weighted:
+    """Picks from (value, weight) pairs"""
+    
+    def __init__(self, choices):
+        self.values = [value for value, _ in choices]
+        self.cum_weights = list(accumulate(weight for _, weight in choices))
+    
+    def pick(self, rng: Random):
+        """Pick one value"""
+        return rng.choices(self.values, cum_weights=self.cum_weights)[0]
+
+
+def timestamp(spec, rng: Random, fraction: float) -> datetime:
+    """
+    A time fraction of the way through the year before the epoch, with jitter;
+    fractions above 1 fall after the epoch
+    """
+    return spec['epoch'] - timedelta(days=365 * (1 - fraction), seconds=rng.randrange(3600))
+
+
+def build_roles(spec):
+    """Role tree: the default roles are roots, later roles attach below earlier ones up to role_depth"""
+    rng = Random(f"{spec['seed']}:roles")
+    rows = []
+    depths = {}
+    
+    for role_id in range(1, spec['roles'] + 1):
+        if role_id <= len(DEFAULT_ROLE_NAMES):
+            name, parent, depth = DEFAULT_ROLE_NAMES[role_id - 1], None, 0
+        else:
+            # Prefer recent roles as parents so chains grow deep rather than wide
+            candidates = [r for r in range(max(1, role_id - 20), role_id) if depths[r] < spec['role_depth'] - 1]
+            parent = rng.choice(candidates) if candidates else None
+            depth = depths[parent] + 1 if parent else 0
+            name = f"role_{role_id}"
+        depths[role_id] = depth
+        rows.append((role_id, name, f"Generated role at depth {depth}", parent))
+    
+    return rows
+
+
+def build_role_permissions(spec):
+    """Every role can read; write, create and delete are progressively rarer"""
+    rng = Random(f"{spec['seed']}:role_permissions")
+    chances = {'read': 1.0, 'write': 0.4, 'create': 0.2, 'delete': 0.1}
+    rows = []
+    
+    for role_id in range(1, spec['roles'] + 1):
+        for action, permission_id in spec['permissions'].items():
+            if rng.random() < chances.get(action, 0.05):
+                rows.append((role_id, permission_id))
+    
+    return rows
+
+
+def generate_users(spec, rng, start, count):
+    """Users with a shared password hash, created in ID order over the year"""
+    for user_id in range(start, start + count):
+        yield (
+            user_id, f"user{user_id}", f"user{user_id}@example.com", spec['password_hash'],
+            rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), timestamp(spec, rng, user_id / spec['users'])
+        )
+
+
+def generate_user_roles(spec, rng, start, count):
+    """Each user gets one or more distinct roles, drawn by role popularity"""
+    roles = PowerLaw(spec['roles'], spec['role_skew'])
+    for user_id in range(start, start + count):
+        role_count = 1
+        while role_count < spec['roles'] and rng.random() < spec['extra_role_chance']:
+            role_count += 1
+        role_ids = set()
+        while len(role_ids) < role_count:
+            role_ids.add(roles.rank(rng))
+        for role_id in sorted(role_ids):
+            expires_at = timestamp(spec, rng, 1.1) if rng.random() < 0.05 else None
+            yield user_id, role_id, 1, timestamp(spec, rng, user_id / spec['users']), expires_at
+
+
+def generate_items(spec, rng, start, count):
+    """Items in ID order over the year, owned mostly by heavy users"""
+    owners = PowerLaw(spec['users'], spec['user_skew'])
+    item_types = Weighted(ITEM_TYPES)
+    for item_id in range(start, start + count):
+        item_type = item_types.pick(rng)
+        metadata = json.dumps({'size': rng.randrange(1, 10 ** 7), 'tags': rng.sample(range(100), 2)})
+        yield (
+            item_id, f"{item_type.title()} {item_id}", item_type, owners.id(rng), metadata,
+            rng.random() < spec['public_ratio'], timestamp(spec, rng, item_id / spec['items'])
+        )
+
+
+def generate_item_access(spec, rng, start, count):
+    """Grants on hot items, to heavy users or (less often) to popular roles"""
+    items = PowerLaw(spec['items'], spec['item_skew'])
+    users = PowerLaw(spec['users'], spec['user_skew'])
+    roles = PowerLaw(spec['roles'], spec['role_skew'])
+    permissions = Weighted(
+        [(spec['permissions'][action], weight) for action, weight in ACTIONS if action in spec['permissions']]
+    )
+    for access_id in range(start, start + count):
+        if rng.random() < spec['role_grant_ratio']:
+            user_id, role_id = None, roles.rank(rng)
+        else:
+            user_id, role_id = users.id(rng), None
+        expires_at = timestamp(spec, rng, 1.2) if rng.random() < 0.1 else None
+        yield (
+            access_id, items.id(rng), user_id, role_id, permissions.pick(rng), 1,
+            timestamp(spec, rng, rng.random()), expires_at
+        )
+
+
+def generate_access_logs(spec, rng, start, count):
+    """Access attempts by heavy users on hot items over the last 30 days"""
+    items = PowerLaw(spec['items'], spec['item_skew'])
+    users = PowerLaw(spec['users'], spec['user_skew'])
+    actions = Weighted(ACTIONS)
+    for log_id in range(start, start + count):
+        created_at = spec['epoch'] - timedelta(seconds=30 * 86400 * (1 - log_id / spec['access_logs']))
+        yield (
+            log_id, users.id(rng), items.id(rng), actions.pick(rng), rng.random() < 0.9,
+            f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+            rng.choice(USER_AGENTS), created_at
+        )
+
+
+GENERATORS = {
+    'users': generate_users,
+    'user_roles': generate_user_roles,
+    'items': generate_items,
+    'item_access': generate_item_access,
+    'access_logs': generate_access_logs
+}
+
+_worker_db = None
+
+
+def _init_worker():
+    """Open one database connection per worker process"""
+    global _worker_db
+    _worker_db = DatabaseConnection()
+    _worker_db.initialize()
+
+
+def copy_rows(db, table, rows) -> int:
+    """COPY rows into a table as CSV"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    buffer.seek(0)
+    
+    with db.get_cursor(commit=True) as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(COLUMNS[table])}) FROM STDIN WITH (FORMAT csv)", buffer)
+    return count
+
+
+def _load_chunk(task) -> int:
+    """Generate and COPY one chunk of a table (runs in a worker process)"""
+    table, chunk, start, count, spec = task
+    rng = Random(f"{spec['seed']}:{table}:{chunk}")
+    return copy_rows(_worker_db, table, GENERATORS[table](spec, rng, start, count))
+
+
+def load_table(executor, table, total, spec):
+    """Split a table into chunks and load them in parallel"""
+    started = time.perf_counter()
+    chunk_size = spec['chunk_size']
+    tasks = [
+        (table, chunk, start + 1, min(chunk_size, total - start), spec)
+        for chunk, start in enumerate(range(0, total, chunk_size))
+    ]
+    
+    loaded = 0
+    for count in executor.map(_load_chunk, tasks):
+        loaded += count
+        print(f"\r  {table}: {loaded:,} rows", end='', flush=True)
+    
+    elapsed = time.perf_counter() - started
+    print(f"\r✓ {table}: {loaded:,} rows in {elapsed:.1f}s ({loaded / elapsed if elapsed else 0:,.0f} rows/s)")
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--items', type=int, default=500000)
+    parser.add_argument('--roles', type=int, default=200)
+    parser.add_argument('--role-depth', type=int, default=6, help="Maximum depth of the role tree")
+    parser.add_argument('--grants', type=int, default=500000, help="item_access rows")
+    parser.add_argument('--access-logs', type=int, default=1000000)
+    parser.add_argument('--extra-role-chance', type=float, default=0.4,
+                        help="Chance of each additional role per user (geometric)")
+    parser.add_argument('--role-grant-ratio', type=float, default=0.01,
+                        help="Share of grants given to roles instead of users")
+    parser.add_argument('--public-ratio', type=float, default=0.05, help="Share of public items")
+    parser.add_argument('--user-skew', type=float, default=1.1, help="Power-law exponent for heavy users")
+    parser.add_argument('--item-skew', type=float, default=1.2, help="Power-law exponent for hot items")
+    parser.add_argument('--role-skew', type=float, default=1.0, help="Power-law exponent for popular roles")
+    parser.add_argument('--password', default='password123', help="Password of every generated user")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--epoch', type=datetime.fromisoformat,
+                        default=datetime.combine(datetime.utcnow().date(), datetime.min.time()),
+                        help="End of the generated time range (default: today at midnight UTC)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=50000, help="Rows per COPY")
+    parser.add_argument('--reset', action='store_true',
+                        help="Truncate users, items and everything depending on them first")
+    return parser.parse_args()
+
+
+def generate_dataset():
+    """Generate and load the dataset"""
+    args = parse_args()
+    if args.roles < len(DEFAULT_ROLE_NAMES):
+        sys.exit(f"--roles must be at least {len(DEFAULT_ROLE_NAMES)}")
+    
+    db = DatabaseConnection()
+    db.initialize()
+    started = time.perf_counter()
+    
+    if args.reset:
+        db.execute_update(RESET_SQL)
+        print("✓ Existing data truncated")
+    
+    existing = db.execute_query(
+        "SELECT (SELECT COUNT(*) FROM users) + (SELECT COUNT(*) FROM items) AS count", fetch_one=True
+    )
+    if existing['count']:
+        sys.exit("users or items already contain rows; rerun with --reset to replace them")
+    
+    # The default roles from init_db are regenerated as the roots of the role tree
+    db.execute_update("TRUNCATE role_permissions, role_closure, roles RESTART IDENTITY CASCADE")
+    
+    permissions = db.execute_query("SELECT id, action FROM permissions WHERE resource = 'items'")
+    if not permissions:
+        sys.exit("No item permissions found; run scripts/init_db.py first")
+    
+    spec = {
+        'seed': args.seed,
+        'epoch': args.epoch,
+        'users': args.users,
+        'items': args.items,
+        'roles': args.roles,
+        'role_depth': args.role_depth,
+        'access_logs': args.access_logs,
+        'extra_role_chance': args.extra_role_chance,
+        'role_grant_ratio': args.role_grant_ratio,
+        'public_ratio': args.public_ratio,
+        'user_skew': args.user_skew,
+        'item_skew': args.item_skew,
+        'role_skew': args.role_skew,
+        'chunk_size': args.chunk_size,
+        'permissions': {row['action']: row['id'] for row in permissions},
+        # One hash for everyone: hashing millions of passwords is not what is being measured
+        'password_hash': bcrypt.hashpw(
+            args.password.encode('utf-8'), bcrypt.gensalt(Config.BCRYPT_ROUNDS)
+        ).decode('utf-8')
+    }
+    
+    print(f"Generating dataset (seed {args.seed}, {args.workers} workers)...")
+    
+    with db.get_cursor(commit=True) as cursor:
+        for table in TRIGGER_TABLES:
+            cursor.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+    
+    try:
+        copy_rows(db, 'roles', build_roles(spec))
+        copy_rows(db, 'role_permissions', build_role_permissions(spec))
+        print(f"✓ roles: {args.roles} in a tree up to {args.role_depth} deep")
+        
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as executor:
+            load_table(executor, 'users', args.users, spec)
+            load_table(executor, 'user_roles', args.users, spec)
+            load_table(executor, 'items', args.items, spec)
+            load_table(executor, 'item_access', args.grants, spec)
+            load_table(executor, 'access_logs', args.access_logs, spec)
+    finally:
+        with db.get_cursor(commit=True) as cursor:
+            for table in TRIGGER_TABLES:
+                cursor.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+    
+    # Rows were loaded with explicit IDs; move the sequences past them
+    with db.get_cursor(commit=True) as cursor:
+        for table in ('roles', 'users', 'items', 'item_access', 'access_logs'):
+            cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))")
+    
+    print("Rebuilding role_closure and effective_access...")
+    rebuild_started = time.perf_counter()
+    db.execute_query("SELECT rebuild_role_closure(), rebuild_effective_access()", fetch_one=True, commit=True)
+    db.execute_update("ANALYZE")
+    
+    effective = db.execute_query("SELECT COUNT(*) AS count FROM effective_access", fetch_one=True)
+    print(f"✓ effective_access: {effective['count']:,} rows in {time.perf_counter() - rebuild_started:.1f}s")
+    
+    print(f"\n✅ Dataset loaded in {time.perf_counter() - started:.1f}s")
+    print(f"   Every user's password is {args.password!r}")
+    
+    db.close()
+
+
+if __name__ == '__main__':
+    generate_dataset()
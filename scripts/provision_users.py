@@ -0,0 +1,84 @@
+"""
+Bulk user provisioning script
+Creates users from an NDJSON or CSV file (or stdin) and reports conflicts per row
+"""
+import argparse
+import json
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from src.config import Config
+from src.database.connection import DatabaseConnection
+from src.services.user_provisioner import FORMATS, UserProvisioner, read_records
+
+load_dotenv()
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path', help="Input file, or - for stdin")
+    parser.add_argument('--format', choices=FORMATS,
+                        help="Input format (default: from the file extension, else ndjson)")
+    parser.add_argument('--batch-size', type=int, default=Config.BULK_PROVISION_BATCH_SIZE,
+                        help="Users per COPY + merge")
+    parser.add_argument('--workers', type=int, default=Config.BULK_PROVISION_WORKERS,
+                        help="bcrypt threads (0 = one per CPU)")
+    parser.add_argument('--rounds', type=int, default=Config.BCRYPT_ROUNDS, help="bcrypt cost")
+    parser.add_argument('--report', help="Write rejected rows to this NDJSON file")
+    return parser.parse_args()
+
+
+def print_progress(summary):
+    """Print the running totals after each batch"""
+    print(
+        f"  {summary['processed']} rows: {summary['created']} created, "
+        f"{len(summary['conflicts'])} conflicts, {len(summary['invalid'])} invalid "
+        f"({summary['users_per_second']:.1f} users/s)",
+        file=sys.stderr
+    )
+
+
+def provision_users():
+    """Provision users from the input file"""
+    args = parse_args()
+    fmt = args.format or ('csv' if args.path.endswith('.csv') else 'ndjson')
+    
+    db = DatabaseConnection()
+    db.initialize()
+    
+    provisioner = UserProvisioner(
+        db,
+        rounds=args.rounds,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        min_password_length=Config.PASSWORD_MIN_LENGTH
+    )
+    print(f"Provisioning users from {args.path} ({fmt}, {provisioner.workers} hash workers)...", file=sys.stderr)
+    
+    source = sys.stdin if args.path == '-' else open(args.path, newline='', encoding='utf-8')
+    try:
+        summary = provisioner.provision(read_records(source, fmt), progress=print_progress)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        db.close()
+    
+    if args.report:
+        with open(args.report, 'w') as report:
+            for row in summary['invalid'] + summary['conflicts']:
+                report.write(json.dumps(row) + '\n')
+    
+    print(f"✓ Created {summary['created']} of {summary['processed']} users "
+          f"in {summary['elapsed_seconds']:.1f}s ({summary['users_per_second']:.1f} users/s)", file=sys.stderr)
+    if summary['conflicts'] or summary['invalid']:
+        print(f"  {len(summary['conflicts'])} conflicts, {len(summary['invalid'])} invalid rows"
+              + (f" (see {args.report})" if args.report else ""), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    provision_users()
@@ -0,0 +1,32 @@
+"""
+Effective access rebuild script
+Recomputes the effective_access table from grants, roles, ownership and public items
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dotenv import load_dotenv
+from src.database.connection import DatabaseConnection
+from src.services.rbac_service import RBACService
+
+load_dotenv()
+
+
+def rebuild_effective_access():
+    """Rebuild the effective_access table"""
+    print("Rebuilding effective access...")
+    
+    db = DatabaseConnection()
+    db.initialize()
+    
+    count = RBACService(db).rebuild_effective_access()
+    print(f"✓ effective_access rebuilt ({count} rows)")
+    
+    db.close()
+
+
+if __name__ == '__main__':
+    rebuild_effective_access()
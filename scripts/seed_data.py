@@ -3,40 +3,38 @@ Seed database with sample data for testing
 """
 import sys
 import os
-from datetime import datetime, timedelta
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from dotenv import load_dotenv
 from faker import Faker
+from src.config import Config
 from src.database.connection import DatabaseConnection
-from src.services.auth_service import AuthService
+from src.services.user_provisioner import UserProvisioner
 
 load_dotenv()
 fake = Faker()
 
 
-def seed_users(auth_service, count=10):
+def seed_users(db, count=10):
     """Create sample users"""
     print(f"Creating {count} sample users...")
     
-    user_ids = []
-    for i in range(count):
-        username = f"user{i+1}"
-        email = f"user{i+1}@example.com"
-        
-        user_id = auth_service.create_user(
-            username=username,
-            email=email,
-            password="password123",
-            first_name=fake.first_name(),
-            last_name=fake.last_name()
-        )
-        
-        if user_id:
-            user_ids.append(user_id)
-    
-    print(f"✓ Created {len(user_ids)} users")
+    records = (
+        ({
+            'username': f"user{i+1}",
+            'email': f"user{i+1}@example.com",
+            'password': "password123",
+            'first_name': fake.first_name(),
+            'last_name': fake.last_name()
+        }, None)
+        for i in range(count)
+    )
+    
+    summary = UserProvisioner(db, rounds=Config.BCRYPT_ROUNDS).provision(records)
+    user_ids = summary['user_ids']
+    
+    print(f"✓ Created {len(user_ids)} users ({summary['users_per_second']:.1f} users/s)")
     return user_ids
 
 
@@ -104,10 +102,8 @@ def seed_database():
     db = DatabaseConnection()
     db.initialize()
     
-    auth_service = AuthService(db)
-    
     # Create users
-    user_ids = seed_users(auth_service, count=10)
+    user_ids = seed_users(db, count=10)
     
     # Create items
     item_ids = seed_items(db, user_ids, count=50)
@@ -25,42 +25,104 @@ class Config:
     DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
     DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
     DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
-    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 3600))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 3600))  # seconds; older connections are replaced
+    DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))  # connections opened at startup
+    DB_POOL_PING_INTERVAL = float(os.getenv('DB_POOL_PING_INTERVAL', 30))  # ping connections idle this long; -1 never
+    # Server-side prepared statements for hot queries; disable behind
+    # transaction-mode poolers such as PgBouncer
+    DB_PREPARED_STATEMENTS = os.getenv('DB_PREPARED_STATEMENTS', 'false').lower() == 'true'
+    
+    # Read Replicas; comma-separated connection strings, empty reads from the primary only
+    DB_REPLICA_URLS = os.getenv('DB_REPLICA_URLS', '')
+    DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 5))  # seconds; laggier replicas are skipped
+    DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 5))  # seconds between lag checks
+    # Seconds a client keeps reading from the primary after it writes
+    DB_REPLICA_STICKY_SECONDS = float(os.getenv('DB_REPLICA_STICKY_SECONDS', 10))
     
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-change-this')
     JWT_EXPIRATION_HOURS = int(os.getenv('JWT_EXPIRATION_HOURS', 24))
+    # With refresh tokens enabled, access tokens last ACCESS_TOKEN_EXPIRATION_MINUTES
+    # instead of JWT_EXPIRATION_HOURS and are renewed through /api/auth/refresh
+    REFRESH_TOKENS_ENABLED = os.getenv('REFRESH_TOKENS_ENABLED', 'false').lower() == 'true'
+    ACCESS_TOKEN_EXPIRATION_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRATION_MINUTES', 15))
+    REFRESH_TOKEN_EXPIRATION_DAYS = int(os.getenv('REFRESH_TOKEN_EXPIRATION_DAYS', 30))
     JWT_ALGORITHM = 'HS256'
+    TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))  # 0 disables the verified-token cache
     
     # Redis Configuration
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     REDIS_ENABLED = os.getenv('REDIS_ENABLED', 'false').lower() == 'true'
     CACHE_TTL = int(os.getenv('CACHE_TTL', 300))  # 5 minutes
     
+    # Permission Decision Cache (in-process)
+    PERMISSION_CACHE_ENABLED = os.getenv('PERMISSION_CACHE_ENABLED', 'false').lower() == 'true'
+    PERMISSION_CACHE_MAX_SIZE = int(os.getenv('PERMISSION_CACHE_MAX_SIZE', 10000))
+    PERMISSION_CACHE_TTL = int(os.getenv('PERMISSION_CACHE_TTL', 30))  # seconds
+    
+    # Audit Log Writer
+    AUDIT_ASYNC_ENABLED = os.getenv('AUDIT_ASYNC_ENABLED', 'false').lower() == 'true'
+    AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', 10000))
+    AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', 500))
+    AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', 1.0))  # seconds
+    AUDIT_OVERFLOW_POLICY = os.getenv('AUDIT_OVERFLOW_POLICY', 'block')  # block, drop or spill
+    AUDIT_BLOCK_TIMEOUT = float(os.getenv('AUDIT_BLOCK_TIMEOUT', 5.0))  # seconds
+    AUDIT_SPILL_PATH = os.getenv('AUDIT_SPILL_PATH', 'logs/audit_spill.ndjson')
+    
     # AWS Configuration
     AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
     AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
     
     # Security Configuration
-    MAX_LOGIN_ATTEMPTS = int(os.getenv('MAX_LOGIN_ATTEMPTS', 5))
+    MAX_LOGIN_ATTEMPTS = int(os.getenv('MAX_LOGIN_ATTEMPTS', 5))  # failed logins per username per window
+    LOGIN_THROTTLE_ENABLED = os.getenv('LOGIN_THROTTLE_ENABLED', 'true').lower() == 'true'
+    LOGIN_THROTTLE_WINDOW = int(os.getenv('LOGIN_THROTTLE_WINDOW', 300))  # seconds
+    LOGIN_THROTTLE_MAX_PER_IP = int(os.getenv('LOGIN_THROTTLE_MAX_PER_IP', 50))
+    LOGIN_THROTTLE_BACKEND = os.getenv('LOGIN_THROTTLE_BACKEND', 'memory')  # memory or redis
+    # reverse proxies in front of the app; the client IP is taken from the X-Forwarded-For entry they appended
+    TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
     PASSWORD_MIN_LENGTH = int(os.getenv('PASSWORD_MIN_LENGTH', 8))
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))  # hashes at another cost are upgraded on login
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 32))
+    BULK_PROVISION_BATCH_SIZE = int(os.getenv('BULK_PROVISION_BATCH_SIZE', 1000))  # users per COPY + merge
+    # bcrypt threads for scripts/provision_users.py (0 = one per CPU); the API uses the password hasher
+    BULK_PROVISION_WORKERS = int(os.getenv('BULK_PROVISION_WORKERS', 0))
     SESSION_TIMEOUT = timedelta(minutes=int(os.getenv('SESSION_TIMEOUT_MINUTES', 30)))
     
     # API Configuration
     API_VERSION = os.getenv('API_VERSION', 'v1')
     API_PREFIX = os.getenv('API_PREFIX', '/api')
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*')
+    MAX_BATCH_CHECK_SIZE = int(os.getenv('MAX_BATCH_CHECK_SIZE', 500))
+    MAX_BULK_ACCESS_SIZE = int(os.getenv('MAX_BULK_ACCESS_SIZE', 10000))  # grants or revocations per bulk call
+    MAX_ROLE_SYNC_USERS = int(os.getenv('MAX_ROLE_SYNC_USERS', 100000))  # users per role-set sync
+    DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', 100))
+    MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 1000))
+    STREAM_FETCH_SIZE = int(os.getenv('STREAM_FETCH_SIZE', 2000))  # rows per server-side cursor fetch
+    ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 10))  # threads serving the Flask fallback routes under ASGI
     
     # Logging Configuration
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'logs/rbac_service.log')
     
+    # Observability
+    # Server-Timing header and a request_timing log line on every response
+    REQUEST_TIMING_ENABLED = os.getenv('REQUEST_TIMING_ENABLED', 'false').lower() == 'true'
+    REQUEST_TIMING_LOG_THRESHOLD_MS = float(os.getenv('REQUEST_TIMING_LOG_THRESHOLD_MS', 0))  # 0 logs every request
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'  # Prometheus /metrics endpoint
+    # Seconds between pool and cache gauge updates
+    METRICS_REFRESH_INTERVAL = float(os.getenv('METRICS_REFRESH_INTERVAL', 5.0))
+    
     @classmethod
     def get_database_url(cls):
         """Construct database URL if not provided"""
         if cls.DATABASE_URL:
             return cls.DATABASE_URL
         
-        return f"postgresql://{cls.DB_USER}:{cls.DB_PASSWORD}@{cls.DB_HOST}:{cls.DB_PORT}/{cls.DB_NAME}?sslmode={cls.DB_SSL_MODE}"
+        return (
+            f"postgresql://{cls.DB_USER}:{cls.DB_PASSWORD}@{cls.DB_HOST}:{cls.DB_PORT}/{cls.DB_NAME}"
+            f"?sslmode={cls.DB_SSL_MODE}"
+        )
 
@@ -0,0 +1,142 @@
+"""
+Async PostgreSQL Connection Manager
+psycopg 3 connection pool for the ASGI app (see asgi.py)
+"""
+import logging
+from typing import Dict, List, Optional, Sequence
+
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from src.config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabaseConnection:
+    """
+    asyncio counterpart of DatabaseConnection
+    
+    Queries take the same %s placeholders and return the same dict rows, so
+    the async services run the SQL of the sync ones. A request waiting on
+    Postgres holds a pooled connection but no thread.
+    
+    Connections run in autocommit: every call is one statement, which is
+    atomic on its own, and reads skip the BEGIN/COMMIT round trips. With
+    DB_PREPARED_STATEMENTS enabled psycopg prepares every statement on its
+    first use on a connection, instead of DatabaseConnection's named ones.
+    """
+    
+    def __init__(self):
+        self._pool: Optional[AsyncConnectionPool] = None
+        self._config = Config()
+    
+    async def initialize(self):
+        """Open the connection pool, waiting for its first DB_POOL_MIN_SIZE connections"""
+        config = self._config
+        logger.info(f"Initializing async connection pool to PostgreSQL RDS at {config.DB_HOST}")
+        
+        self._pool = AsyncConnectionPool(
+            kwargs={
+                'host': config.DB_HOST,
+                'port': config.DB_PORT,
+                'dbname': config.DB_NAME,
+                'user': config.DB_USER,
+                'password': config.DB_PASSWORD,
+                'sslmode': config.DB_SSL_MODE,
+                'connect_timeout': 10,
+                'application_name': 'rbac_service_async',
+                'autocommit': True,
+                'row_factory': dict_row,
+                'prepare_threshold': 0 if config.DB_PREPARED_STATEMENTS else None
+            },
+            min_size=config.DB_POOL_MIN_SIZE,
+            max_size=config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW,
+            timeout=config.DB_POOL_TIMEOUT,
+            max_lifetime=config.DB_POOL_RECYCLE,
+            open=False
+        )
+        await self._pool.open(wait=True)
+        
+        logger.info("Async database connection pool initialized successfully")
+    
+    async def execute_query(self, query: str, params: Sequence = None, fetch_one: bool = False):
+        """
+        Execute a SQL query
+        
+        Args:
+            query: SQL query string (SELECT, or a write with RETURNING)
+            params: Query parameters
+            fetch_one: Return single row if True, all rows if False
+            
+        Returns:
+            Query results
+            
+        Raises:
+            PoolTimeout: If no connection became available within DB_POOL_TIMEOUT
+        """
+        async with self._pool.connection() as conn:
+            cursor = await conn.execute(query, params)
+            if fetch_one:
+                return await cursor.fetchone()
+            return await cursor.fetchall()
+    
+    async def execute_update(self, query: str, params: Sequence = None) -> int:
+        """
+        Execute an UPDATE/INSERT/DELETE query
+        
+        Args:
+            query: SQL query string
+            params: Query parameters
+            
+        Returns:
+            Number of affected rows
+        """
+        async with self._pool.connection() as conn:
+            cursor = await conn.execute(query, params)
+            return cursor.rowcount
+    
+    async def execute_many(self, query: str, rows: List[Sequence]):
+        """
+        Execute a statement once per row, pipelined in a single transaction
+        
+        Args:
+            query: SQL query string with one row's placeholders
+            rows: Sequence of row tuples
+        """
+        if not rows:
+            return
+        
+        async with self._pool.connection() as conn:
+            async with conn.transaction():
+                async with conn.cursor() as cursor:
+                    await cursor.executemany(query, rows)
+    
+    def stats(self) -> Dict:
+        """
+        Get pool counters
+        
+        Returns:
+            Dictionary with the keys of DatabaseConnection.stats
+        """
+        if self._pool is None:
+            return {'size': 0, 'in_use': 0, 'idle': 0, 'waiting': 0, 'max': 0}
+        
+        stats = self._pool.get_stats()
+        return {
+            'size': stats.get('pool_size', 0),
+            'in_use': stats.get('pool_size', 0) - stats.get('pool_available', 0),
+            'idle': stats.get('pool_available', 0),
+            'waiting': stats.get('requests_waiting', 0),
+            'max': stats.get('pool_max', 0),
+            'checkouts': stats.get('requests_num', 0),
+            'timeouts': stats.get('requests_errors', 0),
+            'wait_seconds': stats.get('requests_wait_ms', 0) / 1000
+        }
+    
+    async def close(self):
+        """Close all connections in the pool"""
+        if self._pool is not None:
+            await self._pool.close()
+            logger.info("Async database connection pool closed")
@@ -2,28 +2,112 @@
 PostgreSQL RDS Database Connection Manager
 Handles connection pooling and database sessions
 """
+import itertools
 import logging
+import re
+import threading
+import time
+import uuid
+import weakref
 from contextlib import contextmanager
-from typing import Optional
+from functools import wraps
+from typing import Dict, Iterator, List, Optional
 
 import psycopg2
-from psycopg2 import pool, extras
-from psycopg2.extensions import connection
+from psycopg2 import errors, pool, extras
+from psycopg2.extensions import connection, parse_dsn
 
+from src import metrics, request_timing
 from src.config import Config
+from src.database import replicas
+from src.database.pool import PoolTimeout, QueuePool
+from src.database.replicas import Replica
 
 
 logger = logging.getLogger(__name__)
 
 
+class TimedCursor(extras.RealDictCursor):
+    """RealDictCursor that adds each statement's round trip to the request's timings"""
+    
+    timings: "request_timing.RequestTimings" = None
+    
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self.timings.add_query(time.perf_counter() - started)
+    
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self.timings.add_query(time.perf_counter() - started)
+    
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            self.timings.add_query(time.perf_counter() - started)
+
+
+def _observed(method):
+    """
+    Record a query method's calls, rows, errors and latency under its
+    query fingerprint while metrics are enabled (see src.metrics)
+    """
+    @wraps(method)
+    def wrapper(self, query, *args, **kwargs):
+        if not metrics.queries_enabled():
+            return method(self, query, *args, **kwargs)
+        
+        started = time.perf_counter()
+        try:
+            result = method(self, query, *args, **kwargs)
+        except Exception:
+            metrics.observe_query(query, time.perf_counter() - started, error=True)
+            raise
+        
+        if isinstance(result, int):
+            rows = result
+        elif isinstance(result, list):
+            rows = len(result)
+        else:
+            rows = int(result is not None)
+        metrics.observe_query(query, time.perf_counter() - started, rows)
+        return result
+    
+    return wrapper
+
+
 class DatabaseConnection:
     """
     PostgreSQL RDS connection manager with connection pooling
+    
+    With DB_REPLICA_URLS set, plain reads (execute_query without commit,
+    iter_query) go round-robin to replicas whose replication lag is within
+    DB_REPLICA_MAX_LAG, and to the primary when none is. Writes always go to
+    the primary, after which the rest of the request reads from the primary
+    too (see src.database.replicas).
     """
     
     def __init__(self):
-        self._connection_pool: Optional[pool.ThreadedConnectionPool] = None
+        self._connection_pool: Optional[QueuePool] = None
         self._config = Config()
+        self.use_prepared_statements = self._config.DB_PREPARED_STATEMENTS
+        # Statement name -> SQL, shared by every connection
+        self._statements: Dict[str, str] = {}
+        # Names prepared on each pooled connection; a reconnect yields a new
+        # connection object and so starts with an empty set
+        self._prepared: "weakref.WeakKeyDictionary[connection, set[str]]" = weakref.WeakKeyDictionary()
+        self._statements_lock = threading.Lock()
+        self._replicas: List[Replica] = []
+        self._next_replica = itertools.count()
+        # Replica connection -> the replica it was checked out from
+        self._replica_connections: "weakref.WeakKeyDictionary[connection, Replica]" = weakref.WeakKeyDictionary()
     
     def initialize(self):
         """Initialize the connection pool to PostgreSQL RDS"""
@@ -42,11 +126,15 @@ class DatabaseConnection:
                 'application_name': 'rbac_service'
             }
             
-            # Create connection pool
-            self._connection_pool = pool.ThreadedConnectionPool(
-                minconn=1,
-                maxconn=self._config.DB_POOL_SIZE,
-                **conn_params
+            # Create connection pool; requests wait for a connection when it is exhausted
+            self._connection_pool = QueuePool(
+                lambda: psycopg2.connect(**conn_params),
+                pool_size=self._config.DB_POOL_SIZE,
+                max_overflow=self._config.DB_MAX_OVERFLOW,
+                timeout=self._config.DB_POOL_TIMEOUT,
+                recycle=self._config.DB_POOL_RECYCLE,
+                ping_interval=self._config.DB_POOL_PING_INTERVAL,
+                min_size=self._config.DB_POOL_MIN_SIZE
             )
             
             # Test the connection
@@ -64,14 +152,60 @@ class DatabaseConnection:
         except psycopg2.Error as e:
             logger.error(f"Failed to initialize database connection pool: {e}")
             raise
+        
+        for dsn in filter(None, (url.strip() for url in (self._config.DB_REPLICA_URLS or '').split(','))):
+            self.add_replica(dsn)
     
-    def get_connection(self) -> connection:
+    def add_replica(self, dsn: str):
         """
-        Get a connection from the pool
+        Send reads to a replica as well
+        
+        No connection is opened up front, so an unreachable replica does not
+        stop the service from starting; it is skipped until it answers its
+        lag check.
+        
+        Args:
+            dsn: libpq connection string or URL of the replica
+        """
+        params = parse_dsn(dsn)
+        name = f"{params.get('host', 'localhost')}:{params.get('port', 5432)}"
+        
+        replica_pool = QueuePool(
+            lambda: psycopg2.connect(dsn, connect_timeout=10, application_name='rbac_service'),
+            pool_size=self._config.DB_POOL_SIZE,
+            max_overflow=self._config.DB_MAX_OVERFLOW,
+            timeout=self._config.DB_POOL_TIMEOUT,
+            recycle=self._config.DB_POOL_RECYCLE,
+            ping_interval=self._config.DB_POOL_PING_INTERVAL,
+            min_size=0
+        )
+        self._replicas.append(Replica(
+            name, replica_pool,
+            max_lag=self._config.DB_REPLICA_MAX_LAG,
+            check_interval=self._config.DB_REPLICA_CHECK_INTERVAL
+        ))
+        logger.info(f"Routing reads to replica {name}")
+    
+    def get_connection(self, replica: bool = False) -> connection:
+        """
+        Get a connection from the pool, waiting up to DB_POOL_TIMEOUT
+        seconds if every connection is checked out
+        
+        Args:
+            replica: Take a replica connection if one is available and the
+                     request has not written yet (reads only)
         
         Returns:
             psycopg2 connection object
+            
+        Raises:
+            PoolTimeout: If no connection became available in time
         """
+        if replica and self._replicas and not replicas.reads_from_primary():
+            conn = self._get_replica_connection()
+            if conn is not None:
+                return conn
+        
         try:
             if self._connection_pool is None:
                 raise RuntimeError("Connection pool not initialized")
@@ -86,6 +220,30 @@ class DatabaseConnection:
             logger.error(f"Failed to get connection from pool: {e}")
             raise
     
+    def _get_replica_connection(self) -> Optional[connection]:
+        """A connection to the next available replica, or None if none can serve reads"""
+        start = next(self._next_replica)
+        count = len(self._replicas)
+        
+        for offset in range(count):
+            replica = self._replicas[(start + offset) % count]
+            if not replica.available():
+                continue
+            
+            try:
+                conn = replica.pool.getconn()
+            except PoolTimeout:
+                logger.warning(f"Replica {replica.name} is busy; trying the next one")
+                continue
+            except (psycopg2.Error, pool.PoolError) as e:
+                replica.mark_unhealthy(f"could not connect: {e}")
+                continue
+            
+            self._replica_connections[conn] = replica
+            return conn
+        
+        return None
+    
     def release_connection(self, conn: connection):
         """
         Return a connection back to the pool
@@ -94,36 +252,67 @@ class DatabaseConnection:
             conn: psycopg2 connection object to release
         """
         try:
-            if self._connection_pool and conn:
+            replica = self._replica_connections.pop(conn, None) if conn is not None else None
+            if replica is not None:
+                replica.pool.putconn(conn)
+            elif self._connection_pool and conn:
                 self._connection_pool.putconn(conn)
         except pool.PoolError as e:
             logger.error(f"Failed to release connection: {e}")
     
     @contextmanager
-    def get_cursor(self, commit: bool = False):
+    def get_cursor(self, commit: bool = False, replica: bool = False, sticky: bool = True):
         """
         Context manager for database operations
         
+        While a request is being timed (see src.request_timing), the wait
+        for a pooled connection, each statement and the commit are added to
+        its timings.
+        
         Args:
-            commit: Whether to commit the transaction
+            commit: Whether to commit the transaction; the rest of the
+                    request then reads from the primary
+            replica: Run on a replica if one is available (reads only;
+                     ignored when commit is True)
+            sticky: Whether a commit sends the request's later reads to the
+                    primary; pass False for writes nothing reads back
             
         Yields:
             psycopg2 cursor object
         """
         conn = None
         cursor = None
+        timings = request_timing.current()
+        use_replica = replica and not commit
         
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
+            if timings is None:
+                conn = self.get_connection(use_replica)
+                cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
+            else:
+                started = time.perf_counter()
+                conn = self.get_connection(use_replica)
+                timings.pool_wait_seconds += time.perf_counter() - started
+                cursor = conn.cursor(cursor_factory=TimedCursor)
+                cursor.timings = timings
             
             yield cursor
             
             if commit:
-                conn.commit()
+                if timings is None:
+                    conn.commit()
+                else:
+                    started = time.perf_counter()
+                    conn.commit()
+                    timings.db_seconds += time.perf_counter() - started
+                if sticky:
+                    replicas.record_write()
                 
         except psycopg2.Error as e:
             if conn:
+                source = self._replica_connections.get(conn)
+                if source is not None and conn.closed:
+                    source.mark_unhealthy(f"connection lost: {e}")
                 conn.rollback()
             logger.error(f"Database error: {e}")
             raise
@@ -134,7 +323,16 @@ class DatabaseConnection:
             if conn:
                 self.release_connection(conn)
     
-    def execute_query(self, query: str, params: tuple = None, fetch_one: bool = False):
+    @_observed
+    def execute_query(
+        self,
+        query: str,
+        params: tuple = None,
+        fetch_one: bool = False,
+        commit: bool = False,
+        prepare: Optional[str] = None,
+        primary: bool = False
+    ):
         """
         Execute a SQL query
         
@@ -142,37 +340,217 @@ class DatabaseConnection:
             query: SQL query string
             params: Query parameters
             fetch_one: Return single row if True, all rows if False
+            commit: Commit the transaction, for INSERT/UPDATE ... RETURNING
+            prepare: Statement name to run the query as a prepared statement
+                     when DB_PREPARED_STATEMENTS is enabled (optional)
+            primary: Read from the primary even if replicas are configured,
+                     for reads that a following write depends on or whose
+                     result is cached
             
         Returns:
             Query results
         """
-        with self.get_cursor() as cursor:
-            cursor.execute(query, params)
+        with self.get_cursor(commit=commit, replica=not primary) as cursor:
+            if prepare and self.use_prepared_statements:
+                self._execute_prepared(cursor, prepare, query, params)
+            else:
+                cursor.execute(query, params)
             
             if fetch_one:
                 return cursor.fetchone()
             return cursor.fetchall()
     
-    def execute_update(self, query: str, params: tuple = None) -> int:
+    @_observed
+    def execute_update(self, query: str, params: tuple = None, sticky: bool = True) -> int:
         """
         Execute an UPDATE/INSERT/DELETE query
         
         Args:
             query: SQL query string
             params: Query parameters
+            sticky: Send the request's later reads to the primary (see get_cursor)
             
         Returns:
             Number of affected rows
         """
-        with self.get_cursor(commit=True) as cursor:
+        with self.get_cursor(commit=True, sticky=sticky) as cursor:
             cursor.execute(query, params)
             return cursor.rowcount
     
+    @_observed
+    def execute_values(
+        self,
+        query: str,
+        rows: list,
+        template: str = None,
+        page_size: int = None,
+        fetch: bool = False,
+        sticky: bool = True
+    ):
+        """
+        Execute a multi-row INSERT using a single VALUES list
+        
+        Args:
+            query: SQL query string with a single %s placeholder for the VALUES list
+            rows: Sequence of row tuples
+            template: Row template (optional)
+            page_size: Rows per statement; defaults to all rows in one statement
+            fetch: Return the rows produced by a RETURNING clause instead of the count
+            sticky: Send the request's later reads to the primary (see get_cursor)
+            
+        Returns:
+            Number of affected rows, or the returned rows if fetch is True
+        """
+        if not rows:
+            return [] if fetch else 0
+        
+        with self.get_cursor(commit=True, sticky=sticky) as cursor:
+            result = extras.execute_values(
+                cursor, query, rows, template=template, page_size=page_size or len(rows), fetch=fetch
+            )
+            return result if fetch else cursor.rowcount
+    
+    def iter_query(
+        self,
+        query: str,
+        params: tuple = None,
+        itersize: int = 2000,
+        primary: bool = False
+    ) -> Iterator[Dict]:
+        """
+        Stream the rows of a query through a named server-side cursor
+        
+        Rows are fetched from the server itersize at a time, so memory stays
+        flat however large the result is. The pooled connection is held until
+        the generator is exhausted or closed; stopping early (break, close(),
+        or an abandoned generator being collected) closes the cursor and
+        returns the connection to the pool.
+        
+        Args:
+            query: SQL query string (SELECT only; the transaction is rolled back)
+            params: Query parameters
+            itersize: Rows fetched per round trip
+            primary: Read from the primary even if replicas are configured
+            
+        Yields:
+            Row dictionaries
+        """
+        conn = self.get_connection(replica=not primary)
+        cursor = None
+        
+        try:
+            cursor = conn.cursor(name=f"rbac_stream_{uuid.uuid4().hex}", cursor_factory=extras.RealDictCursor)
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            
+            while True:
+                rows = cursor.fetchmany(itersize)
+                if not rows:
+                    break
+                yield from rows
+                
+        except psycopg2.Error as e:
+            logger.error(f"Database error: {e}")
+            raise
+            
+        finally:
+            try:
+                if cursor is not None and not conn.closed:
+                    cursor.close()
+                # Ends the transaction the named cursor lived in
+                conn.rollback()
+            except psycopg2.Error as e:
+                logger.warning(f"Failed to close streaming cursor: {e}")
+            self.release_connection(conn)
+    
+    def register_statement(self, name: str, query: str):
+        """
+        Register a named statement for execute_query(..., prepare=name)
+        
+        Args:
+            name: Statement name (SQL identifier)
+            query: SQL query string with %s placeholders
+            
+        Raises:
+            ValueError: If the name is invalid or already registered for other SQL
+        """
+        if not re.fullmatch(r'[a-z_][a-z0-9_]*', name):
+            raise ValueError(f"Invalid prepared statement name: {name}")
+        if '%(' in query:
+            raise ValueError("Prepared statements support positional %s parameters only")
+        
+        with self._statements_lock:
+            registered = self._statements.setdefault(name, query)
+        
+        if registered != query:
+            raise ValueError(f"Prepared statement {name} is already registered with different SQL")
+    
+    def _execute_prepared(self, cursor, name: str, query: str, params: tuple = None):
+        """
+        Run a query with EXECUTE, preparing it on this connection first if needed
+        
+        The first use on each pooled connection pays for PREPARE; later calls
+        skip parsing and planning. If the server no longer knows the statement
+        (a new backend behind a pooler, DISCARD ALL) it is prepared again.
+        """
+        self.register_statement(name, query)
+        
+        conn = cursor.connection
+        params = tuple(params or ())
+        execute = f"EXECUTE {name} ({', '.join(['%s'] * len(params))})" if params else f"EXECUTE {name}"
+        
+        with self._statements_lock:
+            prepared = self._prepared.setdefault(conn, set())
+        
+        if name not in prepared:
+            self._prepare(cursor, name, query)
+            prepared.add(name)
+            cursor.execute(execute, params)
+            return
+        
+        try:
+            cursor.execute(execute, params)
+        except errors.InvalidSqlStatementName:
+            # Only this statement ran in the transaction, so it is safe to
+            # roll back; PREPARE itself is not undone by a rollback
+            conn.rollback()
+            logger.info(f"Re-preparing statement {name} after it was lost on the server")
+            self._prepare(cursor, name, query)
+            cursor.execute(execute, params)
+    
+    @staticmethod
+    def _prepare(cursor, name: str, query: str):
+        """PREPARE a %s-style query, numbering its placeholders $1..$n"""
+        parts = query.split('%s')
+        body = parts[0]
+        for index, part in enumerate(parts[1:], start=1):
+            body += f"${index}{part}"
+        cursor.execute(f"PREPARE {name} AS {body.replace('%%', '%')}")
+    
+    def stats(self) -> Dict:
+        """
+        Get pool counters
+        
+        Returns:
+            Dictionary with open, in-use, idle and waiting connections, limits
+            and checkout totals of the primary pool (see QueuePool.stats), and
+            the health, lag and pool counters of each replica
+        """
+        if self._connection_pool is None:
+            return {'size': 0, 'in_use': 0, 'idle': 0, 'waiting': 0, 'max': 0}
+        
+        stats = self._connection_pool.stats()
+        if self._replicas:
+            stats['replicas'] = [replica.stats() for replica in self._replicas]
+        return stats
+    
     def close(self):
         """Close all connections in the pool"""
         if self._connection_pool:
             self._connection_pool.closeall()
             logger.info("Database connection pool closed")
+        for replica in self._replicas:
+            replica.pool.closeall()
 
 
 # Singleton instance
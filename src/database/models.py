@@ -20,6 +20,7 @@ class User:
     created_at: datetime = None
     updated_at: datetime = None
     last_login: Optional[datetime] = None
+    authz_version: int = 0
 
 
 @dataclass
@@ -57,6 +58,14 @@ class Item:
     updated_at: datetime = None
 
 
+@dataclass
+class RoleClosure:
+    """Role hierarchy closure: a role inherits the permissions of its ancestors"""
+    ancestor_id: int
+    descendant_id: int
+    depth: int
+
+
 @dataclass
 class UserRole:
     """User-Role association"""
@@ -84,12 +93,33 @@ class ItemAccess:
     item_id: int
     user_id: Optional[int] = None
     role_id: Optional[int] = None
-    permission_id: int
-    granted_by: int
+    permission_id: int = None
+    granted_by: int = None
     granted_at: datetime = None
     expires_at: Optional[datetime] = None
 
 
+@dataclass
+class RefreshToken:
+    """Single-use refresh token; only its SHA-256 digest is stored"""
+    id: int
+    user_id: int
+    token_hash: str
+    family_id: str  # shared by every token rotated from the same login
+    expires_at: datetime
+    created_at: datetime = None
+    revoked_at: Optional[datetime] = None
+
+
+@dataclass
+class EffectiveAccess:
+    """Materialized access decision derived from grants, roles, ownership and is_public"""
+    user_id: int  # 0 for public items, readable by everyone
+    item_id: int
+    action: str
+    expires_at: Optional[datetime] = None
+
+
 @dataclass
 class AccessLog:
     """Audit log for access attempts"""
@@ -116,9 +146,13 @@ CREATE TABLE IF NOT EXISTS users (
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    last_login TIMESTAMP
+    last_login TIMESTAMP,
+    authz_version INTEGER NOT NULL DEFAULT 0
 );
 
+-- Upgrade databases created before authz_version existed
+ALTER TABLE users ADD COLUMN IF NOT EXISTS authz_version INTEGER NOT NULL DEFAULT 0;
+
 -- Roles table
 CREATE TABLE IF NOT EXISTS roles (
     id SERIAL PRIMARY KEY,
@@ -148,10 +182,15 @@ CREATE TABLE IF NOT EXISTS items (
     owner_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
     metadata JSONB,
     is_public BOOLEAN DEFAULT FALSE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Item lists page on (created_at, id), and a NULL created_at never matches
+-- the keyset seek; upgrade databases created while the column was nullable
+UPDATE items SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL;
+ALTER TABLE items ALTER COLUMN created_at SET NOT NULL;
+
 -- User-Role associations
 CREATE TABLE IF NOT EXISTS user_roles (
     id SERIAL PRIMARY KEY,
@@ -194,19 +233,444 @@ CREATE TABLE IF NOT EXISTS access_logs (
     granted BOOLEAN NOT NULL,
     ip_address INET,
     user_agent TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Audit logs page on (created_at, id) like items; rows of unknown time sort
+-- as the oldest
+UPDATE access_logs SET created_at = TIMESTAMP 'epoch' WHERE created_at IS NULL;
+ALTER TABLE access_logs ALTER COLUMN created_at SET NOT NULL;
+
+-- Refresh tokens, rotated on every use; a token is looked up by its digest
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    token_hash CHAR(64) UNIQUE NOT NULL,
+    family_id UUID NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    revoked_at TIMESTAMP
+);
+
+-- Role hierarchy closure, one row per (ancestor, descendant) pair including
+-- every role paired with itself at depth 0. Maintained by triggers on roles.
+CREATE TABLE IF NOT EXISTS role_closure (
+    ancestor_id INTEGER NOT NULL REFERENCES roles(id) ON DELETE CASCADE,
+    descendant_id INTEGER NOT NULL REFERENCES roles(id) ON DELETE CASCADE,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (descendant_id, ancestor_id)
 );
 
+CREATE OR REPLACE FUNCTION rebuild_role_closure() RETURNS VOID AS $$
+BEGIN
+    DELETE FROM role_closure;
+    
+    INSERT INTO role_closure (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE chain AS (
+        SELECT id AS descendant_id, id AS ancestor_id, 0 AS depth
+        FROM roles
+        UNION ALL
+        SELECT c.descendant_id, r.parent_role_id, c.depth + 1
+        FROM chain c
+        JOIN roles r ON r.id = c.ancestor_id
+        WHERE r.parent_role_id IS NOT NULL
+    )
+    SELECT ancestor_id, descendant_id, MIN(depth)
+    FROM chain
+    GROUP BY ancestor_id, descendant_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recompute the closure rows of the given roles, walking up from each
+CREATE OR REPLACE FUNCTION refresh_role_closure(p_role_ids INTEGER[]) RETURNS VOID AS $$
+BEGIN
+    DELETE FROM role_closure WHERE descendant_id = ANY(p_role_ids);
+    
+    INSERT INTO role_closure (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE chain AS (
+        SELECT id AS descendant_id, id AS ancestor_id, 0 AS depth
+        FROM roles
+        WHERE id = ANY(p_role_ids)
+        UNION ALL
+        SELECT c.descendant_id, r.parent_role_id, c.depth + 1
+        FROM chain c
+        JOIN roles r ON r.id = c.ancestor_id
+        WHERE r.parent_role_id IS NOT NULL
+    )
+    SELECT ancestor_id, descendant_id, MIN(depth)
+    FROM chain
+    GROUP BY ancestor_id, descendant_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only new roles and the subtrees of roles whose parent changed get new
+-- ancestors. Deletes need no work here: the closure rows cascade, and
+-- children of a deleted role are re-parented by ON DELETE SET NULL, which
+-- fires the update trigger. A new role has no members or grants yet, so
+-- only members of moved roles can gain or lose effective access.
+CREATE OR REPLACE FUNCTION roles_refresh_closure_trigger() RETURNS TRIGGER AS $$
+DECLARE
+    moved INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_role_closure(ARRAY(SELECT id FROM new_rows));
+        RETURN NULL;
+    END IF;
+    
+    moved := ARRAY(
+        SELECT DISTINCT rc.descendant_id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN role_closure rc ON rc.ancestor_id = n.id
+        WHERE n.parent_role_id IS DISTINCT FROM o.parent_role_id
+    );
+    IF cardinality(moved) = 0 THEN
+        RETURN NULL;
+    END IF;
+    
+    PERFORM refresh_role_closure(moved);
+    PERFORM refresh_effective_access(ARRAY(SELECT DISTINCT user_id FROM user_roles WHERE role_id = ANY(moved)), NULL);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Reject parent assignments that would make a role its own ancestor
+CREATE OR REPLACE FUNCTION roles_check_parent_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.parent_role_id IS NOT NULL AND EXISTS (
+        WITH RECURSIVE ancestors AS (
+            SELECT NEW.parent_role_id AS id
+            UNION
+            SELECT r.parent_role_id
+            FROM roles r
+            JOIN ancestors a ON r.id = a.id
+            WHERE r.parent_role_id IS NOT NULL
+        )
+        SELECT 1 FROM ancestors WHERE id = NEW.id
+    ) THEN
+        RAISE EXCEPTION 'Role % cannot inherit from role %: cycle in role hierarchy', NEW.id, NEW.parent_role_id
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS roles_check_parent ON roles;
+CREATE TRIGGER roles_check_parent
+    BEFORE INSERT OR UPDATE OF parent_role_id ON roles
+    FOR EACH ROW EXECUTE FUNCTION roles_check_parent_trigger();
+
+DROP TRIGGER IF EXISTS roles_rebuild_closure ON roles;
+DROP FUNCTION IF EXISTS roles_rebuild_closure_trigger();
+
+DROP TRIGGER IF EXISTS roles_refresh_closure_insert ON roles;
+CREATE TRIGGER roles_refresh_closure_insert
+    AFTER INSERT ON roles REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION roles_refresh_closure_trigger();
+
+DROP TRIGGER IF EXISTS roles_refresh_closure_update ON roles;
+CREATE TRIGGER roles_refresh_closure_update
+    AFTER UPDATE ON roles REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION roles_refresh_closure_trigger();
+
+-- Materialized effective access: one row per (user, action, item) the user may
+-- perform, derived from direct grants, role grants (including inherited roles),
+-- item ownership and is_public. Public items are stored once under user_id 0.
+-- Maintained by the triggers below; rebuild with rebuild_effective_access().
+CREATE TABLE IF NOT EXISTS effective_access (
+    user_id INTEGER NOT NULL,
+    action VARCHAR(50) NOT NULL,
+    item_id INTEGER NOT NULL,
+    expires_at TIMESTAMP,
+    PRIMARY KEY (user_id, action, item_id)
+);
+
+CREATE OR REPLACE VIEW effective_access_source AS
+SELECT user_id, item_id, action,
+       CASE WHEN BOOL_OR(expires_at IS NULL) THEN NULL ELSE MAX(expires_at) END AS expires_at
+FROM (
+    -- Direct user grants
+    SELECT ia.user_id, ia.item_id, p.action, ia.expires_at
+    FROM item_access ia
+    JOIN permissions p ON p.id = ia.permission_id
+    WHERE ia.user_id IS NOT NULL
+    UNION ALL
+    -- Role grants, for members of the role and of every role inheriting from it
+    SELECT ur.user_id, ia.item_id, p.action, LEAST(ia.expires_at, ur.expires_at)
+    FROM item_access ia
+    JOIN permissions p ON p.id = ia.permission_id
+    JOIN role_closure rc ON rc.ancestor_id = ia.role_id
+    JOIN user_roles ur ON ur.role_id = rc.descendant_id
+    UNION ALL
+    -- Owners may perform every item action
+    SELECT i.owner_id, i.id, p.action, NULL
+    FROM items i
+    JOIN (SELECT DISTINCT action FROM permissions WHERE resource = 'items') p ON TRUE
+    WHERE i.owner_id IS NOT NULL
+    UNION ALL
+    -- Public items are readable by everyone
+    SELECT 0, i.id, 'read', NULL
+    FROM items i
+    WHERE i.is_public
+) sources
+GROUP BY user_id, item_id, action;
+
+-- Recompute the rows of the given users and items
+CREATE OR REPLACE FUNCTION refresh_effective_access(p_user_ids INTEGER[], p_item_ids INTEGER[]) RETURNS VOID AS $$
+BEGIN
+    DELETE FROM effective_access
+    WHERE user_id = ANY(p_user_ids) OR item_id = ANY(p_item_ids);
+    
+    INSERT INTO effective_access (user_id, item_id, action, expires_at)
+    SELECT user_id, item_id, action, expires_at
+    FROM effective_access_source
+    WHERE user_id = ANY(p_user_ids) OR item_id = ANY(p_item_ids)
+    ON CONFLICT (user_id, action, item_id) DO UPDATE SET expires_at = EXCLUDED.expires_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recompute the rows of the given actions
+CREATE OR REPLACE FUNCTION refresh_effective_access_actions(p_actions VARCHAR[]) RETURNS VOID AS $$
+BEGIN
+    DELETE FROM effective_access WHERE action = ANY(p_actions);
+    
+    INSERT INTO effective_access (user_id, item_id, action, expires_at)
+    SELECT user_id, item_id, action, expires_at
+    FROM effective_access_source
+    WHERE action = ANY(p_actions);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rebuild_effective_access() RETURNS VOID AS $$
+BEGIN
+    DELETE FROM effective_access;
+    
+    INSERT INTO effective_access (user_id, item_id, action, expires_at)
+    SELECT user_id, item_id, action, expires_at
+    FROM effective_access_source;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level refresh scoped by the changed rows.
+-- TG_ARGV[0]: column of the changed rows holding the scope ID
+-- TG_ARGV[1]: 'user' or 'item', the kind of ID in that column
+CREATE OR REPLACE FUNCTION effective_access_refresh_trigger() RETURNS TRIGGER AS $$
+DECLARE
+    changed INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        EXECUTE format('SELECT ARRAY(SELECT DISTINCT %I FROM new_rows)', TG_ARGV[0]) INTO changed;
+    ELSIF TG_OP = 'DELETE' THEN
+        EXECUTE format('SELECT ARRAY(SELECT DISTINCT %I FROM old_rows)', TG_ARGV[0]) INTO changed;
+    ELSE
+        EXECUTE format('SELECT ARRAY(SELECT %1$I FROM new_rows UNION SELECT %1$I FROM old_rows)', TG_ARGV[0])
+            INTO changed;
+    END IF;
+    
+    IF TG_ARGV[1] = 'user' THEN
+        PERFORM refresh_effective_access(changed, NULL);
+    ELSE
+        PERFORM refresh_effective_access(NULL, changed);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A permission contributes rows under its action: through the grants that
+-- reference it, and for owners when its resource is 'items'. Inserts and
+-- deletes can only change the item actions owners get (grants on a deleted
+-- permission cascade through item_access); updates matter only when the
+-- resource or action changes.
+CREATE OR REPLACE FUNCTION permissions_effective_access_trigger() RETURNS TRIGGER AS $$
+DECLARE
+    changed VARCHAR[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changed := ARRAY(SELECT DISTINCT action FROM new_rows WHERE resource = 'items');
+    ELSIF TG_OP = 'DELETE' THEN
+        changed := ARRAY(SELECT DISTINCT action FROM old_rows WHERE resource = 'items');
+    ELSE
+        changed := ARRAY(
+            SELECT n.action FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE (n.resource, n.action) IS DISTINCT FROM (o.resource, o.action)
+            UNION
+            SELECT o.action FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE (n.resource, n.action) IS DISTINCT FROM (o.resource, o.action)
+        );
+    END IF;
+    
+    IF cardinality(changed) > 0 THEN
+        PERFORM refresh_effective_access_actions(changed);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- users.authz_version changes whenever a user's role names may have changed,
+-- so role claims embedded in a token can be checked without loading roles.
+-- It also moves on logout and when a user is deactivated or reactivated, so
+-- tokens issued before are refused.
+CREATE OR REPLACE FUNCTION bump_authz_versions(p_user_ids INTEGER[]) RETURNS VOID AS $$
+BEGIN
+    UPDATE users SET authz_version = authz_version + 1
+    WHERE id = ANY(p_user_ids);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION user_roles_authz_version_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_authz_versions(ARRAY(SELECT DISTINCT user_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM bump_authz_versions(ARRAY(SELECT DISTINCT user_id FROM old_rows));
+    ELSE
+        PERFORM bump_authz_versions(ARRAY(SELECT user_id FROM new_rows UNION SELECT user_id FROM old_rows));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A role's name is claimed by the members of the role and of every role
+-- inheriting from it, so a rename or a move bumps only that subtree; updates
+-- that change neither name nor parent bump no one. Deletes need no work here:
+-- members lose the role through the user_roles cascade, and children are
+-- re-parented by ON DELETE SET NULL, which fires this trigger.
+CREATE OR REPLACE FUNCTION roles_authz_version_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_authz_versions(ARRAY(
+        SELECT DISTINCT ur.user_id
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN role_closure rc ON rc.ancestor_id = n.id
+        JOIN user_roles ur ON ur.role_id = rc.descendant_id
+        WHERE n.name IS DISTINCT FROM o.name
+           OR n.parent_role_id IS DISTINCT FROM o.parent_role_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION users_active_authz_version_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.authz_version := OLD.authz_version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_active_authz_version ON users;
+CREATE TRIGGER users_active_authz_version
+    BEFORE UPDATE OF is_active ON users
+    FOR EACH ROW WHEN (NEW.is_active IS DISTINCT FROM OLD.is_active)
+    EXECUTE FUNCTION users_active_authz_version_trigger();
+
+DROP TRIGGER IF EXISTS user_roles_authz_version_insert ON user_roles;
+CREATE TRIGGER user_roles_authz_version_insert
+    AFTER INSERT ON user_roles REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION user_roles_authz_version_trigger();
+
+DROP TRIGGER IF EXISTS user_roles_authz_version_update ON user_roles;
+CREATE TRIGGER user_roles_authz_version_update
+    AFTER UPDATE ON user_roles REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION user_roles_authz_version_trigger();
+
+DROP TRIGGER IF EXISTS user_roles_authz_version_delete ON user_roles;
+CREATE TRIGGER user_roles_authz_version_delete
+    AFTER DELETE ON user_roles REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION user_roles_authz_version_trigger();
+
+DROP TRIGGER IF EXISTS roles_authz_version ON roles;
+CREATE TRIGGER roles_authz_version
+    AFTER UPDATE ON roles REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION roles_authz_version_trigger();
+
+-- Keep effective_access in step with every write to its sources
+DROP TRIGGER IF EXISTS item_access_effective_access_insert ON item_access;
+CREATE TRIGGER item_access_effective_access_insert
+    AFTER INSERT ON item_access REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION effective_access_refresh_trigger('item_id', 'item');
+
+DROP TRIGGER IF EXISTS item_access_effective_access_update ON item_access;
+CREATE TRIGGER item_access_effective_access_update
+    AFTER UPDATE ON item_access REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION effective_access_refresh_trigger('item_id', 'item');
+
+DROP TRIGGER IF EXISTS item_access_effective_access_delete ON item_access;
+CREATE TRIGGER item_access_effective_access_delete
+    AFTER DELETE ON item_access REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION effective_access_refresh_trigger('item_id', 'item');
+
+DROP TRIGGER IF EXISTS user_roles_effective_access_insert ON user_roles;
+CREATE TRIGGER user_roles_effective_access_insert
+    AFTER INSERT ON user_roles REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION effective_access_refresh_trigger('user_id', 'user');
+
+DROP TRIGGER IF EXISTS user_roles_effective_access_update ON user_roles;
+CREATE TRIGGER user_roles_effective_access_update
+    AFTER UPDATE ON user_roles REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION effective_access_refresh_trigger('user_id', 'user');
+
+DROP TRIGGER IF EXISTS user_roles_effective_access_delete ON user_roles;
+CREATE TRIGGER user_roles_effective_access_delete
+    AFTER DELETE ON user_roles REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION effective_access_refresh_trigger('user_id', 'user');
+
+DROP TRIGGER IF EXISTS items_effective_access_insert ON items;
+CREATE TRIGGER items_effective_access_insert
+    AFTER INSERT ON items REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION effective_access_refresh_trigger('id', 'item');
+
+DROP TRIGGER IF EXISTS items_effective_access_update ON items;
+CREATE TRIGGER items_effective_access_update
+    AFTER UPDATE ON items REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION effective_access_refresh_trigger('id', 'item');
+
+DROP TRIGGER IF EXISTS items_effective_access_delete ON items;
+CREATE TRIGGER items_effective_access_delete
+    AFTER DELETE ON items REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION effective_access_refresh_trigger('id', 'item');
+
+DROP TRIGGER IF EXISTS permissions_effective_access ON permissions;
+DROP FUNCTION IF EXISTS effective_access_rebuild_trigger();
+
+DROP TRIGGER IF EXISTS permissions_effective_access_insert ON permissions;
+CREATE TRIGGER permissions_effective_access_insert
+    AFTER INSERT ON permissions REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION permissions_effective_access_trigger();
+
+DROP TRIGGER IF EXISTS permissions_effective_access_update ON permissions;
+CREATE TRIGGER permissions_effective_access_update
+    AFTER UPDATE ON permissions REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION permissions_effective_access_trigger();
+
+DROP TRIGGER IF EXISTS permissions_effective_access_delete ON permissions;
+CREATE TRIGGER permissions_effective_access_delete
+    AFTER DELETE ON permissions REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION permissions_effective_access_trigger();
+
+-- Backfill derived tables for data written before they existed
+SELECT rebuild_role_closure();
+SELECT rebuild_effective_access();
+
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_user_roles_user_id ON user_roles(user_id);
 CREATE INDEX IF NOT EXISTS idx_user_roles_role_id ON user_roles(role_id);
 CREATE INDEX IF NOT EXISTS idx_role_permissions_role_id ON role_permissions(role_id);
+CREATE INDEX IF NOT EXISTS idx_role_closure_ancestor_id ON role_closure(ancestor_id);
+CREATE INDEX IF NOT EXISTS idx_effective_access_item_id ON effective_access(item_id);
 CREATE INDEX IF NOT EXISTS idx_item_access_item_id ON item_access(item_id);
 CREATE INDEX IF NOT EXISTS idx_item_access_user_id ON item_access(user_id);
 CREATE INDEX IF NOT EXISTS idx_items_owner_id ON items(owner_id);
-CREATE INDEX IF NOT EXISTS idx_access_logs_user_id ON access_logs(user_id);
-CREATE INDEX IF NOT EXISTS idx_access_logs_created_at ON access_logs(created_at);
+CREATE INDEX IF NOT EXISTS idx_items_created_at_id ON items(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family_id ON refresh_tokens(family_id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_id ON refresh_tokens(user_id);
+
+-- Keyset pagination of audit logs, overall and per user or item
+DROP INDEX IF EXISTS idx_access_logs_user_id;
+DROP INDEX IF EXISTS idx_access_logs_created_at;
+CREATE INDEX IF NOT EXISTS idx_access_logs_created_at_id ON access_logs(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_access_logs_user_id_created_at ON access_logs(user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_access_logs_item_id_created_at ON access_logs(item_id, created_at, id);
 """
 
@@ -0,0 +1,266 @@
+"""
+Queue Connection Pool
+Bounded PostgreSQL connection pool with overflow, checkout timeout,
+recycling and health checks
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+import psycopg2
+from psycopg2 import extensions, pool
+from psycopg2.extensions import connection
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(pool.PoolError):
+    """No connection became available within the checkout timeout"""
+
+
+class QueuePool:
+    """
+    Connection pool that makes callers wait for a connection instead of failing
+    
+    Up to pool_size connections are kept open; under load another
+    max_overflow are opened and closed again when returned. When all of
+    them are checked out, getconn() waits up to timeout seconds for one to
+    be returned and then raises PoolTimeout. Idle connections are reused
+    most-recently-returned first, so a quiet period lets the rest age out.
+    
+    Before a connection is handed out it is replaced if it is older than
+    recycle seconds, and checked with SELECT 1 if it has been idle longer
+    than ping_interval seconds, so connections dropped by the server, a
+    failover or an idle timeout are never given to a request.
+    
+    The interface matches psycopg2's pools (getconn, putconn, closeall).
+    """
+    
+    def __init__(
+        self,
+        connect: Callable[[], connection],
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        timeout: float = 30.0,
+        recycle: float = 3600.0,
+        ping_interval: float = 30.0,
+        min_size: int = 1
+    ):
+        """
+        Args:
+            connect: Opens a new connection
+            pool_size: Connections kept open
+            max_overflow: Extra connections opened under load
+            timeout: Seconds to wait for a connection before PoolTimeout
+            recycle: Replace connections older than this many seconds (<= 0 never)
+            ping_interval: Ping connections idle longer than this many seconds
+                before handing them out (0 pings on every checkout, < 0 never)
+            min_size: Connections opened up front
+        """
+        self._connect = connect
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self.closed = False
+        
+        # (connection, returned at) for idle connections, most recent last
+        self._idle: Deque[Tuple[connection, float]] = deque()
+        # Connection -> opened at, for every open connection
+        self._opened: Dict[connection, float] = {}
+        # Open connections plus those being opened
+        self._size = 0
+        self._waiting = 0
+        self._cond = threading.Condition(threading.Lock())
+        
+        self.checkouts = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self.failed_pings = 0
+        self.wait_seconds = 0.0
+        
+        for _ in range(min(min_size, pool_size)):
+            with self._cond:
+                self._size += 1
+            conn = self._open()
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+    
+    @property
+    def maxconn(self) -> int:
+        """Most connections open at once"""
+        return self.pool_size + self.max_overflow
+    
+    def getconn(self, timeout: Optional[float] = None) -> connection:
+        """
+        Check out a connection, waiting for one if the pool is exhausted
+        
+        Args:
+            timeout: Seconds to wait (default: the pool timeout)
+            
+        Returns:
+            psycopg2 connection
+            
+        Raises:
+            PoolTimeout: If no connection became available in time
+            PoolError: If the pool is closed
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        
+        with self._cond:
+            while True:
+                if self.closed:
+                    raise pool.PoolError("connection pool is closed")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    conn, returned_at = None, None
+                    break
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"No connection available within {timeout:g}s "
+                        f"({self._size} open, {self._waiting} waiting)"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            
+            self.checkouts += 1
+            self.wait_seconds += time.monotonic() - started
+        
+        try:
+            if conn is None:
+                return self._open()
+            return self._checked(conn, returned_at)
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+    
+    def putconn(self, conn: connection, close: bool = False):
+        """
+        Return a checked-out connection
+        
+        A connection in a transaction is rolled back. Broken connections,
+        overflow connections beyond pool_size and connections returned after
+        closeall() are closed.
+        
+        Args:
+            conn: Connection from getconn()
+            close: Close the connection instead of keeping it
+        """
+        if not conn.closed and not close:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+        
+        with self._cond:
+            if conn.closed or close or self.closed or len(self._idle) >= self.pool_size:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+    
+    def closeall(self):
+        """Close idle connections now and checked-out ones when they are returned"""
+        with self._cond:
+            self.closed = True
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+            self._cond.notify_all()
+    
+    def stats(self) -> Dict:
+        """
+        Get pool counters
+        
+        Returns:
+            Dictionary with open, in-use, idle and waiting counts, limits, and
+            checkout, timeout, recycle and failed-ping totals
+        """
+        with self._cond:
+            return {
+                'size': self._size,
+                'in_use': self._size - len(self._idle),
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'overflow': max(self._size - self.pool_size, 0),
+                'pool_size': self.pool_size,
+                'max': self.maxconn,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'recycled': self.recycled,
+                'failed_pings': self.failed_pings,
+                'wait_seconds': self.wait_seconds
+            }
+    
+    def _checked(self, conn: connection, returned_at: float) -> connection:
+        """The idle connection, or a fresh one if it is too old or fails its ping"""
+        now = time.monotonic()
+        
+        if conn.closed:
+            self._close(conn)
+            return self._open()
+        
+        if self.recycle > 0 and now - self._opened.get(conn, now) > self.recycle:
+            with self._cond:
+                self.recycled += 1
+            self._close(conn)
+            return self._open()
+        
+        if 0 <= self.ping_interval <= now - returned_at:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error as e:
+                logger.warning(f"Replacing pooled connection that failed its health check: {e}")
+                with self._cond:
+                    self.failed_pings += 1
+                self._close(conn)
+                return self._open()
+        
+        return conn
+    
+    def _open(self) -> connection:
+        """Open a connection for a slot already counted in _size"""
+        conn = self._connect()
+        with self._cond:
+            self._opened[conn] = time.monotonic()
+        return conn
+    
+    def _close(self, conn: connection):
+        """Close a connection whose slot is reused by the caller"""
+        with self._cond:
+            self._opened.pop(conn, None)
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+    
+    def _discard(self, conn: connection):
+        """Close a connection and free its slot (lock held)"""
+        self._opened.pop(conn, None)
+        self._size -= 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
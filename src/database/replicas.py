@@ -0,0 +1,171 @@
+"""
+Read Replicas
+Replica connection pools with replication lag checks, and the
+read-your-writes state that keeps a request on the primary after it writes
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import psycopg2
+from psycopg2 import pool
+from flask import Flask, g, request
+
+from src.database.pool import QueuePool
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind; 0 when it has replayed everything it
+# received, or when the server is not a standby at all
+LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+END AS lag_seconds
+"""
+
+# Cookie that keeps a client's reads on the primary for a while after it wrote
+PRIMARY_COOKIE = 'rbac_read_primary_until'
+
+
+class Replica:
+    """
+    A read replica's connection pool and last measured replication lag
+    
+    The lag is measured lazily: the first caller after check_interval
+    seconds runs LAG_QUERY while everyone else uses the last result. A
+    replica that lags more than max_lag seconds, or cannot be reached, is
+    skipped until a later check finds it healthy again.
+    """
+    
+    def __init__(self, name: str, connection_pool: QueuePool, max_lag: float = 5.0, check_interval: float = 5.0):
+        self.name = name
+        self.pool = connection_pool
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag: Optional[float] = None
+        self.healthy = False
+        self._next_check = 0.0
+        self._check_lock = threading.Lock()
+    
+    def available(self) -> bool:
+        """Whether reads may use this replica, re-checking its lag when due"""
+        if time.monotonic() >= self._next_check and self._check_lock.acquire(blocking=False):
+            try:
+                self._check()
+            finally:
+                self._check_lock.release()
+        return self.healthy
+    
+    def mark_unhealthy(self, reason: str):
+        """Skip the replica until the next lag check"""
+        if self.healthy:
+            logger.warning(f"Skipping replica {self.name}: {reason}")
+        self.healthy = False
+        self._next_check = time.monotonic() + self.check_interval
+    
+    def stats(self) -> Dict:
+        """Health, last lag and pool counters"""
+        return {'name': self.name, 'healthy': self.healthy, 'lag_seconds': self.lag, **self.pool.stats()}
+    
+    def _check(self):
+        """Measure the replication lag and update health"""
+        self._next_check = time.monotonic() + self.check_interval
+        try:
+            conn = self.pool.getconn(timeout=1.0)
+        except (psycopg2.Error, pool.PoolError) as e:
+            self.mark_unhealthy(f"lag check could not connect: {e}")
+            return
+        
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(LAG_QUERY)
+                self.lag = float(cursor.fetchone()[0])
+            conn.rollback()
+        except psycopg2.Error as e:
+            self.pool.putconn(conn, close=True)
+            self.mark_unhealthy(f"lag check failed: {e}")
+            return
+        self.pool.putconn(conn)
+        
+        if self.lag > self.max_lag:
+            self.mark_unhealthy(f"replication lag {self.lag:.1f}s exceeds {self.max_lag:g}s")
+        else:
+            if not self.healthy:
+                logger.info(f"Replica {self.name} available (lag {self.lag:.1f}s)")
+            self.healthy = True
+
+
+class _ReadState:
+    """Whether the current request (or thread, outside requests) must read from the primary"""
+    
+    __slots__ = ('wrote', 'primary_until')
+    
+    def __init__(self, primary_until: float = 0.0):
+        self.wrote = False
+        self.primary_until = primary_until
+
+
+_state: ContextVar[Optional[_ReadState]] = ContextVar('rbac_read_state', default=None)
+
+
+def reads_from_primary() -> bool:
+    """Whether reads must go to the primary to see this request's (or client's) recent writes"""
+    state = _state.get()
+    return state is not None and (state.wrote or state.primary_until > time.time())
+
+
+def record_write():
+    """
+    Send the rest of this request's reads to the primary
+    
+    Outside a request (scripts, background threads) the thread keeps
+    reading from the primary from now on.
+    """
+    state = _state.get()
+    if state is None:
+        state = _ReadState()
+        _state.set(state)
+    state.wrote = True
+
+
+def init_app(app: Flask, sticky_seconds: float = 10.0):
+    """
+    Keep a client's reads on the primary for sticky_seconds after it writes
+    
+    Each request starts with fresh routing state, so a write pins only the
+    rest of that request; a cookie carries the pin over to the client's
+    following requests, whichever worker serves them.
+    
+    Args:
+        app: Flask application
+        sticky_seconds: How long after a write the client's reads go to the
+            primary; keep it above DB_REPLICA_MAX_LAG
+    """
+    @app.before_request
+    def start_read_state():
+        try:
+            primary_until = float(request.cookies.get(PRIMARY_COOKIE, 0))
+        except ValueError:
+            primary_until = 0.0
+        g.read_state_token = _state.set(_ReadState(primary_until))
+    
+    @app.after_request
+    def pin_client_to_primary(response):
+        state = _state.get()
+        if state is not None and state.wrote:
+            response.set_cookie(
+                PRIMARY_COOKIE, f"{time.time() + sticky_seconds:.3f}",
+                max_age=int(sticky_seconds) + 1, httponly=True, samesite='Lax'
+            )
+        return response
+    
+    @app.teardown_request
+    def reset_read_state(exc=None):
+        token = g.pop('read_state_token', None)
+        if token is not None:
+            _state.reset(token)
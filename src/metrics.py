@@ -0,0 +1,237 @@
+"""
+Prometheus Metrics
+Per-query-fingerprint database statistics, per-route request histograms,
+connection pool and replica gauges and cache hit ratios, served on /metrics
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py) before
+the app is imported: every worker then writes its samples to the shared
+directory and /metrics aggregates all of them, whichever worker serves it.
+"""
+import hashlib
+import os
+import re
+import time
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+POOL_STATES = ('in_use', 'idle', 'waiting', 'max')
+POOL_EVENTS = ('checkouts', 'timeouts', 'recycled', 'failed_pings')
+
+# Longest normalized query kept in the rbac_db_query_info label
+MAX_QUERY_LABEL_LENGTH = 500
+
+DB_QUERIES = Counter(
+    'rbac_db_queries_total', 'Statements executed, by query fingerprint', ['fingerprint']
+)
+DB_QUERY_ROWS = Counter(
+    'rbac_db_query_rows_total', 'Rows returned or affected, by query fingerprint', ['fingerprint']
+)
+DB_QUERY_ERRORS = Counter(
+    'rbac_db_query_errors_total', 'Statements that raised, by query fingerprint', ['fingerprint']
+)
+DB_QUERY_DURATION = Histogram(
+    'rbac_db_query_duration_seconds', 'Statement latency including pool checkout, by query fingerprint',
+    ['fingerprint'], buckets=QUERY_BUCKETS
+)
+DB_QUERY_INFO = Gauge(
+    'rbac_db_query_info', 'Normalized SQL of each query fingerprint', ['fingerprint', 'query'],
+    multiprocess_mode='max'
+)
+
+HTTP_REQUESTS = Counter(
+    'rbac_http_requests_total', 'Requests handled, by route and status', ['method', 'endpoint', 'status']
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'rbac_http_request_duration_seconds', 'Request latency until the response is returned, by route',
+    ['method', 'endpoint'], buckets=REQUEST_BUCKETS
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    'rbac_db_pool_connections', 'Pooled connections by state (in_use, idle, waiting, max), summed over workers',
+    ['state'], multiprocess_mode='livesum'
+)
+DB_POOL_EVENTS = Gauge(
+    'rbac_db_pool_events', 'Pool checkouts, timeouts, recycled connections and failed pings since the worker '
+    'started, summed over workers', ['event'], multiprocess_mode='livesum'
+)
+DB_REPLICA_LAG = Gauge(
+    'rbac_db_replica_lag_seconds', 'Last measured replication lag of each read replica', ['replica'],
+    multiprocess_mode='max'
+)
+DB_REPLICA_HEALTHY = Gauge(
+    'rbac_db_replica_healthy', 'Whether reads are routed to the replica (1) or it is skipped (0)', ['replica'],
+    multiprocess_mode='min'
+)
+CACHE_HITS = Gauge(
+    'rbac_cache_hits', 'Cache hits since the worker started, summed over workers', ['cache'],
+    multiprocess_mode='livesum'
+)
+CACHE_MISSES = Gauge(
+    'rbac_cache_misses', 'Cache misses since the worker started, summed over workers', ['cache'],
+    multiprocess_mode='livesum'
+)
+CACHE_ENTRIES = Gauge(
+    'rbac_cache_entries', 'Entries held by in-process caches, summed over workers', ['cache'],
+    multiprocess_mode='livesum'
+)
+CACHE_HIT_RATIO = Gauge(
+    'rbac_cache_hit_ratio', 'Cache hit ratio of each worker (rbac_cache_hits / (hits + misses) overall)',
+    ['cache'], multiprocess_mode='liveall'
+)
+
+_LITERALS = (
+    (re.compile(r'--[^\n]*|/\*.*?\*/', re.S), ' '),
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%\(\w+\)s|%s|\$\d+'), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' ')
+)
+
+_enabled = False
+_seen_fingerprints = set()
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query: str) -> Tuple[str, str]:
+    """
+    Normalize a statement so calls that differ only in literals, parameters
+    or whitespace share statistics
+    
+    Args:
+        query: SQL query string
+        
+    Returns:
+        (12-character fingerprint ID, normalized SQL)
+    """
+    normalized = query
+    for pattern, replacement in _LITERALS:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = normalized.strip()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12], normalized
+
+
+def queries_enabled() -> bool:
+    """Whether DatabaseConnection should record query statistics"""
+    return _enabled
+
+
+def observe_query(query: str, seconds: float, rows: int = 0, error: bool = False):
+    """
+    Record one statement
+    
+    Args:
+        query: SQL query string as passed to DatabaseConnection
+        seconds: Latency, including the wait for a pooled connection
+        rows: Rows returned or affected
+        error: Whether the statement raised
+    """
+    fingerprint_id, normalized = fingerprint(query)
+    
+    if fingerprint_id not in _seen_fingerprints:
+        _seen_fingerprints.add(fingerprint_id)
+        DB_QUERY_INFO.labels(fingerprint_id, normalized[:MAX_QUERY_LABEL_LENGTH]).set(1)
+    
+    DB_QUERIES.labels(fingerprint_id).inc()
+    DB_QUERY_DURATION.labels(fingerprint_id).observe(seconds)
+    if rows:
+        DB_QUERY_ROWS.labels(fingerprint_id).inc(rows)
+    if error:
+        DB_QUERY_ERRORS.labels(fingerprint_id).inc()
+
+
+def cache_stats(app: Flask) -> Dict[str, Dict]:
+    """The app's cache counters, keyed by cache name"""
+    caches = {'token': app.token_verifier.stats()}
+    
+    permission_cache = getattr(app, 'permission_cache', None)
+    if permission_cache is not None:
+        stats = permission_cache.stats()
+        if stats.get('backend') == 'redis':
+            caches['shared'] = stats
+            stats = stats.get('local')
+        if stats is not None:
+            caches['permission'] = stats
+    
+    return caches
+
+
+def refresh_gauges(app: Flask):
+    """Copy this worker's pool and cache counters into the gauges"""
+    pool_stats = app.db_connection.stats()
+    for state in POOL_STATES:
+        DB_POOL_CONNECTIONS.labels(state).set(pool_stats.get(state, 0))
+    for event in POOL_EVENTS:
+        DB_POOL_EVENTS.labels(event).set(pool_stats.get(event, 0))
+    for replica in pool_stats.get('replicas', ()):
+        if replica['lag_seconds'] is not None:
+            DB_REPLICA_LAG.labels(replica['name']).set(replica['lag_seconds'])
+        DB_REPLICA_HEALTHY.labels(replica['name']).set(int(replica['healthy']))
+    
+    for name, stats in cache_stats(app).items():
+        CACHE_HITS.labels(name).set(stats['hits'])
+        CACHE_MISSES.labels(name).set(stats['misses'])
+        CACHE_HIT_RATIO.labels(name).set(stats['hit_ratio'])
+        if 'size' in stats:
+            CACHE_ENTRIES.labels(name).set(stats['size'])
+
+
+def render() -> Tuple[bytes, str]:
+    """Metrics in Prometheus text format, aggregated over workers in multiprocess mode"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_app(app: Flask, refresh_interval: float = 5.0):
+    """
+    Record request and query metrics for an app and serve them on /metrics
+    
+    Args:
+        app: Flask application with db_connection, token_verifier and
+             permission_cache attributes
+        refresh_interval: Seconds between copies of this worker's pool and
+             cache counters into the gauges (also refreshed on every scrape)
+    """
+    global _enabled
+    _enabled = True
+    next_refresh = [0.0]
+    
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+    
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        
+        endpoint = request.endpoint or 'unmatched'
+        HTTP_REQUESTS.labels(request.method, endpoint, response.status_code).inc()
+        HTTP_REQUEST_DURATION.labels(request.method, endpoint).observe(time.perf_counter() - started)
+        
+        now = time.monotonic()
+        if now >= next_refresh[0]:
+            next_refresh[0] = now + refresh_interval
+            refresh_gauges(app)
+        
+        return response
+    
+    @app.route('/metrics')
+    def metrics():
+        refresh_gauges(app)
+        body, content_type = render()
+        return Response(body, content_type=content_type)
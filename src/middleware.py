@@ -2,15 +2,114 @@
 Middleware for authentication and authorization
 """
 import logging
+import time
 from functools import wraps
-from flask import request, jsonify, current_app
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from flask import Response, request, jsonify, current_app
 
 from src.services.auth_service import AuthService
+from src.services.rbac_service import RBACService
+from src.utils import decode_cursor, encode_cursor
 
 
 logger = logging.getLogger(__name__)
 
 
+def get_rbac_service() -> RBACService:
+    """
+    Build an RBACService wired to the current app's database, cache and audit writer
+    """
+    return RBACService(current_app.db_connection, current_app.permission_cache, current_app.audit_writer)
+
+
+def get_auth_service() -> AuthService:
+    """
+    Build an AuthService wired to the current app's database, token verifier and password hasher
+    """
+    return AuthService(current_app.db_connection, current_app.token_verifier, current_app.password_hasher)
+
+
+def get_page_args() -> Tuple[int, Optional[List[Any]]]:
+    """
+    Read the limit and cursor query parameters of a list endpoint
+    
+    Returns:
+        Tuple of (page size capped at MAX_PAGE_SIZE, sort key the page starts after)
+        
+    Raises:
+        ValueError: If limit or cursor is invalid
+    """
+    try:
+        limit = int(request.args.get('limit', current_app.config['DEFAULT_PAGE_SIZE']))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    
+    cursor = request.args.get('cursor')
+    after = decode_cursor(cursor) if cursor else None
+    
+    return min(limit, current_app.config['MAX_PAGE_SIZE']), after
+
+
+def paginated_response(rows: List[dict], sort_keys: Sequence[str], limit: int):
+    """
+    Build the response for one page of a list endpoint
+    
+    The body stays a plain JSON list. Callers fetch limit + 1 rows; if the
+    extra row exists, the cursor for the next page is sent in X-Next-Cursor.
+    
+    Args:
+        rows: Up to limit + 1 rows in sort order
+        sort_keys: Keys of the sort key values in each row
+        limit: Page size
+    """
+    rows = rows or []
+    response = jsonify(rows[:limit])
+    
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        response.headers['X-Next-Cursor'] = encode_cursor([last[key] for key in sort_keys])
+    
+    return response, 200
+
+
+def stream_ndjson(rows: Iterable[Dict]) -> Response:
+    """
+    Stream rows as newline-delimited JSON, one object per line
+    
+    Args:
+        rows: Row iterable, typically from DatabaseConnection.iter_query
+    """
+    dumps = current_app.json.dumps
+    
+    def generate():
+        for row in rows:
+            yield dumps(row) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+def stream_json_array(rows: Iterable[Dict]) -> Response:
+    """
+    Stream rows as a single JSON array without building it in memory
+    
+    Args:
+        rows: Row iterable, typically from DatabaseConnection.iter_query
+    """
+    dumps = current_app.json.dumps
+    
+    def generate():
+        separator = '['
+        for row in rows:
+            yield separator + dumps(row)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+    
+    return Response(generate(), mimetype='application/json')
+
+
 def require_auth(f):
     """
     Decorator to require authentication for API endpoints
@@ -31,9 +130,8 @@ def require_auth(f):
         
         token = parts[1]
         
-        # Verify token
-        auth_service = AuthService(current_app.db_connection)
-        payload = auth_service.verify_token(token)
+        # Verify token (served from the shared verified-token cache when possible)
+        payload = current_app.token_verifier.verify(token)
         
         if not payload:
             return jsonify({'error': 'Invalid or expired token'}), 401
@@ -41,12 +139,37 @@ def require_auth(f):
         # Add user info to request context
         request.user_id = payload.get('user_id')
         request.username = payload.get('username')
+        request.token_payload = payload
         
         return f(*args, **kwargs)
     
     return decorated_function
 
 
+def _token_role_names(rbac_service: RBACService, payload: Dict) -> Optional[List[str]]:
+    """
+    Role names from the token, if they are still current
+    
+    The claims are trusted while the token's authz_version matches the
+    user's current version (a cache hit, or a primary-key lookup) and no
+    role assignment behind them has expired.
+    
+    Returns:
+        Role names, or None if the roles must be loaded from the database
+    """
+    if 'roles' not in payload or 'authz_version' not in payload:
+        return None
+    
+    roles_exp = payload.get('roles_exp')
+    if roles_exp is not None and roles_exp <= time.time():
+        return None
+    
+    if rbac_service.get_authz_version(payload['user_id']) != payload['authz_version']:
+        return None
+    
+    return payload['roles']
+
+
 def require_role(*roles):
     """
     Decorator to require specific roles for API endpoints
@@ -58,20 +181,13 @@ def require_role(*roles):
         @wraps(f)
         @require_auth
         def decorated_function(*args, **kwargs):
-            # Get user roles
-            query = """
-            SELECT r.name FROM roles r
-            JOIN user_roles ur ON r.id = ur.role_id
-            WHERE ur.user_id = %s
-            AND (ur.expires_at IS NULL OR ur.expires_at > NOW())
-            """
-            
-            user_roles = current_app.db_connection.execute_query(
-                query,
-                (request.user_id,)
-            )
+            rbac_service = get_rbac_service()
+            user_role_names = _token_role_names(rbac_service, request.token_payload)
             
-            user_role_names = [r['name'] for r in user_roles] if user_roles else []
+            # Claims missing or stale: load roles (from the role-set cache when enabled)
+            if user_role_names is None:
+                user_roles = rbac_service.get_user_roles(request.user_id)
+                user_role_names = [r.name for r in user_roles]
             
             # Check if user has any of the required roles
             if not any(role in user_role_names for role in roles):
@@ -0,0 +1,129 @@
+"""
+Request Timing
+Per-request total, database, pool wait and serialization time, reported in a
+Server-Timing header and a structured log line
+"""
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from flask import Flask, g, request
+from flask.json.provider import DefaultJSONProvider
+
+
+logger = logging.getLogger(__name__)
+
+# Timings of the request being handled; None when timing is disabled or
+# outside a request, so the database hooks cost one lookup
+_current: ContextVar[Optional['RequestTimings']] = ContextVar('rbac_request_timings', default=None)
+
+
+class RequestTimings:
+    """Counters for one request, fed by DatabaseConnection and the JSON provider"""
+    
+    __slots__ = ('started', 'db_seconds', 'queries', 'pool_wait_seconds', 'serialize_seconds')
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.pool_wait_seconds = 0.0
+        self.serialize_seconds = 0.0
+    
+    def add_query(self, seconds: float):
+        """Record one statement's round trip"""
+        self.queries += 1
+        self.db_seconds += seconds
+    
+    def as_dict(self, total_seconds: float) -> Dict:
+        """Timings in milliseconds; app is what is left after database, pool wait and serialization"""
+        app_seconds = total_seconds - self.db_seconds - self.pool_wait_seconds - self.serialize_seconds
+        return {
+            'total_ms': round(total_seconds * 1000, 3),
+            'db_ms': round(self.db_seconds * 1000, 3),
+            'queries': self.queries,
+            'pool_wait_ms': round(self.pool_wait_seconds * 1000, 3),
+            'serialize_ms': round(self.serialize_seconds * 1000, 3),
+            'app_ms': round(max(app_seconds, 0.0) * 1000, 3)
+        }
+    
+    def server_timing(self, total_seconds: float) -> str:
+        """Server-Timing header value"""
+        timings = self.as_dict(total_seconds)
+        queries = f"{self.queries} {'query' if self.queries == 1 else 'queries'}"
+        return ', '.join([
+            f"total;dur={timings['total_ms']}",
+            f'db;dur={timings["db_ms"]};desc="{queries}"',
+            f"pool;dur={timings['pool_wait_ms']}",
+            f"serialize;dur={timings['serialize_ms']}",
+            f"app;dur={timings['app_ms']}"
+        ])
+
+
+def current() -> Optional[RequestTimings]:
+    """Timings of the current request, or None if it is not being timed"""
+    return _current.get()
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that adds the time spent building JSON responses to the request's timings"""
+    
+    def response(self, *args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return super().response(*args, **kwargs)
+        
+        started = time.perf_counter()
+        try:
+            return super().response(*args, **kwargs)
+        finally:
+            timings.serialize_seconds += time.perf_counter() - started
+
+
+def init_app(app: Flask, log_threshold_ms: float = 0.0):
+    """
+    Time every request of an app
+    
+    Nothing is registered unless this is called, so a disabled app pays
+    only for the context variable lookup in DatabaseConnection.get_cursor.
+    Streamed bodies (e.g. /api/items/export) are produced after the
+    headers are sent, so only the time to start the stream is reported.
+    
+    Args:
+        app: Flask application
+        log_threshold_ms: Log only requests slower than this (0 logs every request)
+    """
+    app.json = TimedJSONProvider(app)
+    
+    @app.before_request
+    def start_timing():
+        g.request_timing_token = _current.set(RequestTimings())
+    
+    @app.after_request
+    def report_timing(response):
+        timings = _current.get()
+        if timings is None:
+            return response
+        
+        total_seconds = time.perf_counter() - timings.started
+        response.headers['Server-Timing'] = timings.server_timing(total_seconds)
+        
+        if total_seconds * 1000 >= log_threshold_ms:
+            fields = {
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                **timings.as_dict(total_seconds)
+            }
+            logger.info(f"request_timing {json.dumps(fields)}")
+        
+        return response
+    
+    @app.teardown_request
+    def stop_timing(exc=None):
+        token = g.pop('request_timing_token', None)
+        if token is not None:
+            _current.reset(token)
@@ -3,6 +3,7 @@ API Routes Registration
 """
 from flask import Flask
 
+from src.database.pool import PoolTimeout
 from src.routes import auth, users, roles, permissions, items
 
 
@@ -20,4 +21,8 @@ def register_routes(app: Flask):
     @app.route('/health')
     def health_check():
         return {'status': 'healthy', 'service': 'rbac-service'}
-
+    
+    # Every pooled connection stayed checked out for DB_POOL_TIMEOUT seconds
+    @app.errorhandler(PoolTimeout)
+    def pool_timeout(error):
+        return {'error': 'Service busy, please retry'}, 503, {'Retry-After': '1'}
@@ -0,0 +1,632 @@
+"""
+ASGI API Routes
+Async handlers for the permission-check, item, role, user, permission and
+auth endpoints. They answer exactly like the Flask views of the same paths;
+every other path falls through to the Flask app (see asgi.py).
+"""
+import asyncio
+import math
+import time
+from functools import wraps
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from src.config import Config
+from src.routes.items import _is_id
+from src.services.async_auth_service import AsyncAuthService
+from src.services.async_rbac_service import AsyncRBACService, call_cache
+from src.services.password_hasher import PasswordHasherBusy
+from src.utils import decode_cursor, encode_cursor, keyset_paginate
+
+
+def get_rbac_service(request: Request) -> AsyncRBACService:
+    """
+    Build an AsyncRBACService wired to the async pool and the Flask app's cache and audit writer
+    """
+    flask_app = request.app.state.flask_app
+    return AsyncRBACService(request.app.state.db, flask_app.permission_cache, flask_app.audit_writer)
+
+
+def get_auth_service(request: Request) -> AsyncAuthService:
+    """
+    Build an AsyncAuthService wired to the async pool and the Flask app's token verifier and password hasher
+    """
+    flask_app = request.app.state.flask_app
+    return AsyncAuthService(request.app.state.db, flask_app.token_verifier, flask_app.password_hasher)
+
+
+def jsonify(request: Request, data: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """JSON response serialized by the Flask app's provider, byte-for-byte like flask.jsonify"""
+    body = request.app.state.flask_app.json.dumps(data, separators=(',', ':')) + '\n'
+    return Response(body, status_code=status, headers=headers, media_type='application/json')
+
+
+def client_address(request: Request) -> Optional[str]:
+    """
+    Client IP address of the request
+    
+    Behind TRUSTED_PROXY_COUNT reverse proxies this is the entry those proxies
+    appended to X-Forwarded-For, the same one ProxyFix gives the Flask routes;
+    the peer address is used when the header has fewer entries.
+    """
+    remote_addr = request.client.host if request.client else None
+    trusted = Config.TRUSTED_PROXY_COUNT
+    header = request.headers.getlist('x-forwarded-for')
+    if trusted <= 0 or not header:
+        return remote_addr
+    
+    forwarded = [value.strip() for value in ','.join(header).split(',')]
+    if len(forwarded) < trusted:
+        return remote_addr
+    return forwarded[-trusted] or remote_addr
+
+
+async def get_json(request: Request) -> Any:
+    """
+    Parse the request body like Flask's request.get_json()
+    
+    Raises:
+        HTTPException: 415 if the body is not declared as JSON, 400 if it does not parse
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    if content_type != 'application/json' and not (
+        content_type.startswith('application/') and content_type.endswith('+json')
+    ):
+        raise HTTPException(415, "Did not attempt to load JSON data because the request Content-Type "
+                                 "was not 'application/json'.")
+    try:
+        return await request.json()
+    except ValueError:
+        raise HTTPException(400, "Failed to decode JSON object")
+
+
+def get_int_arg(request: Request, name: str) -> Optional[int]:
+    """An integer query parameter, or None if it is missing or not an integer"""
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def get_page_args(request: Request) -> Tuple[int, Optional[List[Any]]]:
+    """
+    Read the limit and cursor query parameters of a list endpoint
+    
+    Raises:
+        ValueError: If limit or cursor is invalid
+    """
+    try:
+        limit = int(request.query_params.get('limit', Config.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    
+    cursor = request.query_params.get('cursor')
+    after = decode_cursor(cursor) if cursor else None
+    
+    return min(limit, Config.MAX_PAGE_SIZE), after
+
+
+def paginated_response(request: Request, rows: List[dict], sort_keys: Sequence[str], limit: int) -> Response:
+    """One page of a list endpoint, with X-Next-Cursor if another page follows"""
+    rows = rows or []
+    headers = {}
+    
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        headers['X-Next-Cursor'] = encode_cursor([last[key] for key in sort_keys])
+    
+    return jsonify(request, rows[:limit], headers=headers)
+
+
+async def _token_role_names(rbac_service: AsyncRBACService, payload: Dict) -> Optional[List[str]]:
+    """Role names from the token while its claims are current (see middleware._token_role_names)"""
+    if 'roles' not in payload or 'authz_version' not in payload:
+        return None
+    
+    roles_exp = payload.get('roles_exp')
+    if roles_exp is not None and roles_exp <= time.time():
+        return None
+    
+    if await rbac_service.get_authz_version(payload['user_id']) != payload['authz_version']:
+        return None
+    
+    return payload['roles']
+
+
+def require_role(*roles):
+    """
+    Decorator to require specific roles for async endpoints, answering like
+    the Flask require_role
+    
+    Args:
+        roles: Role names required to access the endpoint
+    """
+    def decorator(handler):
+        @wraps(handler)
+        async def decorated(request: Request):
+            auth_header = request.headers.get('authorization')
+            if not auth_header:
+                return jsonify(request, {'error': 'Authorization header required'}, 401)
+            
+            parts = auth_header.split()
+            if len(parts) != 2 or parts[0].lower() != 'bearer':
+                return jsonify(request, {'error': 'Invalid authorization header format'}, 401)
+            
+            payload = await get_auth_service(request).verify_token(parts[1])
+            if not payload:
+                return jsonify(request, {'error': 'Invalid or expired token'}, 401)
+            request.state.token_payload = payload
+            
+            rbac_service = get_rbac_service(request)
+            user_role_names = await _token_role_names(rbac_service, payload)
+            if user_role_names is None:
+                user_role_names = [r.name for r in await rbac_service.get_user_roles(payload.get('user_id'))]
+            
+            if not any(role in user_role_names for role in roles):
+                return jsonify(request, {'error': 'Insufficient permissions'}, 403)
+            
+            return await handler(request)
+        
+        return decorated
+    
+    return decorator
+
+
+async def health_check(request: Request):
+    return jsonify(request, {'status': 'healthy', 'service': 'rbac-service'})
+
+
+# Authentication
+
+async def login(request: Request):
+    """User login endpoint"""
+    data = await get_json(request)
+    if not isinstance(data, dict):
+        return jsonify(request, {'error': 'Username and password required'}, 400)
+    
+    username = data.get('username')
+    password = data.get('password')
+    
+    if not username or not password:
+        return jsonify(request, {'error': 'Username and password required'}, 400)
+    
+    if not isinstance(username, str) or not isinstance(password, str):
+        return jsonify(request, {'error': 'Username and password must be strings'}, 400)
+    
+    # Reject throttled clients before any database or bcrypt work; an allowed
+    # attempt is counted now, so concurrent guesses cannot overshoot the limit
+    throttle = request.app.state.flask_app.login_throttle
+    remote_addr = client_address(request)
+    if throttle is not None:
+        retry_after = await asyncio.to_thread(throttle.check, username, remote_addr)
+        if retry_after is not None:
+            return jsonify(
+                request, {'error': 'Too many failed login attempts, retry later'}, 429,
+                {'Retry-After': str(math.ceil(retry_after))}
+            )
+    
+    try:
+        result = await get_auth_service(request).authenticate_user(username, password)
+    except PasswordHasherBusy:
+        if throttle is not None:
+            await asyncio.to_thread(throttle.release, username, remote_addr)
+        return jsonify(request, {'error': 'Too many concurrent logins, retry shortly'}, 503)
+    
+    if result:
+        if throttle is not None:
+            await asyncio.to_thread(throttle.reset, username, remote_addr)
+        return jsonify(request, result)
+    
+    if throttle is not None:
+        throttle.record_failure(username, remote_addr)
+    
+    return jsonify(request, {'error': 'Invalid credentials'}, 401)
+
+
+async def refresh(request: Request):
+    """Exchange a refresh token for a new access token and refresh token"""
+    data = await get_json(request) or {}
+    refresh_token = data.get('refresh_token')
+    
+    if not refresh_token:
+        return jsonify(request, {'error': 'refresh_token required'}, 400)
+    
+    result = await get_auth_service(request).refresh_access_token(refresh_token)
+    
+    if result:
+        return jsonify(request, result)
+    
+    return jsonify(request, {'error': 'Invalid or expired refresh token'}, 401)
+
+
+async def logout(request: Request):
+    """Revoke a refresh token, every token rotated from the same login and the user's access tokens"""
+    data = await get_json(request) or {}
+    refresh_token = data.get('refresh_token')
+    
+    if not refresh_token:
+        return jsonify(request, {'error': 'refresh_token required'}, 400)
+    
+    user_id = await get_auth_service(request).revoke_refresh_token(refresh_token)
+    
+    cache = request.app.state.flask_app.permission_cache
+    if user_id is not None and cache is not None:
+        await call_cache(cache, cache.invalidate_user, user_id)
+    
+    return jsonify(request, {'message': 'Logged out'})
+
+
+async def register(request: Request):
+    """User registration endpoint"""
+    data = await get_json(request)
+    
+    username = data.get('username')
+    email = data.get('email')
+    password = data.get('password')
+    
+    if not all([username, email, password]):
+        return jsonify(request, {'error': 'Username, email, and password required'}, 400)
+    
+    try:
+        user_id = await get_auth_service(request).create_user(
+            username=username,
+            email=email,
+            password=password,
+            first_name=data.get('first_name'),
+            last_name=data.get('last_name')
+        )
+    except PasswordHasherBusy:
+        return jsonify(request, {'error': 'Too many concurrent registrations, retry shortly'}, 503)
+    
+    if user_id:
+        return jsonify(request, {'user_id': user_id, 'message': 'User created successfully'}, 201)
+    
+    return jsonify(request, {'error': 'Failed to create user'}, 500)
+
+
+async def verify_token(request: Request):
+    """Verify JWT token"""
+    data = await get_json(request)
+    token = data.get('token')
+    
+    if not token:
+        return jsonify(request, {'error': 'Token required'}, 400)
+    
+    payload = await get_auth_service(request).verify_token(token)
+    
+    if payload:
+        return jsonify(request, {'valid': True, 'payload': payload})
+    
+    return jsonify(request, {'valid': False, 'error': 'Invalid token'}, 401)
+
+
+# Items
+
+async def list_items(request: Request):
+    """List items, newest first, one page at a time"""
+    try:
+        limit, after = get_page_args(request)
+        query, params = keyset_paginate(
+            "SELECT * FROM items", [], [], ('created_at', 'id'), after, limit + 1
+        )
+    except ValueError as e:
+        return jsonify(request, {'error': str(e)}, 400)
+    
+    items = await request.app.state.db.execute_query(query, params)
+    return paginated_response(request, items, ('created_at', 'id'), limit)
+
+
+async def get_item(request: Request):
+    """Get item details"""
+    item_id = request.path_params['item_id']
+    cache = request.app.state.flask_app.permission_cache
+    item = await call_cache(cache, cache.get_item, item_id) if cache is not None else None
+    
+    if item is None:
+        generation = await call_cache(cache, cache.generation) if cache is not None else None
+        item = await request.app.state.db.execute_query(
+            "SELECT * FROM items WHERE id = %s", (item_id,), fetch_one=True
+        )
+        
+        if item and cache is not None:
+            await call_cache(cache, cache.set_item, item_id, dict(item), generation=generation)
+    
+    if item:
+        return jsonify(request, item)
+    
+    return jsonify(request, {'error': 'Item not found'}, 404)
+
+
+async def get_accessible_items(request: Request):
+    """Get items accessible by current user"""
+    user_id = get_int_arg(request, 'user_id')
+    action = request.query_params.get('action', 'read')
+    
+    if not user_id:
+        return jsonify(request, {'error': 'user_id parameter required'}, 400)
+    
+    try:
+        limit, after = get_page_args(request)
+        items = await get_rbac_service(request).get_accessible_items(user_id, action, limit=limit + 1, after=after)
+    except ValueError as e:
+        return jsonify(request, {'error': str(e)}, 400)
+    
+    return paginated_response(request, [item.__dict__ for item in items], ('created_at', 'id'), limit)
+
+
+async def check_access(request: Request):
+    """Check if user has access to item"""
+    item_id = request.path_params['item_id']
+    data = await get_json(request)
+    
+    user_id = data.get('user_id')
+    action = data.get('action', 'read')
+    
+    if not user_id:
+        return jsonify(request, {'error': 'user_id required'}, 400)
+    
+    has_access = await get_rbac_service(request).check_user_permission(user_id, item_id, action)
+    
+    return jsonify(request, {
+        'item_id': item_id,
+        'user_id': user_id,
+        'action': action,
+        'has_access': has_access
+    })
+
+
+async def check_access_batch(request: Request):
+    """Check access for a batch of (user_id, item_id, action) tuples"""
+    data = await get_json(request) or {}
+    checks = data.get('checks')
+    
+    if not isinstance(checks, list) or not checks:
+        return jsonify(request, {'error': 'checks must be a non-empty list'}, 400)
+    
+    max_size = Config.MAX_BATCH_CHECK_SIZE
+    if len(checks) > max_size:
+        return jsonify(request, {'error': f'Batch size exceeds maximum of {max_size}'}, 400)
+    
+    triples = []
+    for index, check in enumerate(checks):
+        if not isinstance(check, dict):
+            return jsonify(request, {'error': f'checks[{index}] must be an object'}, 400)
+        
+        user_id = check.get('user_id')
+        item_id = check.get('item_id')
+        action = check.get('action', 'read')
+        
+        if not _is_id(user_id) or not _is_id(item_id) or not isinstance(action, str):
+            return jsonify(request, {'error': f'checks[{index}] requires integer user_id and item_id'}, 400)
+        
+        triples.append((user_id, item_id, action))
+    
+    decisions = await get_rbac_service(request).check_user_permissions_batch(triples)
+    
+    return jsonify(request, {
+        'results': [
+            {
+                'item_id': item_id,
+                'user_id': user_id,
+                'action': action,
+                'has_access': has_access
+            }
+            for (user_id, item_id, action), has_access in zip(triples, decisions)
+        ]
+    })
+
+
+async def grant_access(request: Request):
+    """Grant access to item"""
+    item_id = request.path_params['item_id']
+    data = await get_json(request)
+    
+    user_id = data.get('user_id')
+    role_id = data.get('role_id')
+    permission_id = data.get('permission_id')
+    granted_by = data.get('granted_by', 1)  # TODO: Get from JWT token
+    
+    if not permission_id:
+        return jsonify(request, {'error': 'permission_id required'}, 400)
+    
+    if not user_id and not role_id:
+        return jsonify(request, {'error': 'Either user_id or role_id required'}, 400)
+    
+    access_id = await get_rbac_service(request).grant_item_access(
+        item_id=item_id,
+        user_id=user_id,
+        role_id=role_id,
+        permission_id=permission_id,
+        granted_by=granted_by
+    )
+    
+    if access_id:
+        return jsonify(request, {'access_id': access_id, 'message': 'Access granted successfully'}, 201)
+    
+    return jsonify(request, {'error': 'Failed to grant access'}, 500)
+
+
+async def revoke_access(request: Request):
+    """Revoke access to item"""
+    success = await get_rbac_service(request).revoke_item_access(request.path_params['access_id'])
+    
+    if success:
+        return jsonify(request, {'message': 'Access revoked successfully'})
+    
+    return jsonify(request, {'error': 'Failed to revoke access'}, 500)
+
+
+# Users, roles and permissions
+
+async def list_users(request: Request):
+    """List users by ID, one page at a time"""
+    try:
+        limit, after = get_page_args(request)
+        query, params = keyset_paginate(
+            "SELECT id, username, email, first_name, last_name, is_active, created_at FROM users",
+            [], [], ('id',), after, limit + 1, descending=False
+        )
+    except ValueError as e:
+        return jsonify(request, {'error': str(e)}, 400)
+    
+    users = await request.app.state.db.execute_query(query, params)
+    return paginated_response(request, users, ('id',), limit)
+
+
+async def get_user(request: Request):
+    """Get user details"""
+    query = """
+    SELECT id, username, email, first_name, last_name, is_active, created_at, last_login
+    FROM users WHERE id = %s
+    """
+    user = await request.app.state.db.execute_query(query, (request.path_params['user_id'],), fetch_one=True)
+    
+    if user:
+        return jsonify(request, user)
+    
+    return jsonify(request, {'error': 'User not found'}, 404)
+
+
+async def get_user_roles(request: Request):
+    """Get user's roles"""
+    query = """
+    SELECT r.id, r.name, r.description, ur.granted_at, ur.expires_at
+    FROM roles r
+    JOIN user_roles ur ON r.id = ur.role_id
+    WHERE ur.user_id = %s
+    AND (ur.expires_at IS NULL OR ur.expires_at > NOW())
+    """
+    
+    roles = await request.app.state.db.execute_query(query, (request.path_params['user_id'],))
+    return jsonify(request, roles)
+
+
+async def list_roles(request: Request):
+    """List roles by name, one page at a time"""
+    try:
+        limit, after = get_page_args(request)
+        query, params = keyset_paginate(
+            "SELECT * FROM roles", [], [], ('name',), after, limit + 1, descending=False
+        )
+    except ValueError as e:
+        return jsonify(request, {'error': str(e)}, 400)
+    
+    roles = await request.app.state.db.execute_query(query, params)
+    return paginated_response(request, roles, ('name',), limit)
+
+
+async def get_role(request: Request):
+    """Get role details"""
+    role = await request.app.state.db.execute_query(
+        "SELECT * FROM roles WHERE id = %s", (request.path_params['role_id'],), fetch_one=True
+    )
+    
+    if role:
+        return jsonify(request, role)
+    
+    return jsonify(request, {'error': 'Role not found'}, 404)
+
+
+async def get_role_permissions(request: Request):
+    """Get permissions for a role"""
+    permissions = await get_rbac_service(request).get_role_permissions(request.path_params['role_id'])
+    
+    return jsonify(request, [p.__dict__ for p in permissions])
+
+
+async def assign_role(request: Request):
+    """Assign role to user"""
+    data = await get_json(request)
+    
+    user_id = data.get('user_id')
+    role_id = data.get('role_id')
+    granted_by = data.get('granted_by', 1)  # TODO: Get from JWT token
+    
+    if not user_id or not role_id:
+        return jsonify(request, {'error': 'user_id and role_id required'}, 400)
+    
+    assignment_id = await get_rbac_service(request).assign_role_to_user(user_id, role_id, granted_by)
+    
+    if assignment_id:
+        return jsonify(request, {'assignment_id': assignment_id, 'message': 'Role assigned successfully'}, 201)
+    
+    return jsonify(request, {'error': 'Failed to assign role'}, 500)
+
+
+@require_role('admin')
+async def set_role_parent(request: Request):
+    """Set or clear the parent a role inherits permissions from"""
+    role_id = request.path_params['role_id']
+    data = await get_json(request)
+    
+    if not data or 'parent_role_id' not in data:
+        return jsonify(request, {'error': 'parent_role_id required (null to clear)'}, 400)
+    
+    try:
+        updated = await get_rbac_service(request).set_role_parent(role_id, data['parent_role_id'])
+    except ValueError as e:
+        return jsonify(request, {'error': str(e)}, 400)
+    
+    if updated:
+        return jsonify(request, {'role_id': role_id, 'parent_role_id': data['parent_role_id']})
+    
+    return jsonify(request, {'error': 'Role not found'}, 404)
+
+
+async def list_permissions(request: Request):
+    """List all permissions"""
+    permissions = await request.app.state.db.execute_query("SELECT * FROM permissions ORDER BY resource, action")
+    return jsonify(request, permissions)
+
+
+async def get_permission(request: Request):
+    """Get permission details"""
+    permission = await request.app.state.db.execute_query(
+        "SELECT * FROM permissions WHERE id = %s", (request.path_params['permission_id'],), fetch_one=True
+    )
+    
+    if permission:
+        return jsonify(request, permission)
+    
+    return jsonify(request, {'error': 'Permission not found'}, 404)
+
+
+# Paths served asynchronously; bulk, export, sync, provisioning and /metrics
+# are left to the Flask app
+routes = [
+    Route('/health', health_check),
+    
+    Route('/api/auth/login', login, methods=['POST']),
+    Route('/api/auth/refresh', refresh, methods=['POST']),
+    Route('/api/auth/logout', logout, methods=['POST']),
+    Route('/api/auth/register', register, methods=['POST']),
+    Route('/api/auth/verify', verify_token, methods=['POST']),
+    
+    Route('/api/items', list_items),
+    Route('/api/items/accessible', get_accessible_items),
+    Route('/api/items/check-access/batch', check_access_batch, methods=['POST']),
+    Route('/api/items/{item_id:int}', get_item),
+    Route('/api/items/{item_id:int}/check-access', check_access, methods=['POST']),
+    Route('/api/items/{item_id:int}/grant', grant_access, methods=['POST']),
+    Route('/api/items/access/{access_id:int}/revoke', revoke_access, methods=['DELETE']),
+    
+    Route('/api/users', list_users),
+    Route('/api/users/{user_id:int}', get_user),
+    Route('/api/users/{user_id:int}/roles', get_user_roles),
+    
+    Route('/api/roles', list_roles),
+    Route('/api/roles/assign', assign_role, methods=['POST']),
+    Route('/api/roles/{role_id:int}', get_role),
+    Route('/api/roles/{role_id:int}/permissions', get_role_permissions),
+    Route('/api/roles/{role_id:int}/parent', set_role_parent, methods=['PUT']),
+    
+    Route('/api/permissions', list_permissions),
+    Route('/api/permissions/{permission_id:int}', get_permission),
+]
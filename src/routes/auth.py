@@ -1,9 +1,12 @@
 """
 Authentication API Routes
 """
+import math
+
 from flask import Blueprint, request, jsonify, current_app
 
-from src.services.auth_service import AuthService
+from src.middleware import get_auth_service
+from src.services.password_hasher import PasswordHasherBusy
 
 
 bp = Blueprint('auth', __name__)
@@ -13,6 +16,8 @@ bp = Blueprint('auth', __name__)
 def login():
     """User login endpoint"""
     data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Username and password required'}), 400
     
     username = data.get('username')
     password = data.get('password')
@@ -20,15 +25,76 @@ def login():
     if not username or not password:
         return jsonify({'error': 'Username and password required'}), 400
     
-    auth_service = AuthService(current_app.db_connection)
-    result = auth_service.authenticate_user(username, password)
+    if not isinstance(username, str) or not isinstance(password, str):
+        return jsonify({'error': 'Username and password must be strings'}), 400
+    
+    # Reject throttled clients before any database or bcrypt work; an allowed
+    # attempt is counted now, so concurrent guesses cannot overshoot the limit
+    throttle = current_app.login_throttle
+    if throttle is not None:
+        retry_after = throttle.check(username, request.remote_addr)
+        if retry_after is not None:
+            response = jsonify({'error': 'Too many failed login attempts, retry later'})
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response, 429
+    
+    auth_service = get_auth_service()
+    
+    try:
+        result = auth_service.authenticate_user(username, password)
+    except PasswordHasherBusy:
+        if throttle is not None:
+            throttle.release(username, request.remote_addr)
+        return jsonify({'error': 'Too many concurrent logins, retry shortly'}), 503
     
     if result:
+        if throttle is not None:
+            throttle.reset(username, request.remote_addr)
         return jsonify(result), 200
     
+    if throttle is not None:
+        throttle.record_failure(username, request.remote_addr)
+    
     return jsonify({'error': 'Invalid credentials'}), 401
 
 
+@bp.route('/refresh', methods=['POST'])
+def refresh():
+    """Exchange a refresh token for a new access token and refresh token"""
+    data = request.get_json() or {}
+    refresh_token = data.get('refresh_token')
+    
+    if not refresh_token:
+        return jsonify({'error': 'refresh_token required'}), 400
+    
+    auth_service = get_auth_service()
+    result = auth_service.refresh_access_token(refresh_token)
+    
+    if result:
+        return jsonify(result), 200
+    
+    return jsonify({'error': 'Invalid or expired refresh token'}), 401
+
+
+@bp.route('/logout', methods=['POST'])
+def logout():
+    """Revoke a refresh token, every token rotated from the same login and the user's access tokens"""
+    data = request.get_json() or {}
+    refresh_token = data.get('refresh_token')
+    
+    if not refresh_token:
+        return jsonify({'error': 'refresh_token required'}), 400
+    
+    auth_service = get_auth_service()
+    user_id = auth_service.revoke_refresh_token(refresh_token)
+    
+    # The cached authz_version would let access tokens through until it expires
+    if user_id is not None and current_app.permission_cache is not None:
+        current_app.permission_cache.invalidate_user(user_id)
+    
+    return jsonify({'message': 'Logged out'}), 200
+
+
 @bp.route('/register', methods=['POST'])
 def register():
     """User registration endpoint"""
@@ -41,14 +107,18 @@ def register():
     if not all([username, email, password]):
         return jsonify({'error': 'Username, email, and password required'}), 400
     
-    auth_service = AuthService(current_app.db_connection)
-    user_id = auth_service.create_user(
-        username=username,
-        email=email,
-        password=password,
-        first_name=data.get('first_name'),
-        last_name=data.get('last_name')
-    )
+    auth_service = get_auth_service()
+    
+    try:
+        user_id = auth_service.create_user(
+            username=username,
+            email=email,
+            password=password,
+            first_name=data.get('first_name'),
+            last_name=data.get('last_name')
+        )
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Too many concurrent registrations, retry shortly'}), 503
     
     if user_id:
         return jsonify({'user_id': user_id, 'message': 'User created successfully'}), 201
@@ -65,7 +135,7 @@ def verify_token():
     if not token:
         return jsonify({'error': 'Token required'}), 400
     
-    auth_service = AuthService(current_app.db_connection)
+    auth_service = get_auth_service()
     payload = auth_service.verify_token(token)
     
     if payload:
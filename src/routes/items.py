@@ -1,9 +1,14 @@
 """
 Item Access Control API Routes
 """
+from datetime import datetime
+
 from flask import Blueprint, jsonify, request, current_app
 
-from src.services.rbac_service import RBACService
+from src.middleware import (
+    get_rbac_service, get_page_args, paginated_response, require_role, stream_json_array, stream_ndjson
+)
+from src.utils import keyset_paginate
 
 
 bp = Blueprint('items', __name__)
@@ -11,17 +16,50 @@ bp = Blueprint('items', __name__)
 
 @bp.route('', methods=['GET'])
 def list_items():
-    """List all items"""
-    query = "SELECT * FROM items ORDER BY created_at DESC LIMIT 100"
-    items = current_app.db_connection.execute_query(query)
-    return jsonify(items if items else []), 200
+    """List items, newest first, one page at a time"""
+    try:
+        limit, after = get_page_args()
+        query, params = keyset_paginate(
+            "SELECT * FROM items", [], [], ('created_at', 'id'), after, limit + 1
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    items = current_app.db_connection.execute_query(query, params)
+    return paginated_response(items, ('created_at', 'id'), limit)
+
+
+@bp.route('/export', methods=['GET'])
+def export_items():
+    """Stream every item as NDJSON (default) or a JSON array (?format=json)"""
+    output_format = request.args.get('format', 'ndjson')
+    
+    if output_format not in ('ndjson', 'json'):
+        return jsonify({'error': 'format must be ndjson or json'}), 400
+    
+    rows = current_app.db_connection.iter_query(
+        "SELECT * FROM items ORDER BY id",
+        itersize=current_app.config['STREAM_FETCH_SIZE']
+    )
+    
+    return stream_ndjson(rows) if output_format == 'ndjson' else stream_json_array(rows)
 
 
 @bp.route('/<int:item_id>', methods=['GET'])
 def get_item(item_id):
     """Get item details"""
-    query = "SELECT * FROM items WHERE id = %s"
-    item = current_app.db_connection.execute_query(query, (item_id,), fetch_one=True)
+    cache = current_app.permission_cache
+    item = cache.get_item(item_id) if cache is not None else None
+    
+    if item is None:
+        generation = cache.generation() if cache is not None else None
+        query = "SELECT * FROM items WHERE id = %s"
+        item = current_app.db_connection.execute_query(
+            query, (item_id,), fetch_one=True, prepare='items_get', primary=cache is not None
+        )
+        
+        if item and cache is not None:
+            cache.set_item(item_id, dict(item), generation=generation)
     
     if item:
         return jsonify(item), 200
@@ -38,10 +76,14 @@ def get_accessible_items():
     if not user_id:
         return jsonify({'error': 'user_id parameter required'}), 400
     
-    rbac_service = RBACService(current_app.db_connection)
-    items = rbac_service.get_accessible_items(user_id, action)
+    try:
+        limit, after = get_page_args()
+        rbac_service = get_rbac_service()
+        items = rbac_service.get_accessible_items(user_id, action, limit=limit + 1, after=after)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify([item.__dict__ for item in items]), 200
+    return paginated_response([item.__dict__ for item in items], ('created_at', 'id'), limit)
 
 
 @bp.route('/<int:item_id>/check-access', methods=['POST'])
@@ -55,7 +97,7 @@ def check_access(item_id):
     if not user_id:
         return jsonify({'error': 'user_id required'}), 400
     
-    rbac_service = RBACService(current_app.db_connection)
+    rbac_service = get_rbac_service()
     has_access = rbac_service.check_user_permission(user_id, item_id, action)
     
     return jsonify({
@@ -66,6 +108,49 @@ def check_access(item_id):
     }), 200
 
 
+@bp.route('/check-access/batch', methods=['POST'])
+def check_access_batch():
+    """Check access for a batch of (user_id, item_id, action) tuples"""
+    data = request.get_json() or {}
+    checks = data.get('checks')
+    
+    if not isinstance(checks, list) or not checks:
+        return jsonify({'error': 'checks must be a non-empty list'}), 400
+    
+    max_size = current_app.config['MAX_BATCH_CHECK_SIZE']
+    if len(checks) > max_size:
+        return jsonify({'error': f'Batch size exceeds maximum of {max_size}'}), 400
+    
+    triples = []
+    for index, check in enumerate(checks):
+        if not isinstance(check, dict):
+            return jsonify({'error': f'checks[{index}] must be an object'}), 400
+        
+        user_id = check.get('user_id')
+        item_id = check.get('item_id')
+        action = check.get('action', 'read')
+        
+        if not _is_id(user_id) or not _is_id(item_id) or not isinstance(action, str):
+            return jsonify({'error': f'checks[{index}] requires integer user_id and item_id'}), 400
+        
+        triples.append((user_id, item_id, action))
+    
+    rbac_service = get_rbac_service()
+    decisions = rbac_service.check_user_permissions_batch(triples)
+    
+    return jsonify({
+        'results': [
+            {
+                'item_id': item_id,
+                'user_id': user_id,
+                'action': action,
+                'has_access': has_access
+            }
+            for (user_id, item_id, action), has_access in zip(triples, decisions)
+        ]
+    }), 200
+
+
 @bp.route('/<int:item_id>/grant', methods=['POST'])
 def grant_access(item_id):
     """Grant access to item"""
@@ -82,7 +167,7 @@ def grant_access(item_id):
     if not user_id and not role_id:
         return jsonify({'error': 'Either user_id or role_id required'}), 400
     
-    rbac_service = RBACService(current_app.db_connection)
+    rbac_service = get_rbac_service()
     access_id = rbac_service.grant_item_access(
         item_id=item_id,
         user_id=user_id,
@@ -100,7 +185,7 @@ def grant_access(item_id):
 @bp.route('/access/<int:access_id>/revoke', methods=['DELETE'])
 def revoke_access(access_id):
     """Revoke access to item"""
-    rbac_service = RBACService(current_app.db_connection)
+    rbac_service = get_rbac_service()
     success = rbac_service.revoke_item_access(access_id)
     
     if success:
@@ -108,3 +193,120 @@ def revoke_access(access_id):
     
     return jsonify({'error': 'Failed to revoke access'}), 500
 
+
+def _parse_expires_at(data):
+    """Read an optional ISO 8601 expires_at from a request body"""
+    expires_at = data.get('expires_at')
+    if expires_at is None:
+        return None
+    if not isinstance(expires_at, str):
+        raise ValueError('expires_at must be an ISO 8601 string')
+    return datetime.fromisoformat(expires_at)
+
+
+@bp.route('/access/bulk-grant', methods=['POST'])
+@require_role('admin')
+def bulk_grant_access():
+    """
+    Grant access for a list of grants, or for every item matching a selector
+    
+    Body is either {"grants": [{item_id, user_id | role_id, permission_id}, ...]}
+    or {"selector": {item_type, owner_id}, user_id | role_id, permission_id}.
+    """
+    data = request.get_json() or {}
+    granted_by = request.user_id
+    rbac_service = get_rbac_service()
+    
+    try:
+        expires_at = _parse_expires_at(data)
+        
+        if 'selector' in data:
+            user_id, role_id, permission_id = _grant_target(data, 'body')
+            counts = rbac_service.grant_item_access_by_selector(
+                data['selector'], user_id, role_id, permission_id, granted_by, expires_at
+            )
+            return jsonify(counts), 200
+        
+        grants = data.get('grants')
+        if not isinstance(grants, list) or not grants:
+            return jsonify({'error': 'grants must be a non-empty list, or give a selector'}), 400
+        
+        max_size = current_app.config['MAX_BULK_ACCESS_SIZE']
+        if len(grants) > max_size:
+            return jsonify({'error': f'Batch size exceeds maximum of {max_size}'}), 400
+        
+        rows = []
+        for index, grant in enumerate(grants):
+            if not isinstance(grant, dict) or not _is_id(grant.get('item_id')):
+                return jsonify({'error': f'grants[{index}] requires an integer item_id'}), 400
+            rows.append((grant['item_id'],) + _grant_target(grant, f'grants[{index}]'))
+        
+        counts = rbac_service.grant_item_access_bulk(rows, granted_by, expires_at)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(counts), 200
+
+
+@bp.route('/access/bulk-revoke', methods=['POST'])
+@require_role('admin')
+def bulk_revoke_access():
+    """
+    Revoke a list of access records, or a grantee's grants on every item matching a selector
+    
+    Body is either {"access_ids": [...]} or
+    {"selector": {item_type, owner_id}, user_id | role_id, permission_id (optional)}.
+    """
+    data = request.get_json() or {}
+    rbac_service = get_rbac_service()
+    
+    try:
+        if 'selector' in data:
+            user_id, role_id, permission_id = _grant_target(data, 'body', permission_required=False)
+            counts = rbac_service.revoke_item_access_by_selector(
+                data['selector'], user_id, role_id, permission_id
+            )
+            return jsonify(counts), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    access_ids = data.get('access_ids')
+    if not isinstance(access_ids, list) or not access_ids or not all(_is_id(a) for a in access_ids):
+        return jsonify({'error': 'access_ids must be a non-empty list of integers, or give a selector'}), 400
+    
+    max_size = current_app.config['MAX_BULK_ACCESS_SIZE']
+    if len(access_ids) > max_size:
+        return jsonify({'error': f'Batch size exceeds maximum of {max_size}'}), 400
+    
+    counts = rbac_service.revoke_item_access_bulk(access_ids)
+    return jsonify(counts), 200
+
+
+def _is_id(value) -> bool:
+    """Whether a JSON value is an integer ID"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _grant_target(data, where, permission_required=True):
+    """
+    Read the grantee and permission of a grant or revocation
+    
+    Returns:
+        Tuple of (user_id, role_id, permission_id)
+        
+    Raises:
+        ValueError: If exactly one of user_id and role_id is not given, or
+                    the permission is missing
+    """
+    user_id = data.get('user_id')
+    role_id = data.get('role_id')
+    permission_id = data.get('permission_id')
+    
+    if (user_id is None) == (role_id is None):
+        raise ValueError(f'{where} requires either user_id or role_id')
+    if any(value is not None and not _is_id(value) for value in (user_id, role_id, permission_id)):
+        raise ValueError(f'{where} user_id, role_id and permission_id must be integers')
+    if permission_required and permission_id is None:
+        raise ValueError(f'{where} requires permission_id')
+    
+    return user_id, role_id, permission_id
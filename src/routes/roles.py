@@ -3,7 +3,8 @@ Role Management API Routes
 """
 from flask import Blueprint, jsonify, request, current_app
 
-from src.services.rbac_service import RBACService
+from src.middleware import get_rbac_service, get_page_args, paginated_response, require_role
+from src.utils import keyset_paginate
 
 
 bp = Blueprint('roles', __name__)
@@ -11,10 +12,17 @@ bp = Blueprint('roles', __name__)
 
 @bp.route('', methods=['GET'])
 def list_roles():
-    """List all roles"""
-    query = "SELECT * FROM roles ORDER BY name"
-    roles = current_app.db_connection.execute_query(query)
-    return jsonify(roles if roles else []), 200
+    """List roles by name, one page at a time"""
+    try:
+        limit, after = get_page_args()
+        query, params = keyset_paginate(
+            "SELECT * FROM roles", [], [], ('name',), after, limit + 1, descending=False
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    roles = current_app.db_connection.execute_query(query, params)
+    return paginated_response(roles, ('name',), limit)
 
 
 @bp.route('/<int:role_id>', methods=['GET'])
@@ -32,7 +40,7 @@ def get_role(role_id):
 @bp.route('/<int:role_id>/permissions', methods=['GET'])
 def get_role_permissions(role_id):
     """Get permissions for a role"""
-    rbac_service = RBACService(current_app.db_connection)
+    rbac_service = get_rbac_service()
     permissions = rbac_service.get_role_permissions(role_id)
     
     return jsonify([p.__dict__ for p in permissions]), 200
@@ -50,7 +58,7 @@ def assign_role():
     if not user_id or not role_id:
         return jsonify({'error': 'user_id and role_id required'}), 400
     
-    rbac_service = RBACService(current_app.db_connection)
+    rbac_service = get_rbac_service()
     assignment_id = rbac_service.assign_role_to_user(user_id, role_id, granted_by)
     
     if assignment_id:
@@ -58,3 +66,70 @@ def assign_role():
     
     return jsonify({'error': 'Failed to assign role'}), 500
 
+
+@bp.route('/sync', methods=['POST'])
+@require_role('admin')
+def sync_roles():
+    """
+    Set the complete direct role set of many users in one transaction
+    
+    Body: {"users": [{"user_id": 1, "role_ids": [2, 3]}, ...]}. Roles not
+    listed for a user are removed; users not listed are left untouched.
+    """
+    data = request.get_json() or {}
+    users = data.get('users')
+    granted_by = request.user_id
+    
+    if not isinstance(users, list) or not users:
+        return jsonify({'error': 'users must be a non-empty list'}), 400
+    
+    max_size = current_app.config['MAX_ROLE_SYNC_USERS']
+    if len(users) > max_size:
+        return jsonify({'error': f'Batch size exceeds maximum of {max_size}'}), 400
+    
+    role_sets = {}
+    for index, entry in enumerate(users):
+        user_id = entry.get('user_id') if isinstance(entry, dict) else None
+        role_ids = entry.get('role_ids') if isinstance(entry, dict) else None
+        
+        if not isinstance(user_id, int) or isinstance(user_id, bool):
+            return jsonify({'error': f'users[{index}] requires an integer user_id'}), 400
+        if not isinstance(role_ids, list) or not all(
+            isinstance(role_id, int) and not isinstance(role_id, bool) for role_id in role_ids
+        ):
+            return jsonify({'error': f'users[{index}] requires a list of integer role_ids'}), 400
+        if user_id in role_sets:
+            return jsonify({'error': f'users[{index}] repeats user {user_id}'}), 400
+        
+        role_sets[user_id] = role_ids
+    
+    rbac_service = get_rbac_service()
+    
+    try:
+        counts = rbac_service.sync_user_roles(role_sets, granted_by)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(counts), 200
+
+
+@bp.route('/<int:role_id>/parent', methods=['PUT'])
+@require_role('admin')
+def set_role_parent(role_id):
+    """Set or clear the parent a role inherits permissions from"""
+    data = request.get_json()
+    
+    if not data or 'parent_role_id' not in data:
+        return jsonify({'error': 'parent_role_id required (null to clear)'}), 400
+    
+    rbac_service = get_rbac_service()
+    
+    try:
+        updated = rbac_service.set_role_parent(role_id, data['parent_role_id'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if updated:
+        return jsonify({'role_id': role_id, 'parent_role_id': data['parent_role_id']}), 200
+    
+    return jsonify({'error': 'Role not found'}), 404
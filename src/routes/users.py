@@ -1,7 +1,14 @@
 """
 User Management API Routes
 """
-from flask import Blueprint, jsonify, current_app
+import io
+
+from flask import Blueprint, request, jsonify, current_app
+
+from src.middleware import get_page_args, paginated_response, require_role
+from src.services.password_hasher import PasswordHasherBusy
+from src.services.user_provisioner import FORMATS, UserProvisioner, read_records
+from src.utils import keyset_paginate
 
 
 bp = Blueprint('users', __name__)
@@ -9,10 +16,53 @@ bp = Blueprint('users', __name__)
 
 @bp.route('', methods=['GET'])
 def list_users():
-    """List all users"""
-    query = "SELECT id, username, email, first_name, last_name, is_active, created_at FROM users"
-    users = current_app.db_connection.execute_query(query)
-    return jsonify(users if users else []), 200
+    """List users by ID, one page at a time"""
+    try:
+        limit, after = get_page_args()
+        query, params = keyset_paginate(
+            "SELECT id, username, email, first_name, last_name, is_active, created_at FROM users",
+            [], [], ('id',), after, limit + 1, descending=False
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    users = current_app.db_connection.execute_query(query, params)
+    return paginated_response(users, ('id',), limit)
+
+
+@bp.route('/bulk', methods=['POST'])
+@require_role('admin')
+def bulk_create_users():
+    """
+    Create users from an NDJSON or CSV body
+    
+    The format comes from ?format=, or from a text/csv Content-Type, and
+    defaults to NDJSON. The response lists every row that was not created.
+    Passwords are hashed on the shared password hasher; if its backlog is
+    full the request stops with 503 and reports the batches already created.
+    """
+    fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    if fmt not in FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(FORMATS)}"}), 400
+    
+    config = current_app.config
+    provisioner = UserProvisioner(
+        current_app.db_connection,
+        rounds=config['BCRYPT_ROUNDS'],
+        batch_size=config['BULK_PROVISION_BATCH_SIZE'],
+        min_password_length=config['PASSWORD_MIN_LENGTH'],
+        password_hasher=current_app.password_hasher
+    )
+    
+    # Latest summary of the committed batches, for a response cut short by a busy hasher
+    completed = {}
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    try:
+        summary = provisioner.provision(read_records(lines, fmt), progress=completed.update)
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Password hashing is busy, retry the remaining rows', **completed}), 503
+    
+    return jsonify(summary), 200
 
 
 @bp.route('/<int:user_id>', methods=['GET'])
@@ -0,0 +1,253 @@
+"""
+Async Authentication Service - logins, refresh tokens and registration for the ASGI app
+"""
+import asyncio
+import logging
+import secrets
+import uuid
+from typing import Dict, Optional
+
+from src.config import Config
+from src.database.async_connection import AsyncDatabaseConnection
+from src.services.auth_service import (
+    CREATE_USER_QUERY, ISSUE_REFRESH_TOKEN_QUERY, REHASH_PASSWORD_QUERY, REVOKE_REFRESH_FAMILY_QUERY,
+    ROLE_CLAIMS_QUERY, UPDATE_LAST_LOGIN_QUERY, USE_REFRESH_TOKEN_QUERY, USER_LOOKUP_QUERY, AuthService
+)
+from src.services.password_hasher import PasswordHasher
+from src.services.token_verifier import TokenVerifier
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAuthService:
+    """
+    asyncio counterpart of AuthService
+    
+    Runs the same SQL on an AsyncDatabaseConnection and issues identical
+    tokens. bcrypt runs on the PasswordHasher pool when one is configured,
+    awaited through its future, so a full backlog is reported at once and
+    no thread waits on a slot; without one it runs on a worker thread.
+    Either way a login never blocks the event loop.
+    """
+    
+    def __init__(
+        self,
+        db: AsyncDatabaseConnection,
+        token_verifier: Optional[TokenVerifier] = None,
+        password_hasher: Optional[PasswordHasher] = None
+    ):
+        self.db = db
+        self.config = Config()
+        self.token_verifier = token_verifier
+        self.password_hasher = password_hasher
+    
+    # Token signing and password hashing do not touch the database
+    _encode_token = AuthService._encode_token
+    _role_claims = staticmethod(AuthService._role_claims)
+    _refresh_token_hash = staticmethod(AuthService._refresh_token_hash)
+    _hash_password = AuthService._hash_password
+    _verify_password = AuthService._verify_password
+    _needs_rehash = AuthService._needs_rehash
+    
+    async def authenticate_user(self, username: str, password: str) -> Optional[Dict]:
+        """
+        Authenticate user credentials
+        
+        Args:
+            username: Username or email
+            password: Plain text password
+            
+        Returns:
+            User data with JWT token if successful, None otherwise
+            
+        Raises:
+            PasswordHasherBusy: If the bcrypt backlog is full
+        """
+        user_data = await self.db.execute_query(USER_LOOKUP_QUERY, (username, username), fetch_one=True)
+        
+        if not user_data:
+            logger.warning(f"Authentication failed: User {username} not found")
+            return None
+        
+        if not await self._verify_password_async(password, user_data['password_hash']):
+            logger.warning(f"Authentication failed: Invalid password for user {username}")
+            return None
+        
+        # Upgrade hashes made at an old cost while the plain password is at hand
+        if self._needs_rehash(user_data['password_hash']):
+            await self._rehash_password(user_data['id'], password)
+        
+        await self.db.execute_update(UPDATE_LAST_LOGIN_QUERY, (user_data['id'],))
+        
+        token = await self._generate_token(user_data)
+        
+        logger.info(f"User {username} authenticated successfully")
+        
+        result = {
+            'user_id': user_data['id'],
+            'username': user_data['username'],
+            'email': user_data['email'],
+            'token': token,
+            'token_type': 'Bearer'
+        }
+        
+        if self.config.REFRESH_TOKENS_ENABLED:
+            result['refresh_token'] = await self.issue_refresh_token(user_data['id'])
+            result['expires_in'] = self.config.ACCESS_TOKEN_EXPIRATION_MINUTES * 60
+        
+        return result
+    
+    async def issue_refresh_token(self, user_id: int, family_id: Optional[str] = None) -> str:
+        """
+        Create a refresh token for a user
+        
+        Args:
+            user_id: User ID
+            family_id: Family of the token being rotated (optional; new login if omitted)
+            
+        Returns:
+            Opaque refresh token string
+        """
+        refresh_token = secrets.token_urlsafe(32)
+        
+        await self.db.execute_update(
+            ISSUE_REFRESH_TOKEN_QUERY,
+            (
+                user_id,
+                self._refresh_token_hash(refresh_token),
+                family_id or str(uuid.uuid4()),
+                self.config.REFRESH_TOKEN_EXPIRATION_DAYS
+            )
+        )
+        
+        return refresh_token
+    
+    async def refresh_access_token(self, refresh_token: str) -> Optional[Dict]:
+        """
+        Exchange a refresh token for a new access token and refresh token
+        
+        Presenting a token that was already used revokes its whole family
+        (see AuthService.refresh_access_token).
+        
+        Args:
+            refresh_token: Refresh token string
+            
+        Returns:
+            Dictionary with the new access token and refresh token, or None
+        """
+        token_hash = self._refresh_token_hash(refresh_token)
+        user_data = await self.db.execute_query(USE_REFRESH_TOKEN_QUERY, (token_hash,), fetch_one=True)
+        
+        if not user_data:
+            if await self.revoke_refresh_token(refresh_token):
+                logger.warning("Refresh token reused; revoked its token family")
+            return None
+        
+        if not user_data['is_active']:
+            logger.warning(f"Refresh rejected for inactive user {user_data['id']}")
+            return None
+        
+        return {
+            'user_id': user_data['id'],
+            'username': user_data['username'],
+            'email': user_data['email'],
+            'token': await self._generate_token(user_data),
+            'token_type': 'Bearer',
+            'refresh_token': await self.issue_refresh_token(user_data['id'], str(user_data['family_id'])),
+            'expires_in': self.config.ACCESS_TOKEN_EXPIRATION_MINUTES * 60
+        }
+    
+    async def verify_token(self, token: str) -> Optional[Dict]:
+        """
+        Verify and decode JWT token in a worker thread, since the verifier's
+        revocation hook may wait on Redis or the database
+        
+        Args:
+            token: JWT token string
+            
+        Returns:
+            Decoded token payload if valid, None otherwise
+        """
+        return await asyncio.to_thread(AuthService.verify_token, self, token)
+    
+    async def revoke_refresh_token(self, refresh_token: str) -> Optional[int]:
+        """
+        Revoke a refresh token and every token rotated from the same login,
+        along with the user's access tokens already issued
+        
+        Args:
+            refresh_token: Refresh token string
+            
+        Returns:
+            ID of the user whose tokens were revoked, or None if none were live
+        """
+        result = await self.db.execute_query(
+            REVOKE_REFRESH_FAMILY_QUERY, (self._refresh_token_hash(refresh_token),), fetch_one=True
+        )
+        return result['id'] if result else None
+    
+    async def create_user(
+        self,
+        username: str,
+        email: str,
+        password: str,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Create a new user
+        
+        Args:
+            username: Username
+            email: Email address
+            password: Plain text password
+            first_name: First name (optional)
+            last_name: Last name (optional)
+            
+        Returns:
+            User ID if created successfully, None otherwise
+            
+        Raises:
+            PasswordHasherBusy: If the bcrypt backlog is full
+        """
+        password_hash = await self._hash_password_async(password)
+        
+        try:
+            result = await self.db.execute_query(
+                CREATE_USER_QUERY, (username, email, password_hash, first_name, last_name), fetch_one=True
+            )
+            
+            user_id = result['id'] if result else None
+            logger.info(f"User {username} created successfully with ID {user_id}")
+            return user_id
+        
+        except Exception as e:
+            logger.error(f"Failed to create user {username}: {e}")
+            return None
+    
+    async def _generate_token(self, user_data: Dict) -> str:
+        """Generate JWT token for user, embedding their role claims"""
+        row = await self.db.execute_query(ROLE_CLAIMS_QUERY, (user_data['id'],), fetch_one=True)
+        return self._encode_token(user_data, self._role_claims(row))
+    
+    async def _hash_password_async(self, password: str) -> str:
+        """Hash a password off the event loop"""
+        if self.password_hasher is not None:
+            return await asyncio.wrap_future(self.password_hasher.submit_hash(password))
+        return await asyncio.to_thread(self._hash_password, password)
+    
+    async def _verify_password_async(self, password: str, password_hash: str) -> bool:
+        """Verify a password off the event loop"""
+        if self.password_hasher is not None:
+            return await asyncio.wrap_future(self.password_hasher.submit_verify(password, password_hash))
+        return await asyncio.to_thread(self._verify_password, password, password_hash)
+    
+    async def _rehash_password(self, user_id: int, password: str):
+        """Replace a user's password hash with one at the current cost; failures are only logged"""
+        try:
+            password_hash = await self._hash_password_async(password)
+            await self.db.execute_update(REHASH_PASSWORD_QUERY, (password_hash, user_id))
+            logger.info(f"Upgraded password hash for user {user_id} to cost {self.config.BCRYPT_ROUNDS}")
+        except Exception as e:
+            logger.warning(f"Failed to upgrade password hash for user {user_id}: {e}")
@@ -0,0 +1,406 @@
+"""
+Async RBAC Service - access checks and grants for the ASGI app
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.database.async_connection import AsyncDatabaseConnection
+from src.database.models import Role, Permission, Item
+from src.services.audit_writer import AuditWriter
+from src.services.permission_cache import PermissionCache
+from src.services.rbac_service import (
+    ACCESSIBLE_ITEMS_CONDITION, ASSIGN_ROLE_QUERY, CHECK_PERMISSION_QUERY, CHECK_PERMISSIONS_BATCH_QUERY,
+    GRANT_ACCESS_QUERY, LOG_ACCESS_BATCH_QUERY, LOG_ACCESS_QUERY, ROLE_PERMISSIONS_QUERY, SET_ROLE_PARENT_QUERY,
+    USER_ROLES_QUERY,
+    RBACService
+)
+from src.utils import keyset_paginate
+
+
+logger = logging.getLogger(__name__)
+
+
+async def call_cache(cache, operation: Callable, *args, **kwargs):
+    """
+    Run a cache operation from a coroutine
+    
+    The in-process PermissionCache only takes a lock and runs inline; a
+    SharedCache waits on Redis, so it runs in a worker thread.
+    
+    Args:
+        cache: Cache the operation belongs to
+        operation: Callable to run
+        args: Positional arguments for the operation
+        kwargs: Keyword arguments for the operation
+        
+    Returns:
+        The operation's result
+    """
+    if isinstance(cache, PermissionCache):
+        return operation(*args, **kwargs)
+    return await asyncio.to_thread(operation, *args, **kwargs)
+
+
+class AsyncRBACService:
+    """
+    asyncio counterpart of RBACService
+    
+    Runs the same SQL on an AsyncDatabaseConnection and takes the same
+    permission cache and audit writer, so decisions cached or invalidated by
+    either app are seen by both. Bulk grants, role syncs and the other
+    admin operations stay on RBACService.
+    """
+    
+    def __init__(
+        self,
+        db: AsyncDatabaseConnection,
+        cache: Optional[PermissionCache] = None,
+        audit_writer: Optional[AuditWriter] = None
+    ):
+        self.db = db
+        self.cache = cache
+        self.audit_writer = audit_writer
+    
+    # Cache bookkeeping does not touch the database
+    _invalidate_access = RBACService._invalidate_access
+    _invalidate_access_many = RBACService._invalidate_access_many
+    
+    async def check_user_permission(self, user_id: int, item_id: int, action: str) -> bool:
+        """
+        Check if a user has permission to perform an action on an item
+        
+        Args:
+            user_id: User ID
+            item_id: Item ID
+            action: Action to perform (read, write, delete, etc.)
+            
+        Returns:
+            True if user has permission, False otherwise
+        """
+        if self.cache is not None:
+            cached = await call_cache(self.cache, self.cache.get, user_id, item_id, action)
+            if cached is not None:
+                await self._log_access_attempt(user_id, item_id, action, cached)
+                return cached
+        
+        generation = await call_cache(self.cache, self.cache.generation) if self.cache is not None else None
+        result = await self.db.execute_query(CHECK_PERMISSION_QUERY, (user_id, action, item_id), fetch_one=True)
+        has_permission = result['count'] > 0 if result else False
+        
+        if self.cache is not None:
+            expires_in = result.get('expires_in') if has_permission else None
+            ttl = float(expires_in) if expires_in is not None else None
+            await call_cache(
+                self.cache, self.cache.set, user_id, item_id, action, has_permission, ttl=ttl, generation=generation
+            )
+        
+        await self._log_access_attempt(user_id, item_id, action, has_permission)
+        
+        return has_permission
+    
+    async def check_user_permissions_batch(self, checks: List[Tuple[int, int, str]]) -> List[bool]:
+        """
+        Check many (user_id, item_id, action) triples in one query
+        
+        Args:
+            checks: List of (user_id, item_id, action) tuples
+            
+        Returns:
+            List of decisions in the same order as checks
+        """
+        decisions: Dict[Tuple[int, int, str], bool] = {}
+        
+        if self.cache is not None:
+            for check in set(checks):
+                cached = await call_cache(self.cache, self.cache.get, *check)
+                if cached is not None:
+                    decisions[check] = cached
+        
+        pending = [check for check in set(checks) if check not in decisions]
+        
+        if pending:
+            user_ids, item_ids, actions = (list(column) for column in zip(*pending))
+            generation = await call_cache(self.cache, self.cache.generation) if self.cache is not None else None
+            results = await self.db.execute_query(CHECK_PERMISSIONS_BATCH_QUERY, (user_ids, item_ids, actions))
+            
+            for row in results:
+                check = (row['user_id'], row['item_id'], row['action'])
+                has_permission = row['count'] > 0
+                decisions[check] = has_permission
+                
+                if self.cache is not None:
+                    expires_in = row.get('expires_in') if has_permission else None
+                    ttl = float(expires_in) if expires_in is not None else None
+                    await call_cache(self.cache, self.cache.set, *check, has_permission, ttl=ttl, generation=generation)
+        
+        results = [decisions.get(check, False) for check in checks]
+        
+        await self._log_access_attempts([
+            (user_id, item_id, action, granted)
+            for (user_id, item_id, action), granted in zip(checks, results)
+        ])
+        
+        return results
+    
+    async def grant_item_access(
+        self,
+        item_id: int,
+        user_id: Optional[int],
+        role_id: Optional[int],
+        permission_id: int,
+        granted_by: int,
+        expires_at: Optional[datetime] = None
+    ) -> int:
+        """
+        Grant access to an item for a user or role
+        
+        Args:
+            item_id: Item ID
+            user_id: User ID (optional if role_id is provided)
+            role_id: Role ID (optional if user_id is provided)
+            permission_id: Permission ID
+            granted_by: User ID who granted the access
+            expires_at: Expiration datetime (optional)
+            
+        Returns:
+            ID of the created access record
+        """
+        result = await self.db.execute_query(
+            GRANT_ACCESS_QUERY,
+            (item_id, user_id, role_id, permission_id, granted_by, expires_at),
+            fetch_one=True
+        )
+        
+        await call_cache(self.cache, self._invalidate_access, item_id, user_id, role_id)
+        
+        logger.info(f"Access granted to item {item_id} by user {granted_by}")
+        return result['id'] if result else None
+    
+    async def revoke_item_access(self, access_id: int) -> bool:
+        """
+        Revoke access to an item
+        
+        The record is deleted and its grantee returned by one statement, so
+        no lookup precedes the delete.
+        
+        Args:
+            access_id: Access record ID
+            
+        Returns:
+            True if revoked successfully
+        """
+        revoked = await self.db.execute_query(
+            "DELETE FROM item_access WHERE id = %s RETURNING item_id, user_id, role_id",
+            (access_id,),
+            fetch_one=True
+        )
+        
+        if revoked:
+            await call_cache(
+                self.cache, self._invalidate_access, revoked['item_id'], revoked['user_id'], revoked['role_id']
+            )
+        
+        logger.info(f"Access {access_id} revoked")
+        return revoked is not None
+    
+    async def get_user_roles(self, user_id: int) -> List[Role]:
+        """
+        Get all active roles for a user, including inherited ancestor roles
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            List of Role objects
+        """
+        if self.cache is not None:
+            cached = await call_cache(self.cache, self.cache.get_user_roles, user_id)
+            if cached is not None:
+                return [Role(**row) for row in cached]
+        
+        generation = await call_cache(self.cache, self.cache.generation) if self.cache is not None else None
+        rows = await self.db.execute_query(USER_ROLES_QUERY, (user_id,))
+        
+        # The cached role set must not outlive the first assignment to expire
+        expiries = [float(e) for e in (row.pop('expires_in') for row in rows) if e is not None]
+        
+        if self.cache is not None:
+            ttl = min(expiries) if expiries else None
+            await call_cache(self.cache, self.cache.set_user_roles, user_id, rows, ttl=ttl, generation=generation)
+        
+        return [Role(**row) for row in rows]
+    
+    async def get_authz_version(self, user_id: int) -> Optional[int]:
+        """
+        Get a user's authorization version, bumped whenever their roles change
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            users.authz_version, or None if the user does not exist
+        """
+        if self.cache is not None:
+            cached = await call_cache(self.cache, self.cache.get_authz_version, user_id)
+            if cached is not None:
+                return cached
+        
+        generation = await call_cache(self.cache, self.cache.generation) if self.cache is not None else None
+        result = await self.db.execute_query(
+            "SELECT authz_version FROM users WHERE id = %s", (user_id,), fetch_one=True
+        )
+        if not result:
+            return None
+        
+        if self.cache is not None:
+            await call_cache(
+                self.cache, self.cache.set_authz_version, user_id, result['authz_version'], generation=generation
+            )
+        
+        return result['authz_version']
+    
+    async def get_role_permissions(self, role_id: int) -> List[Permission]:
+        """
+        Get all permissions for a role
+        
+        Args:
+            role_id: Role ID
+            
+        Returns:
+            List of Permission objects
+        """
+        results = await self.db.execute_query(ROLE_PERMISSIONS_QUERY, (role_id,))
+        return [Permission(**row) for row in results]
+    
+    async def get_accessible_items(
+        self,
+        user_id: int,
+        action: str = 'read',
+        limit: Optional[int] = None,
+        after: Optional[Sequence[Any]] = None
+    ) -> List[Item]:
+        """
+        Get items accessible by a user for a specific action, newest first
+        
+        Args:
+            user_id: User ID
+            action: Action type (default: read)
+            limit: Maximum number of items (optional)
+            after: (created_at, id) of the last item of the previous page (optional)
+            
+        Returns:
+            List of Item objects
+        """
+        query, params = keyset_paginate(
+            "SELECT i.* FROM items i",
+            [ACCESSIBLE_ITEMS_CONDITION],
+            [user_id, action],
+            ('i.created_at', 'i.id'),
+            after,
+            limit
+        )
+        
+        results = await self.db.execute_query(query, params)
+        return [Item(**row) for row in results]
+    
+    async def assign_role_to_user(
+        self,
+        user_id: int,
+        role_id: int,
+        granted_by: int,
+        expires_at: Optional[datetime] = None
+    ) -> int:
+        """
+        Assign a role to a user
+        
+        Args:
+            user_id: User ID
+            role_id: Role ID
+            granted_by: User ID who granted the role
+            expires_at: Expiration datetime (optional)
+            
+        Returns:
+            ID of the created user_role record
+        """
+        result = await self.db.execute_query(
+            ASSIGN_ROLE_QUERY, (user_id, role_id, granted_by, expires_at), fetch_one=True
+        )
+        
+        if self.cache is not None:
+            await call_cache(self.cache, self.cache.invalidate_user, user_id)
+        
+        logger.info(f"Role {role_id} assigned to user {user_id} by {granted_by}")
+        return result['id'] if result else None
+    
+    async def set_role_parent(self, role_id: int, parent_role_id: Optional[int]) -> bool:
+        """
+        Make a role inherit the permissions of a parent role
+        
+        Args:
+            role_id: Role ID
+            parent_role_id: Parent role ID, or None to detach the role
+            
+        Returns:
+            True if the role exists and was updated
+            
+        Raises:
+            ValueError: If the parent already inherits from the role
+        """
+        if parent_role_id == role_id:
+            raise ValueError(f"Role {role_id} cannot be its own parent")
+        
+        if parent_role_id is not None:
+            cycle = await self.db.execute_query(
+                "SELECT 1 FROM role_closure WHERE ancestor_id = %s AND descendant_id = %s",
+                (role_id, parent_role_id),
+                fetch_one=True
+            )
+            if cycle:
+                raise ValueError(f"Role {parent_role_id} inherits from role {role_id}; cannot make it the parent")
+        
+        rows_affected = await self.db.execute_update(SET_ROLE_PARENT_QUERY, (parent_role_id, role_id))
+        
+        # Inheritance changes can affect any user, so drop every cached decision
+        if rows_affected and self.cache is not None:
+            await call_cache(self.cache, self.cache.clear)
+        
+        logger.info(f"Role {role_id} parent set to {parent_role_id}")
+        return rows_affected > 0
+    
+    async def _log_access_attempt(self, user_id: int, item_id: int, action: str, granted: bool):
+        """Log an access attempt for audit purposes"""
+        if self.audit_writer is not None:
+            await self._submit_audit_rows([(user_id, item_id, action, granted, None, None)])
+            return
+        
+        try:
+            await self.db.execute_update(LOG_ACCESS_QUERY, (user_id, item_id, action, granted, None, None))
+        except Exception as e:
+            logger.error(f"Failed to log access attempt: {e}")
+    
+    async def _log_access_attempts(self, attempts: List[Tuple[int, int, str, bool]]):
+        """Log a batch of access attempts with a single insert"""
+        if not attempts:
+            return
+        
+        if self.audit_writer is not None:
+            await self._submit_audit_rows([attempt + (None, None) for attempt in attempts])
+            return
+        
+        columns = tuple(list(column) for column in zip(*attempts))
+        try:
+            logged = await self.db.execute_update(LOG_ACCESS_BATCH_QUERY, columns)
+        except Exception as e:
+            logger.error(f"Failed to log {len(attempts)} access attempts: {e}")
+            return
+        
+        if logged < len(attempts):
+            logger.warning(f"Skipped {len(attempts) - logged} access attempts for unknown users or items")
+    
+    async def _submit_audit_rows(self, rows: List[Tuple]):
+        """Queue audit rows without waiting; rows that find the queue full go through the overflow policy in a thread"""
+        refused = [row for row in rows if not self.audit_writer.offer(row)]
+        if refused:
+            await asyncio.to_thread(self.audit_writer.submit_many, refused)
@@ -0,0 +1,459 @@
+"""
+Audit Writer
+Buffers access_logs rows in memory and writes them from a background thread
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+
+from src.database.connection import DatabaseConnection
+
+
+logger = logging.getLogger(__name__)
+
+AuditRow = Tuple[int, int, str, bool, Optional[str], Optional[str]]
+_AUDIT_ROW_FIELDS = 6
+
+OVERFLOW_POLICIES = ('block', 'drop', 'spill')
+
+# Errors caused by the row itself; retrying the same row can never succeed
+_DATA_ERRORS = (psycopg2.IntegrityError, psycopg2.DataError)
+
+# Queued by stop() to wake the worker without waiting for flush_interval
+_WAKE = object()
+
+INSERT_QUERY = """
+INSERT INTO access_logs (user_id, item_id, action, granted, ip_address, user_agent)
+VALUES %s
+"""
+
+
+class AuditWriter:
+    """
+    Non-blocking writer for the access_logs audit table
+    
+    Request threads enqueue rows into a bounded queue. A worker thread drains
+    it and writes multi-row inserts whenever ``batch_size`` rows are waiting
+    or ``flush_interval`` seconds have passed since the first queued row.
+    
+    When the queue is full the overflow policy decides what happens:
+    ``block`` waits up to ``block_timeout`` seconds for space (then drops),
+    ``drop`` discards the row and counts it, and ``spill`` appends it to an
+    NDJSON file that is replayed once the queue is idle.
+    
+    Rows the database refuses (an unknown user or item, a value out of
+    range) are never retried; with a spill file they are kept in
+    ``<spill_path>.rejected``.
+    """
+    
+    def __init__(
+        self,
+        db: DatabaseConnection,
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        overflow_policy: str = 'block',
+        block_timeout: float = 5.0,
+        spill_path: Optional[str] = None
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown audit overflow policy: {overflow_policy}")
+        if overflow_policy == 'spill' and not spill_path:
+            raise ValueError("spill_path is required for the spill overflow policy")
+        
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.spill_path = spill_path
+        self.max_queue_size = max_queue_size
+        self._queue: "queue.Queue[AuditRow]" = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._spill_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._pending = 0
+        self._idle = threading.Condition(self._stats_lock)
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+    
+    def start(self):
+        """Start the background flush thread"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name='rbac-audit-writer', daemon=True)
+        self._worker.start()
+        logger.info(
+            f"Audit writer started (batch_size={self.batch_size}, "
+            f"flush_interval={self.flush_interval}s, policy={self.overflow_policy})"
+        )
+    
+    def stop(self, timeout: float = 10.0):
+        """
+        Flush everything still queued and stop the worker thread
+        
+        Args:
+            timeout: Maximum seconds to wait for the final flush
+        """
+        if self._worker is None:
+            return
+        
+        self._stop.set()
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass  # the worker is busy draining and will see the stop flag
+        self._worker.join(timeout)
+        if self._worker.is_alive():
+            logger.error(f"Audit writer did not finish flushing within {timeout}s; "
+                         f"{self._queue.qsize()} rows left in queue")
+        self._worker = None
+    
+    def submit(
+        self,
+        user_id: int,
+        item_id: int,
+        action: str,
+        granted: bool,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> bool:
+        """
+        Queue one access attempt
+        
+        Args:
+            user_id: User ID
+            item_id: Item ID
+            action: Action attempted
+            granted: Whether access was granted
+            ip_address: Client IP address (optional)
+            user_agent: Client user agent (optional)
+            
+        Returns:
+            True if the row was queued or spilled, False if it was dropped
+        """
+        return self._enqueue((user_id, item_id, action, granted, ip_address, user_agent))
+    
+    def submit_many(self, rows: List[AuditRow]) -> int:
+        """
+        Queue several access attempts
+        
+        Args:
+            rows: List of (user_id, item_id, action, granted, ip_address, user_agent) tuples
+            
+        Returns:
+            Number of rows queued or spilled
+        """
+        return sum(1 for row in rows if self._enqueue(tuple(row)))
+    
+    def offer(self, row: AuditRow) -> bool:
+        """
+        Queue an access attempt only if there is room right away
+        
+        Never waits, so coroutines can call it on the event loop and hand
+        the rows it refuses to submit_many in a worker thread.
+        
+        Args:
+            row: (user_id, item_id, action, granted, ip_address, user_agent) tuple
+            
+        Returns:
+            True if the row was queued, False if the queue is full
+        """
+        with self._stats_lock:
+            self._pending += 1
+        
+        try:
+            self._queue.put_nowait(tuple(row))
+        except queue.Full:
+            self._settle(1)
+            return False
+        
+        with self._stats_lock:
+            self.enqueued += 1
+        return True
+    
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Wait until every row queued so far has been written
+        
+        Args:
+            timeout: Maximum seconds to wait
+            
+        Returns:
+            True if the queue drained in time
+        """
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._pending > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+    
+    def stats(self) -> Dict:
+        """
+        Get writer metrics
+        
+        Returns:
+            Dictionary with queue depth, row counters and flush latency
+        """
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_size': self.max_queue_size,
+                'overflow_policy': self.overflow_policy,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'spilled': self.spilled,
+                'failed': self.failed,
+                'flushes': self.flushes,
+                'last_flush_seconds': self.last_flush_seconds,
+                'max_flush_seconds': self.max_flush_seconds,
+                'avg_flush_seconds': self.total_flush_seconds / self.flushes if self.flushes else 0.0
+            }
+    
+    def _enqueue(self, row: AuditRow) -> bool:
+        """Put a row on the queue, applying the overflow policy when full"""
+        with self._stats_lock:
+            self._pending += 1
+        
+        try:
+            if self.overflow_policy == 'block':
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            self._settle(1)
+            
+            if self.overflow_policy == 'spill':
+                return self._spill([row])
+            
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        
+        with self._stats_lock:
+            self.enqueued += 1
+        return True
+    
+    def _run(self):
+        """Worker loop: collect batches and write them"""
+        while True:
+            try:
+                if self._stop.is_set():
+                    first = self._queue.get_nowait()
+                else:
+                    first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._stop.is_set():
+                    break
+                self._replay_spill()
+                continue
+            
+            if first is _WAKE:
+                continue
+            
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            
+            while len(batch) < self.batch_size:
+                remaining = 0 if self._stop.is_set() else deadline - time.monotonic()
+                try:
+                    row = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if row is not _WAKE:
+                    batch.append(row)
+            
+            self._write(batch)
+            self._settle(len(batch))
+        
+        self._replay_spill()
+    
+    def _write(self, batch: List[AuditRow]) -> bool:
+        """
+        Write a batch with one multi-row insert
+        
+        A batch the database refuses for its data is written again row by
+        row, so one bad row does not hold back the others.
+        
+        Returns:
+            False if rows were spilled (or counted as failed) to retry later
+        """
+        started = time.perf_counter()
+        try:
+            self.db.execute_values(INSERT_QUERY, batch, sticky=False)
+            written, complete = len(batch), True
+        except _DATA_ERRORS as e:
+            logger.warning(f"Audit batch of {len(batch)} rows refused ({e}); writing it row by row")
+            written, complete = self._write_rows(batch)
+        except Exception as e:
+            self._defer(batch, e)
+            return False
+        
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.written += written
+            self.flushes += 1
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            self.total_flush_seconds += elapsed
+        return complete
+    
+    def _write_rows(self, rows: List[AuditRow]) -> Tuple[int, bool]:
+        """
+        Write rows one insert at a time, rejecting those the database refuses
+        
+        Returns:
+            Tuple of (rows written, whether every row was written or rejected)
+        """
+        written = 0
+        for index, row in enumerate(rows):
+            try:
+                self.db.execute_values(INSERT_QUERY, [row], sticky=False)
+            except _DATA_ERRORS as e:
+                logger.error(f"Rejected audit row {row}: {e}")
+                self._reject([json.dumps(row) + '\n'])
+                continue
+            except Exception as e:
+                self._defer(rows[index:], e)
+                return written, False
+            written += 1
+        return written, True
+    
+    def _defer(self, rows: List[AuditRow], error: Exception):
+        """Spill rows that failed to write, or count them as failed without a spill file"""
+        logger.error(f"Failed to write {len(rows)} audit rows: {error}")
+        if self.spill_path:
+            self._spill(rows)
+        else:
+            with self._stats_lock:
+                self.failed += len(rows)
+    
+    def _reject(self, lines: List[str]):
+        """Count lines that can never be written as failed, keeping them in the rejected file"""
+        with self._stats_lock:
+            self.failed += len(lines)
+        
+        if not self.spill_path:
+            return
+        
+        try:
+            with self._spill_lock:
+                with open(f"{self.spill_path}.rejected", 'a') as rejected_file:
+                    rejected_file.writelines(lines)
+        except OSError as e:
+            logger.error(f"Failed to keep {len(lines)} rejected audit rows in {self.spill_path}.rejected: {e}")
+    
+    def _spill(self, rows: List[AuditRow]) -> bool:
+        """Append rows to the spill file"""
+        try:
+            with self._spill_lock:
+                directory = os.path.dirname(self.spill_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.spill_path, 'a') as spill_file:
+                    for row in rows:
+                        spill_file.write(json.dumps(row) + '\n')
+        except OSError as e:
+            logger.error(f"Failed to spill {len(rows)} audit rows to {self.spill_path}: {e}")
+            with self._stats_lock:
+                self.dropped += len(rows)
+            return False
+        
+        with self._stats_lock:
+            self.spilled += len(rows)
+        return True
+    
+    def _replay_spill(self):
+        """
+        Write back rows spilled to disk while the queue was full
+        
+        Never raises, so a bad spill file cannot stop the worker: lines that
+        are not audit rows are appended to ``<spill_path>.rejected``, and a
+        file that cannot be read or replayed is renamed to ``*.bad`` and
+        left for an operator.
+        """
+        if not self.spill_path:
+            return
+        
+        # Workers may share the spill file, so each claims it under its own name
+        replay_path = f"{self.spill_path}.{os.getpid()}.replay"
+        try:
+            with self._spill_lock:
+                if not os.path.exists(replay_path):
+                    try:
+                        os.replace(self.spill_path, replay_path)
+                    except FileNotFoundError:
+                        return
+            
+            self._replay_file(replay_path)
+        except Exception as e:
+            logger.error(f"Failed to replay spilled audit rows from {replay_path}: {e}")
+            self._set_aside(replay_path)
+    
+    def _replay_file(self, replay_path: str):
+        """Write the rows of a claimed spill file, then remove it"""
+        rows = []
+        rejected = []
+        with open(replay_path) as spill_file:
+            for line in spill_file:
+                if not line.strip():
+                    continue
+                try:
+                    row = tuple(json.loads(line))
+                except (ValueError, TypeError):
+                    row = None
+                if row is not None and len(row) == _AUDIT_ROW_FIELDS:
+                    rows.append(row)
+                else:
+                    rejected.append(line if line.endswith('\n') else line + '\n')
+        
+        if rejected:
+            self._reject(rejected)
+            logger.error(f"Skipped {len(rejected)} malformed spilled audit rows; kept in {self.spill_path}.rejected")
+        
+        for start in range(0, len(rows), self.batch_size):
+            if not self._write(rows[start:start + self.batch_size]):
+                # The failed batch was spilled again; retry the rest later
+                self._spill(rows[start + self.batch_size:])
+                break
+        
+        os.remove(replay_path)
+        logger.info(f"Replayed {len(rows)} spilled audit rows")
+    
+    def _set_aside(self, replay_path: str):
+        """Rename an unreplayable spill file so the next replay starts fresh"""
+        bad_path = f"{replay_path}.{int(time.time())}.bad"
+        try:
+            os.replace(replay_path, bad_path)
+            logger.error(f"Moved unreplayable audit spill file to {bad_path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Failed to move {replay_path} aside: {e}")
+    
+    def _settle(self, count: int):
+        """Mark queued rows as handled and wake flush() waiters"""
+        with self._idle:
+            self._pending -= count
+            if self._pending <= 0:
+                self._idle.notify_all()
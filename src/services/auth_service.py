@@ -2,7 +2,10 @@
 Authentication Service
 Handles user authentication, JWT tokens, and session management
 """
+import hashlib
 import logging
+import secrets
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional, Dict
 
@@ -12,19 +15,92 @@ import bcrypt
 from src.config import Config
 from src.database.connection import DatabaseConnection
 from src.database.models import User
+from src.services.password_hasher import PasswordHasher, bcrypt_cost
+from src.services.token_verifier import TokenVerifier
 
 
 logger = logging.getLogger(__name__)
 
+USER_LOOKUP_QUERY = """
+SELECT * FROM users
+WHERE (username = %s OR email = %s)
+AND is_active = TRUE
+"""
+
+ISSUE_REFRESH_TOKEN_QUERY = """
+INSERT INTO refresh_tokens (user_id, token_hash, family_id, expires_at)
+VALUES (%s, %s, %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 day')
+"""
+
+# Consumes a live refresh token and returns its user and family
+USE_REFRESH_TOKEN_QUERY = """
+WITH used AS (
+    UPDATE refresh_tokens SET revoked_at = CURRENT_TIMESTAMP
+    WHERE token_hash = %s
+    AND revoked_at IS NULL
+    AND expires_at > CURRENT_TIMESTAMP
+    RETURNING user_id, family_id
+)
+SELECT u.id, u.username, u.email, u.is_active, used.family_id
+FROM used
+JOIN users u ON u.id = used.user_id
+"""
+
+# Also moves the user's authz_version, so their issued access tokens are refused
+REVOKE_REFRESH_FAMILY_QUERY = """
+WITH revoked AS (
+    UPDATE refresh_tokens SET revoked_at = CURRENT_TIMESTAMP
+    WHERE family_id = (SELECT family_id FROM refresh_tokens WHERE token_hash = %s)
+    AND revoked_at IS NULL
+    RETURNING user_id
+)
+UPDATE users SET authz_version = authz_version + 1
+WHERE id IN (SELECT user_id FROM revoked)
+RETURNING id
+"""
+
+CREATE_USER_QUERY = """
+INSERT INTO users (username, email, password_hash, first_name, last_name)
+VALUES (%s, %s, %s, %s, %s)
+RETURNING id
+"""
+
+# Version and role names are read in one statement so they always match
+# expires_at is session-local time (it is compared with NOW()), so it goes
+# through TIMESTAMPTZ before the epoch is taken
+ROLE_CLAIMS_QUERY = """
+SELECT u.authz_version,
+       COALESCE(ARRAY_AGG(DISTINCT r.name) FILTER (WHERE r.name IS NOT NULL), '{}') AS roles,
+       EXTRACT(EPOCH FROM MIN(ur.expires_at)::TIMESTAMPTZ)::BIGINT AS roles_exp
+FROM users u
+LEFT JOIN user_roles ur ON ur.user_id = u.id
+    AND (ur.expires_at IS NULL OR ur.expires_at > NOW())
+LEFT JOIN role_closure rc ON rc.descendant_id = ur.role_id
+LEFT JOIN roles r ON r.id = rc.ancestor_id
+WHERE u.id = %s
+GROUP BY u.authz_version
+"""
+
+REHASH_PASSWORD_QUERY = "UPDATE users SET password_hash = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s"
+
+UPDATE_LAST_LOGIN_QUERY = "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = %s"
+
 
 class AuthService:
     """
     Authentication service for user login and token management
     """
     
-    def __init__(self, db: DatabaseConnection):
+    def __init__(
+        self,
+        db: DatabaseConnection,
+        token_verifier: Optional[TokenVerifier] = None,
+        password_hasher: Optional[PasswordHasher] = None
+    ):
         self.db = db
         self.config = Config()
+        self.token_verifier = token_verifier
+        self.password_hasher = password_hasher
     
     def authenticate_user(self, username: str, password: str) -> Optional[Dict]:
         """
@@ -38,13 +114,9 @@ class AuthService:
             User data with JWT token if successful, None otherwise
         """
         # Fetch user from database
-        query = """
-        SELECT * FROM users
-        WHERE (username = %s OR email = %s)
-        AND is_active = TRUE
-        """
-        
-        user_data = self.db.execute_query(query, (username, username), fetch_one=True)
+        user_data = self.db.execute_query(
+            USER_LOOKUP_QUERY, (username, username), fetch_one=True, prepare='auth_user_lookup'
+        )
         
         if not user_data:
             logger.warning(f"Authentication failed: User {username} not found")
@@ -55,6 +127,10 @@ class AuthService:
             logger.warning(f"Authentication failed: Invalid password for user {username}")
             return None
         
+        # Upgrade hashes made at an old cost while the plain password is at hand
+        if self._needs_rehash(user_data['password_hash']):
+            self._rehash_password(user_data['id'], password)
+        
         # Update last login
         self._update_last_login(user_data['id'])
         
@@ -63,13 +139,99 @@ class AuthService:
         
         logger.info(f"User {username} authenticated successfully")
         
-        return {
+        result = {
             'user_id': user_data['id'],
             'username': user_data['username'],
             'email': user_data['email'],
             'token': token,
             'token_type': 'Bearer'
         }
+        
+        if self.config.REFRESH_TOKENS_ENABLED:
+            result['refresh_token'] = self.issue_refresh_token(user_data['id'])
+            result['expires_in'] = self.config.ACCESS_TOKEN_EXPIRATION_MINUTES * 60
+        
+        return result
+    
+    def issue_refresh_token(self, user_id: int, family_id: Optional[str] = None) -> str:
+        """
+        Create a refresh token for a user
+        
+        Args:
+            user_id: User ID
+            family_id: Family of the token being rotated (optional; new login if omitted)
+            
+        Returns:
+            Opaque refresh token string
+        """
+        refresh_token = secrets.token_urlsafe(32)
+        
+        self.db.execute_update(
+            ISSUE_REFRESH_TOKEN_QUERY,
+            (
+                user_id,
+                self._refresh_token_hash(refresh_token),
+                family_id or str(uuid.uuid4()),
+                self.config.REFRESH_TOKEN_EXPIRATION_DAYS
+            )
+        )
+        
+        return refresh_token
+    
+    def refresh_access_token(self, refresh_token: str) -> Optional[Dict]:
+        """
+        Exchange a refresh token for a new access token and refresh token
+        
+        The presented token is consumed by a single conditional UPDATE on its
+        unique digest, so concurrent requests cannot both use it. Presenting
+        a token that was already used revokes its whole family, since the
+        token has probably been stolen. No password hashing is involved.
+        
+        Args:
+            refresh_token: Refresh token string
+            
+        Returns:
+            Dictionary with the new access token and refresh token, or None
+        """
+        token_hash = self._refresh_token_hash(refresh_token)
+        user_data = self.db.execute_query(USE_REFRESH_TOKEN_QUERY, (token_hash,), fetch_one=True, commit=True)
+        
+        if not user_data:
+            # Unknown, expired or already used; the family is only still live
+            # if the token was replayed after rotation
+            if self.revoke_refresh_token(refresh_token):
+                logger.warning("Refresh token reused; revoked its token family")
+            return None
+        
+        if not user_data['is_active']:
+            logger.warning(f"Refresh rejected for inactive user {user_data['id']}")
+            return None
+        
+        return {
+            'user_id': user_data['id'],
+            'username': user_data['username'],
+            'email': user_data['email'],
+            'token': self._generate_token(user_data),
+            'token_type': 'Bearer',
+            'refresh_token': self.issue_refresh_token(user_data['id'], str(user_data['family_id'])),
+            'expires_in': self.config.ACCESS_TOKEN_EXPIRATION_MINUTES * 60
+        }
+    
+    def revoke_refresh_token(self, refresh_token: str) -> Optional[int]:
+        """
+        Revoke a refresh token and every token rotated from the same login,
+        along with the user's access tokens already issued
+        
+        Args:
+            refresh_token: Refresh token string
+            
+        Returns:
+            ID of the user whose tokens were revoked, or None if none were live
+        """
+        result = self.db.execute_query(
+            REVOKE_REFRESH_FAMILY_QUERY, (self._refresh_token_hash(refresh_token),), fetch_one=True, commit=True
+        )
+        return result['id'] if result else None
     
     def verify_token(self, token: str) -> Optional[Dict]:
         """
@@ -81,6 +243,9 @@ class AuthService:
         Returns:
             Decoded token payload if valid, None otherwise
         """
+        if self.token_verifier is not None:
+            return self.token_verifier.verify(token)
+        
         try:
             payload = jwt.decode(
                 token,
@@ -95,7 +260,7 @@ class AuthService:
                 return None
             
             return payload
-            
+        
         except jwt.InvalidTokenError as e:
             logger.warning(f"Invalid token: {e}")
             return None
@@ -124,46 +289,88 @@ class AuthService:
         # Hash password
         password_hash = self._hash_password(password)
         
-        query = """
-        INSERT INTO users (username, email, password_hash, first_name, last_name)
-        VALUES (%s, %s, %s, %s, %s)
-        RETURNING id
-        """
-        
         try:
             result = self.db.execute_query(
-                query,
+                CREATE_USER_QUERY,
                 (username, email, password_hash, first_name, last_name),
-                fetch_one=True
+                fetch_one=True,
+                commit=True
             )
             
             user_id = result['id'] if result else None
             logger.info(f"User {username} created successfully with ID {user_id}")
             return user_id
-            
+        
         except Exception as e:
             logger.error(f"Failed to create user {username}: {e}")
             return None
     
+    def _get_role_claims(self, user_id: int) -> Dict:
+        """
+        Load the role claims embedded in a user's token
+        
+        The version and role names are read in one statement so they always
+        match. roles_exp is when the first role assignment expires; past it
+        the claims are stale even if the version has not changed.
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Dictionary with authz_version, roles and roles_exp (Unix time or None)
+        """
+        # The claims live as long as the token, so they are read from the primary
+        result = self.db.execute_query(ROLE_CLAIMS_QUERY, (user_id,), fetch_one=True, primary=True)
+        return self._role_claims(result)
+    
+    @staticmethod
+    def _role_claims(row: Optional[Dict]) -> Dict:
+        """Token claims from a ROLE_CLAIMS_QUERY row"""
+        if not row:
+            return {}
+        
+        return {
+            'authz_version': row['authz_version'],
+            'roles': sorted(row['roles']),
+            'roles_exp': row['roles_exp']
+        }
+    
     def _generate_token(self, user_data: Dict) -> str:
         """
-        Generate JWT token for user
+        Generate JWT token for user, embedding their role claims
         
         Args:
             user_data: User data dictionary
             
+        Returns:
+            JWT token string
+        """
+        return self._encode_token(user_data, self._get_role_claims(user_data['id']))
+    
+    def _encode_token(self, user_data: Dict, role_claims: Dict) -> str:
+        """
+        Sign a JWT for a user with the given role claims
+        
+        Args:
+            user_data: User data dictionary
+            role_claims: Claims from _get_role_claims
+            
         Returns:
             JWT token string
         """
         now = datetime.utcnow()
-        exp = now + timedelta(hours=self.config.JWT_EXPIRATION_HOURS)
+        if self.config.REFRESH_TOKENS_ENABLED:
+            exp = now + timedelta(minutes=self.config.ACCESS_TOKEN_EXPIRATION_MINUTES)
+        else:
+            exp = now + timedelta(hours=self.config.JWT_EXPIRATION_HOURS)
         
         payload = {
             'user_id': user_data['id'],
             'username': user_data['username'],
             'email': user_data['email'],
             'iat': now,
-            'exp': exp
+            'exp': exp,
+            **role_claims
         }
         
         token = jwt.encode(
@@ -174,9 +381,14 @@ class AuthService:
         
         return token
     
+    @staticmethod
+    def _refresh_token_hash(refresh_token: str) -> str:
+        """Digest stored and looked up in place of the refresh token itself"""
+        return hashlib.sha256(refresh_token.encode('utf-8')).hexdigest()
+    
     def _hash_password(self, password: str) -> str:
         """
-        Hash password using bcrypt
+        Hash password using bcrypt, on the hasher pool when configured
         
         Args:
             password: Plain text password
@@ -184,7 +396,10 @@ class AuthService:
         Returns:
             Hashed password
         """
-        salt = bcrypt.gensalt()
+        if self.password_hasher is not None:
+            return self.password_hasher.hash(password)
+        
+        salt = bcrypt.gensalt(self.config.BCRYPT_ROUNDS)
         return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
     
     def _verify_password(self, password: str, password_hash: str) -> bool:
@@ -198,8 +413,45 @@ class AuthService:
         Returns:
             True if password matches, False otherwise
         """
+        if self.password_hasher is not None:
+            return self.password_hasher.verify(password, password_hash)
+        
         return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
     
+    def _needs_rehash(self, password_hash: str) -> bool:
+        """
+        Check whether a hash was made at a cost other than BCRYPT_ROUNDS
+        
+        Args:
+            password_hash: Hashed password
+            
+        Returns:
+            True if the hash should be upgraded
+        """
+        if self.password_hasher is not None:
+            return self.password_hasher.needs_rehash(password_hash)
+        
+        cost = bcrypt_cost(password_hash)
+        return cost is not None and cost != self.config.BCRYPT_ROUNDS
+    
+    def _rehash_password(self, user_id: int, password: str):
+        """
+        Replace a user's password hash with one at the current cost
+        
+        A failure only delays the upgrade to the next login, so it is logged
+        rather than failing the login.
+        
+        Args:
+            user_id: User ID
+            password: Plain text password that was just verified
+        """
+        try:
+            password_hash = self._hash_password(password)
+            self.db.execute_update(REHASH_PASSWORD_QUERY, (password_hash, user_id))
+            logger.info(f"Upgraded password hash for user {user_id} to cost {self.config.BCRYPT_ROUNDS}")
+        except Exception as e:
+            logger.warning(f"Failed to upgrade password hash for user {user_id}: {e}")
+    
     def _update_last_login(self, user_id: int):
         """
         Update user's last login timestamp
@@ -207,6 +459,5 @@ class AuthService:
         Args:
             user_id: User ID
         """
-        query = "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = %s"
-        self.db.execute_update(query, (user_id,))
+        self.db.execute_update(UPDATE_LAST_LOGIN_QUERY, (user_id,))
 
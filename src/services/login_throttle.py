@@ -0,0 +1,285 @@
+"""
+Login Throttle
+Sliding-window limits on failed logins per username and per client IP
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+import redis
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'rbac:login'
+
+# Prune, count and add in one step, so concurrent attempts cannot all see
+# the same count; returns the oldest score when the key is at its limit
+RESERVE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, ARGV[1] - ARGV[2])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return oldest[2] or ARGV[1]
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return false
+"""
+
+
+class MemoryThrottleBackend:
+    """
+    In-process sliding-window counters
+    
+    Each key keeps the timestamps of its attempts inside the window. At most
+    ``max_keys`` keys are tracked; the least recently touched is dropped
+    first, so random usernames cannot grow memory without bound.
+    """
+    
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def reserve(self, key: str, window: float, limit: int) -> Optional[float]:
+        """
+        Count one attempt for a key unless it already has limit attempts in the window
+        
+        Args:
+            key: Throttle key
+            window: Window length in seconds
+            limit: Attempts allowed inside the window
+            
+        Returns:
+            None if the attempt was counted, otherwise seconds until the
+            oldest attempt leaves the window
+        """
+        now = time.monotonic()
+        with self._lock:
+            attempts = self._prune(key, now - window)
+            if attempts is not None and len(attempts) >= limit:
+                return attempts[0] + window - now
+            
+            if attempts is None:
+                attempts = self._windows[key] = deque()
+            attempts.append(now)
+            self._windows.move_to_end(key)
+            
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+        return None
+    
+    def release(self, key: str):
+        """Forget the most recent attempt of a key"""
+        with self._lock:
+            attempts = self._windows.get(key)
+            if attempts:
+                attempts.pop()
+                if not attempts:
+                    del self._windows[key]
+    
+    def reset(self, key: str):
+        """Forget every attempt of a key"""
+        with self._lock:
+            self._windows.pop(key, None)
+    
+    def _prune(self, key: str, cutoff: float) -> Optional[Deque[float]]:
+        """Drop attempts older than cutoff; caller must hold the lock"""
+        attempts = self._windows.get(key)
+        if attempts is None:
+            return None
+        
+        while attempts and attempts[0] <= cutoff:
+            attempts.popleft()
+        
+        if not attempts:
+            del self._windows[key]
+            return None
+        
+        return attempts
+
+
+class RedisThrottleBackend:
+    """
+    Sliding-window counters shared by every worker, one sorted set per key
+    
+    Redis errors fail open: the attempt is allowed and the error logged, so
+    an outage degrades to no throttling rather than to no logins.
+    """
+    
+    def __init__(self, redis_url: str, client: Optional[redis.Redis] = None, socket_timeout: float = 0.25):
+        self._client = client or redis.Redis.from_url(
+            redis_url,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout
+        )
+        self._reserve = self._client.register_script(RESERVE_SCRIPT)
+    
+    def reserve(self, key: str, window: float, limit: int) -> Optional[float]:
+        """
+        Count one attempt for a key unless it already has limit attempts in the window
+        
+        Args:
+            key: Throttle key
+            window: Window length in seconds
+            limit: Attempts allowed inside the window
+            
+        Returns:
+            None if the attempt was counted (or Redis is unavailable),
+            otherwise seconds until the oldest attempt leaves the window
+        """
+        now = time.time()
+        try:
+            oldest = self._reserve(
+                keys=[self._key(key)],
+                args=[now, window, limit, f"{now}:{uuid.uuid4().hex[:8]}", int(window) + 1]
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Login throttle unavailable, allowing attempt: {e}")
+            return None
+        
+        if oldest is None:
+            return None
+        return float(oldest) + window - now
+    
+    def release(self, key: str):
+        """Forget the most recent attempt of a key"""
+        try:
+            self._client.zpopmax(self._key(key))
+        except redis.RedisError as e:
+            logger.warning(f"Login throttle unavailable, release skipped: {e}")
+    
+    def reset(self, key: str):
+        """Forget every attempt of a key"""
+        try:
+            self._client.delete(self._key(key))
+        except redis.RedisError as e:
+            logger.warning(f"Login throttle unavailable, reset skipped: {e}")
+    
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"{KEY_PREFIX}:{key}"
+
+
+class LoginThrottle:
+    """
+    Rejects logins from usernames or IPs with too many recent failures
+    
+    check() runs before the user lookup and the bcrypt verify, so blocked
+    attempts cost no database or hashing work. It counts the attempt up
+    front, atomically per key, so a burst of concurrent logins cannot all
+    pass before any of them fails. Attempts are counted per username
+    (max_attempts) and per client IP (max_attempts_per_ip) over a sliding
+    window. A successful login clears the username's count and gives back
+    its IP attempt; an attempt that never reached bcrypt is released.
+    """
+    
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        max_attempts_per_ip: int = 50,
+        window: float = 300,
+        backend=None
+    ):
+        self.max_attempts = max_attempts
+        self.max_attempts_per_ip = max_attempts_per_ip
+        self.window = window
+        self.backend = backend or MemoryThrottleBackend()
+        self._stats_lock = threading.Lock()
+        self.rejected_username = 0
+        self.rejected_ip = 0
+        self.failures = 0
+    
+    def check(self, username: str, ip_address: Optional[str]) -> Optional[float]:
+        """
+        Decide whether a login attempt may proceed, counting it if so
+        
+        Every allowed attempt must end in record_failure(), reset() or
+        release().
+        
+        Args:
+            username: Username or email as submitted
+            ip_address: Client IP address (optional)
+            
+        Returns:
+            None if allowed, otherwise seconds until the client may retry
+        """
+        retry_after = self.backend.reserve(self._user_key(username), self.window, self.max_attempts)
+        if retry_after is not None:
+            with self._stats_lock:
+                self.rejected_username += 1
+            return max(retry_after, 1.0)
+        
+        if ip_address:
+            retry_after = self.backend.reserve(self._ip_key(ip_address), self.window, self.max_attempts_per_ip)
+            if retry_after is not None:
+                self.backend.release(self._user_key(username))
+                with self._stats_lock:
+                    self.rejected_ip += 1
+                return max(retry_after, 1.0)
+        
+        return None
+    
+    def record_failure(self, username: str, ip_address: Optional[str]):
+        """
+        Keep a failed login counted against the username and the IP
+        
+        The attempt was already counted by check(); this only updates the
+        failure counter.
+        
+        Args:
+            username: Username or email as submitted
+            ip_address: Client IP address (optional)
+        """
+        with self._stats_lock:
+            self.failures += 1
+    
+    def reset(self, username: str, ip_address: Optional[str] = None):
+        """
+        Clear the count of a username after a successful login
+        
+        Args:
+            username: Username or email as submitted
+            ip_address: Client IP address whose attempt is given back (optional)
+        """
+        self.backend.reset(self._user_key(username))
+        if ip_address:
+            self.backend.release(self._ip_key(ip_address))
+    
+    def release(self, username: str, ip_address: Optional[str]):
+        """
+        Give back an attempt that ended before the password was checked
+        
+        Args:
+            username: Username or email as submitted
+            ip_address: Client IP address (optional)
+        """
+        self.backend.release(self._user_key(username))
+        if ip_address:
+            self.backend.release(self._ip_key(ip_address))
+    
+    def stats(self) -> Dict:
+        """
+        Get throttle counters
+        
+        Returns:
+            Dictionary with recorded failures and rejections by key type
+        """
+        with self._stats_lock:
+            return {
+                'backend': 'redis' if isinstance(self.backend, RedisThrottleBackend) else 'memory',
+                'failures': self.failures,
+                'rejected_username': self.rejected_username,
+                'rejected_ip': self.rejected_ip
+            }
+    
+    @staticmethod
+    def _user_key(username: str) -> str:
+        return f"user:{username.strip().lower()}"
+    
+    @staticmethod
+    def _ip_key(ip_address: str) -> str:
+        return f"ip:{ip_address}"
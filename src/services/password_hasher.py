@@ -0,0 +1,189 @@
+"""
+Password Hasher
+Runs bcrypt on a small dedicated worker pool with a bounded backlog
+"""
+import logging
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+import bcrypt
+
+
+logger = logging.getLogger(__name__)
+
+_COST_PATTERN = re.compile(r'^\$2[abxy]\$(\d{2})\$')
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when every hashing backlog slot is taken"""
+
+
+def bcrypt_cost(password_hash: str) -> Optional[int]:
+    """
+    Read the work factor from a bcrypt hash
+    
+    Args:
+        password_hash: Hash such as $2b$12$...
+        
+    Returns:
+        Cost (log2 rounds), or None if the hash is not bcrypt
+    """
+    match = _COST_PATTERN.match(password_hash or '')
+    return int(match.group(1)) if match else None
+
+
+class PasswordHasher:
+    """
+    bcrypt hashing and verification off the request threads
+    
+    Work runs on ``max_workers`` threads (bcrypt releases the GIL, so they
+    hash in parallel without slowing other Python code), which caps the CPU
+    a login burst can take. At most ``max_pending`` calls may be queued or
+    running; further callers get PasswordHasherBusy at once, without waiting
+    for a slot, so a flood of logins fails fast instead of piling up request
+    threads behind it.
+    """
+    
+    def __init__(
+        self,
+        rounds: int = 12,
+        max_workers: int = 2,
+        max_pending: int = 32
+    ):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rbac-bcrypt')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._stats_lock = threading.Lock()
+        self.hashed = 0
+        self.verified = 0
+        self.rejected = 0
+    
+    def hash(self, password: str) -> str:
+        """
+        Hash a password at the configured cost
+        
+        Args:
+            password: Plain text password
+            
+        Returns:
+            bcrypt hash
+            
+        Raises:
+            PasswordHasherBusy: If the backlog is full
+        """
+        return self.submit_hash(password).result()
+    
+    def verify(self, password: str, password_hash: str) -> bool:
+        """
+        Check a password against a bcrypt hash
+        
+        Args:
+            password: Plain text password
+            password_hash: bcrypt hash
+            
+        Returns:
+            True if the password matches
+            
+        Raises:
+            PasswordHasherBusy: If the backlog is full
+        """
+        return self.submit_verify(password, password_hash).result()
+    
+    def submit_hash(self, password: str) -> Future:
+        """
+        Queue hashing without waiting for the result, e.g. for asyncio.wrap_future
+        
+        Args:
+            password: Plain text password
+            
+        Returns:
+            Future resolving to the bcrypt hash
+            
+        Raises:
+            PasswordHasherBusy: If the backlog is full
+        """
+        return self._submit(self._hash, password)
+    
+    def submit_verify(self, password: str, password_hash: str) -> Future:
+        """
+        Queue verification without waiting for the result
+        
+        Args:
+            password: Plain text password
+            password_hash: bcrypt hash
+            
+        Returns:
+            Future resolving to True if the password matches
+            
+        Raises:
+            PasswordHasherBusy: If the backlog is full
+        """
+        return self._submit(self._verify, password, password_hash)
+    
+    def needs_rehash(self, password_hash: str) -> bool:
+        """
+        Whether a hash was made at a different cost than the configured one
+        
+        Args:
+            password_hash: bcrypt hash
+            
+        Returns:
+            True if the hash should be replaced on the next successful login
+        """
+        cost = bcrypt_cost(password_hash)
+        return cost is not None and cost != self.rounds
+    
+    def shutdown(self):
+        """Stop the worker threads once queued work is done"""
+        self._executor.shutdown(wait=True)
+    
+    def stats(self) -> Dict:
+        """
+        Get hasher counters
+        
+        Returns:
+            Dictionary with pool size, cost and call counters
+        """
+        with self._stats_lock:
+            return {
+                'rounds': self.rounds,
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'hashed': self.hashed,
+                'verified': self.verified,
+                'rejected': self.rejected
+            }
+    
+    def _hash(self, password: str) -> str:
+        """Hash on a pool thread"""
+        result = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        with self._stats_lock:
+            self.hashed += 1
+        return result.decode('utf-8')
+    
+    def _verify(self, password: str, password_hash: str) -> bool:
+        """Verify on a pool thread"""
+        result = bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        with self._stats_lock:
+            self.verified += 1
+        return result
+    
+    def _submit(self, work, *args) -> Future:
+        """Queue work on the pool if a backlog slot is free, without waiting for one"""
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            raise PasswordHasherBusy("Password hashing backlog is full")
+        
+        try:
+            future = self._executor.submit(work, *args)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
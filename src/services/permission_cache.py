@@ -0,0 +1,423 @@
+"""
+Permission Decision Cache
+In-process TTL + LRU cache for RBAC permission decisions, role sets, item rows
+and authorization versions
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+DecisionKey = Tuple[int, int, str]
+
+
+class PermissionCache:
+    """
+    Bounded cache of (user_id, item_id, action) -> allowed decisions
+    
+    Entries expire after a TTL and the least recently used entry is evicted
+    once the cache is full. Secondary indexes by user and by item allow
+    write paths to invalidate exactly the decisions they affect. Effective
+    role rows and authorization versions per user, and item rows, are kept
+    alongside the decisions and are dropped by the same user and item
+    invalidations.
+    
+    The cache is local to the process, so with several workers a change made
+    on one worker only reaches the others once their entries expire, unless
+    it is wrapped by a SharedCache that relays invalidations.
+    
+    Every invalidation moves a generation counter. A caller that reads
+    ``generation()`` before loading a value from the database and passes it
+    to the setter has the value dropped if an invalidation ran in between,
+    so a load that raced a write cannot re-cache what the write replaced.
+    """
+    
+    def __init__(self, max_size: int = 10000, ttl: float = 30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[DecisionKey, Tuple[bool, float]]" = OrderedDict()
+        self._by_user: Dict[int, Set[DecisionKey]] = {}
+        self._by_item: Dict[int, Set[DecisionKey]] = {}
+        self._roles: "OrderedDict[int, Tuple[List[Dict], float]]" = OrderedDict()
+        self._items: "OrderedDict[int, Tuple[Dict, float]]" = OrderedDict()
+        self._versions: "OrderedDict[int, Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def generation(self) -> int:
+        """
+        Get the invalidation generation, to pass to a setter after a database read
+        
+        Returns:
+            Number of invalidations run so far
+        """
+        with self._lock:
+            return self._generation
+    
+    def get(self, user_id: int, item_id: int, action: str) -> Optional[bool]:
+        """
+        Look up a cached decision
+        
+        Args:
+            user_id: User ID
+            item_id: Item ID
+            action: Action name
+            
+        Returns:
+            Cached decision, or None on a miss or an expired entry
+        """
+        key = (user_id, item_id, action)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            allowed, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return allowed
+    
+    def set(
+        self,
+        user_id: int,
+        item_id: int,
+        action: str,
+        allowed: bool,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None
+    ):
+        """
+        Store a decision
+        
+        Args:
+            user_id: User ID
+            item_id: Item ID
+            action: Action name
+            allowed: Decision to cache
+            ttl: Lifetime in seconds, capped at the cache TTL (optional).
+                 Used to keep an "allow" from outliving the grant behind it.
+            generation: generation() read before the decision was loaded;
+                        nothing is stored if an invalidation ran since (optional)
+        """
+        ttl = self._effective_ttl(ttl)
+        if ttl <= 0:
+            return
+        
+        key = (user_id, item_id, action)
+        
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            
+            self._entries[key] = (allowed, time.monotonic() + ttl)
+            self._by_user.setdefault(user_id, set()).add(key)
+            self._by_item.setdefault(item_id, set()).add(key)
+            
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+    
+    def get_user_roles(self, user_id: int) -> Optional[List[Dict]]:
+        """
+        Look up the cached effective role rows of a user
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            List of role row dictionaries, or None on a miss
+        """
+        with self._lock:
+            return self._lookup(self._roles, user_id)
+    
+    def set_user_roles(
+        self,
+        user_id: int,
+        roles: List[Dict],
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None
+    ):
+        """
+        Store the effective role rows of a user
+        
+        Args:
+            user_id: User ID
+            roles: List of role row dictionaries
+            ttl: Lifetime in seconds, capped at the cache TTL (optional)
+            generation: generation() read before the rows were loaded (optional)
+        """
+        with self._lock:
+            self._store(self._roles, user_id, roles, ttl, generation)
+    
+    def get_item(self, item_id: int) -> Optional[Dict]:
+        """
+        Look up a cached item row
+        
+        Args:
+            item_id: Item ID
+            
+        Returns:
+            Item row dictionary, or None on a miss
+        """
+        with self._lock:
+            return self._lookup(self._items, item_id)
+    
+    def set_item(self, item_id: int, item: Dict, ttl: Optional[float] = None, generation: Optional[int] = None):
+        """
+        Store an item row
+        
+        Args:
+            item_id: Item ID
+            item: Item row dictionary
+            ttl: Lifetime in seconds, capped at the cache TTL (optional)
+            generation: generation() read before the row was loaded (optional)
+        """
+        with self._lock:
+            self._store(self._items, item_id, item, ttl, generation)
+    
+    def get_authz_version(self, user_id: int) -> Optional[int]:
+        """
+        Look up the cached authorization version of a user
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            users.authz_version, or None on a miss
+        """
+        with self._lock:
+            return self._lookup(self._versions, user_id)
+    
+    def set_authz_version(
+        self,
+        user_id: int,
+        version: int,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None
+    ):
+        """
+        Store the authorization version of a user
+        
+        Args:
+            user_id: User ID
+            version: users.authz_version
+            ttl: Lifetime in seconds, capped at the cache TTL (optional)
+            generation: generation() read before the version was loaded (optional)
+        """
+        with self._lock:
+            self._store(self._versions, user_id, version, ttl, generation)
+    
+    def invalidate_user(self, user_id: int) -> int:
+        """
+        Drop every decision, the role set and the version cached for a user
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Number of entries removed
+        """
+        return self.invalidate_users((user_id,))
+    
+    def invalidate_users(self, user_ids: Iterable[int]) -> int:
+        """
+        Drop every decision, the role set and the version cached for several users
+        
+        Args:
+            user_ids: User IDs
+            
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            self._generation += 1
+            removed = 0
+            for user_id in set(user_ids):
+                removed += self._remove_keys(self._by_user.get(user_id, ()))
+                for store in (self._roles, self._versions):
+                    if store.pop(user_id, None) is not None:
+                        removed += 1
+                        self.invalidations += 1
+            return removed
+    
+    def invalidate_item(self, item_id: int) -> int:
+        """
+        Drop every decision and the row cached for an item
+        
+        Args:
+            item_id: Item ID
+            
+        Returns:
+            Number of entries removed
+        """
+        return self.invalidate_items((item_id,))
+    
+    def invalidate_items(self, item_ids: Iterable[int]) -> int:
+        """
+        Drop every decision and the row cached for each of several items
+        
+        Args:
+            item_ids: Item IDs
+            
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            self._generation += 1
+            removed = 0
+            for item_id in set(item_ids):
+                removed += self._remove_keys(self._by_item.get(item_id, ()))
+                if self._items.pop(item_id, None) is not None:
+                    removed += 1
+                    self.invalidations += 1
+            return removed
+    
+    def invalidate_user_item(self, user_id: int, item_id: int) -> int:
+        """
+        Drop the decisions cached for one user on one item
+        
+        Args:
+            user_id: User ID
+            item_id: Item ID
+            
+        Returns:
+            Number of entries removed
+        """
+        return self.invalidate_user_items(((user_id, item_id),))
+    
+    def invalidate_user_items(self, pairs: Iterable[Tuple[int, int]]) -> int:
+        """
+        Drop the decisions cached for several (user_id, item_id) pairs
+        
+        Args:
+            pairs: (user_id, item_id) tuples
+            
+        Returns:
+            Number of entries removed
+        """
+        pairs = set(pairs)
+        with self._lock:
+            self._generation += 1
+            users = {user_id for user_id, _ in pairs}
+            keys = [
+                key
+                for user_id in users
+                for key in self._by_user.get(user_id, ())
+                if (user_id, key[1]) in pairs
+            ]
+            return self._remove_keys(keys)
+    
+    def clear(self):
+        """Drop everything in the cache"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += (
+                len(self._entries) + len(self._roles) + len(self._items) + len(self._versions)
+            )
+            self._entries.clear()
+            self._by_user.clear()
+            self._by_item.clear()
+            self._roles.clear()
+            self._items.clear()
+            self._versions.clear()
+    
+    def stats(self) -> Dict:
+        """
+        Get cache counters
+        
+        Returns:
+            Dictionary with size, hits, misses, hit ratio, evictions and invalidations
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'roles_size': len(self._roles),
+                'items_size': len(self._items),
+                'versions_size': len(self._versions),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+    
+    def _effective_ttl(self, ttl: Optional[float]) -> float:
+        """Cap a requested TTL at the cache TTL; non-positive means do not cache"""
+        if self.max_size <= 0:
+            return 0
+        return self.ttl if ttl is None else min(ttl, self.ttl)
+    
+    def _lookup(self, store: OrderedDict, key):
+        """Read a live entry from a keyed store; caller must hold the lock"""
+        entry = store.get(key)
+        
+        if entry is None or entry[1] <= time.monotonic():
+            store.pop(key, None)
+            self.misses += 1
+            return None
+        
+        store.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+    
+    def _store(self, store: OrderedDict, key, value, ttl: Optional[float], generation: Optional[int] = None):
+        """Write an entry to a keyed store unless invalidated since ``generation``; caller must hold the lock"""
+        ttl = self._effective_ttl(ttl)
+        if ttl <= 0 or (generation is not None and generation != self._generation):
+            return
+        
+        store[key] = (value, time.monotonic() + ttl)
+        store.move_to_end(key)
+        
+        while len(store) > self.max_size:
+            store.popitem(last=False)
+            self.evictions += 1
+    
+    def _remove_keys(self, keys) -> int:
+        """Remove a collection of decision keys; caller must hold the lock"""
+        keys = list(keys)
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+        return len(keys)
+    
+    def _remove(self, key: DecisionKey):
+        """Remove a single decision key and its index entries; caller must hold the lock"""
+        if self._entries.pop(key, None) is None:
+            return
+        
+        user_id, item_id, _ = key
+        
+        user_keys = self._by_user.get(user_id)
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._by_user[user_id]
+        
+        item_keys = self._by_item.get(item_id)
+        if item_keys is not None:
+            item_keys.discard(key)
+            if not item_keys:
+                del self._by_item[item_id]
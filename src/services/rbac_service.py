@@ -2,15 +2,214 @@
 RBAC Service - Core business logic for access control
 """
 import logging
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict, Sequence, Tuple
 from datetime import datetime
 
+from psycopg2 import errors
+
 from src.database.connection import DatabaseConnection
 from src.database.models import User, Role, Permission, Item, ItemAccess
+from src.services.audit_writer import AuditWriter
+from src.services.permission_cache import PermissionCache
+from src.utils import keyset_paginate
 
 
 logger = logging.getLogger(__name__)
 
+# Item columns a bulk grant or revoke may select on, with their types
+ITEM_SELECTOR_FIELDS = {'item_type': str, 'owner_id': int}
+
+# A grant counts as existing while an unexpired row for the same item,
+# grantee and permission is present
+BULK_GRANT_QUERY = """
+INSERT INTO item_access (item_id, user_id, role_id, permission_id, granted_by, expires_at)
+SELECT v.item_id, v.user_id, v.role_id, v.permission_id, v.granted_by, v.expires_at
+FROM (VALUES %s) AS v (item_id, user_id, role_id, permission_id, granted_by, expires_at)
+WHERE NOT EXISTS (
+    SELECT 1 FROM item_access ia
+    WHERE ia.item_id = v.item_id
+    AND ia.permission_id = v.permission_id
+    AND ia.user_id IS NOT DISTINCT FROM v.user_id
+    AND ia.role_id IS NOT DISTINCT FROM v.role_id
+    AND (ia.expires_at IS NULL OR ia.expires_at > NOW())
+)
+RETURNING item_id, user_id, role_id
+"""
+
+BULK_GRANT_TEMPLATE = "(%s::integer, %s::integer, %s::integer, %s::integer, %s::integer, %s::timestamp)"
+
+# Desired (user_id, role_id) pairs arrive as two parallel arrays; users listed
+# with no pairs lose every role
+SYNC_USER_ROLES_QUERY = """
+WITH desired AS (
+    SELECT DISTINCT d.user_id, d.role_id
+    FROM unnest(%s::integer[], %s::integer[]) AS d (user_id, role_id)
+),
+scope AS (
+    SELECT DISTINCT unnest(%s::integer[]) AS user_id
+),
+removed AS (
+    DELETE FROM user_roles ur
+    USING scope s
+    WHERE ur.user_id = s.user_id
+    AND NOT EXISTS (
+        SELECT 1 FROM desired d WHERE d.user_id = ur.user_id AND d.role_id = ur.role_id
+    )
+    RETURNING ur.user_id
+),
+renewed AS (
+    UPDATE user_roles ur
+    SET expires_at = NULL, granted_by = %s, granted_at = CURRENT_TIMESTAMP
+    FROM desired d
+    WHERE ur.user_id = d.user_id AND ur.role_id = d.role_id
+    AND ur.expires_at IS NOT NULL AND ur.expires_at <= NOW()
+    RETURNING ur.user_id
+),
+added AS (
+    INSERT INTO user_roles (user_id, role_id, granted_by)
+    SELECT d.user_id, d.role_id, %s
+    FROM desired d
+    WHERE NOT EXISTS (
+        SELECT 1 FROM user_roles ur WHERE ur.user_id = d.user_id AND ur.role_id = d.role_id
+    )
+    ON CONFLICT (user_id, role_id) DO NOTHING
+    RETURNING user_id
+)
+SELECT
+    (SELECT COUNT(*) FROM added) AS added,
+    (SELECT COUNT(*) FROM removed) AS removed,
+    (SELECT COUNT(*) FROM renewed) AS renewed,
+    ARRAY(
+        SELECT user_id FROM added
+        UNION SELECT user_id FROM removed
+        UNION SELECT user_id FROM renewed
+    ) AS changed_user_ids
+"""
+
+SELECTOR_GRANT_QUERY = """
+WITH selected AS (
+    SELECT i.id FROM items i WHERE {conditions}
+),
+grant_values AS (
+    SELECT %s::integer AS user_id, %s::integer AS role_id, %s::integer AS permission_id,
+           %s::integer AS granted_by, %s::timestamp AS expires_at
+),
+inserted AS (
+    INSERT INTO item_access (item_id, user_id, role_id, permission_id, granted_by, expires_at)
+    SELECT s.id, g.user_id, g.role_id, g.permission_id, g.granted_by, g.expires_at
+    FROM selected s CROSS JOIN grant_values g
+    WHERE NOT EXISTS (
+        SELECT 1 FROM item_access ia
+        WHERE ia.item_id = s.id
+        AND ia.permission_id = g.permission_id
+        AND ia.user_id IS NOT DISTINCT FROM g.user_id
+        AND ia.role_id IS NOT DISTINCT FROM g.role_id
+        AND (ia.expires_at IS NULL OR ia.expires_at > NOW())
+    )
+    RETURNING item_id
+)
+SELECT (SELECT COUNT(*) FROM selected) AS matched, ARRAY(SELECT item_id FROM inserted) AS item_ids
+"""
+
+# effective_access already folds in direct and inherited role grants,
+# ownership and public items (stored under user 0), so this is a
+# primary-key probe. expires_in is the time left on the longest-lived
+# grant behind an "allow", so a cached decision never outlives it
+CHECK_PERMISSION_QUERY = """
+SELECT COUNT(*) AS count,
+       CASE WHEN BOOL_OR(expires_at IS NULL) THEN NULL
+            ELSE EXTRACT(EPOCH FROM MAX(expires_at) - LOCALTIMESTAMP)
+       END AS expires_in
+FROM effective_access
+WHERE user_id IN (%s, 0)
+AND action = %s
+AND item_id = %s
+AND (expires_at IS NULL OR expires_at > NOW())
+"""
+
+# Same probe as CHECK_PERMISSION_QUERY, evaluated for every unnested triple
+# in a single round trip
+CHECK_PERMISSIONS_BATCH_QUERY = """
+SELECT c.user_id, c.item_id, c.action,
+       COUNT(ea.item_id) AS count,
+       CASE WHEN BOOL_OR(ea.item_id IS NOT NULL AND ea.expires_at IS NULL) THEN NULL
+            ELSE EXTRACT(EPOCH FROM MAX(ea.expires_at) - LOCALTIMESTAMP)
+       END AS expires_in
+FROM unnest(%s::integer[], %s::integer[], %s::varchar[]) AS c(user_id, item_id, action)
+LEFT JOIN effective_access ea
+    ON ea.user_id IN (c.user_id, 0)
+    AND ea.action = c.action
+    AND ea.item_id = c.item_id
+    AND (ea.expires_at IS NULL OR ea.expires_at > NOW())
+GROUP BY c.user_id, c.item_id, c.action
+"""
+
+GRANT_ACCESS_QUERY = """
+INSERT INTO item_access (item_id, user_id, role_id, permission_id, granted_by, expires_at)
+VALUES (%s, %s, %s, %s, %s, %s)
+RETURNING id
+"""
+
+# Active roles of a user with inherited ancestors; expires_in bounds how long
+# the role set may be cached
+USER_ROLES_QUERY = """
+SELECT r.*,
+       EXTRACT(EPOCH FROM MIN(ur.expires_at) - LOCALTIMESTAMP) AS expires_in
+FROM user_roles ur
+JOIN role_closure rc ON rc.descendant_id = ur.role_id
+JOIN roles r ON r.id = rc.ancestor_id
+WHERE ur.user_id = %s
+AND (ur.expires_at IS NULL OR ur.expires_at > NOW())
+GROUP BY r.id
+"""
+
+ROLE_PERMISSIONS_QUERY = """
+SELECT p.* FROM permissions p
+JOIN role_permissions rp ON p.id = rp.permission_id
+WHERE rp.role_id = %s
+"""
+
+# keyset_paginate condition on items aliased as i; params are user_id, action
+ACCESSIBLE_ITEMS_CONDITION = """i.id IN (
+    SELECT ea.item_id FROM effective_access ea
+    WHERE ea.user_id IN (%s, 0)
+    AND ea.action = %s
+    AND (ea.expires_at IS NULL OR ea.expires_at > NOW())
+)"""
+
+ASSIGN_ROLE_QUERY = """
+INSERT INTO user_roles (user_id, role_id, granted_by, expires_at)
+VALUES (%s, %s, %s, %s)
+ON CONFLICT (user_id, role_id) DO UPDATE
+SET granted_by = EXCLUDED.granted_by,
+    granted_at = CURRENT_TIMESTAMP,
+    expires_at = EXCLUDED.expires_at
+RETURNING id
+"""
+
+# The roles trigger rebuilds role_closure and effective_access in the same
+# transaction
+SET_ROLE_PARENT_QUERY = """
+UPDATE roles SET parent_role_id = %s, updated_at = CURRENT_TIMESTAMP
+WHERE id = %s
+"""
+
+LOG_ACCESS_QUERY = """
+INSERT INTO access_logs (user_id, item_id, action, granted, ip_address, user_agent)
+VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+# Attempts naming a user or item that does not exist are left out, and an
+# overlong action is cut to the column width, so one bad row cannot fail
+# the audit of the whole batch
+LOG_ACCESS_BATCH_QUERY = """
+INSERT INTO access_logs (user_id, item_id, action, granted)
+SELECT a.user_id, a.item_id, a.action::varchar(50), a.granted
+FROM unnest(%s::integer[], %s::integer[], %s::varchar[], %s::boolean[]) AS a(user_id, item_id, action, granted)
+JOIN users u ON u.id = a.user_id
+JOIN items i ON i.id = a.item_id
+"""
+
 
 class RBACService:
     """
@@ -18,8 +217,15 @@ class RBACService:
     Handles permission checks and access management
     """
     
-    def __init__(self, db: DatabaseConnection):
+    def __init__(
+        self,
+        db: DatabaseConnection,
+        cache: Optional[PermissionCache] = None,
+        audit_writer: Optional[AuditWriter] = None
+    ):
         self.db = db
+        self.cache = cache
+        self.audit_writer = audit_writer
     
     def check_user_permission(self, user_id: int, item_id: int, action: str) -> bool:
         """
@@ -33,31 +239,86 @@ class RBACService:
         Returns:
             True if user has permission, False otherwise
         """
-        query = """
-        SELECT COUNT(*) as count
-        FROM item_access ia
-        JOIN permissions p ON ia.permission_id = p.id
-        WHERE ia.item_id = %s
-        AND p.action = %s
-        AND (ia.expires_at IS NULL OR ia.expires_at > NOW())
-        AND (
-            ia.user_id = %s
-            OR ia.role_id IN (
-                SELECT role_id FROM user_roles
-                WHERE user_id = %s
-                AND (expires_at IS NULL OR expires_at > NOW())
-            )
-        )
-        """
+        if self.cache is not None:
+            cached = self.cache.get(user_id, item_id, action)
+            if cached is not None:
+                self._log_access_attempt(user_id, item_id, action, cached)
+                return cached
         
-        result = self.db.execute_query(query, (item_id, action, user_id, user_id), fetch_one=True)
+        # Decisions that get cached come from the primary: a lagging replica
+        # could still return a grant revoked since, and the cache would keep it.
+        # The generation is read first so a revoke that lands while the query
+        # runs keeps its result out of the cache.
+        generation = self.cache.generation() if self.cache is not None else None
+        result = self.db.execute_query(
+            CHECK_PERMISSION_QUERY,
+            (user_id, action, item_id),
+            fetch_one=True,
+            prepare='rbac_check_permission',
+            primary=self.cache is not None
+        )
         has_permission = result['count'] > 0 if result else False
         
+        if self.cache is not None:
+            expires_in = result.get('expires_in') if has_permission else None
+            ttl = float(expires_in) if expires_in is not None else None
+            self.cache.set(user_id, item_id, action, has_permission, ttl=ttl, generation=generation)
+        
         # Log the access attempt
         self._log_access_attempt(user_id, item_id, action, has_permission)
         
         return has_permission
     
+    def check_user_permissions_batch(self, checks: List[Tuple[int, int, str]]) -> List[bool]:
+        """
+        Check many (user_id, item_id, action) triples in one query
+        
+        Args:
+            checks: List of (user_id, item_id, action) tuples
+            
+        Returns:
+            List of decisions in the same order as checks
+        """
+        decisions: Dict[Tuple[int, int, str], bool] = {}
+        
+        if self.cache is not None:
+            for check in set(checks):
+                cached = self.cache.get(*check)
+                if cached is not None:
+                    decisions[check] = cached
+        
+        pending = [check for check in set(checks) if check not in decisions]
+        
+        if pending:
+            user_ids, item_ids, actions = (list(column) for column in zip(*pending))
+            generation = self.cache.generation() if self.cache is not None else None
+            results = self.db.execute_query(
+                CHECK_PERMISSIONS_BATCH_QUERY,
+                (user_ids, item_ids, actions),
+                prepare='rbac_check_permissions_batch',
+                primary=self.cache is not None
+            ) or []
+            
+            for row in results:
+                check = (row['user_id'], row['item_id'], row['action'])
+                has_permission = row['count'] > 0
+                decisions[check] = has_permission
+                
+                if self.cache is not None:
+                    expires_in = row.get('expires_in') if has_permission else None
+                    ttl = float(expires_in) if expires_in is not None else None
+                    self.cache.set(*check, has_permission, ttl=ttl, generation=generation)
+        
+        results = [decisions.get(check, False) for check in checks]
+        
+        # Audit the whole batch with a single multi-row insert
+        self._log_access_attempts([
+            (user_id, item_id, action, granted)
+            for (user_id, item_id, action), granted in zip(checks, results)
+        ])
+        
+        return results
+    
     def grant_item_access(
         self,
         item_id: int,
@@ -81,18 +342,15 @@ class RBACService:
         Returns:
             ID of the created access record
         """
-        query = """
-        INSERT INTO item_access (item_id, user_id, role_id, permission_id, granted_by, expires_at)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        RETURNING id
-        """
-        
         result = self.db.execute_query(
-            query,
+            GRANT_ACCESS_QUERY,
             (item_id, user_id, role_id, permission_id, granted_by, expires_at),
-            fetch_one=True
+            fetch_one=True,
+            commit=True
         )
         
+        self._invalidate_access(item_id, user_id, role_id)
+        
         logger.info(f"Access granted to item {item_id} by user {granted_by}")
         return result['id'] if result else None
     
@@ -106,15 +364,178 @@ class RBACService:
         Returns:
             True if revoked successfully
         """
+        access = None
+        if self.cache is not None:
+            access = self.db.execute_query(
+                "SELECT item_id, user_id, role_id FROM item_access WHERE id = %s",
+                (access_id,),
+                fetch_one=True,
+                primary=True
+            )
+        
         query = "DELETE FROM item_access WHERE id = %s"
         rows_affected = self.db.execute_update(query, (access_id,))
         
+        if access:
+            self._invalidate_access(access['item_id'], access['user_id'], access['role_id'])
+        
         logger.info(f"Access {access_id} revoked")
         return rows_affected > 0
     
+    def grant_item_access_bulk(
+        self,
+        grants: Sequence[Tuple[int, Optional[int], Optional[int], int]],
+        granted_by: int,
+        expires_at: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """
+        Grant many (item, user or role, permission) combinations in one statement
+        
+        Repeated entries and combinations that already have a live grant are
+        skipped, and the cache is invalidated once for the whole batch.
+        
+        Args:
+            grants: (item_id, user_id, role_id, permission_id) tuples; one of
+                    user_id and role_id may be None
+            granted_by: User ID who granted the access
+            expires_at: Expiration datetime applied to every new grant (optional)
+            
+        Returns:
+            Counts of requested, newly granted and already existing grants
+            
+        Raises:
+            ValueError: If an entry refers to a missing item, user, role or permission
+        """
+        unique = list(dict.fromkeys(tuple(grant) for grant in grants))
+        rows = [grant + (granted_by, expires_at) for grant in unique]
+        
+        try:
+            inserted = self.db.execute_values(
+                BULK_GRANT_QUERY, rows, template=BULK_GRANT_TEMPLATE, fetch=True
+            )
+        except errors.ForeignKeyViolation as e:
+            raise ValueError(f"Grant refers to a missing item, user, role or permission: {e.diag.message_detail}")
+        
+        self._invalidate_access_many(inserted)
+        
+        logger.info(f"{len(inserted)} of {len(unique)} grants created by user {granted_by}")
+        return {'requested': len(unique), 'granted': len(inserted), 'existing': len(unique) - len(inserted)}
+    
+    def grant_item_access_by_selector(
+        self,
+        selector: Dict[str, Any],
+        user_id: Optional[int],
+        role_id: Optional[int],
+        permission_id: int,
+        granted_by: int,
+        expires_at: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """
+        Grant a user or role access to every item matching a selector
+        
+        Items that already carry the same live grant are skipped. Selection
+        and insert run as one statement, so the item set is consistent.
+        
+        Args:
+            selector: Item filter with item_type and/or owner_id
+            user_id: User ID (optional if role_id is provided)
+            role_id: Role ID (optional if user_id is provided)
+            permission_id: Permission ID
+            granted_by: User ID who granted the access
+            expires_at: Expiration datetime (optional)
+            
+        Returns:
+            Counts of matched items, newly granted and already existing grants
+            
+        Raises:
+            ValueError: If the selector is empty or invalid, or refers to a
+                        missing user, role or permission
+        """
+        conditions, params = self._item_selector(selector)
+        query = SELECTOR_GRANT_QUERY.format(conditions=' AND '.join(conditions))
+        
+        try:
+            result = self.db.execute_query(
+                query,
+                tuple(params) + (user_id, role_id, permission_id, granted_by, expires_at),
+                fetch_one=True,
+                commit=True
+            )
+        except errors.ForeignKeyViolation as e:
+            raise ValueError(f"Grant refers to a missing user, role or permission: {e.diag.message_detail}")
+        
+        item_ids = result['item_ids']
+        self._invalidate_access_many([(item_id, user_id, role_id) for item_id in item_ids])
+        
+        logger.info(f"Access granted to {len(item_ids)} of {result['matched']} items by user {granted_by}")
+        return {'matched': result['matched'], 'granted': len(item_ids), 'existing': result['matched'] - len(item_ids)}
+    
+    def revoke_item_access_bulk(self, access_ids: Sequence[int]) -> Dict[str, int]:
+        """
+        Revoke many access records in one statement
+        
+        Args:
+            access_ids: Access record IDs
+            
+        Returns:
+            Counts of requested and revoked records
+        """
+        unique = list(dict.fromkeys(access_ids))
+        query = """
+        DELETE FROM item_access WHERE id = ANY(%s)
+        RETURNING item_id, user_id, role_id
+        """
+        
+        revoked = self.db.execute_query(query, (unique,), commit=True)
+        self._invalidate_access_many(revoked)
+        
+        logger.info(f"{len(revoked)} of {len(unique)} access records revoked")
+        return {'requested': len(unique), 'revoked': len(revoked)}
+    
+    def revoke_item_access_by_selector(
+        self,
+        selector: Dict[str, Any],
+        user_id: Optional[int],
+        role_id: Optional[int],
+        permission_id: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Revoke a user's or role's grants on every item matching a selector
+        
+        Args:
+            selector: Item filter with item_type and/or owner_id
+            user_id: User ID whose grants to revoke (optional if role_id is provided)
+            role_id: Role ID whose grants to revoke (optional if user_id is provided)
+            permission_id: Only revoke grants of this permission (optional)
+            
+        Returns:
+            Count of revoked records
+            
+        Raises:
+            ValueError: If the selector is empty or invalid
+        """
+        conditions, params = self._item_selector(selector)
+        conditions += ["ia.user_id IS NOT DISTINCT FROM %s", "ia.role_id IS NOT DISTINCT FROM %s"]
+        params += [user_id, role_id]
+        if permission_id is not None:
+            conditions.append("ia.permission_id = %s")
+            params.append(permission_id)
+        
+        query = f"""
+        DELETE FROM item_access ia USING items i
+        WHERE ia.item_id = i.id AND {' AND '.join(conditions)}
+        RETURNING ia.item_id, ia.user_id, ia.role_id
+        """
+        
+        revoked = self.db.execute_query(query, tuple(params), commit=True)
+        self._invalidate_access_many(revoked)
+        
+        logger.info(f"{len(revoked)} access records revoked by selector {selector}")
+        return {'revoked': len(revoked)}
+    
     def get_user_roles(self, user_id: int) -> List[Role]:
         """
-        Get all active roles for a user
+        Get all active roles for a user, including inherited ancestor roles
         
         Args:
             user_id: User ID
@@ -122,15 +543,73 @@ class RBACService:
         Returns:
             List of Role objects
         """
-        query = """
-        SELECT r.* FROM roles r
-        JOIN user_roles ur ON r.id = ur.role_id
-        WHERE ur.user_id = %s
-        AND (ur.expires_at IS NULL OR ur.expires_at > NOW())
+        if self.cache is not None:
+            cached = self.cache.get_user_roles(user_id)
+            if cached is not None:
+                return [Role(**row) for row in cached]
+        
+        generation = self.cache.generation() if self.cache is not None else None
+        results = self.db.execute_query(
+            USER_ROLES_QUERY, (user_id,), prepare='rbac_user_roles', primary=self.cache is not None
+        ) or []
+        
+        # The cached role set must not outlive the first assignment to expire
+        rows = [dict(row) for row in results]
+        expiries = [float(e) for e in (row.pop('expires_in') for row in rows) if e is not None]
+        
+        if self.cache is not None:
+            self.cache.set_user_roles(user_id, rows, ttl=min(expiries) if expiries else None, generation=generation)
+        
+        return [Role(**row) for row in rows]
+    
+    def get_authz_version(self, user_id: int) -> Optional[int]:
+        """
+        Get a user's authorization version, bumped whenever their roles change
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            users.authz_version, or None if the user does not exist
+        """
+        if self.cache is not None:
+            cached = self.cache.get_authz_version(user_id)
+            if cached is not None:
+                return cached
+        
+        generation = self.cache.generation() if self.cache is not None else None
+        result = self.db.execute_query(
+            "SELECT authz_version FROM users WHERE id = %s",
+            (user_id,),
+            fetch_one=True,
+            prepare='rbac_authz_version',
+            primary=self.cache is not None
+        )
+        if not result:
+            return None
+        
+        if self.cache is not None:
+            self.cache.set_authz_version(user_id, result['authz_version'], generation=generation)
+        
+        return result['authz_version']
+    
+    def is_token_revoked(self, payload: Dict) -> bool:
         """
+        Check whether a token predates its user's last role change, logout or
+        deactivation, all of which move users.authz_version
         
-        results = self.db.execute_query(query, (user_id,))
-        return [Role(**row) for row in results] if results else []
+        Args:
+            payload: Decoded token payload
+            
+        Returns:
+            True if the user no longer exists or has moved past the token's authz_version
+        """
+        version = self.get_authz_version(payload.get('user_id'))
+        if version is None:
+            return True
+        
+        claimed = payload.get('authz_version')
+        return claimed is not None and claimed < version
     
     def get_role_permissions(self, role_id: int) -> List[Permission]:
         """
@@ -142,46 +621,38 @@ class RBACService:
         Returns:
             List of Permission objects
         """
-        query = """
-        SELECT p.* FROM permissions p
-        JOIN role_permissions rp ON p.id = rp.permission_id
-        WHERE rp.role_id = %s
-        """
-        
-        results = self.db.execute_query(query, (role_id,))
+        results = self.db.execute_query(ROLE_PERMISSIONS_QUERY, (role_id,))
         return [Permission(**row) for row in results] if results else []
     
-    def get_accessible_items(self, user_id: int, action: str = 'read') -> List[Item]:
+    def get_accessible_items(
+        self,
+        user_id: int,
+        action: str = 'read',
+        limit: Optional[int] = None,
+        after: Optional[Sequence[Any]] = None
+    ) -> List[Item]:
         """
-        Get all items accessible by a user for a specific action
+        Get items accessible by a user for a specific action, newest first
         
         Args:
             user_id: User ID
             action: Action type (default: read)
+            limit: Maximum number of items (optional)
+            after: (created_at, id) of the last item of the previous page (optional)
             
         Returns:
             List of Item objects
         """
-        query = """
-        SELECT DISTINCT i.* FROM items i
-        JOIN item_access ia ON i.id = ia.item_id
-        JOIN permissions p ON ia.permission_id = p.id
-        WHERE p.action = %s
-        AND (ia.expires_at IS NULL OR ia.expires_at > NOW())
-        AND (
-            i.is_public = TRUE
-            OR i.owner_id = %s
-            OR ia.user_id = %s
-            OR ia.role_id IN (
-                SELECT role_id FROM user_roles
-                WHERE user_id = %s
-                AND (expires_at IS NULL OR expires_at > NOW())
-            )
+        query, params = keyset_paginate(
+            "SELECT i.* FROM items i",
+            [ACCESSIBLE_ITEMS_CONDITION],
+            [user_id, action],
+            ('i.created_at', 'i.id'),
+            after,
+            limit
         )
-        ORDER BY i.created_at DESC
-        """
         
-        results = self.db.execute_query(query, (action, user_id, user_id, user_id))
+        results = self.db.execute_query(query, params)
         return [Item(**row) for row in results] if results else []
     
     def assign_role_to_user(
@@ -203,25 +674,216 @@ class RBACService:
         Returns:
             ID of the created user_role record
         """
-        query = """
-        INSERT INTO user_roles (user_id, role_id, granted_by, expires_at)
-        VALUES (%s, %s, %s, %s)
-        ON CONFLICT (user_id, role_id) DO UPDATE
-        SET granted_by = EXCLUDED.granted_by,
-            granted_at = CURRENT_TIMESTAMP,
-            expires_at = EXCLUDED.expires_at
-        RETURNING id
-        """
-        
         result = self.db.execute_query(
-            query,
+            ASSIGN_ROLE_QUERY,
             (user_id, role_id, granted_by, expires_at),
-            fetch_one=True
+            fetch_one=True,
+            commit=True
         )
         
+        if self.cache is not None:
+            self.cache.invalidate_user(user_id)
+        
         logger.info(f"Role {role_id} assigned to user {user_id} by {granted_by}")
         return result['id'] if result else None
     
+    def sync_user_roles(self, role_sets: Dict[int, Sequence[int]], granted_by: int) -> Dict[str, int]:
+        """
+        Make the direct roles of many users match a desired state
+        
+        The diff against user_roles is computed in SQL and applied by one
+        statement, so the whole sync is a single transaction: missing
+        assignments are inserted, assignments not in a user's set are
+        deleted and expired ones that are still wanted are renewed. Rows
+        that already match are not written, so their triggers do not fire.
+        Users not listed are left alone; an empty set removes every role.
+        
+        Args:
+            role_sets: Mapping of user ID to the role IDs the user should have
+            granted_by: User ID recorded on inserted and renewed assignments
+            
+        Returns:
+            Counts of users synced, assignments added, removed and renewed,
+            and users whose roles changed
+            
+        Raises:
+            ValueError: If a user or role does not exist
+        """
+        user_ids = list(role_sets)
+        pairs = [(user_id, role_id) for user_id, role_ids in role_sets.items() for role_id in set(role_ids)]
+        
+        try:
+            result = self.db.execute_query(
+                SYNC_USER_ROLES_QUERY,
+                (
+                    [user_id for user_id, _ in pairs],
+                    [role_id for _, role_id in pairs],
+                    user_ids,
+                    granted_by,
+                    granted_by
+                ),
+                fetch_one=True,
+                commit=True
+            )
+        except errors.ForeignKeyViolation as e:
+            raise ValueError(f"Role sync refers to a missing user or role: {e.diag.message_detail}")
+        
+        changed = result['changed_user_ids']
+        if changed and self.cache is not None:
+            self.cache.invalidate_users(changed)
+        
+        logger.info(
+            f"Synced roles of {len(user_ids)} users: {result['added']} added, {result['removed']} removed, "
+            f"{result['renewed']} renewed"
+        )
+        return {
+            'users': len(user_ids),
+            'added': result['added'],
+            'removed': result['removed'],
+            'renewed': result['renewed'],
+            'changed_users': len(changed)
+        }
+    
+    def set_role_parent(self, role_id: int, parent_role_id: Optional[int]) -> bool:
+        """
+        Make a role inherit the permissions of a parent role
+        
+        Args:
+            role_id: Role ID
+            parent_role_id: Parent role ID, or None to detach the role
+            
+        Returns:
+            True if the role exists and was updated
+            
+        Raises:
+            ValueError: If the parent already inherits from the role
+        """
+        if parent_role_id == role_id:
+            raise ValueError(f"Role {role_id} cannot be its own parent")
+        
+        if parent_role_id is not None:
+            cycle = self.db.execute_query(
+                "SELECT 1 FROM role_closure WHERE ancestor_id = %s AND descendant_id = %s",
+                (role_id, parent_role_id),
+                fetch_one=True,
+                primary=True
+            )
+            if cycle:
+                raise ValueError(f"Role {parent_role_id} inherits from role {role_id}; cannot make it the parent")
+        
+        rows_affected = self.db.execute_update(SET_ROLE_PARENT_QUERY, (parent_role_id, role_id))
+        
+        # Inheritance changes can affect any user, so drop every cached decision
+        if rows_affected and self.cache is not None:
+            self.cache.clear()
+        
+        logger.info(f"Role {role_id} parent set to {parent_role_id}")
+        return rows_affected > 0
+    
+    def rebuild_effective_access(self) -> int:
+        """
+        Recompute effective_access from scratch
+        
+        Triggers keep the table current on every write, so this is only
+        needed to recover from drift, e.g. after triggers were disabled
+        for a bulk load.
+        
+        Returns:
+            Number of effective_access rows after the rebuild
+        """
+        self.db.execute_query("SELECT rebuild_effective_access()", fetch_one=True, commit=True)
+        result = self.db.execute_query("SELECT COUNT(*) AS count FROM effective_access", fetch_one=True)
+        
+        if self.cache is not None:
+            self.cache.clear()
+        
+        count = result['count'] if result else 0
+        logger.info(f"Rebuilt effective_access ({count} rows)")
+        return count
+    
+    def _invalidate_access(self, item_id: int, user_id: Optional[int], role_id: Optional[int]):
+        """
+        Drop cached decisions affected by a change to an item_access row
+        
+        Args:
+            item_id: Item ID of the access record
+            user_id: User ID of the access record (optional)
+            role_id: Role ID of the access record (optional)
+        """
+        if self.cache is None:
+            return
+        
+        # A role grant can affect any member of the role, so drop the whole item
+        if role_id is not None:
+            self.cache.invalidate_item(item_id)
+        elif user_id is not None:
+            self.cache.invalidate_user_item(user_id, item_id)
+    
+    def _invalidate_access_many(self, rows: Sequence[Dict]):
+        """
+        Drop cached decisions affected by changes to many item_access rows
+        
+        Issues at most one item invalidation and one user-item invalidation,
+        so a shared cache relays a single message per kind for the batch.
+        
+        Args:
+            rows: Access records (dicts or tuples) of item_id, user_id, role_id
+        """
+        if self.cache is None or not rows:
+            return
+        
+        item_ids = set()
+        pairs = set()
+        for row in rows:
+            item_id, user_id, role_id = (
+                (row['item_id'], row['user_id'], row['role_id']) if isinstance(row, dict) else row
+            )
+            # A role grant can affect any member of the role, so drop the whole item
+            if role_id is not None:
+                item_ids.add(item_id)
+            elif user_id is not None:
+                pairs.add((user_id, item_id))
+        
+        if item_ids:
+            self.cache.invalidate_items(item_ids)
+        pairs = {pair for pair in pairs if pair[1] not in item_ids}
+        if pairs:
+            self.cache.invalidate_user_items(pairs)
+    
+    @staticmethod
+    def _item_selector(selector: Dict[str, Any]) -> Tuple[List[str], List[Any]]:
+        """
+        Turn an item selector into SQL conditions on items aliased as i
+        
+        Args:
+            selector: Dictionary with item_type (str) and/or owner_id (int)
+            
+        Returns:
+            Tuple of (conditions, params)
+            
+        Raises:
+            ValueError: If the selector is empty or has unknown or mistyped keys
+        """
+        if not isinstance(selector, dict) or not selector:
+            raise ValueError("selector must be a non-empty object")
+        
+        unknown = set(selector) - set(ITEM_SELECTOR_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown selector fields: {', '.join(sorted(unknown))}")
+        
+        conditions = []
+        params = []
+        for field, expected in ITEM_SELECTOR_FIELDS.items():
+            if field not in selector:
+                continue
+            value = selector[field]
+            if not isinstance(value, expected) or isinstance(value, bool):
+                raise ValueError(f"selector {field} must be of type {expected.__name__}")
+            conditions.append(f"i.{field} = %s")
+            params.append(value)
+        
+        return conditions, params
+    
     def _log_access_attempt(
         self,
         user_id: int,
@@ -242,29 +904,56 @@ class RBACService:
             ip_address: Client IP address (optional)
             user_agent: Client user agent (optional)
         """
-        query = """
-        INSERT INTO access_logs (user_id, item_id, action, granted, ip_address, user_agent)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
+        if self.audit_writer is not None:
+            self.audit_writer.submit(user_id, item_id, action, granted, ip_address, user_agent)
+            return
         
         try:
-            self.db.execute_update(query, (user_id, item_id, action, granted, ip_address, user_agent))
+            self.db.execute_update(
+                LOG_ACCESS_QUERY, (user_id, item_id, action, granted, ip_address, user_agent), sticky=False
+            )
         except Exception as e:
             logger.error(f"Failed to log access attempt: {e}")
     
+    def _log_access_attempts(self, attempts: List[Tuple[int, int, str, bool]]):
+        """
+        Log a batch of access attempts with a single insert
+        
+        Args:
+            attempts: List of (user_id, item_id, action, granted) tuples
+        """
+        if not attempts:
+            return
+        
+        if self.audit_writer is not None:
+            self.audit_writer.submit_many([attempt + (None, None) for attempt in attempts])
+            return
+        
+        columns = tuple(list(column) for column in zip(*attempts))
+        try:
+            logged = self.db.execute_update(LOG_ACCESS_BATCH_QUERY, columns, sticky=False)
+        except Exception as e:
+            logger.error(f"Failed to log {len(attempts)} access attempts: {e}")
+            return
+        
+        if logged < len(attempts):
+            logger.warning(f"Skipped {len(attempts) - logged} access attempts for unknown users or items")
+    
     def get_access_logs(
         self,
         user_id: Optional[int] = None,
         item_id: Optional[int] = None,
-        limit: int = 100
+        limit: int = 100,
+        after: Optional[Sequence[Any]] = None
     ) -> List[Dict]:
         """
-        Retrieve access logs with optional filtering
+        Retrieve access logs with optional filtering, newest first
         
         Args:
             user_id: Filter by user ID (optional)
             item_id: Filter by item ID (optional)
             limit: Maximum number of records to return
+            after: (created_at, id) of the last record of the previous page (optional)
             
         Returns:
             List of access log dictionaries
@@ -280,16 +969,15 @@ class RBACService:
             conditions.append("item_id = %s")
             params.append(item_id)
         
-        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
-        params.append(limit)
-        
-        query = f"""
-        SELECT * FROM access_logs
-        {where_clause}
-        ORDER BY created_at DESC
-        LIMIT %s
-        """
+        query, params = keyset_paginate(
+            "SELECT * FROM access_logs",
+            conditions,
+            params,
+            ('created_at', 'id'),
+            after,
+            limit
+        )
         
-        results = self.db.execute_query(query, tuple(params))
+        results = self.db.execute_query(query, params)
         return results if results else []
 
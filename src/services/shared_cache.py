@@ -0,0 +1,779 @@
+"""
+Shared Cache
+Redis-backed cache of permission decisions, role sets, item rows and
+authorization versions shared by every worker and replica, with invalidation
+relayed over pub/sub
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import redis
+
+from src.services.permission_cache import PermissionCache
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'rbac'
+INVALIDATION_CHANNEL = f'{KEY_PREFIX}:invalidate'
+
+# Moved by every invalidation and never deleted, so an old value cannot
+# come back after a clear
+GENERATION_KEY = f'{KEY_PREFIX}:generation'
+
+# Stores a value only if the generation still matches the one read before
+# the value was loaded; KEYS are the generation key, the value key and the
+# index sets to list the value key in
+SET_IF_GENERATION_SCRIPT = """
+if (redis.call('GET', KEYS[1]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[2], 'PX', ARGV[3])
+for i = 3, #KEYS do
+    redis.call('SADD', KEYS[i], KEYS[2])
+    redis.call('EXPIRE', KEYS[i], ARGV[4])
+end
+return 1
+"""
+
+# Generation token: (local generation, Redis generation or None if unread)
+Generation = Tuple[int, Optional[bytes]]
+
+
+def _json_default(value):
+    """Tag values JSON cannot represent so they round-trip unchanged"""
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_object_hook(obj: Dict):
+    """Restore values tagged by _json_default"""
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    if '__date__' in obj:
+        return date.fromisoformat(obj['__date__'])
+    return obj
+
+
+def encode_value(value) -> str:
+    """Serialize a cached row or list of rows"""
+    return json.dumps(value, default=_json_default)
+
+
+def decode_value(raw) -> object:
+    """Deserialize a cached row or list of rows"""
+    return json.loads(raw, object_hook=_json_object_hook)
+
+
+class SharedCache:
+    """
+    Redis-backed cache shared across workers and replicas
+    
+    Exposes the same interface as PermissionCache. An optional local
+    PermissionCache sits in front of Redis; it is only consulted while this
+    node is subscribed to the invalidation channel, so a change published by
+    any node is applied everywhere as soon as the message arrives.
+    
+    Redis errors never fail a request: lookups report a miss, writes are
+    skipped and the cache stays bypassed for ``retry_interval`` seconds, so
+    callers fall back to the database. An invalidation that cannot reach
+    Redis is not lost: before Redis is used again everything under the key
+    prefix is dropped on every node, since entries it should have removed
+    would otherwise be served until they expire.
+    
+    Like PermissionCache, setters take the token returned by
+    ``generation()`` and store nothing if an invalidation ran on any node
+    since it was read.
+    """
+    
+    def __init__(
+        self,
+        redis_url: str,
+        ttl: int = 300,
+        local: Optional[PermissionCache] = None,
+        client: Optional[redis.Redis] = None,
+        retry_interval: float = 5.0,
+        socket_timeout: float = 0.25
+    ):
+        self.ttl = ttl
+        self.local = local
+        self.retry_interval = retry_interval
+        self._client = client or redis.Redis.from_url(
+            redis_url,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout
+        )
+        self._set_if_generation = self._client.register_script(SET_IF_GENERATION_SCRIPT)
+        self._node_id = uuid.uuid4().hex
+        self._unavailable_until = 0.0
+        self._missed_invalidation = False
+        self._resync_lock = threading.Lock()
+        self._subscribed = threading.Event()
+        self._stop = threading.Event()
+        self._listener: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+    
+    @property
+    def available(self) -> bool:
+        """Whether Redis is currently considered reachable"""
+        return time.monotonic() >= self._unavailable_until
+    
+    def generation(self) -> Generation:
+        """
+        Get the invalidation generation, to pass to a setter after a database read
+        
+        Returns:
+            Token combining the local and Redis generations
+        """
+        local = self._local_cache()
+        local_generation = local.generation() if local is not None else -1
+        return local_generation, self._call(lambda r: r.get(GENERATION_KEY) or b'')
+    
+    # Permission decisions
+    
+    def get(self, user_id: int, item_id: int, action: str) -> Optional[bool]:
+        """
+        Look up a cached decision, checking the local cache first
+        
+        Args:
+            user_id: User ID
+            item_id: Item ID
+            action: Action name
+            
+        Returns:
+            Cached decision, or None on a miss or when Redis is unavailable
+        """
+        local = self._local_cache()
+        if local is not None:
+            allowed = local.get(user_id, item_id, action)
+            if allowed is not None:
+                return allowed
+            local_generation = local.generation()
+        
+        raw = self._call(lambda r: r.get(self._decision_key(user_id, item_id, action)))
+        if raw is None:
+            self._count_lookup(hit=False)
+            return None
+        
+        self._count_lookup(hit=True)
+        
+        # Stored as "<0|1>:<unix deadline>" so the local copy keeps the same deadline
+        flag, _, deadline = raw.decode().partition(':')
+        allowed = flag == '1'
+        
+        if local is not None:
+            local.set(user_id, item_id, action, allowed, ttl=float(deadline) - time.time(), generation=local_generation)
+        
+        return allowed
+    
+    def set(
+        self,
+        user_id: int,
+        item_id: int,
+        action: str,
+        allowed: bool,
+        ttl: Optional[float] = None,
+        generation: Optional[Generation] = None
+    ):
+        """
+        Store a decision in Redis and the local cache
+        
+        Args:
+            user_id: User ID
+            item_id: Item ID
+            action: Action name
+            allowed: Decision to cache
+            ttl: Lifetime in seconds, capped at the cache TTL (optional)
+            generation: generation() read before the decision was loaded (optional)
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        
+        local = self._local_cache()
+        if local is not None:
+            local_generation = None if generation is None else generation[0]
+            local.set(user_id, item_id, action, allowed, ttl=ttl, generation=local_generation)
+        
+        key = self._decision_key(user_id, item_id, action)
+        value = f"{int(allowed)}:{time.time() + ttl:.3f}"
+        index_keys = [self._user_index_key(user_id), self._item_index_key(item_id)]
+        
+        def write(r):
+            pipe = r.pipeline(transaction=False)
+            pipe.set(key, value, px=int(ttl * 1000))
+            for index_key in index_keys:
+                pipe.sadd(index_key, key)
+                pipe.expire(index_key, self.ttl)
+            pipe.execute()
+        
+        if generation is None:
+            self._call(write)
+        else:
+            self._write_if_generation(generation, key, value, ttl, index_keys)
+    
+    # Role sets and item rows
+    
+    def get_user_roles(self, user_id: int) -> Optional[List[Dict]]:
+        """
+        Look up the cached effective role rows of a user
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            List of role row dictionaries, or None on a miss
+        """
+        return self._get_row(self._roles_key(user_id), 'user_roles', user_id)
+    
+    def set_user_roles(
+        self,
+        user_id: int,
+        roles: List[Dict],
+        ttl: Optional[float] = None,
+        generation: Optional[Generation] = None
+    ):
+        """
+        Store the effective role rows of a user
+        
+        Args:
+            user_id: User ID
+            roles: List of role row dictionaries
+            ttl: Lifetime in seconds, capped at the cache TTL (optional)
+            generation: generation() read before the rows were loaded (optional)
+        """
+        self._set_row(self._roles_key(user_id), 'user_roles', user_id, roles, ttl, generation)
+    
+    def get_item(self, item_id: int) -> Optional[Dict]:
+        """
+        Look up a cached item row
+        
+        Args:
+            item_id: Item ID
+            
+        Returns:
+            Item row dictionary, or None on a miss
+        """
+        return self._get_row(self._item_key(item_id), 'item', item_id)
+    
+    def set_item(
+        self,
+        item_id: int,
+        item: Dict,
+        ttl: Optional[float] = None,
+        generation: Optional[Generation] = None
+    ):
+        """
+        Store an item row
+        
+        Args:
+            item_id: Item ID
+            item: Item row dictionary
+            ttl: Lifetime in seconds, capped at the cache TTL (optional)
+            generation: generation() read before the row was loaded (optional)
+        """
+        self._set_row(self._item_key(item_id), 'item', item_id, item, ttl, generation)
+    
+    def get_authz_version(self, user_id: int) -> Optional[int]:
+        """
+        Look up the cached authorization version of a user
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            users.authz_version, or None on a miss
+        """
+        return self._get_row(self._authz_version_key(user_id), 'authz_version', user_id)
+    
+    def set_authz_version(
+        self,
+        user_id: int,
+        version: int,
+        ttl: Optional[float] = None,
+        generation: Optional[Generation] = None
+    ):
+        """
+        Store the authorization version of a user
+        
+        Args:
+            user_id: User ID
+            version: users.authz_version
+            ttl: Lifetime in seconds, capped at the cache TTL (optional)
+            generation: generation() read before the version was loaded (optional)
+        """
+        self._set_row(self._authz_version_key(user_id), 'authz_version', user_id, version, ttl, generation)
+    
+    # Invalidation
+    
+    def invalidate_user(self, user_id: int) -> int:
+        """
+        Drop every decision, the role set and the version cached for a user on all nodes
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Number of Redis keys removed
+        """
+        index_key = self._user_index_key(user_id)
+        removed = self._delete_indexed(
+            index_key,
+            extra_keys=[self._roles_key(user_id), self._authz_version_key(user_id)]
+        )
+        self._publish({'scope': 'user', 'user_id': user_id})
+        return removed
+    
+    def invalidate_users(self, user_ids: Iterable[int]) -> int:
+        """
+        Drop every decision, the role set and the version cached for several users on all nodes
+        
+        The keys are read and deleted in pipelined round trips and the other
+        nodes get a single message, however many users there are.
+        
+        Args:
+            user_ids: User IDs
+            
+        Returns:
+            Number of Redis keys removed
+        """
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return 0
+        
+        def delete(r):
+            index_keys = [self._user_index_key(user_id) for user_id in user_ids]
+            pipe = r.pipeline(transaction=False)
+            for index_key in index_keys:
+                pipe.smembers(index_key)
+            keys = [key for members in pipe.execute() for key in members]
+            keys += index_keys
+            keys += [self._roles_key(user_id) for user_id in user_ids]
+            keys += [self._authz_version_key(user_id) for user_id in user_ids]
+            return self._delete_keys(r, keys)
+        
+        removed = self._call(delete, default=0, invalidation=True)
+        self._publish({'scope': 'users', 'user_ids': user_ids})
+        return removed
+    
+    def invalidate_item(self, item_id: int) -> int:
+        """
+        Drop every decision and the row cached for an item on all nodes
+        
+        Args:
+            item_id: Item ID
+            
+        Returns:
+            Number of Redis keys removed
+        """
+        index_key = self._item_index_key(item_id)
+        removed = self._delete_indexed(index_key, extra_keys=[self._item_key(item_id)])
+        self._publish({'scope': 'item', 'item_id': item_id})
+        return removed
+    
+    def invalidate_items(self, item_ids: Iterable[int]) -> int:
+        """
+        Drop every decision and the row cached for several items on all nodes
+        
+        The keys are read and deleted in pipelined round trips and the other
+        nodes get a single message, however many items there are.
+        
+        Args:
+            item_ids: Item IDs
+            
+        Returns:
+            Number of Redis keys removed
+        """
+        item_ids = sorted(set(item_ids))
+        if not item_ids:
+            return 0
+        
+        def delete(r):
+            index_keys = [self._item_index_key(item_id) for item_id in item_ids]
+            pipe = r.pipeline(transaction=False)
+            for index_key in index_keys:
+                pipe.smembers(index_key)
+            keys = [key for members in pipe.execute() for key in members]
+            keys += index_keys + [self._item_key(item_id) for item_id in item_ids]
+            return self._delete_keys(r, keys)
+        
+        removed = self._call(delete, default=0, invalidation=True)
+        self._publish({'scope': 'items', 'item_ids': item_ids})
+        return removed
+    
+    def invalidate_user_item(self, user_id: int, item_id: int) -> int:
+        """
+        Drop the decisions cached for one user on one item on all nodes
+        
+        Args:
+            user_id: User ID
+            item_id: Item ID
+            
+        Returns:
+            Number of Redis keys removed
+        """
+        prefix = f"{KEY_PREFIX}:decision:{user_id}:{item_id}:"
+        
+        def delete(r):
+            keys = [k for k in r.smembers(self._user_index_key(user_id)) if k.decode().startswith(prefix)]
+            return r.delete(*keys) if keys else 0
+        
+        removed = self._call(delete, default=0, invalidation=True)
+        self._publish({'scope': 'user_item', 'user_id': user_id, 'item_id': item_id})
+        return removed
+    
+    def invalidate_user_items(self, pairs: Iterable[Tuple[int, int]]) -> int:
+        """
+        Drop the decisions cached for several (user_id, item_id) pairs on all nodes
+        
+        Args:
+            pairs: (user_id, item_id) tuples
+            
+        Returns:
+            Number of Redis keys removed
+        """
+        pairs = sorted(set(pairs))
+        if not pairs:
+            return 0
+        
+        wanted = set(pairs)
+        users = sorted({user_id for user_id, _ in pairs})
+        
+        def targeted(key: bytes) -> bool:
+            # Decision keys are rbac:decision:<user_id>:<item_id>:<action>
+            _, _, user_id, item_id, _ = key.decode().split(':', 4)
+            return (int(user_id), int(item_id)) in wanted
+        
+        def delete(r):
+            pipe = r.pipeline(transaction=False)
+            for user_id in users:
+                pipe.smembers(self._user_index_key(user_id))
+            keys = [key for members in pipe.execute() for key in members if targeted(key)]
+            return self._delete_keys(r, keys)
+        
+        removed = self._call(delete, default=0, invalidation=True)
+        self._publish({'scope': 'user_items', 'pairs': [list(pair) for pair in pairs]})
+        return removed
+    
+    def clear(self):
+        """Drop everything cached under the key prefix on all nodes"""
+        self._call(self._delete_prefix, invalidation=True)
+        self._publish({'scope': 'all'})
+    
+    # Pub/sub listener
+    
+    def start_listener(self):
+        """Start the background thread that applies invalidations from other nodes"""
+        if self._listener is not None and self._listener.is_alive():
+            return
+        
+        self._stop.clear()
+        self._listener = threading.Thread(
+            target=self._listen,
+            name='rbac-cache-invalidation',
+            daemon=True
+        )
+        self._listener.start()
+    
+    def stop_listener(self, timeout: float = 2.0):
+        """Stop the invalidation listener thread"""
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.join(timeout)
+        self._listener = None
+        self._subscribed.clear()
+    
+    def wait_until_subscribed(self, timeout: float = 5.0) -> bool:
+        """Block until the listener is subscribed; mainly useful in tests"""
+        return self._subscribed.wait(timeout)
+    
+    def stats(self) -> Dict:
+        """
+        Get cache counters
+        
+        Returns:
+            Dictionary with Redis hit/miss/error counters and local cache stats
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'backend': 'redis',
+                'available': self.available,
+                'subscribed': self._subscribed.is_set(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'errors': self.errors
+            }
+        
+        if self.local is not None:
+            stats['local'] = self.local.stats()
+        
+        return stats
+    
+    def _listen(self):
+        """Subscribe to the invalidation channel, reconnecting on failure"""
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                
+                # Messages may have been missed while disconnected
+                if self.local is not None:
+                    self.local.clear()
+                self._subscribed.set()
+                logger.info("Subscribed to cache invalidation channel")
+                
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=0.5)
+                    if message and message.get('type') == 'message':
+                        self._apply(message['data'])
+            
+            except redis.RedisError as e:
+                self._mark_unavailable(e)
+                self._stop.wait(self.retry_interval)
+            
+            finally:
+                self._subscribed.clear()
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except redis.RedisError:
+                        pass
+    
+    def _apply(self, data: bytes):
+        """Apply an invalidation message published by another node"""
+        try:
+            message = json.loads(data)
+        except ValueError:
+            logger.warning(f"Ignoring malformed cache invalidation message: {data!r}")
+            return
+        
+        if self.local is not None and message.get('origin') != self._node_id:
+            self._apply_local(message)
+    
+    # Internal helpers
+    
+    def _local_cache(self) -> Optional[PermissionCache]:
+        """The local cache, if it is safe to use right now"""
+        if self.local is None or not self._subscribed.is_set() or not self.available:
+            return None
+        return self.local
+    
+    def _get_row(self, key: str, kind: str, local_key: int):
+        """Read a JSON row through the local cache and Redis"""
+        local = self._local_cache()
+        if local is not None:
+            value = getattr(local, f'get_{kind}')(local_key)
+            if value is not None:
+                return value
+            local_generation = local.generation()
+        
+        raw = self._call(lambda r: r.get(key))
+        if raw is None:
+            self._count_lookup(hit=False)
+            return None
+        
+        self._count_lookup(hit=True)
+        value = decode_value(raw)
+        
+        if local is not None:
+            getattr(local, f'set_{kind}')(local_key, value, generation=local_generation)
+        
+        return value
+    
+    def _set_row(
+        self,
+        key: str,
+        kind: str,
+        local_key: int,
+        value,
+        ttl: Optional[float],
+        generation: Optional[Generation] = None
+    ):
+        """Write a JSON row to the local cache and Redis"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        
+        local = self._local_cache()
+        if local is not None:
+            local_generation = None if generation is None else generation[0]
+            getattr(local, f'set_{kind}')(local_key, value, ttl=ttl, generation=local_generation)
+        
+        payload = encode_value(value)
+        if generation is None:
+            self._call(lambda r: r.set(key, payload, px=int(ttl * 1000)))
+        else:
+            self._write_if_generation(generation, key, payload, ttl, [])
+    
+    def _write_if_generation(self, generation: Generation, key: str, value: str, ttl: float, index_keys: List[str]):
+        """Write a key and list it in index sets, unless an invalidation ran since ``generation``"""
+        expected = generation[1]
+        if expected is None:
+            return  # the generation could not be read, so the value may be stale
+        
+        self._call(lambda r: self._set_if_generation(
+            keys=[GENERATION_KEY, key] + index_keys,
+            args=[expected, value, int(ttl * 1000), self.ttl],
+            client=r
+        ))
+    
+    def _delete_indexed(self, index_key: str, extra_keys: List[str]) -> int:
+        """Delete every key listed in an index set, the set itself and extra keys"""
+        def delete(r):
+            keys = list(r.smembers(index_key)) + [index_key] + extra_keys
+            return r.delete(*keys)
+        
+        return self._call(delete, default=0, invalidation=True)
+    
+    @staticmethod
+    def _delete_prefix(r):
+        """Delete every key under the key prefix but the generation"""
+        keys = [key for key in r.scan_iter(match=f"{KEY_PREFIX}:*", count=1000) if key != GENERATION_KEY.encode()]
+        for start in range(0, len(keys), 1000):
+            r.delete(*keys[start:start + 1000])
+    
+    @staticmethod
+    def _delete_keys(r, keys: List) -> int:
+        """Delete keys in chunks so a large invalidation stays within sane command sizes"""
+        removed = 0
+        for start in range(0, len(keys), 1000):
+            removed += r.delete(*keys[start:start + 1000])
+        return removed
+    
+    def _publish(self, message: Dict):
+        """Apply an invalidation locally and relay it to the other nodes"""
+        if self.local is not None:
+            self._apply_local(message)
+        
+        message['origin'] = self._node_id
+        self._call(lambda r: self._relay(r, message), invalidation=True)
+    
+    @staticmethod
+    def _relay(r, message: Dict):
+        """Move the generation and publish an invalidation, in one round trip"""
+        pipe = r.pipeline(transaction=False)
+        pipe.incr(GENERATION_KEY)
+        pipe.publish(INVALIDATION_CHANNEL, json.dumps(message))
+        pipe.execute()
+    
+    def _apply_local(self, message: Dict):
+        """Apply an invalidation to this node's local cache"""
+        scope = message['scope']
+        if scope == 'user':
+            self.local.invalidate_user(message['user_id'])
+        elif scope == 'item':
+            self.local.invalidate_item(message['item_id'])
+        elif scope == 'user_item':
+            self.local.invalidate_user_item(message['user_id'], message['item_id'])
+        elif scope == 'users':
+            self.local.invalidate_users(message['user_ids'])
+        elif scope == 'items':
+            self.local.invalidate_items(message['item_ids'])
+        elif scope == 'user_items':
+            self.local.invalidate_user_items(tuple(pair) for pair in message['pairs'])
+        else:
+            self.local.clear()
+    
+    def _call(self, operation: Callable, default=None, invalidation: bool = False):
+        """
+        Run a Redis operation, falling back to ``default`` if Redis is unavailable
+        
+        An invalidation that falls back is remembered for _resync.
+        """
+        if self.available and self._resync():
+            try:
+                return operation(self._client)
+            except redis.RedisError as e:
+                self._mark_unavailable(e)
+        
+        if invalidation:
+            self._missed_invalidation = True
+        return default
+    
+    def _resync(self) -> bool:
+        """
+        Make up for invalidations missed while Redis was unreachable by
+        dropping every key under the prefix and clearing every local cache
+        
+        Returns:
+            False if Redis failed again, so it must still be bypassed
+        """
+        if not self._missed_invalidation:
+            return True
+        
+        with self._resync_lock:
+            if not self._missed_invalidation:
+                return True
+            
+            try:
+                self._delete_prefix(self._client)
+                self._relay(self._client, {'scope': 'all', 'origin': self._node_id})
+            except redis.RedisError as e:
+                self._mark_unavailable(e)
+                return False
+            
+            self._missed_invalidation = False
+        
+        if self.local is not None:
+            self.local.clear()
+        logger.warning("Redis cache reachable again; dropped every entry to make up for missed invalidations")
+        return True
+    
+    def _mark_unavailable(self, error: Exception):
+        """Bypass Redis for retry_interval seconds after an error"""
+        with self._lock:
+            self.errors += 1
+            was_available = self.available
+            self._unavailable_until = time.monotonic() + self.retry_interval
+        
+        if was_available:
+            logger.warning(f"Redis cache unavailable, falling back to database: {error}")
+    
+    def _count_lookup(self, hit: bool):
+        """Update hit/miss counters"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    @staticmethod
+    def _decision_key(user_id: int, item_id: int, action: str) -> str:
+        return f"{KEY_PREFIX}:decision:{user_id}:{item_id}:{action}"
+    
+    @staticmethod
+    def _user_index_key(user_id: int) -> str:
+        return f"{KEY_PREFIX}:idx:user:{user_id}"
+    
+    @staticmethod
+    def _item_index_key(item_id: int) -> str:
+        return f"{KEY_PREFIX}:idx:item:{item_id}"
+    
+    @staticmethod
+    def _roles_key(user_id: int) -> str:
+        return f"{KEY_PREFIX}:roles:{user_id}"
+    
+    @staticmethod
+    def _item_key(item_id: int) -> str:
+        return f"{KEY_PREFIX}:item:{item_id}"
+    
+    @staticmethod
+    def _authz_version_key(user_id: int) -> str:
+        return f"{KEY_PREFIX}:authz:{user_id}"
@@ -0,0 +1,140 @@
+"""
+Token Verifier
+Shared JWT verifier with a bounded cache of already-verified tokens
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import jwt
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenVerifier:
+    """
+    Verifies bearer tokens, remembering the ones already verified
+    
+    Entries are keyed by a SHA-256 digest of the token, so raw tokens are
+    never held in memory, and expire at the token's own ``exp`` claim. The
+    least recently used entry is evicted once ``max_size`` is reached; a
+    size of 0 disables caching.
+    
+    The optional ``is_revoked`` hook is called with the decoded payload on
+    every verification, cache hits included, so a revoked token is rejected
+    as soon as the hook reports it.
+    """
+    
+    def __init__(
+        self,
+        secret_key: str,
+        algorithm: str = 'HS256',
+        max_size: int = 10000,
+        is_revoked: Optional[Callable[[Dict], bool]] = None
+    ):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.max_size = max_size
+        self.is_revoked = is_revoked
+        self._entries: "OrderedDict[bytes, Tuple[Dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+    
+    def verify(self, token: str) -> Optional[Dict]:
+        """
+        Verify a token and return its payload
+        
+        Args:
+            token: JWT token string
+            
+        Returns:
+            Decoded token payload if valid, None otherwise
+        """
+        digest = hashlib.sha256(token.encode()).digest()
+        payload = self._lookup(digest)
+        
+        if payload is None:
+            try:
+                payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            except jwt.InvalidTokenError as e:
+                logger.warning(f"Invalid token: {e}")
+                with self._lock:
+                    self.rejected += 1
+                return None
+            
+            self._store(digest, payload)
+        
+        if self.is_revoked is not None and self.is_revoked(payload):
+            logger.warning(f"Revoked token for user {payload.get('user_id')}")
+            self.invalidate(token)
+            with self._lock:
+                self.rejected += 1
+            return None
+        
+        return dict(payload)
+    
+    def invalidate(self, token: str):
+        """
+        Forget a verified token, e.g. on logout
+        
+        Args:
+            token: JWT token string
+        """
+        with self._lock:
+            self._entries.pop(hashlib.sha256(token.encode()).digest(), None)
+    
+    def clear(self):
+        """Forget every verified token"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        """
+        Get verifier counters
+        
+        Returns:
+            Dictionary with size, hits, misses, hit ratio and rejected tokens
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'rejected': self.rejected
+            }
+    
+    def _lookup(self, digest: bytes) -> Optional[Dict]:
+        """Return a cached payload that has not reached its exp"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            
+            if entry is None or entry[1] <= time.time():
+                self._entries.pop(digest, None)
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[0]
+    
+    def _store(self, digest: bytes, payload: Dict):
+        """Cache a verified payload until its exp claim"""
+        exp = payload.get('exp')
+        if self.max_size <= 0 or exp is None:
+            return
+        
+        with self._lock:
+            self._entries[digest] = (payload, float(exp))
+            self._entries.move_to_end(digest)
+            
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
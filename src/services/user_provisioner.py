@@ -0,0 +1,332 @@
+"""
+User Provisioner
+Bulk account creation: parallel bcrypt, COPY into a staging table, merge into users
+"""
+import csv
+import io
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import bcrypt
+
+from src.database.connection import DatabaseConnection
+from src.services.password_hasher import PasswordHasher
+
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('ndjson', 'csv')
+
+# (record, error): a parsed input row, or the reason it could not be parsed
+ParsedRecord = Tuple[Optional[Dict], Optional[str]]
+
+_FIELD_LIMITS = {'username': 100, 'email': 255, 'first_name': 100, 'last_name': 100}
+
+EXISTING_QUERY = """
+SELECT username, email FROM users
+WHERE username = ANY(%s) OR email = ANY(%s)
+"""
+
+STAGING_QUERY = """
+CREATE TEMP TABLE user_import (
+    row_num INTEGER NOT NULL,
+    username VARCHAR(100) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    first_name VARCHAR(100),
+    last_name VARCHAR(100)
+) ON COMMIT DROP
+"""
+
+COPY_QUERY = """
+COPY user_import (row_num, username, email, password_hash, first_name, last_name)
+FROM STDIN WITH (FORMAT csv)
+"""
+
+MERGE_QUERY = """
+INSERT INTO users (username, email, password_hash, first_name, last_name)
+SELECT username, email, password_hash, first_name, last_name
+FROM user_import
+ORDER BY row_num
+ON CONFLICT DO NOTHING
+RETURNING id, username
+"""
+
+# Rows that lost a race with a concurrent insert between the pre-check and the merge
+LOST_ROWS_QUERY = """
+SELECT s.row_num, s.username, s.email,
+       EXISTS (SELECT 1 FROM users u WHERE u.username = s.username) AS username_taken
+FROM user_import s
+WHERE s.username <> ALL(%s)
+ORDER BY s.row_num
+"""
+
+
+def read_ndjson(lines: Iterable[str]) -> Iterator[ParsedRecord]:
+    """
+    Parse newline-delimited JSON user records
+    
+    Args:
+        lines: Text lines, one JSON object per line; blank lines are skipped
+        
+    Yields:
+        (record, error) pairs, one per non-blank line
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield None, f"Malformed JSON: {e}"
+            continue
+        
+        if isinstance(record, dict):
+            yield record, None
+        else:
+            yield None, "Record is not a JSON object"
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[ParsedRecord]:
+    """
+    Parse CSV user records with a header row
+    
+    Columns are matched by name (username, email, password, first_name,
+    last_name); any others are ignored.
+    
+    Args:
+        lines: Text lines, starting with the header
+        
+    Yields:
+        (record, error) pairs, one per data row
+    """
+    for row in csv.DictReader(lines):
+        yield {key: value for key, value in row.items() if key is not None}, None
+
+
+def read_records(lines: Iterable[str], fmt: str) -> Iterator[ParsedRecord]:
+    """
+    Parse user records in the given format
+    
+    Args:
+        lines: Text lines
+        fmt: 'ndjson' or 'csv'
+        
+    Yields:
+        (record, error) pairs
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    return read_ndjson(lines) if fmt == 'ndjson' else read_csv(lines)
+
+
+class UserProvisioner:
+    """
+    Creates users in batches instead of one INSERT and one commit per account
+    
+    Each batch is validated and de-duplicated in memory, checked against
+    existing usernames and emails with one query (so conflicting rows never
+    pay for bcrypt), hashed on ``workers`` threads (bcrypt releases the GIL,
+    so this uses every core), loaded into a temporary staging table with
+    COPY and merged into users with a single INSERT ... SELECT in the same
+    transaction. Every row that is not created is reported with its
+    1-based position in the input and the reason.
+    
+    Given a ``password_hasher``, hashing goes through its bounded pool
+    instead, with one caller per hasher worker, so provisioning from a
+    request cannot take more CPU than logins are allowed to.
+    """
+    
+    def __init__(
+        self,
+        db: DatabaseConnection,
+        rounds: int = 12,
+        workers: int = 0,
+        batch_size: int = 1000,
+        min_password_length: int = 8,
+        password_hasher: Optional[PasswordHasher] = None
+    ):
+        self.db = db
+        self.rounds = rounds
+        self.password_hasher = password_hasher
+        if password_hasher is not None:
+            self.workers = password_hasher.max_workers
+        else:
+            self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.min_password_length = min_password_length
+    
+    def provision(
+        self,
+        records: Iterable[ParsedRecord],
+        progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Create users from parsed records
+        
+        Args:
+            records: (record, error) pairs, e.g. from read_records()
+            progress: Called with the running summary after each batch (optional)
+            
+        Returns:
+            Summary with row counts, created user IDs, per-row conflicts and
+            invalid rows, elapsed seconds and users per second
+        """
+        summary = {
+            'processed': 0,
+            'created': 0,
+            'user_ids': [],
+            'conflicts': [],
+            'invalid': [],
+            'elapsed_seconds': 0.0,
+            'users_per_second': 0.0
+        }
+        started = time.perf_counter()
+        numbered = enumerate(records, start=1)
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='rbac-provision') as executor:
+            while True:
+                batch = list(islice(numbered, self.batch_size))
+                if not batch:
+                    break
+                
+                self._provision_batch(batch, executor, summary)
+                
+                summary['processed'] += len(batch)
+                summary['elapsed_seconds'] = time.perf_counter() - started
+                summary['users_per_second'] = summary['created'] / summary['elapsed_seconds']
+                logger.info(
+                    f"Provisioned {summary['processed']} rows: {summary['created']} created, "
+                    f"{len(summary['conflicts'])} conflicts, {len(summary['invalid'])} invalid "
+                    f"({summary['users_per_second']:.1f} users/s)"
+                )
+                if progress is not None:
+                    progress(summary)
+        
+        return summary
+    
+    def _provision_batch(self, batch: List[Tuple[int, ParsedRecord]], executor: ThreadPoolExecutor, summary: Dict):
+        """Validate, hash, stage and merge one batch, updating the summary"""
+        rows = []
+        seen_usernames = set()
+        seen_emails = set()
+        
+        for row_num, (record, error) in batch:
+            if error is None:
+                record = self._normalize(record)
+                error = self._validate(record)
+            if error is not None:
+                summary['invalid'].append({'row': row_num, 'error': error})
+                continue
+            
+            if record['username'] in seen_usernames:
+                self._conflict(summary, row_num, record, 'duplicate_username')
+            elif record['email'] in seen_emails:
+                self._conflict(summary, row_num, record, 'duplicate_email')
+            else:
+                seen_usernames.add(record['username'])
+                seen_emails.add(record['email'])
+                rows.append((row_num, record))
+        
+        if not rows:
+            return
+        
+        existing = self.db.execute_query(EXISTING_QUERY, (list(seen_usernames), list(seen_emails)), primary=True)
+        taken_usernames = {row['username'] for row in existing}
+        taken_emails = {row['email'] for row in existing}
+        
+        fresh = []
+        for row_num, record in rows:
+            if record['username'] in taken_usernames:
+                self._conflict(summary, row_num, record, 'username_exists')
+            elif record['email'] in taken_emails:
+                self._conflict(summary, row_num, record, 'email_exists')
+            else:
+                fresh.append((row_num, record))
+        
+        if not fresh:
+            return
+        
+        hashes = executor.map(self._hash_password, [record['password'] for _, record in fresh])
+        staged = [
+            (row_num, record['username'], record['email'], password_hash,
+             record.get('first_name'), record.get('last_name'))
+            for (row_num, record), password_hash in zip(fresh, hashes)
+        ]
+        
+        self._merge(staged, summary)
+    
+    def _merge(self, staged: List[Tuple], summary: Dict):
+        """COPY hashed rows into the staging table and insert them into users"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(staged)
+        buffer.seek(0)
+        
+        with self.db.get_cursor(commit=True) as cursor:
+            cursor.execute(STAGING_QUERY)
+            cursor.copy_expert(COPY_QUERY, buffer)
+            cursor.execute(MERGE_QUERY)
+            inserted = cursor.fetchall()
+            
+            lost = []
+            if len(inserted) < len(staged):
+                cursor.execute(LOST_ROWS_QUERY, ([row['username'] for row in inserted],))
+                lost = cursor.fetchall()
+        
+        summary['created'] += len(inserted)
+        summary['user_ids'].extend(row['id'] for row in inserted)
+        for row in lost:
+            reason = 'username_exists' if row['username_taken'] else 'email_exists'
+            self._conflict(summary, row['row_num'], row, reason)
+    
+    def _hash_password(self, password: str) -> str:
+        """Hash one password at the configured cost, on the hasher pool when configured"""
+        if self.password_hasher is not None:
+            return self.password_hasher.hash(password)
+        
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('utf-8')
+    
+    @staticmethod
+    def _normalize(record: Dict) -> Dict:
+        """Strip whitespace and turn empty optional fields into NULLs"""
+        normalized = {}
+        for key in ('username', 'email', 'password', 'first_name', 'last_name'):
+            value = record.get(key)
+            if isinstance(value, str) and key != 'password':
+                value = value.strip()
+            normalized[key] = value if value != '' else None
+        return normalized
+    
+    def _validate(self, record: Dict) -> Optional[str]:
+        """Return why a normalized record cannot be created, or None"""
+        for key in ('username', 'email', 'password'):
+            if not record[key]:
+                return f"{key} is required"
+        
+        for key, value in record.items():
+            if value is not None and not isinstance(value, str):
+                return f"{key} must be a string"
+        
+        for key, limit in _FIELD_LIMITS.items():
+            if record[key] is not None and len(record[key]) > limit:
+                return f"{key} is longer than {limit} characters"
+        
+        if len(record['password']) < self.min_password_length:
+            return f"password is shorter than {self.min_password_length} characters"
+        
+        return None
+    
+    @staticmethod
+    def _conflict(summary: Dict, row_num: int, record: Dict, reason: str):
+        """Record a row that was not created because its username or email is taken"""
+        summary['conflicts'].append({
+            'row': row_num,
+            'username': record['username'],
+            'email': record['email'],
+            'reason': reason
+        })
@@ -1,7 +1,9 @@
 """
 Utility functions for database operations
 """
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+from datetime import datetime
+import base64
 import json
 
 
@@ -52,7 +54,103 @@ def paginate_query(query: str, page: int = 1, per_page: int = 50) -> str:
         
     Returns:
         Query with LIMIT and OFFSET added
+    
+    OFFSET reads and discards every skipped row, so deep pages get slower
+    linearly; list endpoints use keyset_paginate instead.
     """
     offset = (page - 1) * per_page
     return f"{query} LIMIT {per_page} OFFSET {offset}"
 
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode the sort key of the last row on a page as an opaque cursor
+    
+    Args:
+        values: Sort key values, e.g. (created_at, id)
+        
+    Returns:
+        URL-safe cursor string
+    """
+    payload = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode())
+    return encoded.decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Args:
+        cursor: Cursor string
+        
+    Returns:
+        List of sort key values
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(payload, list):
+            raise ValueError("Cursor is not a list")
+        return [datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v for v in payload]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+
+
+def keyset_paginate(
+    query: str,
+    conditions: List[str],
+    params: Sequence[Any],
+    order_columns: Sequence[str],
+    after: Optional[Sequence[Any]] = None,
+    limit: Optional[int] = None,
+    descending: bool = True
+) -> Tuple[str, tuple]:
+    """
+    Add WHERE, keyset ORDER BY and LIMIT clauses to a query
+    
+    Rows are ordered by order_columns, which must be NOT NULL, unique
+    together and backed by an index, and the page starts strictly after
+    the sort key in ``after``. The index seek costs the same on every page,
+    unlike OFFSET.
+    
+    Args:
+        query: SELECT ... FROM ... without WHERE, ORDER BY or LIMIT
+        conditions: Filter conditions, joined with AND
+        params: Parameters for the filter conditions
+        order_columns: Sort key columns, e.g. ('created_at', 'id')
+        after: Sort key of the last row of the previous page (optional)
+        limit: Maximum number of rows (optional)
+        descending: Sort newest/largest first
+        
+    Returns:
+        Tuple of (query_string, params_tuple)
+        
+    Raises:
+        ValueError: If after does not match the sort key
+    """
+    conditions = list(conditions)
+    params = list(params)
+    
+    if after is not None:
+        if len(after) != len(order_columns):
+            raise ValueError("Cursor does not match the sort order")
+        
+        operator = '<' if descending else '>'
+        placeholders = ', '.join(['%s'] * len(order_columns))
+        conditions.append(f"({', '.join(order_columns)}) {operator} ({placeholders})")
+        params.extend(after)
+    
+    direction = 'DESC' if descending else 'ASC'
+    
+    if conditions:
+        query += "\nWHERE " + "\nAND ".join(conditions)
+    query += "\nORDER BY " + ', '.join(f"{column} {direction}" for column in order_columns)
+    
+    if limit is not None:
+        query += "\nLIMIT %s"
+        params.append(limit)
+    
+    return query, tuple(params)
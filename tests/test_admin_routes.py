@@ -0,0 +1,130 @@
+"""
+Unit tests for the admin-only bulk endpoints
+"""
+import pytest
+from unittest.mock import Mock, patch
+from flask import Flask
+
+from src.routes import items, roles
+
+
+class TestAdminRoutes:
+    
+    @pytest.fixture
+    def rbac_service(self):
+        """Mock RBAC service behind the routes"""
+        return Mock()
+    
+    @pytest.fixture
+    def app(self, rbac_service):
+        """App with the item routes, a mock database and a token verifier that knows two users"""
+        app = Flask(__name__)
+        app.config['MAX_BULK_ACCESS_SIZE'] = 100
+        app.config['MAX_ROLE_SYNC_USERS'] = 100
+        app.config['MAX_BATCH_CHECK_SIZE'] = 100
+        app.db_connection = Mock()
+        app.db_connection.execute_query.return_value = {'authz_version': 1}
+        app.permission_cache = None
+        app.audit_writer = None
+        
+        tokens = {
+            'admin-token': {'user_id': 7, 'roles': ['admin'], 'authz_version': 1},
+            'viewer-token': {'user_id': 8, 'roles': ['viewer'], 'authz_version': 1}
+        }
+        app.token_verifier = Mock()
+        app.token_verifier.verify.side_effect = tokens.get
+        
+        app.register_blueprint(items.bp, url_prefix='/api/items')
+        app.register_blueprint(roles.bp, url_prefix='/api/roles')
+        
+        with patch.object(items, 'get_rbac_service', return_value=rbac_service), \
+                patch.object(roles, 'get_rbac_service', return_value=rbac_service):
+            yield app
+    
+    def test_bulk_grant_requires_login(self, app, rbac_service):
+        """Test bulk grants are rejected without a token"""
+        response = app.test_client().post('/api/items/access/bulk-grant', json={'grants': []})
+        
+        assert response.status_code == 401
+        rbac_service.grant_item_access_bulk.assert_not_called()
+    
+    def test_bulk_grant_requires_admin(self, app, rbac_service):
+        """Test bulk grants are rejected for users without the admin role"""
+        response = app.test_client().post(
+            '/api/items/access/bulk-grant',
+            json={'grants': [{'item_id': 1, 'user_id': 2, 'permission_id': 3}]},
+            headers={'Authorization': 'Bearer viewer-token'}
+        )
+        
+        assert response.status_code == 403
+        rbac_service.grant_item_access_bulk.assert_not_called()
+    
+    def test_bulk_grant_records_caller_as_granter(self, app, rbac_service):
+        """Test granted_by comes from the token, not the request body"""
+        rbac_service.grant_item_access_bulk.return_value = {'granted': 1}
+        
+        response = app.test_client().post(
+            '/api/items/access/bulk-grant',
+            json={'grants': [{'item_id': 1, 'user_id': 2, 'permission_id': 3}], 'granted_by': 1},
+            headers={'Authorization': 'Bearer admin-token'}
+        )
+        
+        assert response.status_code == 200
+        rbac_service.grant_item_access_bulk.assert_called_once_with([(1, 2, None, 3)], 7, None)
+    
+    def test_bulk_revoke_requires_login(self, app, rbac_service):
+        """Test bulk revocations are rejected without a token"""
+        response = app.test_client().post('/api/items/access/bulk-revoke', json={'access_ids': [1, 2]})
+        
+        assert response.status_code == 401
+        rbac_service.revoke_item_access_bulk.assert_not_called()
+    
+    def test_role_sync_requires_admin(self, app, rbac_service):
+        """Test role syncs are rejected for users without the admin role"""
+        response = app.test_client().post(
+            '/api/roles/sync',
+            json={'users': [{'user_id': 2, 'role_ids': []}]},
+            headers={'Authorization': 'Bearer viewer-token'}
+        )
+        
+        assert response.status_code == 403
+        rbac_service.sync_user_roles.assert_not_called()
+    
+    def test_role_sync_records_caller_as_granter(self, app, rbac_service):
+        """Test role syncs record the authenticated admin as granted_by"""
+        rbac_service.sync_user_roles.return_value = {'added': 1, 'removed': 0}
+        
+        response = app.test_client().post(
+            '/api/roles/sync',
+            json={'users': [{'user_id': 2, 'role_ids': [3]}]},
+            headers={'Authorization': 'Bearer admin-token'}
+        )
+        
+        assert response.status_code == 200
+        rbac_service.sync_user_roles.assert_called_once_with({2: [3]}, 7)
+    
+    def test_batch_check_rejects_boolean_ids(self, app, rbac_service):
+        """Test JSON booleans are not accepted as user or item IDs"""
+        response = app.test_client().post('/api/items/check-access/batch', json={
+            'checks': [{'user_id': 1, 'item_id': 100}, {'user_id': True, 'item_id': 100}]
+        })
+        
+        assert response.status_code == 400
+        assert response.get_json() == {'error': 'checks[1] requires integer user_id and item_id'}
+        rbac_service.check_user_permissions_batch.assert_not_called()
+    
+    def test_set_role_parent_requires_login(self, app, rbac_service):
+        """Test role inheritance cannot be changed without a token"""
+        response = app.test_client().put('/api/roles/5/parent', json={'parent_role_id': 1})
+        
+        assert response.status_code == 401
+        rbac_service.set_role_parent.assert_not_called()
+    
+    def test_set_role_parent_requires_admin(self, app, rbac_service):
+        """Test role inheritance cannot be changed by users without the admin role"""
+        response = app.test_client().put(
+            '/api/roles/5/parent', json={'parent_role_id': 1}, headers={'Authorization': 'Bearer viewer-token'}
+        )
+        
+        assert response.status_code == 403
+        rbac_service.set_role_parent.assert_not_called()
@@ -0,0 +1,319 @@
+"""
+Unit tests for the async services and ASGI routes
+"""
+import asyncio
+import json
+import threading
+
+import bcrypt
+import jwt
+import pytest
+from a2wsgi import WSGIMiddleware
+from unittest.mock import AsyncMock, Mock, patch
+from flask import Flask
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from src.routes import asgi as asgi_routes
+from src.services.async_auth_service import AsyncAuthService
+from src.services.async_rbac_service import AsyncRBACService
+from src.services.password_hasher import PasswordHasher, PasswordHasherBusy
+from src.services.permission_cache import PermissionCache
+
+
+def call(app, method, path, body=None, query_string=b'', headers=None):
+    """Send one request through an ASGI app; returns (status, headers, body)"""
+    payload = json.dumps(body).encode() if body is not None else b''
+    request_headers = [(b'content-type', b'application/json')]
+    request_headers += [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': query_string, 'root_path': '', 'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80), 'headers': request_headers
+    }
+    messages = []
+    
+    async def receive():
+        return {'type': 'http.request', 'body': payload, 'more_body': False}
+    
+    async def send(message):
+        messages.append(message)
+    
+    asyncio.run(app(scope, receive, send))
+    
+    headers = {key.decode(): value.decode() for key, value in messages[0]['headers']}
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return messages[0]['status'], headers, body
+
+
+class TestAsyncRBACService:
+    
+    @pytest.fixture
+    def mock_db(self):
+        """Mock async database connection"""
+        return AsyncMock()
+    
+    @pytest.fixture
+    def cache(self):
+        """In-process permission cache"""
+        return PermissionCache(max_size=100, ttl=60)
+    
+    @pytest.fixture
+    def rbac_service(self, mock_db, cache):
+        """Async RBAC service with a mock database and a real cache"""
+        return AsyncRBACService(mock_db, cache)
+    
+    def test_check_user_permission_granted(self, rbac_service, mock_db):
+        """Test a check runs the sync service's query and logs the attempt"""
+        mock_db.execute_query.return_value = {'count': 1, 'expires_in': None}
+        
+        assert asyncio.run(rbac_service.check_user_permission(1, 100, 'read')) is True
+        
+        _, params = mock_db.execute_query.call_args[0]
+        assert params == (1, 'read', 100)
+        mock_db.execute_update.assert_awaited_once()
+    
+    def test_check_user_permission_cached(self, rbac_service, mock_db):
+        """Test a cached decision skips the database"""
+        mock_db.execute_query.return_value = {'count': 0}
+        
+        asyncio.run(rbac_service.check_user_permission(1, 100, 'delete'))
+        result = asyncio.run(rbac_service.check_user_permission(1, 100, 'delete'))
+        
+        assert result is False
+        assert mock_db.execute_query.await_count == 1
+    
+    def test_check_user_permissions_batch(self, rbac_service, mock_db):
+        """Test batch decisions come back in request order and are logged in one call"""
+        mock_db.execute_query.return_value = [
+            {'user_id': 1, 'item_id': 100, 'action': 'read', 'count': 1, 'expires_in': None},
+            {'user_id': 2, 'item_id': 200, 'action': 'write', 'count': 0, 'expires_in': None}
+        ]
+        mock_db.execute_update.return_value = 2
+        
+        results = asyncio.run(rbac_service.check_user_permissions_batch([(2, 200, 'write'), (1, 100, 'read')]))
+        
+        assert results == [False, True]
+        mock_db.execute_update.assert_awaited_once()
+        _, (user_ids, item_ids, actions, granted) = mock_db.execute_update.call_args[0]
+        assert (user_ids, granted) == ([2, 1], [False, True])
+    
+    def test_revoke_item_access_invalidates_cache(self, rbac_service, mock_db, cache):
+        """Test revoking drops the grantee's cached decisions for the item"""
+        cache.set(1, 100, 'read', True)
+        mock_db.execute_query.return_value = {'item_id': 100, 'user_id': 1, 'role_id': None}
+        
+        assert asyncio.run(rbac_service.revoke_item_access(7)) is True
+        assert cache.get(1, 100, 'read') is None
+    
+    def test_revoke_missing_access(self, rbac_service, mock_db):
+        """Test revoking an unknown access record reports failure"""
+        mock_db.execute_query.return_value = None
+        
+        assert asyncio.run(rbac_service.revoke_item_access(7)) is False
+    
+    def test_shared_cache_and_audit_keep_off_event_loop(self, mock_db):
+        """Test a Redis-backed cache runs in a worker thread and audit rows are queued without waiting"""
+        threads = []
+        shared_cache = Mock()
+        shared_cache.get.side_effect = lambda *check: threads.append(threading.current_thread()) or True
+        audit_writer = Mock()
+        audit_writer.offer.return_value = True
+        rbac_service = AsyncRBACService(mock_db, shared_cache, audit_writer)
+        
+        assert asyncio.run(rbac_service.check_user_permission(1, 100, 'read')) is True
+        
+        assert threads and threads[0] is not threading.main_thread()
+        audit_writer.offer.assert_called_once_with((1, 100, 'read', True, None, None))
+        audit_writer.submit_many.assert_not_called()
+
+
+class TestAsyncAuthService:
+    
+    @pytest.fixture
+    def mock_db(self):
+        """Mock async database connection"""
+        return AsyncMock()
+    
+    @pytest.fixture
+    def auth_service(self, mock_db):
+        """Async auth service instance with mock database"""
+        return AsyncAuthService(mock_db)
+    
+    @pytest.fixture
+    def user_row(self):
+        """User row with a low-cost bcrypt hash of 'password123'"""
+        return {
+            'id': 1,
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password_hash': bcrypt.hashpw(b'password123', bcrypt.gensalt(4)).decode()
+        }
+    
+    def test_authenticate_user_success(self, auth_service, mock_db, user_row):
+        """Test a login returns a token carrying the user's role claims"""
+        mock_db.execute_query.side_effect = [user_row, {'roles': ['editor'], 'authz_version': 3, 'roles_exp': None}]
+        
+        with patch.object(auth_service, '_needs_rehash', return_value=False):
+            with patch.object(auth_service.config, 'REFRESH_TOKENS_ENABLED', False):
+                result = asyncio.run(auth_service.authenticate_user('testuser', 'password123'))
+        
+        payload = jwt.decode(result['token'], options={'verify_signature': False})
+        assert result['username'] == 'testuser'
+        assert payload['roles'] == ['editor']
+        mock_db.execute_update.assert_awaited_once()
+    
+    def test_authenticate_user_invalid_password(self, auth_service, mock_db, user_row):
+        """Test a wrong password is rejected without updating last_login"""
+        mock_db.execute_query.return_value = user_row
+        
+        assert asyncio.run(auth_service.authenticate_user('testuser', 'wrongpassword')) is None
+        mock_db.execute_update.assert_not_awaited()
+    
+    def test_authenticate_user_on_password_hasher(self, mock_db, user_row):
+        """Test passwords are checked on the hasher pool when one is configured"""
+        hasher = PasswordHasher(rounds=4, max_workers=1, max_pending=1)
+        auth_service = AsyncAuthService(mock_db, password_hasher=hasher)
+        mock_db.execute_query.return_value = user_row
+        
+        try:
+            assert asyncio.run(auth_service.authenticate_user('testuser', 'wrongpassword')) is None
+        finally:
+            hasher.shutdown()
+        
+        assert hasher.stats()['verified'] == 1
+    
+    def test_create_user_busy_hasher(self, mock_db):
+        """Test a full hasher backlog is reported at once, before any thread is used"""
+        hasher = PasswordHasher(rounds=4, max_workers=1, max_pending=1)
+        hasher._slots.acquire()
+        auth_service = AsyncAuthService(mock_db, password_hasher=hasher)
+        
+        try:
+            with patch('src.services.async_auth_service.asyncio.to_thread') as to_thread:
+                with pytest.raises(PasswordHasherBusy):
+                    asyncio.run(auth_service.create_user('newuser', 'new@example.com', 'password123'))
+        finally:
+            hasher.shutdown()
+        
+        to_thread.assert_not_called()
+        mock_db.execute_query.assert_not_awaited()
+    
+    def test_revoke_refresh_token(self, auth_service, mock_db):
+        """Test revoking reports the user whose tokens were revoked"""
+        mock_db.execute_query.return_value = {'id': 4}
+        
+        assert asyncio.run(auth_service.revoke_refresh_token('opaque-token')) == 4
+
+
+class TestAsyncRoutes:
+    
+    @pytest.fixture
+    def mock_db(self):
+        """Mock async database connection"""
+        return AsyncMock()
+    
+    @pytest.fixture
+    def flask_app(self):
+        """Flask app standing in for create_app(), with one route of its own"""
+        flask_app = Flask(__name__)
+        flask_app.permission_cache = None
+        flask_app.audit_writer = Mock()
+        flask_app.token_verifier = None
+        flask_app.password_hasher = None
+        flask_app.login_throttle = None
+        
+        @flask_app.route('/api/items/export')
+        def export_items():
+            return {'served_by': 'flask'}
+        
+        return flask_app
+    
+    @pytest.fixture
+    def app(self, mock_db, flask_app):
+        """ASGI app with the async routes in front of the Flask app"""
+        app = Starlette(routes=asgi_routes.routes + [Mount('/', app=WSGIMiddleware(flask_app))])
+        app.state.flask_app = flask_app
+        app.state.db = mock_db
+        return app
+    
+    def test_check_access(self, app, mock_db, flask_app):
+        """Test the async check-access route answers exactly like the Flask view"""
+        mock_db.execute_query.return_value = {'count': 1, 'expires_in': None}
+        
+        status, headers, body = call(app, 'POST', '/api/items/100/check-access', {'user_id': 1})
+        
+        assert status == 200
+        assert headers['content-type'] == 'application/json'
+        assert body == b'{"action":"read","has_access":true,"item_id":100,"user_id":1}\n'
+        flask_app.audit_writer.offer.assert_called_once_with((1, 100, 'read', True, None, None))
+    
+    def test_check_access_requires_user_id(self, app):
+        """Test a missing user_id is rejected before any query"""
+        status, _, body = call(app, 'POST', '/api/items/100/check-access', {})
+        
+        assert status == 400
+        assert json.loads(body) == {'error': 'user_id required'}
+    
+    def test_list_page_sets_next_cursor(self, app, mock_db):
+        """Test list endpoints fetch limit + 1 rows and send a cursor when more follow"""
+        mock_db.execute_query.return_value = [{'id': 1, 'name': 'admin'}, {'id': 2, 'name': 'editor'}]
+        
+        status, headers, body = call(app, 'GET', '/api/roles', query_string=b'limit=1')
+        
+        assert status == 200
+        assert json.loads(body) == [{'id': 1, 'name': 'admin'}]
+        assert 'x-next-cursor' in headers
+    
+    def test_set_role_parent_requires_login(self, app, mock_db):
+        """Test the async role parent route rejects requests without a token"""
+        status, _, body = call(app, 'PUT', '/api/roles/5/parent', {'parent_role_id': 1})
+        
+        assert status == 401
+        assert json.loads(body) == {'error': 'Authorization header required'}
+        mock_db.execute_update.assert_not_awaited()
+    
+    def test_login_rejects_non_string_username(self, app, flask_app):
+        """Test a username that is not a string is rejected before the throttle"""
+        flask_app.login_throttle = Mock()
+        
+        status, _, body = call(app, 'POST', '/api/auth/login', {'username': ['alice'], 'password': 'secret'})
+        
+        assert status == 400
+        assert json.loads(body) == {'error': 'Username and password must be strings'}
+        flask_app.login_throttle.check.assert_not_called()
+    
+    def test_login_throttles_peer_address_by_default(self, app, flask_app):
+        """Test X-Forwarded-For is ignored unless proxies are trusted"""
+        flask_app.login_throttle = Mock()
+        flask_app.login_throttle.check.return_value = 30
+        
+        status, _, _ = call(
+            app, 'POST', '/api/auth/login', {'username': 'alice', 'password': 'secret'},
+            headers={'X-Forwarded-For': '203.0.113.9'}
+        )
+        
+        assert status == 429
+        flask_app.login_throttle.check.assert_called_once_with('alice', '127.0.0.1')
+    
+    def test_login_throttles_forwarded_address(self, app, flask_app):
+        """Test the client address appended by a trusted proxy is throttled, not a spoofed one"""
+        flask_app.login_throttle = Mock()
+        flask_app.login_throttle.check.return_value = 30
+        
+        with patch.object(asgi_routes.Config, 'TRUSTED_PROXY_COUNT', 1):
+            status, _, _ = call(
+                app, 'POST', '/api/auth/login', {'username': 'alice', 'password': 'secret'},
+                headers={'X-Forwarded-For': '10.0.0.1, 203.0.113.9'}
+            )
+        
+        assert status == 429
+        flask_app.login_throttle.check.assert_called_once_with('alice', '203.0.113.9')
+    
+    def test_other_routes_fall_through_to_flask(self, app):
+        """Test paths without an async handler are served by the Flask app"""
+        status, _, body = call(app, 'GET', '/api/items/export')
+        
+        assert status == 200
+        assert json.loads(body) == {'served_by': 'flask'}
@@ -0,0 +1,148 @@
+"""
+Unit tests for the buffered Audit Writer
+"""
+import os
+from unittest.mock import Mock
+
+import psycopg2
+import pytest
+
+from src.services.audit_writer import AuditWriter
+
+
+class TestAuditWriter:
+
+    @pytest.fixture
+    def mock_db(self):
+        """Mock database connection"""
+        return Mock()
+    
+    def written_rows(self, mock_db):
+        """All rows passed to execute_values"""
+        return [row for call in mock_db.execute_values.call_args_list for row in call[0][1]]
+    
+    def test_rows_flushed_in_batches(self, mock_db):
+        """Test queued rows are written with multi-row inserts"""
+        writer = AuditWriter(mock_db, batch_size=2, flush_interval=0.05)
+        writer.start()
+        
+        for item_id in range(5):
+            writer.submit(1, item_id, 'read', True)
+        
+        assert writer.flush(timeout=2)
+        writer.stop()
+        
+        assert len(self.written_rows(mock_db)) == 5
+        assert all(len(call[0][1]) <= 2 for call in mock_db.execute_values.call_args_list)
+        assert writer.stats()['written'] == 5
+    
+    def test_stop_flushes_remaining_rows(self, mock_db):
+        """Test shutdown writes everything still queued"""
+        writer = AuditWriter(mock_db, batch_size=100, flush_interval=60)
+        writer.start()
+        writer.submit_many([(1, 100, 'read', True, None, None), (2, 100, 'read', False, None, None)])
+        
+        writer.stop()
+        
+        assert len(self.written_rows(mock_db)) == 2
+    
+    def test_drop_policy_counts_overflow(self, mock_db):
+        """Test rows are dropped and counted when the queue is full"""
+        writer = AuditWriter(mock_db, max_queue_size=2, overflow_policy='drop')
+        
+        results = [writer.submit(1, item_id, 'read', True) for item_id in range(3)]
+        
+        assert results == [True, True, False]
+        stats = writer.stats()
+        assert stats['dropped'] == 1
+        assert stats['queue_depth'] == 2
+    
+    def test_offer_never_waits(self, mock_db):
+        """Test offer refuses a row at once when the queue is full, even under the block policy"""
+        writer = AuditWriter(mock_db, max_queue_size=1, overflow_policy='block', block_timeout=60)
+        
+        assert writer.offer((1, 100, 'read', True, None, None)) is True
+        assert writer.offer((1, 101, 'read', True, None, None)) is False
+        
+        stats = writer.stats()
+        assert (stats['enqueued'], stats['dropped'], stats['queue_depth']) == (1, 0, 1)
+        assert writer._pending == 1
+    
+    def test_spill_policy_replays_from_disk(self, mock_db, tmp_path):
+        """Test overflow spills to disk and is written back once idle"""
+        spill_path = str(tmp_path / 'spill.ndjson')
+        writer = AuditWriter(
+            mock_db,
+            max_queue_size=1,
+            flush_interval=0.05,
+            overflow_policy='spill',
+            spill_path=spill_path
+        )
+        
+        writer.submit(1, 100, 'read', True)
+        writer.submit(1, 101, 'read', False)
+        assert os.path.exists(spill_path)
+        
+        writer.start()
+        writer.stop()
+        
+        assert sorted(row[1] for row in self.written_rows(mock_db)) == [100, 101]
+        assert writer.stats()['spilled'] == 1
+        assert not os.path.exists(spill_path)
+    
+    def test_replay_skips_malformed_lines(self, mock_db, tmp_path):
+        """Test bad spill lines are kept aside while the valid rows are written"""
+        spill_path = tmp_path / 'spill.ndjson'
+        spill_path.write_text('[1, 100, "read", true, null, null]\n{not json\n[1, 2]\n')
+        writer = AuditWriter(mock_db, overflow_policy='spill', spill_path=str(spill_path))
+        
+        writer._replay_spill()
+        
+        assert self.written_rows(mock_db) == [(1, 100, 'read', True, None, None)]
+        assert (tmp_path / 'spill.ndjson.rejected').read_text() == '{not json\n[1, 2]\n'
+        assert writer.stats()['failed'] == 2
+    
+    def test_unreadable_spill_file_moved_aside(self, mock_db, tmp_path):
+        """Test a spill file that cannot be decoded is renamed and the worker keeps writing"""
+        spill_path = tmp_path / 'spill.ndjson'
+        spill_path.write_bytes(b'\xff\xfe not utf-8\n')
+        writer = AuditWriter(mock_db, flush_interval=0.05, overflow_policy='spill', spill_path=str(spill_path))
+        
+        writer.start()
+        writer.submit(1, 100, 'read', True)
+        assert writer.flush(timeout=2)
+        writer.stop()
+        
+        assert [row[1] for row in self.written_rows(mock_db)] == [100]
+        assert len(list(tmp_path.glob('spill.ndjson.*.replay.*.bad'))) == 1
+        assert not list(tmp_path.glob('*.replay'))
+    
+    def test_refused_row_does_not_block_its_batch(self, mock_db, tmp_path):
+        """Test a row violating a foreign key is rejected while the rest of its batch is written"""
+        def insert(query, rows, sticky=True):
+            if any(row[1] == 999 for row in rows):
+                raise psycopg2.errors.ForeignKeyViolation('item 999 does not exist')
+            return len(rows)
+        
+        mock_db.execute_values.side_effect = insert
+        spill_path = tmp_path / 'spill.ndjson'
+        writer = AuditWriter(mock_db, batch_size=10, flush_interval=60, overflow_policy='spill',
+                             spill_path=str(spill_path))
+        writer.start()
+        writer.submit_many([(1, 100, 'read', True, None, None), (1, 999, 'read', False, None, None),
+                            (1, 101, 'read', True, None, None)])
+        writer.stop()
+        
+        inserted = [rows for rows in (call[0][1] for call in mock_db.execute_values.call_args_list)
+                    if all(row[1] != 999 for row in rows)]
+        assert [row[1] for rows in inserted for row in rows] == [100, 101]
+        assert (tmp_path / 'spill.ndjson.rejected').read_text() == '[1, 999, "read", false, null, null]\n'
+        assert not spill_path.exists()
+        stats = writer.stats()
+        assert stats['written'] == 2
+        assert stats['failed'] == 1
+    
+    def test_invalid_policy_rejected(self, mock_db):
+        """Test unknown overflow policies are rejected"""
+        with pytest.raises(ValueError):
+            AuditWriter(mock_db, overflow_policy='ignore')
@@ -71,4 +71,68 @@ class TestAuthService:
         
         assert user_id == 1
         assert mock_db.execute_query.called
-
+    
+    def test_generate_token_embeds_role_claims(self, auth_service, mock_db):
+        """Test tokens carry role names and the authorization version"""
+        mock_db.execute_query.return_value = {
+            'authz_version': 3,
+            'roles': ['viewer', 'editor'],
+            'roles_exp': None
+        }
+        
+        token = auth_service._generate_token({'id': 1, 'username': 'testuser', 'email': 'test@example.com'})
+        payload = auth_service.verify_token(token)
+        
+        assert payload['authz_version'] == 3
+        assert payload['roles'] == ['editor', 'viewer']
+    
+    def test_authenticate_user_upgrades_old_hash(self, auth_service, mock_db):
+        """Test a login with a hash at an outdated cost stores a new hash"""
+        mock_db.execute_query.return_value = {
+            'id': 1,
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password_hash': '$2b$04$dummy_hash'
+        }
+        
+        with patch.object(auth_service, '_verify_password', return_value=True):
+            with patch.object(auth_service, '_hash_password', return_value='new_hash'):
+                with patch.object(auth_service, '_generate_token', return_value='dummy_token'):
+                    auth_service.authenticate_user('testuser', 'password123')
+        
+        rehash = mock_db.execute_update.call_args_list[0][0]
+        assert 'password_hash' in rehash[0]
+        assert rehash[1] == ('new_hash', 1)
+    
+    def test_refresh_access_token_rotates(self, auth_service, mock_db):
+        """Test a valid refresh token yields a new access token and a new refresh token"""
+        mock_db.execute_query.return_value = {
+            'id': 1,
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'is_active': True,
+            'family_id': 'f0f0f0f0-0000-0000-0000-000000000000'
+        }
+        
+        with patch.object(auth_service, '_verify_password') as verify_password:
+            with patch.object(auth_service, '_generate_token', return_value='dummy_token'):
+                result = auth_service.refresh_access_token('old-refresh-token')
+        
+        assert result['token'] == 'dummy_token'
+        assert result['refresh_token'] != 'old-refresh-token'
+        assert not verify_password.called
+        
+        insert_params = mock_db.execute_update.call_args[0][1]
+        assert insert_params[0] == 1
+        assert insert_params[2] == 'f0f0f0f0-0000-0000-0000-000000000000'
+    
+    def test_refresh_token_reuse_revokes_family(self, auth_service, mock_db):
+        """Test replaying a consumed refresh token fails and revokes its family"""
+        mock_db.execute_query.side_effect = [None, {'id': 1}]
+        
+        result = auth_service.refresh_access_token('used-refresh-token')
+        
+        assert result is None
+        revoke_query = mock_db.execute_query.call_args[0][0]
+        assert 'family_id' in revoke_query
+        assert 'authz_version = authz_version + 1' in revoke_query
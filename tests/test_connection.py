@@ -0,0 +1,115 @@
+"""
+Unit tests for the database connection manager
+"""
+import pytest
+from unittest.mock import Mock
+
+from psycopg2 import errors
+
+from src.database.connection import DatabaseConnection
+
+
+class TestIterQuery:
+    
+    @pytest.fixture
+    def conn(self):
+        """Mock psycopg2 connection whose cursor returns three rows in two fetches"""
+        conn = Mock(closed=False)
+        conn.cursor.return_value.fetchmany.side_effect = [[{'id': 1}, {'id': 2}], [{'id': 3}], []]
+        return conn
+    
+    @pytest.fixture
+    def db(self, conn):
+        """Database connection with a mock pool"""
+        db = DatabaseConnection()
+        db._connection_pool = Mock()
+        db._connection_pool.getconn.return_value = conn
+        return db
+    
+    def test_streams_rows_through_named_cursor(self, db, conn):
+        """Test rows are fetched in chunks from a named server-side cursor"""
+        rows = list(db.iter_query("SELECT * FROM items", itersize=2))
+        
+        assert [row['id'] for row in rows] == [1, 2, 3]
+        assert conn.cursor.call_args[1]['name'].startswith('rbac_stream_')
+        conn.cursor.return_value.fetchmany.assert_called_with(2)
+        db._connection_pool.putconn.assert_called_once_with(conn)
+    
+    def test_no_connection_until_iterated(self, db):
+        """Test creating the generator does not check out a connection"""
+        db.iter_query("SELECT * FROM items")
+        
+        assert not db._connection_pool.getconn.called
+    
+    def test_early_close_releases_connection(self, db, conn):
+        """Test a consumer that stops early still closes the cursor and releases the connection"""
+        rows = db.iter_query("SELECT * FROM items")
+        next(rows)
+        rows.close()
+        
+        conn.cursor.return_value.close.assert_called_once()
+        conn.rollback.assert_called_once()
+        db._connection_pool.putconn.assert_called_once_with(conn)
+
+
+class TestPreparedStatements:
+    
+    QUERY = "SELECT * FROM effective_access WHERE user_id IN (%s, 0) AND item_id = %s"
+    
+    @pytest.fixture
+    def cursor(self):
+        """Mock cursor bound to a mock connection"""
+        cursor = Mock()
+        cursor.connection = Mock(closed=False)
+        cursor.connection.cursor.return_value = cursor
+        return cursor
+    
+    @pytest.fixture
+    def db(self, cursor):
+        """Database connection with prepared statements enabled and a mock pool"""
+        db = DatabaseConnection()
+        db.use_prepared_statements = True
+        db._connection_pool = Mock()
+        db._connection_pool.getconn.return_value = cursor.connection
+        return db
+    
+    def test_prepares_once_per_connection(self, db, cursor):
+        """Test the first call prepares the statement and later calls only execute it"""
+        db.execute_query(self.QUERY, (1, 100), prepare='check')
+        db.execute_query(self.QUERY, (1, 101), prepare='check')
+        
+        statements = [call[0][0] for call in cursor.execute.call_args_list]
+        assert statements == [
+            "PREPARE check AS SELECT * FROM effective_access WHERE user_id IN ($1, 0) AND item_id = $2",
+            "EXECUTE check (%s, %s)",
+            "EXECUTE check (%s, %s)",
+        ]
+        assert cursor.execute.call_args[0][1] == (1, 101)
+    
+    def test_reprepares_lost_statement(self, db, cursor):
+        """Test a statement dropped on the server is prepared again transparently"""
+        db.execute_query(self.QUERY, (1, 100), prepare='check')
+        cursor.execute.reset_mock()
+        cursor.execute.side_effect = [errors.InvalidSqlStatementName(), None, None]
+        
+        db.execute_query(self.QUERY, (1, 100), prepare='check')
+        
+        statements = [call[0][0] for call in cursor.execute.call_args_list]
+        assert statements[1].startswith("PREPARE check AS")
+        assert statements[2] == "EXECUTE check (%s, %s)"
+        cursor.connection.rollback.assert_called_once()
+    
+    def test_disabled_runs_plain_sql(self, db, cursor):
+        """Test the statement name is ignored when prepared statements are off"""
+        db.use_prepared_statements = False
+        
+        db.execute_query(self.QUERY, (1, 100), prepare='check')
+        
+        cursor.execute.assert_called_once_with(self.QUERY, (1, 100))
+    
+    def test_name_reused_for_other_sql(self, db):
+        """Test one name cannot be registered for two different queries"""
+        db.register_statement('check', self.QUERY)
+        
+        with pytest.raises(ValueError):
+            db.register_statement('check', "SELECT 1")
@@ -0,0 +1,195 @@
+"""
+Unit tests for the login throttle
+
+The shared-backend test runs against a local redis-server (TEST_REDIS_URL,
+default redis://localhost:6379/15) and is skipped when it is not reachable.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+
+import pytest
+import redis
+from flask import Flask
+
+from src.routes import auth
+from src.services.login_throttle import LoginThrottle, MemoryThrottleBackend, RedisThrottleBackend
+
+
+TEST_REDIS_URL = os.getenv('TEST_REDIS_URL', 'redis://localhost:6379/15')
+
+
+def fail(throttle, username, ip_address):
+    """Run one allowed login attempt that fails"""
+    assert throttle.check(username, ip_address) is None
+    throttle.record_failure(username, ip_address)
+
+
+class TestLoginThrottle:
+    
+    @pytest.fixture
+    def throttle(self):
+        """Throttle allowing 3 failures per username and 5 per IP"""
+        return LoginThrottle(max_attempts=3, max_attempts_per_ip=5, window=60)
+    
+    def test_blocks_username_after_max_failures(self, throttle):
+        """Test a username is rejected once it reaches max_attempts"""
+        for _ in range(3):
+            assert throttle.check('alice', '10.0.0.1') is None
+            throttle.record_failure('Alice', '10.0.0.1')
+        
+        retry_after = throttle.check('alice', '10.0.0.2')
+        
+        assert 0 < retry_after <= 60
+        assert throttle.stats()['rejected_username'] == 1
+    
+    def test_success_resets_username(self, throttle):
+        """Test a successful login clears the username's failures"""
+        for _ in range(3):
+            fail(throttle, 'alice', '10.0.0.1')
+        
+        throttle.reset('alice')
+        
+        assert throttle.check('alice', '10.0.0.1') is None
+    
+    def test_blocks_ip_across_usernames(self, throttle):
+        """Test one IP spraying many usernames hits the per-IP limit"""
+        for index in range(5):
+            fail(throttle, f'user{index}', '10.0.0.1')
+        
+        assert throttle.check('someone-else', '10.0.0.1') is not None
+        assert throttle.check('someone-else', '10.0.0.2') is None
+        assert throttle.stats()['rejected_ip'] == 1
+    
+    def test_failures_leave_window(self, throttle):
+        """Test failures older than the window no longer count"""
+        for _ in range(3):
+            fail(throttle, 'alice', None)
+        
+        later = time.monotonic() + 61
+        with patch('src.services.login_throttle.time.monotonic', return_value=later):
+            assert throttle.check('alice', None) is None
+    
+    def test_concurrent_attempts_cannot_overshoot(self, throttle):
+        """Test a burst of parallel attempts is cut off at max_attempts before any fails"""
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(lambda _: throttle.check('alice', None), range(20)))
+        
+        assert results.count(None) == 3
+    
+    def test_success_gives_back_ip_attempt(self, throttle):
+        """Test successful logins from a shared IP do not use up its limit"""
+        for index in range(10):
+            assert throttle.check(f'user{index}', '10.0.0.1') is None
+            throttle.reset(f'user{index}', '10.0.0.1')
+        
+        assert throttle.check('alice', '10.0.0.1') is None
+    
+    def test_release_returns_attempt(self, throttle):
+        """Test attempts that never reached bcrypt are given back"""
+        for _ in range(5):
+            assert throttle.check('alice', '10.0.0.1') is None
+            throttle.release('alice', '10.0.0.1')
+        
+        assert throttle.check('alice', '10.0.0.1') is None
+    
+    def test_memory_backend_bounded(self):
+        """Test the memory backend drops the oldest keys past max_keys"""
+        backend = MemoryThrottleBackend(max_keys=2)
+        for key in ('a', 'b', 'c'):
+            backend.reserve(key, 60, 1)
+        
+        assert backend.reserve('a', 60, 1) is None
+        assert backend.reserve('c', 60, 1) is not None
+    
+    def test_redis_backend_fails_open(self):
+        """Test Redis errors allow the attempt instead of blocking logins"""
+        client = Mock()
+        client.register_script.return_value.side_effect = redis.ConnectionError('down')
+        throttle = LoginThrottle(max_attempts=1, backend=RedisThrottleBackend('', client=client))
+        
+        fail(throttle, 'alice', '10.0.0.1')
+        
+        assert throttle.check('alice', '10.0.0.1') is None
+    
+    def test_redis_backend_shared(self):
+        """Test failures recorded by one node block the username on another"""
+        client = redis.Redis.from_url(TEST_REDIS_URL, socket_connect_timeout=0.5)
+        try:
+            client.flushdb()
+        except redis.RedisError:
+            pytest.skip('redis-server not available')
+        
+        nodes = [LoginThrottle(max_attempts=2, backend=RedisThrottleBackend(TEST_REDIS_URL)) for _ in range(2)]
+        fail(nodes[0], 'alice', None)
+        fail(nodes[1], 'alice', None)
+        
+        try:
+            assert nodes[0].check('alice', None) is not None
+        finally:
+            client.flushdb()
+    
+    def test_redis_reserve_is_atomic(self):
+        """Test parallel attempts on different nodes share one limit"""
+        client = redis.Redis.from_url(TEST_REDIS_URL, socket_connect_timeout=0.5)
+        try:
+            client.flushdb()
+        except redis.RedisError:
+            pytest.skip('redis-server not available')
+        
+        nodes = [LoginThrottle(max_attempts=2, backend=RedisThrottleBackend(TEST_REDIS_URL)) for _ in range(4)]
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(lambda index: nodes[index % 4].check('alice', None), range(16)))
+            
+            assert results.count(None) == 2
+        finally:
+            client.flushdb()
+
+
+class TestLoginRoute:
+    
+    @pytest.fixture
+    def auth_service(self):
+        """Mock auth service behind the login route"""
+        return Mock()
+    
+    @pytest.fixture
+    def app(self, auth_service):
+        """App with the auth routes and a mock throttle"""
+        app = Flask(__name__)
+        app.login_throttle = Mock()
+        app.login_throttle.check.return_value = None
+        app.register_blueprint(auth.bp, url_prefix='/api/auth')
+        
+        with patch.object(auth, 'get_auth_service', return_value=auth_service):
+            yield app
+    
+    def test_rejects_non_string_username(self, app, auth_service):
+        """Test a username that is not a string is rejected before the throttle"""
+        response = app.test_client().post('/api/auth/login', json={'username': {'$ne': ''}, 'password': 'secret'})
+        
+        assert response.status_code == 400
+        app.login_throttle.check.assert_not_called()
+        auth_service.authenticate_user.assert_not_called()
+    
+    def test_rejects_non_object_body(self, app):
+        """Test a JSON body that is not an object is rejected"""
+        response = app.test_client().post('/api/auth/login', json=['alice', 'secret'])
+        
+        assert response.status_code == 400
+        app.login_throttle.check.assert_not_called()
+    
+    def test_failure_recorded_against_client_address(self, app, auth_service):
+        """Test failed logins count against the username and the client address"""
+        auth_service.authenticate_user.return_value = None
+        
+        response = app.test_client().post(
+            '/api/auth/login', json={'username': 'alice', 'password': 'wrong'},
+            environ_base={'REMOTE_ADDR': '203.0.113.9'}
+        )
+        
+        assert response.status_code == 401
+        app.login_throttle.check.assert_called_once_with('alice', '203.0.113.9')
+        app.login_throttle.record_failure.assert_called_once_with('alice', '203.0.113.9')
@@ -0,0 +1,126 @@
+"""
+Unit tests for Prometheus metrics
+"""
+import pytest
+from unittest.mock import Mock
+from flask import Flask, jsonify
+
+from prometheus_client import REGISTRY
+
+from src import metrics
+from src.database.connection import DatabaseConnection
+
+
+def _sample(name, **labels):
+    """Current value of a sample in the default registry (0 if never recorded)"""
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestFingerprint:
+    
+    def test_literals_and_parameters_are_normalized(self):
+        """Test statements differing only in literals, placeholders and whitespace share a fingerprint"""
+        first = metrics.fingerprint("SELECT * FROM items\n  WHERE id = %s AND item_type = 'doc' -- hot path")
+        second = metrics.fingerprint("SELECT * FROM items WHERE id = 42 AND item_type = 'report'")
+        
+        assert first == second
+        assert first[1] == "SELECT * FROM items WHERE id = ? AND item_type = ?"
+    
+    def test_in_lists_collapse(self):
+        """Test IN lists of any length normalize the same way"""
+        fingerprint_id, normalized = metrics.fingerprint("SELECT 1 FROM users WHERE id IN (%s, %s, 0)")
+        
+        assert normalized == "SELECT ? FROM users WHERE id IN (...)"
+        assert fingerprint_id == metrics.fingerprint("SELECT 1 FROM users WHERE id IN (1, 2)")[0]
+
+
+class TestQueryObservation:
+    
+    @pytest.fixture
+    def cursor(self):
+        """Mock cursor returning two rows"""
+        cursor = Mock()
+        cursor.fetchall.return_value = [{'id': 1}, {'id': 2}]
+        cursor.rowcount = 3
+        return cursor
+    
+    @pytest.fixture
+    def db(self, cursor, monkeypatch):
+        """Database connection with a mock pool and query metrics enabled"""
+        monkeypatch.setattr(metrics, '_enabled', True)
+        db = DatabaseConnection()
+        db._connection_pool = Mock()
+        db._connection_pool.getconn.return_value.cursor.return_value = cursor
+        return db
+    
+    def test_calls_rows_and_latency_recorded(self, db):
+        """Test execute_query and execute_update record calls, rows and a latency sample"""
+        query = "SELECT id FROM test_observed WHERE owner_id = %s"
+        fingerprint_id = metrics.fingerprint(query)[0]
+        
+        db.execute_query(query, (1,))
+        db.execute_update("UPDATE test_observed SET owner_id = %s", (2,))
+        
+        assert _sample('rbac_db_queries_total', fingerprint=fingerprint_id) == 1
+        assert _sample('rbac_db_query_rows_total', fingerprint=fingerprint_id) == 2
+        assert _sample('rbac_db_query_duration_seconds_count', fingerprint=fingerprint_id) == 1
+        update_id = metrics.fingerprint("UPDATE test_observed SET owner_id = %s")[0]
+        assert _sample('rbac_db_query_rows_total', fingerprint=update_id) == 3
+    
+    def test_errors_recorded(self, db, cursor):
+        """Test a failing statement is counted as a call and an error"""
+        query = "SELECT * FROM test_observed_errors"
+        fingerprint_id = metrics.fingerprint(query)[0]
+        cursor.execute.side_effect = RuntimeError("boom")
+        
+        with pytest.raises(RuntimeError):
+            db.execute_query(query)
+        
+        assert _sample('rbac_db_queries_total', fingerprint=fingerprint_id) == 1
+        assert _sample('rbac_db_query_errors_total', fingerprint=fingerprint_id) == 1
+    
+    def test_disabled_records_nothing(self, db, monkeypatch):
+        """Test no samples are recorded while metrics are disabled"""
+        monkeypatch.setattr(metrics, '_enabled', False)
+        query = "SELECT * FROM test_observed_disabled"
+        
+        db.execute_query(query)
+        
+        assert _sample('rbac_db_queries_total', fingerprint=metrics.fingerprint(query)[0]) == 0
+
+
+class TestMetricsEndpoint:
+    
+    @pytest.fixture
+    def app(self, monkeypatch):
+        """App with metrics enabled, a mock pool and a mock token cache"""
+        monkeypatch.setattr(metrics, '_enabled', False)
+        monkeypatch.delenv('PROMETHEUS_MULTIPROC_DIR', raising=False)
+        
+        app = Flask(__name__)
+        app.db_connection = Mock()
+        app.db_connection.stats.return_value = {'in_use': 1, 'idle': 4, 'max': 10}
+        app.token_verifier = Mock()
+        app.token_verifier.stats.return_value = {'size': 3, 'hits': 9, 'misses': 1, 'hit_ratio': 0.9}
+        app.permission_cache = None
+        
+        @app.route('/metrics-test')
+        def view():
+            return jsonify({})
+        
+        metrics.init_app(app)
+        return app
+    
+    def test_exposes_requests_pool_and_caches(self, app):
+        """Test /metrics serves route histograms, pool gauges and cache ratios in text format"""
+        client = app.test_client()
+        client.get('/metrics-test')
+        
+        response = client.get('/metrics')
+        body = response.get_data(as_text=True)
+        
+        assert response.content_type.startswith('text/plain')
+        assert 'rbac_http_requests_total{endpoint="view",method="GET",status="200"}' in body
+        assert 'rbac_http_request_duration_seconds_bucket{endpoint="view"' in body
+        assert 'rbac_db_pool_connections{state="idle"} 4.0' in body
+        assert 'rbac_cache_hit_ratio{cache="token"} 0.9' in body
@@ -0,0 +1,48 @@
+"""
+Unit tests for the pooled password hasher
+"""
+import pytest
+import threading
+
+from src.services.password_hasher import PasswordHasher, PasswordHasherBusy, bcrypt_cost
+
+
+class TestPasswordHasher:
+    
+    @pytest.fixture
+    def hasher(self):
+        """Hasher at the minimum bcrypt cost to keep tests fast"""
+        hasher = PasswordHasher(rounds=4, max_workers=1, max_pending=1)
+        yield hasher
+        hasher.shutdown()
+    
+    def test_hash_and_verify(self, hasher):
+        """Test hashes use the configured cost and verify on the pool"""
+        password_hash = hasher.hash('password123')
+        
+        assert bcrypt_cost(password_hash) == 4
+        assert hasher.verify('password123', password_hash) is True
+        assert hasher.verify('wrong', password_hash) is False
+    
+    def test_needs_rehash(self, hasher):
+        """Test only bcrypt hashes at another cost need upgrading"""
+        assert hasher.needs_rehash('$2b$12$' + 'x' * 53) is True
+        assert hasher.needs_rehash('$2b$04$' + 'x' * 53) is False
+        assert hasher.needs_rehash('not-a-bcrypt-hash') is False
+    
+    def test_full_backlog_raises_busy(self, hasher):
+        """Test callers fail fast once every backlog slot is taken"""
+        started = threading.Event()
+        release = threading.Event()
+        blocker = threading.Thread(target=hasher._submit, args=(lambda: started.set() or release.wait(),))
+        blocker.start()
+        started.wait(1)
+        
+        try:
+            with pytest.raises(PasswordHasherBusy):
+                hasher.hash('password123')
+        finally:
+            release.set()
+            blocker.join()
+        
+        assert hasher.stats()['rejected'] == 1
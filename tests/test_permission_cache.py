@@ -0,0 +1,135 @@
+"""
+Unit tests for Permission Decision Cache
+"""
+import pytest
+from unittest.mock import patch
+
+from src.services.permission_cache import PermissionCache
+
+
+class TestPermissionCache:
+
+    @pytest.fixture
+    def cache(self):
+        """Create a small cache instance"""
+        return PermissionCache(max_size=3, ttl=60)
+    
+    def test_get_miss_then_hit(self, cache):
+        """Test hit and miss counters"""
+        assert cache.get(1, 100, 'read') is None
+        
+        cache.set(1, 100, 'read', True)
+        
+        assert cache.get(1, 100, 'read') is True
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+    
+    def test_lru_eviction(self, cache):
+        """Test least recently used entry is evicted when full"""
+        cache.set(1, 100, 'read', True)
+        cache.set(1, 101, 'read', True)
+        cache.set(1, 102, 'read', True)
+        cache.get(1, 100, 'read')
+        
+        cache.set(1, 103, 'read', False)
+        
+        assert cache.get(1, 101, 'read') is None
+        assert cache.get(1, 100, 'read') is True
+        assert cache.stats()['evictions'] == 1
+    
+    def test_entry_expires_with_grant(self, cache):
+        """Test an entry never outlives the TTL it was stored with"""
+        with patch('src.services.permission_cache.time.monotonic', return_value=1000.0):
+            cache.set(1, 100, 'read', True, ttl=5)
+        
+        with patch('src.services.permission_cache.time.monotonic', return_value=1004.0):
+            assert cache.get(1, 100, 'read') is True
+        
+        with patch('src.services.permission_cache.time.monotonic', return_value=1005.0):
+            assert cache.get(1, 100, 'read') is None
+    
+    def test_expired_grant_is_not_cached(self, cache):
+        """Test non-positive TTLs are ignored"""
+        cache.set(1, 100, 'read', True, ttl=0)
+        
+        assert cache.stats()['size'] == 0
+    
+    def test_invalidate_user_item(self, cache):
+        """Test invalidation only drops the matching user and item"""
+        cache.set(1, 100, 'read', True)
+        cache.set(1, 100, 'write', False)
+        cache.set(2, 100, 'read', True)
+        
+        removed = cache.invalidate_user_item(1, 100)
+        
+        assert removed == 2
+        assert cache.get(2, 100, 'read') is True
+    
+    def test_invalidate_item(self, cache):
+        """Test invalidation by item keeps other items"""
+        cache.set(1, 100, 'read', True)
+        cache.set(2, 100, 'read', True)
+        cache.set(1, 101, 'read', True)
+        
+        cache.invalidate_item(100)
+        
+        assert cache.get(1, 100, 'read') is None
+        assert cache.get(2, 100, 'read') is None
+        assert cache.get(1, 101, 'read') is True
+    
+    def test_invalidate_many(self):
+        """Test batch invalidation drops exactly the listed items and user-item pairs"""
+        cache = PermissionCache(max_size=10, ttl=60)
+        cache.set(1, 100, 'read', True)
+        cache.set(2, 101, 'read', True)
+        cache.set(1, 102, 'read', True)
+        cache.set(2, 102, 'read', True)
+        cache.set(3, 103, 'read', True)
+        
+        cache.set_user_roles(3, [{'id': 1}])
+        
+        assert cache.invalidate_items([100, 101]) == 2
+        assert cache.invalidate_user_items([(1, 102), (3, 999)]) == 1
+        assert cache.invalidate_users([3, 4]) == 2
+        
+        assert cache.get(2, 102, 'read') is True
+        assert cache.get_user_roles(3) is None
+        assert cache.stats()['size'] == 1
+    
+    def test_invalidate_user(self, cache):
+        """Test invalidation by user keeps other users"""
+        cache.set(1, 100, 'read', True)
+        cache.set(1, 101, 'read', True)
+        cache.set(2, 100, 'read', True)
+        
+        cache.invalidate_user(1)
+        
+        assert cache.stats()['size'] == 1
+        assert cache.get(2, 100, 'read') is True
+    
+    def test_authz_version_dropped_with_user(self, cache):
+        """Test a user's cached authorization version is dropped with their decisions"""
+        cache.set_authz_version(1, 0)
+        cache.set_authz_version(2, 5)
+        
+        assert cache.get_authz_version(1) == 0
+        
+        cache.invalidate_user(1)
+        
+        assert cache.get_authz_version(1) is None
+        assert cache.get_authz_version(2) == 5
+    
+    def test_set_skipped_after_invalidation(self, cache):
+        """Test a value loaded before an invalidation is not cached after it"""
+        generation = cache.generation()
+        cache.invalidate_item(200)
+        
+        cache.set(1, 100, 'read', True, generation=generation)
+        cache.set_authz_version(1, 3, generation=generation)
+        
+        assert cache.get(1, 100, 'read') is None
+        assert cache.get_authz_version(1) is None
+        
+        cache.set(1, 100, 'read', True, generation=cache.generation())
+        assert cache.get(1, 100, 'read') is True
@@ -0,0 +1,133 @@
+"""
+Unit tests for the queue connection pool
+"""
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock, Mock
+
+import psycopg2
+from psycopg2 import extensions
+
+from src.database.pool import PoolTimeout, QueuePool
+
+
+def _connection():
+    """Mock psycopg2 connection that is open and idle"""
+    conn = Mock(closed=False)
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+    conn.cursor.return_value = MagicMock()
+    conn.close.side_effect = lambda: setattr(conn, 'closed', True)
+    return conn
+
+
+class TestQueuePool:
+    
+    @pytest.fixture
+    def connect(self):
+        """Connection factory returning a new mock connection per call"""
+        return Mock(side_effect=_connection)
+    
+    def test_prewarms_and_reuses_connections(self, connect):
+        """Test min_size connections are opened up front and returned ones are reused"""
+        pool = QueuePool(connect, pool_size=3, max_overflow=0, min_size=2, ping_interval=-1)
+        assert connect.call_count == 2
+        
+        conn = pool.getconn()
+        pool.putconn(conn)
+        
+        assert pool.getconn() is conn
+        assert connect.call_count == 2
+        assert pool.stats()['in_use'] == 1 and pool.stats()['idle'] == 1
+    
+    def test_overflow_connections_closed_on_return(self, connect):
+        """Test overflow connections are opened under load and closed when returned"""
+        pool = QueuePool(connect, pool_size=1, max_overflow=1, min_size=0, ping_interval=-1)
+        
+        first, second = pool.getconn(), pool.getconn()
+        assert pool.stats()['overflow'] == 1
+        
+        pool.putconn(first)
+        pool.putconn(second)
+        
+        assert second.closed and not first.closed
+        assert pool.stats()['size'] == 1
+    
+    def test_waits_for_returned_connection(self, connect):
+        """Test an exhausted pool hands a returned connection to a waiting caller"""
+        pool = QueuePool(connect, pool_size=1, max_overflow=0, timeout=5, min_size=0, ping_interval=-1)
+        conn = pool.getconn()
+        
+        threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+        
+        assert pool.getconn() is conn
+        assert pool.stats()['wait_seconds'] > 0
+    
+    def test_times_out_when_exhausted(self, connect):
+        """Test PoolTimeout is raised when no connection comes back in time"""
+        pool = QueuePool(connect, pool_size=1, max_overflow=0, timeout=0.05, min_size=0)
+        pool.getconn()
+        
+        with pytest.raises(PoolTimeout):
+            pool.getconn()
+        
+        assert pool.stats()['timeouts'] == 1
+    
+    def test_recycles_old_connections(self, connect):
+        """Test a connection older than recycle is replaced at checkout"""
+        pool = QueuePool(connect, pool_size=1, max_overflow=0, recycle=0.01, min_size=1, ping_interval=-1)
+        old = pool.getconn()
+        pool.putconn(old)
+        time.sleep(0.02)
+        
+        conn = pool.getconn()
+        
+        assert conn is not old and old.closed
+        assert pool.stats()['recycled'] == 1
+    
+    def test_replaces_connection_failing_ping(self, connect):
+        """Test an idle connection that fails SELECT 1 is replaced"""
+        pool = QueuePool(connect, pool_size=1, max_overflow=0, ping_interval=0, min_size=1)
+        dead = pool._idle[0][0]
+        dead.cursor.return_value.__enter__.return_value.execute.side_effect = psycopg2.OperationalError()
+        
+        conn = pool.getconn()
+        
+        assert conn is not dead and dead.closed
+        assert pool.stats()['failed_pings'] == 1
+        assert pool.stats()['size'] == 1
+    
+    def test_failed_connect_frees_slot(self, connect):
+        """Test a connection that cannot be opened does not use up pool capacity"""
+        pool = QueuePool(connect, pool_size=1, max_overflow=0, min_size=0)
+        connect.side_effect = psycopg2.OperationalError()
+        
+        with pytest.raises(psycopg2.OperationalError):
+            pool.getconn()
+        
+        assert pool.stats()['size'] == 0
+    
+    def test_putconn_rolls_back_open_transaction(self, connect):
+        """Test a connection returned mid-transaction is rolled back and kept"""
+        pool = QueuePool(connect, pool_size=1, max_overflow=0, min_size=0)
+        conn = pool.getconn()
+        conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+        
+        pool.putconn(conn)
+        
+        conn.rollback.assert_called_once()
+        assert pool.stats()['idle'] == 1
+    
+    def test_closeall(self, connect):
+        """Test closeall closes idle connections and checked-out ones on return"""
+        pool = QueuePool(connect, pool_size=2, max_overflow=0, min_size=2, ping_interval=-1)
+        busy = pool.getconn()
+        idle = pool._idle[0][0]
+        
+        pool.closeall()
+        pool.putconn(busy)
+        
+        assert idle.closed and busy.closed
+        with pytest.raises(psycopg2.pool.PoolError):
+            pool.getconn()
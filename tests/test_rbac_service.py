@@ -4,6 +4,7 @@ Unit tests for RBAC Service
 import pytest
 from unittest.mock import Mock, MagicMock
 
+from src.services.permission_cache import PermissionCache
 from src.services.rbac_service import RBACService
 
 
@@ -80,4 +81,236 @@ class TestRBACService:
         
         assert result == 1
         assert mock_db.execute_query.called
-
+    
+    def test_check_user_permission_cached(self, mock_db):
+        """Test repeated permission checks are served from the cache"""
+        mock_db.execute_query.return_value = {'count': 1, 'expires_in': None}
+        rbac_service = RBACService(mock_db, PermissionCache())
+        
+        assert rbac_service.check_user_permission(1, 100, 'read') is True
+        assert rbac_service.check_user_permission(1, 100, 'read') is True
+        
+        assert mock_db.execute_query.call_count == 1
+        assert mock_db.execute_update.call_count == 2  # both attempts audited
+    
+    def test_check_racing_revoke_not_cached(self, mock_db):
+        """Test a decision read while a revoke invalidates the cache is not cached"""
+        cache = PermissionCache()
+        
+        def query(*args, **kwargs):
+            cache.invalidate_user_item(1, 100)  # a revoke committing mid-check
+            return {'count': 1, 'expires_in': None}
+        
+        mock_db.execute_query.side_effect = query
+        rbac_service = RBACService(mock_db, cache)
+        
+        assert rbac_service.check_user_permission(1, 100, 'read') is True
+        assert cache.get(1, 100, 'read') is None
+    
+    def test_grant_item_access_invalidates_cache(self, mock_db):
+        """Test granting access drops the cached decision for that user and item"""
+        cache = PermissionCache()
+        cache.set(1, 100, 'read', False)
+        cache.set(2, 100, 'read', False)
+        mock_db.execute_query.return_value = {'id': 1}
+        rbac_service = RBACService(mock_db, cache)
+        
+        rbac_service.grant_item_access(item_id=100, user_id=1, role_id=None, permission_id=1, granted_by=1)
+        
+        assert cache.get(1, 100, 'read') is None
+        assert cache.get(2, 100, 'read') is False
+    
+    def test_revoke_role_access_invalidates_item(self, mock_db):
+        """Test revoking a role grant drops cached decisions for the item"""
+        cache = PermissionCache()
+        cache.set(1, 100, 'read', True)
+        cache.set(1, 101, 'read', True)
+        mock_db.execute_query.return_value = {'item_id': 100, 'user_id': None, 'role_id': 3}
+        mock_db.execute_update.return_value = 1
+        rbac_service = RBACService(mock_db, cache)
+        
+        assert rbac_service.revoke_item_access(access_id=1) is True
+        
+        assert cache.get(1, 100, 'read') is None
+        assert cache.get(1, 101, 'read') is True
+    
+    def test_check_user_permissions_batch(self, rbac_service, mock_db):
+        """Test batch check resolves in one query and keeps input order"""
+        mock_db.execute_query.return_value = [
+            {'user_id': 1, 'item_id': 101, 'action': 'read', 'count': 0, 'expires_in': None},
+            {'user_id': 1, 'item_id': 100, 'action': 'read', 'count': 2, 'expires_in': None},
+        ]
+        mock_db.execute_update.return_value = 3
+        
+        result = rbac_service.check_user_permissions_batch([
+            (1, 100, 'read'),
+            (1, 101, 'read'),
+            (1, 100, 'read'),
+        ])
+        
+        assert result == [True, False, True]
+        assert mock_db.execute_query.call_count == 1
+        mock_db.execute_update.assert_called_once()
+        _, (user_ids, item_ids, actions, granted) = mock_db.execute_update.call_args[0]
+        assert item_ids == [100, 101, 100]
+        assert granted == [True, False, True]
+    
+    def test_access_attempt_queued_to_audit_writer(self, mock_db):
+        """Test permission checks hand audit rows to the background writer"""
+        mock_db.execute_query.return_value = {'count': 1}
+        audit_writer = Mock()
+        rbac_service = RBACService(mock_db, audit_writer=audit_writer)
+        
+        rbac_service.check_user_permission(user_id=1, item_id=100, action='read')
+        
+        audit_writer.submit.assert_called_once_with(1, 100, 'read', True, None, None)
+        assert not mock_db.execute_update.called
+    
+    def test_set_role_parent(self, rbac_service, mock_db):
+        """Test assigning a parent role"""
+        mock_db.execute_query.return_value = None
+        mock_db.execute_update.return_value = 1
+        
+        result = rbac_service.set_role_parent(role_id=2, parent_role_id=1)
+        
+        assert result is True
+        assert mock_db.execute_update.called
+    
+    def test_set_role_parent_rejects_cycle(self, rbac_service, mock_db):
+        """Test a parent that already inherits from the role is rejected"""
+        mock_db.execute_query.return_value = {'?column?': 1}
+        
+        with pytest.raises(ValueError):
+            rbac_service.set_role_parent(role_id=1, parent_role_id=3)
+        
+        assert not mock_db.execute_update.called
+    
+    def test_check_user_permission_probes_effective_access(self, rbac_service, mock_db):
+        """Test permission checks read the materialized effective_access table"""
+        mock_db.execute_query.return_value = {'count': 1, 'expires_in': None}
+        
+        rbac_service.check_user_permission(user_id=1, item_id=100, action='read')
+        
+        query, params = mock_db.execute_query.call_args[0]
+        assert 'FROM effective_access' in query
+        assert 'item_access' not in query
+        assert params == (1, 'read', 100)
+    
+    def test_rebuild_effective_access_clears_cache(self, mock_db):
+        """Test a full rebuild drops every cached decision"""
+        cache = PermissionCache()
+        cache.set(1, 100, 'read', True)
+        mock_db.execute_query.return_value = {'count': 42}
+        rbac_service = RBACService(mock_db, cache)
+        
+        assert rbac_service.rebuild_effective_access() == 42
+        
+        assert cache.get(1, 100, 'read') is None
+    
+    def test_get_accessible_items_page(self, rbac_service, mock_db):
+        """Test accessible items are paged by (created_at, id) without OFFSET"""
+        mock_db.execute_query.return_value = []
+        after = ['2024-05-01T00:00:00', 10]
+        
+        rbac_service.get_accessible_items(user_id=1, limit=21, after=after)
+        
+        query, params = mock_db.execute_query.call_args[0]
+        assert '(i.created_at, i.id) < (%s, %s)' in query
+        assert params == (1, 'read', '2024-05-01T00:00:00', 10, 21)
+    
+    def test_get_authz_version_cached(self, mock_db):
+        """Test the authorization version is read once and then served from the cache"""
+        mock_db.execute_query.return_value = {'authz_version': 7}
+        rbac_service = RBACService(mock_db, PermissionCache())
+        
+        assert rbac_service.get_authz_version(1) == 7
+        assert rbac_service.get_authz_version(1) == 7
+        
+        assert mock_db.execute_query.call_count == 1
+    
+    def test_token_revoked_once_authz_version_moves(self, rbac_service, mock_db):
+        """Test tokens older than the user's authz_version, or of unknown users, are revoked"""
+        mock_db.execute_query.return_value = {'authz_version': 3}
+        
+        assert rbac_service.is_token_revoked({'user_id': 1, 'authz_version': 3}) is False
+        assert rbac_service.is_token_revoked({'user_id': 1, 'authz_version': 2}) is True
+        
+        mock_db.execute_query.return_value = None
+        assert rbac_service.is_token_revoked({'user_id': 1, 'authz_version': 3}) is True
+    
+    def test_grant_item_access_bulk_invalidates_once(self, mock_db):
+        """Test a bulk grant dedupes its input and invalidates the cache once per kind"""
+        cache = Mock()
+        mock_db.execute_values.return_value = [
+            {'item_id': 100, 'user_id': None, 'role_id': 3},
+            {'item_id': 101, 'user_id': None, 'role_id': 3},
+            {'item_id': 102, 'user_id': 1, 'role_id': None}
+        ]
+        rbac_service = RBACService(mock_db, cache)
+        grants = [(100, None, 3, 1), (101, None, 3, 1), (101, None, 3, 1), (102, 1, None, 1), (103, 1, None, 1)]
+        
+        counts = rbac_service.grant_item_access_bulk(grants, granted_by=1)
+        
+        assert counts == {'requested': 4, 'granted': 3, 'existing': 1}
+        assert len(mock_db.execute_values.call_args[0][1]) == 4
+        cache.invalidate_items.assert_called_once_with({100, 101})
+        cache.invalidate_user_items.assert_called_once_with({(1, 102)})
+        cache.invalidate_item.assert_not_called()
+    
+    def test_grant_item_access_by_selector(self, rbac_service, mock_db):
+        """Test a selector grant filters items by the given columns in one statement"""
+        mock_db.execute_query.return_value = {'matched': 3, 'item_ids': [100, 101]}
+        
+        counts = rbac_service.grant_item_access_by_selector(
+            {'item_type': 'document', 'owner_id': 7}, user_id=None, role_id=3, permission_id=1, granted_by=1
+        )
+        
+        assert counts == {'matched': 3, 'granted': 2, 'existing': 1}
+        query, params = mock_db.execute_query.call_args[0]
+        assert 'i.item_type = %s AND i.owner_id = %s' in query
+        assert params[:3] == ('document', 7, None)
+    
+    def test_selector_must_name_known_item_columns(self, rbac_service, mock_db):
+        """Test empty, unknown and mistyped selectors are rejected before any query"""
+        for selector in ({}, {'name': 'x'}, {'owner_id': 'seven'}, {'owner_id': True}):
+            with pytest.raises(ValueError):
+                rbac_service.revoke_item_access_by_selector(selector, user_id=1, role_id=None)
+        
+        mock_db.execute_query.assert_not_called()
+    
+    def test_revoke_item_access_bulk(self, mock_db):
+        """Test a bulk revoke deletes by ID in one statement and invalidates what it removed"""
+        cache = Mock()
+        mock_db.execute_query.return_value = [{'item_id': 100, 'user_id': 1, 'role_id': None}]
+        rbac_service = RBACService(mock_db, cache)
+        
+        counts = rbac_service.revoke_item_access_bulk([5, 6, 5])
+        
+        assert counts == {'requested': 2, 'revoked': 1}
+        assert mock_db.execute_query.call_args[0][1] == ([5, 6],)
+        cache.invalidate_user_items.assert_called_once_with({(1, 100)})
+    
+    def test_sync_user_roles(self, mock_db):
+        """Test a role sync sends the desired pairs in one statement and invalidates changed users"""
+        cache = Mock()
+        mock_db.execute_query.return_value = {'added': 2, 'removed': 1, 'renewed': 0, 'changed_user_ids': [1, 2]}
+        rbac_service = RBACService(mock_db, cache)
+        
+        counts = rbac_service.sync_user_roles({1: [3, 3], 2: [4], 5: []}, granted_by=9)
+        
+        assert counts == {'users': 3, 'added': 2, 'removed': 1, 'renewed': 0, 'changed_users': 2}
+        assert mock_db.execute_query.call_count == 1
+        params = mock_db.execute_query.call_args[0][1]
+        assert params == ([1, 2], [3, 4], [1, 2, 5], 9, 9)
+        cache.invalidate_users.assert_called_once_with([1, 2])
+    
+    def test_sync_user_roles_unchanged_skips_invalidation(self, mock_db):
+        """Test a sync that changes nothing leaves the cache alone"""
+        cache = Mock()
+        mock_db.execute_query.return_value = {'added': 0, 'removed': 0, 'renewed': 0, 'changed_user_ids': []}
+        rbac_service = RBACService(mock_db, cache)
+        
+        counts = rbac_service.sync_user_roles({1: [3]}, granted_by=1)
+        
+        assert counts['changed_users'] == 0
+        cache.invalidate_users.assert_not_called()
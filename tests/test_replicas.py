@@ -0,0 +1,196 @@
+"""
+Unit tests for read replica routing
+"""
+import pytest
+from unittest.mock import MagicMock, Mock
+from flask import Flask, current_app, jsonify
+
+import psycopg2
+from psycopg2 import extras
+
+from src.database import replicas
+from src.database.connection import DatabaseConnection
+from src.database.replicas import PRIMARY_COOKIE, Replica
+from src.services.permission_cache import PermissionCache
+from src.services.rbac_service import RBACService
+
+
+def _pool(lag=0.0):
+    """Mock QueuePool whose connections report the given replication lag"""
+    conn = Mock(closed=False)
+    conn.cursor.return_value = MagicMock()
+    conn.cursor.return_value.__enter__.return_value.fetchone.return_value = (lag,)
+    connection_pool = Mock()
+    connection_pool.getconn.return_value = conn
+    connection_pool.stats.return_value = {'in_use': 0, 'idle': 1}
+    return connection_pool
+
+
+class TestReplica:
+    
+    def test_healthy_within_max_lag(self):
+        """Test a replica lagging less than max_lag serves reads"""
+        replica = Replica('replica:5433', _pool(lag=1.5), max_lag=5)
+        
+        assert replica.available()
+        assert replica.lag == 1.5
+    
+    def test_skipped_beyond_max_lag(self):
+        """Test a replica lagging more than max_lag is skipped"""
+        replica = Replica('replica:5433', _pool(lag=12), max_lag=5)
+        
+        assert not replica.available()
+        assert replica.stats()['lag_seconds'] == 12
+    
+    def test_skipped_when_unreachable(self):
+        """Test a replica that cannot be connected to is skipped"""
+        connection_pool = _pool()
+        connection_pool.getconn.side_effect = psycopg2.OperationalError("connection refused")
+        
+        assert not Replica('replica:5433', connection_pool).available()
+    
+    def test_lag_checked_once_per_interval(self):
+        """Test the lag is not measured again before check_interval has passed"""
+        connection_pool = _pool()
+        replica = Replica('replica:5433', connection_pool, check_interval=60)
+        
+        replica.available()
+        replica.available()
+        
+        assert connection_pool.getconn.call_count == 1
+
+
+class TestReadRouting:
+    
+    @pytest.fixture
+    def replica_pool(self):
+        """Replica pool with no lag"""
+        return _pool()
+    
+    @pytest.fixture
+    def db(self, replica_pool):
+        """Database connection with a mock primary pool and one replica"""
+        db = DatabaseConnection()
+        db._connection_pool = Mock()
+        db._replicas = [Replica('replica:5433', replica_pool)]
+        return db
+    
+    @pytest.fixture(autouse=True)
+    def read_state(self):
+        """Fresh routing state for each test"""
+        token = replicas._state.set(None)
+        yield
+        replicas._state.reset(token)
+    
+    def test_reads_go_to_replica(self, db, replica_pool):
+        """Test plain reads use the replica and return the connection to its pool"""
+        db.execute_query("SELECT * FROM items")
+        
+        replica_conn = replica_pool.getconn.return_value
+        replica_conn.cursor.assert_called_with(cursor_factory=extras.RealDictCursor)
+        replica_pool.putconn.assert_called_with(replica_conn)
+        db._connection_pool.getconn.assert_not_called()
+    
+    def test_writes_go_to_primary_and_pin_reads(self, db, replica_pool):
+        """Test a write uses the primary and later reads follow it there"""
+        db.execute_update("UPDATE items SET name = %s", ('renamed',))
+        db.execute_query("SELECT * FROM items")
+        
+        assert db._connection_pool.getconn.call_count == 2
+        replica_pool.getconn.return_value.cursor.assert_not_called()
+    
+    def test_non_sticky_write_keeps_replica_reads(self, db, replica_pool):
+        """Test writes nothing reads back (audit rows) do not pin reads to the primary"""
+        db.execute_update("INSERT INTO access_logs (user_id) VALUES (%s)", (1,), sticky=False)
+        db.execute_query("SELECT * FROM items")
+        
+        replica_pool.getconn.return_value.cursor.assert_called()
+    
+    def test_primary_flag_bypasses_replicas(self, db, replica_pool):
+        """Test execute_query(primary=True) reads from the primary"""
+        db.execute_query("SELECT 1 FROM role_closure", primary=True)
+        
+        db._connection_pool.getconn.assert_called_once()
+        replica_pool.getconn.return_value.cursor.assert_not_called()
+    
+    def test_cached_decisions_read_from_primary(self, db, replica_pool):
+        """Test checks whose result is cached skip the replicas, so a lagging one cannot re-cache a revoked grant"""
+        primary_conn = db._connection_pool.getconn.return_value
+        primary_conn.cursor.return_value.fetchone.return_value = {'count': 1, 'expires_in': None}
+        rbac_service = RBACService(db, PermissionCache(max_size=10, ttl=60), audit_writer=Mock())
+        
+        assert rbac_service.check_user_permission(1, 100, 'read') is True
+        
+        replica_pool.getconn.return_value.cursor.assert_not_called()
+    
+    def test_uncached_decisions_read_from_replica(self, db, replica_pool):
+        """Test checks go to a replica when no cache would keep the result"""
+        replica_conn = replica_pool.getconn.return_value
+        replica_conn.cursor.return_value.fetchone.return_value = {'count': 0}
+        
+        RBACService(db, audit_writer=Mock()).check_user_permission(1, 100, 'read')
+        
+        db._connection_pool.getconn.assert_not_called()
+    
+    def test_falls_back_to_primary_when_replica_lags(self, db):
+        """Test reads go to the primary when every replica lags too far"""
+        db._replicas = [Replica('replica:5433', _pool(lag=30), max_lag=5)]
+        
+        db.execute_query("SELECT * FROM items")
+        
+        db._connection_pool.getconn.assert_called_once()
+    
+    def test_stats_include_replicas(self, db):
+        """Test stats report each replica's health and lag"""
+        db._connection_pool.stats.return_value = {'in_use': 0}
+        db.execute_query("SELECT * FROM items")
+        
+        replica_stats = db.stats()['replicas'][0]
+        
+        assert replica_stats['name'] == 'replica:5433'
+        assert replica_stats['healthy'] and replica_stats['lag_seconds'] == 0
+
+
+class TestReadYourWritesCookie:
+    
+    @pytest.fixture
+    def app(self):
+        """App with replica routing and views that read and write"""
+        app = Flask(__name__)
+        app.db_connection = DatabaseConnection()
+        app.db_connection._connection_pool = Mock()
+        app.db_connection._replicas = [Replica('replica:5433', _pool())]
+        
+        @app.route('/read')
+        def read():
+            current_app.db_connection.execute_query("SELECT * FROM items")
+            return jsonify({'primary': replicas.reads_from_primary()})
+        
+        @app.route('/write', methods=['POST'])
+        def write():
+            current_app.db_connection.execute_update("UPDATE items SET name = %s", ('renamed',))
+            return jsonify({'primary': replicas.reads_from_primary()})
+        
+        replicas.init_app(app, sticky_seconds=10)
+        return app
+    
+    def test_write_pins_client_to_primary(self, app):
+        """Test a write sets the cookie and the client's next read uses the primary"""
+        client = app.test_client()
+        
+        response = client.post('/write')
+        assert response.get_json()['primary']
+        assert PRIMARY_COOKIE in response.headers['Set-Cookie']
+        
+        assert client.get('/read').get_json()['primary']
+        assert app.db_connection._connection_pool.getconn.call_count == 2
+    
+    def test_other_clients_read_from_replica(self, app):
+        """Test a write does not pin requests without the cookie"""
+        app.test_client().post('/write')
+        
+        response = app.test_client().get('/read')
+        
+        assert not response.get_json()['primary']
+        assert 'Set-Cookie' not in response.headers
+        assert app.db_connection._connection_pool.getconn.call_count == 1
@@ -0,0 +1,120 @@
+"""
+Unit tests for request timing
+"""
+import json
+import logging
+
+import pytest
+from unittest.mock import Mock
+from flask import Flask, jsonify
+
+from psycopg2 import extras
+
+from src import request_timing
+from src.database.connection import DatabaseConnection, TimedCursor
+
+
+class TestGetCursorHooks:
+    
+    @pytest.fixture
+    def conn(self):
+        """Mock psycopg2 connection"""
+        return Mock(closed=False)
+    
+    @pytest.fixture
+    def db(self, conn):
+        """Database connection with a mock pool"""
+        db = DatabaseConnection()
+        db._connection_pool = Mock()
+        db._connection_pool.getconn.return_value = conn
+        return db
+    
+    def test_untimed_uses_plain_cursor(self, db, conn):
+        """Test nothing is recorded outside a timed request"""
+        with db.get_cursor():
+            pass
+        
+        assert conn.cursor.call_args[1]['cursor_factory'] is extras.RealDictCursor
+    
+    def test_timed_request_gets_timed_cursor(self, db, conn):
+        """Test a timed request gets a cursor bound to its timings and records pool wait and commit"""
+        timings = request_timing.RequestTimings()
+        token = request_timing._current.set(timings)
+        try:
+            with db.get_cursor(commit=True):
+                pass
+        finally:
+            request_timing._current.reset(token)
+        
+        assert conn.cursor.call_args[1]['cursor_factory'] is TimedCursor
+        assert conn.cursor.return_value.timings is timings
+        assert timings.pool_wait_seconds > 0
+        assert timings.db_seconds > 0
+        conn.commit.assert_called_once()
+
+
+class TestRequestTimings:
+    
+    def test_server_timing_header(self):
+        """Test the header lists total, database, pool, serialization and remaining app time"""
+        timings = request_timing.RequestTimings()
+        timings.add_query(0.004)
+        timings.pool_wait_seconds = 0.001
+        timings.serialize_seconds = 0.002
+        
+        header = timings.server_timing(0.010)
+        
+        assert header == (
+            'total;dur=10.0, db;dur=4.0;desc="1 query", pool;dur=1.0, serialize;dur=2.0, app;dur=3.0'
+        )
+
+
+class TestInitApp:
+    
+    @pytest.fixture
+    def app(self):
+        """App whose view records a query through the current timings"""
+        app = Flask(__name__)
+        
+        @app.route('/check')
+        def check():
+            timings = request_timing.current()
+            if timings is not None:
+                timings.add_query(0.002)
+            return jsonify({'has_access': True})
+        
+        return app
+    
+    def test_disabled_app_has_no_header(self, app):
+        """Test an app without init_app is not timed"""
+        response = app.test_client().get('/check')
+        
+        assert response.status_code == 200
+        assert 'Server-Timing' not in response.headers
+    
+    def test_header_and_log_line(self, app, caplog):
+        """Test timed requests get a Server-Timing header and a JSON log line"""
+        request_timing.init_app(app)
+        
+        with caplog.at_level(logging.INFO, logger='src.request_timing'):
+            response = app.test_client().get('/check')
+        
+        assert response.headers['Server-Timing'].startswith('total;dur=')
+        assert 'db;dur=2.0;desc="1 query"' in response.headers['Server-Timing']
+        
+        fields = json.loads(caplog.records[-1].getMessage().split(' ', 1)[1])
+        assert fields['endpoint'] == 'check'
+        assert fields['status'] == 200
+        assert fields['queries'] == 1
+        assert fields['serialize_ms'] > 0
+        assert request_timing.current() is None
+    
+    def test_log_threshold(self, app, caplog):
+        """Test requests faster than the threshold are not logged but still get the header"""
+        request_timing.init_app(app, log_threshold_ms=60000)
+        
+        with caplog.at_level(logging.INFO, logger='src.request_timing'):
+            response = app.test_client().get('/check')
+        
+        assert 'Server-Timing' in response.headers
+        assert not caplog.records
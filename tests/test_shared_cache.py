@@ -0,0 +1,193 @@
+"""
+Unit tests for Redis-backed Shared Cache
+
+Tests marked with the redis_url fixture run against a local redis-server
+(REDIS_URL, default redis://localhost:6379/15) and are skipped when it is
+not reachable.
+"""
+import os
+import time
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import pytest
+import redis
+
+from src.services.permission_cache import PermissionCache
+from src.services.shared_cache import SharedCache
+
+
+TEST_REDIS_URL = os.getenv('TEST_REDIS_URL', 'redis://localhost:6379/15')
+
+
+@pytest.fixture
+def redis_url():
+    """URL of a local redis-server database flushed for each test"""
+    client = redis.Redis.from_url(TEST_REDIS_URL, socket_connect_timeout=0.5)
+    try:
+        client.flushdb()
+    except redis.RedisError:
+        pytest.skip('redis-server not available')
+    yield TEST_REDIS_URL
+    client.flushdb()
+
+
+@pytest.fixture
+def make_cache(redis_url):
+    """Factory for listening SharedCache nodes with a local cache each"""
+    caches = []
+    
+    def factory():
+        cache = SharedCache(redis_url, ttl=60, local=PermissionCache(ttl=60))
+        cache.start_listener()
+        assert cache.wait_until_subscribed()
+        caches.append(cache)
+        return cache
+    
+    yield factory
+    
+    for cache in caches:
+        cache.stop_listener()
+
+
+def wait_for(condition, timeout=2.0):
+    """Poll until condition() is true"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestSharedCache:
+
+    def test_decision_shared_between_nodes(self, make_cache):
+        """Test a decision stored by one node is served to another"""
+        node_a, node_b = make_cache(), make_cache()
+        
+        node_a.set(1, 100, 'read', True)
+        
+        assert node_b.get(1, 100, 'read') is True
+    
+    def test_invalidation_reaches_other_nodes(self, make_cache):
+        """Test a revoke on one node drops local copies on every node"""
+        node_a, node_b = make_cache(), make_cache()
+        node_a.set(1, 100, 'read', True)
+        node_a.set(1, 101, 'read', True)
+        assert node_b.get(1, 100, 'read') is True
+        
+        node_a.invalidate_user_item(1, 100)
+        
+        assert wait_for(lambda: node_b.local.get(1, 100, 'read') is None)
+        assert node_b.get(1, 100, 'read') is None
+        assert node_b.get(1, 101, 'read') is True
+    
+    def test_role_set_round_trip(self, make_cache):
+        """Test role rows keep their types through Redis"""
+        node_a, node_b = make_cache(), make_cache()
+        created_at = datetime(2024, 1, 2, 3, 4, 5)
+        node_a.set_user_roles(1, [{'id': 2, 'name': 'editor', 'created_at': created_at}])
+        
+        assert node_b.get_user_roles(1) == [{'id': 2, 'name': 'editor', 'created_at': created_at}]
+        
+        node_a.invalidate_user(1)
+        
+        assert wait_for(lambda: node_b.get_user_roles(1) is None)
+    
+    def test_item_row_invalidated_with_item(self, make_cache):
+        """Test item invalidation drops the cached row and decisions"""
+        node = make_cache()
+        node.set_item(100, {'id': 100, 'name': 'report'})
+        node.set(2, 100, 'write', False)
+        
+        node.invalidate_item(100)
+        
+        assert node.get_item(100) is None
+        assert node.get(2, 100, 'write') is None
+    
+    def test_batch_invalidation_reaches_other_nodes(self, make_cache):
+        """Test invalidating many items, pairs and users at once clears them on every node"""
+        node_a, node_b = make_cache(), make_cache()
+        for user_id, item_id in ((1, 100), (1, 101), (2, 102), (2, 103)):
+            node_a.set(user_id, item_id, 'read', True)
+            assert node_b.get(user_id, item_id, 'read') is True
+        
+        node_a.set_user_roles(3, [{'id': 1, 'name': 'viewer'}])
+        assert node_b.get_user_roles(3) == [{'id': 1, 'name': 'viewer'}]
+        
+        node_a.invalidate_items([100, 101])
+        node_a.invalidate_user_items([(2, 102)])
+        node_a.invalidate_users([3])
+        
+        assert wait_for(lambda: node_b.local.get_user_roles(3) is None)
+        assert node_b.get(1, 100, 'read') is None
+        assert node_b.get(1, 101, 'read') is None
+        assert node_b.get(2, 102, 'read') is None
+        assert node_b.get(2, 103, 'read') is True
+        assert node_b.get_user_roles(3) is None
+    
+    def test_set_skipped_after_invalidation_on_other_node(self, make_cache):
+        """Test a value loaded before another node invalidated is cached on neither node"""
+        node_a, node_b = make_cache(), make_cache()
+        generation = node_a.generation()
+        
+        node_b.invalidate_user(1)
+        assert wait_for(lambda: node_a.local.generation() != generation[0])
+        node_a.set(1, 100, 'read', True, generation=generation)
+        node_a.set_authz_version(1, 3, generation=generation)
+        
+        assert node_a.get(1, 100, 'read') is None
+        assert node_b.get(1, 100, 'read') is None
+        assert node_b.get_authz_version(1) is None
+        
+        node_a.set(1, 100, 'read', True, generation=node_a.generation())
+        assert node_b.get(1, 100, 'read') is True
+    
+    def test_invalidation_missed_during_outage_replayed(self, redis_url):
+        """Test an invalidation that could not reach Redis still drops the entry once Redis is back"""
+        node_a = SharedCache(redis_url, ttl=60, retry_interval=0.1)
+        node_b = SharedCache(redis_url, ttl=60)
+        node_a.set(1, 100, 'read', True)
+        
+        with patch.object(node_a._client, 'execute_command', side_effect=redis.ConnectionError('connection refused')):
+            node_a.invalidate_user_item(1, 100)
+        
+        assert node_a.available is False
+        assert node_b.get(1, 100, 'read') is True
+        
+        time.sleep(0.15)
+        
+        assert node_a.get(1, 100, 'read') is None
+        assert node_b.get(1, 100, 'read') is None
+
+
+class TestSharedCacheFallback:
+
+    @pytest.fixture
+    def broken_client(self):
+        """Redis client whose every call fails"""
+        client = Mock()
+        client.get.side_effect = redis.ConnectionError('connection refused')
+        client.pipeline.side_effect = redis.ConnectionError('connection refused')
+        client.publish.side_effect = redis.ConnectionError('connection refused')
+        return client
+    
+    def test_unreachable_redis_reports_miss(self, broken_client):
+        """Test lookups fall back to the database when Redis is down"""
+        cache = SharedCache('redis://unused', client=broken_client, retry_interval=60)
+        
+        assert cache.get(1, 100, 'read') is None
+        cache.set(1, 100, 'read', True)
+        
+        assert cache.available is False
+        assert cache.stats()['errors'] == 1
+        assert broken_client.pipeline.called is False
+    
+    def test_local_cache_bypassed_without_subscription(self, broken_client):
+        """Test the local cache is not trusted while invalidations cannot arrive"""
+        local = PermissionCache()
+        local.set(1, 100, 'read', True)
+        cache = SharedCache('redis://unused', client=broken_client, local=local)
+        
+        assert cache.get(1, 100, 'read') is None
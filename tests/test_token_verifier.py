@@ -0,0 +1,76 @@
+"""
+Unit tests for the verified-token cache
+"""
+import pytest
+import time
+from unittest.mock import Mock, patch
+
+import jwt
+
+from src.services.token_verifier import TokenVerifier
+
+
+SECRET = 'test-secret'
+
+
+def make_token(user_id: int = 1, expires_in: int = 3600) -> str:
+    """Build a signed token expiring in expires_in seconds"""
+    return jwt.encode({'user_id': user_id, 'exp': int(time.time()) + expires_in}, SECRET, algorithm='HS256')
+
+
+class TestTokenVerifier:
+    
+    @pytest.fixture
+    def verifier(self):
+        """Verifier with a small cache"""
+        return TokenVerifier(SECRET, max_size=2)
+    
+    def test_repeated_token_decoded_once(self, verifier):
+        """Test a token is decoded on first use and then served from the cache"""
+        token = make_token()
+        
+        with patch('src.services.token_verifier.jwt.decode', wraps=jwt.decode) as decode:
+            assert verifier.verify(token)['user_id'] == 1
+            assert verifier.verify(token)['user_id'] == 1
+        
+        assert decode.call_count == 1
+        assert verifier.stats()['hits'] == 1
+    
+    def test_invalid_token_rejected(self, verifier):
+        """Test tokens with a bad signature are rejected and not cached"""
+        token = jwt.encode({'user_id': 1, 'exp': int(time.time()) + 60}, 'other-secret', algorithm='HS256')
+        
+        assert verifier.verify(token) is None
+        assert verifier.stats()['size'] == 0
+    
+    def test_entry_expires_with_token(self, verifier):
+        """Test a cached token stops verifying once its exp passes"""
+        token = make_token(expires_in=60)
+        verifier.verify(token)
+        
+        # Past exp the cached entry is ignored and the token is decoded again
+        with patch('src.services.token_verifier.time.time', return_value=time.time() + 120), \
+                patch('src.services.token_verifier.jwt.decode', side_effect=jwt.ExpiredSignatureError):
+            assert verifier.verify(token) is None
+    
+    def test_revocation_hook_checked_on_hits(self):
+        """Test the revocation hook can reject a token already in the cache"""
+        is_revoked = Mock(return_value=False)
+        verifier = TokenVerifier(SECRET, is_revoked=is_revoked)
+        token = make_token()
+        
+        assert verifier.verify(token) is not None
+        is_revoked.return_value = True
+        
+        assert verifier.verify(token) is None
+        assert verifier.stats()['size'] == 0
+    
+    def test_lru_eviction(self, verifier):
+        """Test the least recently used token is evicted at max_size"""
+        tokens = [make_token(user_id) for user_id in (1, 2, 3)]
+        for token in tokens:
+            verifier.verify(token)
+        
+        assert verifier.stats()['size'] == 2
+        verifier.verify(tokens[0])
+        assert verifier.stats()['misses'] == 4
@@ -0,0 +1,146 @@
+"""
+Unit tests for User Provisioner
+"""
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+
+from src.services.user_provisioner import UserProvisioner, read_csv, read_ndjson, read_records
+
+
+def _record(n, **overrides):
+    """Build a valid input record"""
+    record = {'username': f'user{n}', 'email': f'user{n}@example.com', 'password': 'password123'}
+    record.update(overrides)
+    return record, None
+
+
+class TestReaders:
+    
+    def test_read_ndjson_reports_malformed_lines(self):
+        """Test that bad NDJSON lines become per-row errors instead of aborting"""
+        lines = ['{"username": "a"}\n', '\n', '{not json\n', '[1, 2]\n']
+        
+        parsed = list(read_ndjson(lines))
+        
+        assert parsed[0] == ({'username': 'a'}, None)
+        assert parsed[1][0] is None and parsed[1][1].startswith('Malformed JSON')
+        assert parsed[2] == (None, 'Record is not a JSON object')
+    
+    def test_read_csv_matches_columns_by_name(self):
+        """Test that CSV columns are read from the header"""
+        lines = ['email,username,password,team\n', 'a@example.com,a,password123,x\n']
+        
+        parsed = list(read_csv(lines))
+        
+        assert parsed == [({'email': 'a@example.com', 'username': 'a', 'password': 'password123', 'team': 'x'}, None)]
+    
+    def test_read_records_rejects_unknown_format(self):
+        """Test that only NDJSON and CSV are accepted"""
+        with pytest.raises(ValueError):
+            read_records([], 'xml')
+
+
+class TestUserProvisioner:
+    
+    @pytest.fixture
+    def mock_cursor(self):
+        """Mock cursor used for the staging COPY and merge"""
+        cursor = Mock()
+        cursor.fetchall.return_value = []
+        return cursor
+    
+    @pytest.fixture
+    def mock_db(self, mock_cursor):
+        """Mock database connection with no existing users"""
+        db = Mock()
+        db.execute_query.return_value = []
+        db.get_cursor.return_value = MagicMock(__enter__=Mock(return_value=mock_cursor))
+        return db
+    
+    @pytest.fixture
+    def provisioner(self, mock_db):
+        """Create a provisioner with fast hashing"""
+        with patch.object(UserProvisioner, '_hash_password', side_effect=lambda password: f'hash:{password}'):
+            yield UserProvisioner(mock_db, rounds=4, workers=2, batch_size=2)
+    
+    def test_provision_copies_and_merges_each_batch(self, provisioner, mock_cursor):
+        """Test that rows are hashed, COPYed to staging and merged batch by batch"""
+        mock_cursor.fetchall.side_effect = [
+            [{'id': 1, 'username': 'user1'}, {'id': 2, 'username': 'user2'}],
+            [{'id': 3, 'username': 'user3'}]
+        ]
+        progress = Mock()
+        
+        summary = provisioner.provision([_record(1), _record(2), _record(3)], progress=progress)
+        
+        assert summary['processed'] == 3
+        assert summary['created'] == 3
+        assert summary['user_ids'] == [1, 2, 3]
+        assert summary['conflicts'] == [] and summary['invalid'] == []
+        assert mock_cursor.copy_expert.call_count == 2
+        assert progress.call_count == 2
+        
+        staged = mock_cursor.copy_expert.call_args_list[0][0][1].getvalue()
+        assert staged.splitlines()[0] == '1,user1,user1@example.com,hash:password123,,'
+    
+    def test_provision_reports_invalid_and_duplicate_rows(self, provisioner, mock_cursor):
+        """Test that invalid rows and repeats within a batch are reported without hashing"""
+        provisioner.batch_size = 10
+        mock_cursor.fetchall.return_value = [{'id': 1, 'username': 'user1'}]
+        records = [
+            _record(1),
+            _record(1, email='other@example.com'),
+            _record(2, email='user1@example.com'),
+            _record(3, password='short'),
+            (None, 'Malformed JSON'),
+            _record(4, username=42)
+        ]
+        
+        summary = provisioner.provision(records)
+        
+        assert [(c['row'], c['reason']) for c in summary['conflicts']] == [
+            (2, 'duplicate_username'), (3, 'duplicate_email')
+        ]
+        assert [i['row'] for i in summary['invalid']] == [4, 5, 6]
+        assert provisioner._hash_password.call_count == 1
+    
+    def test_provision_skips_hashing_existing_users(self, provisioner, mock_db, mock_cursor):
+        """Test that rows clashing with existing users are reported before bcrypt runs"""
+        mock_db.execute_query.return_value = [
+            {'username': 'user1', 'email': 'old@example.com'},
+            {'username': 'someone', 'email': 'user2@example.com'}
+        ]
+        
+        summary = provisioner.provision([_record(1), _record(2)])
+        
+        assert [c['reason'] for c in summary['conflicts']] == ['username_exists', 'email_exists']
+        assert summary['created'] == 0
+        provisioner._hash_password.assert_not_called()
+        mock_db.get_cursor.assert_not_called()
+    
+    def test_provision_reports_rows_lost_to_concurrent_inserts(self, provisioner, mock_cursor):
+        """Test that rows skipped by ON CONFLICT are reported with their reason"""
+        mock_cursor.fetchall.side_effect = [
+            [{'id': 1, 'username': 'user1'}],
+            [{'row_num': 2, 'username': 'user2', 'email': 'user2@example.com', 'username_taken': False}]
+        ]
+        
+        summary = provisioner.provision([_record(1), _record(2)])
+        
+        assert summary['created'] == 1
+        assert summary['conflicts'] == [
+            {'row': 2, 'username': 'user2', 'email': 'user2@example.com', 'reason': 'email_exists'}
+        ]
+    
+    def test_provision_hashes_on_password_hasher(self, mock_db, mock_cursor):
+        """Test that a shared password hasher replaces the provisioner's own bcrypt threads"""
+        hasher = Mock(max_workers=2)
+        hasher.hash.side_effect = lambda password: f'hash:{password}'
+        mock_cursor.fetchall.return_value = [{'id': 1, 'username': 'user1'}]
+        provisioner = UserProvisioner(mock_db, workers=16, password_hasher=hasher)
+        
+        summary = provisioner.provision([_record(1)])
+        
+        assert provisioner.workers == 2
+        assert summary['created'] == 1
+        hasher.hash.assert_called_once_with('password123')
@@ -0,0 +1,60 @@
+"""
+Unit tests for utility functions
+"""
+import pytest
+from datetime import datetime
+
+from src.utils import decode_cursor, encode_cursor, keyset_paginate
+
+
+class TestCursors:
+    
+    def test_cursor_round_trip(self):
+        """Test a (created_at, id) sort key survives encoding"""
+        key = [datetime(2024, 5, 1, 12, 30, 0, 123456), 42]
+        
+        cursor = encode_cursor(key)
+        
+        assert '=' not in cursor
+        assert decode_cursor(cursor) == key
+    
+    def test_decode_invalid_cursor(self):
+        """Test malformed cursors raise ValueError"""
+        for cursor in ('not-a-cursor', encode_cursor([{'x': 1}]), 'e30'):
+            with pytest.raises(ValueError):
+                decode_cursor(cursor)
+
+
+class TestKeysetPaginate:
+    
+    def test_first_page(self):
+        """Test the first page only orders and limits"""
+        query, params = keyset_paginate("SELECT * FROM items", [], [], ('created_at', 'id'), limit=10)
+        
+        assert 'WHERE' not in query
+        assert 'ORDER BY created_at DESC, id DESC' in query
+        assert params == (10,)
+    
+    def test_next_page_seeks_past_cursor(self):
+        """Test later pages add a row-value comparison after the filters"""
+        after = [datetime(2024, 5, 1), 7]
+        
+        query, params = keyset_paginate(
+            "SELECT * FROM access_logs", ["user_id = %s"], [3], ('created_at', 'id'), after, 50
+        )
+        
+        assert 'WHERE user_id = %s\nAND (created_at, id) < (%s, %s)' in query
+        assert 'OFFSET' not in query
+        assert params == (3, after[0], 7, 50)
+    
+    def test_ascending_order(self):
+        """Test ascending keys seek with greater-than"""
+        query, params = keyset_paginate("SELECT * FROM users", [], [], ('id',), [5], 20, descending=False)
+        
+        assert '(id) > (%s)' in query
+        assert 'ORDER BY id ASC' in query
+    
+    def test_cursor_must_match_sort_key(self):
+        """Test a cursor for a different sort key is rejected"""
+        with pytest.raises(ValueError):
+            keyset_paginate("SELECT * FROM users", [], [], ('id',), [datetime(2024, 1, 1), 1], 20)